@@ -504,7 +504,7 @@ typedef struct __rescaled_BSSN_rfm_basis_struct__ {
         for mu in range(4):
             for nu in range(mu, 4):
                 gf = "T4UU" + str(mu) + str(nu)
-                body += "    griddata->gridfuncs.auxevol_gfs[IDX4ptS("+gf.upper()+"GF, idx3)] = rescaled_BSSN_rfm_basis."+gf+";\n"
+                body += "    griddata->gridfuncs.auxevol_gfs[IDX4ptSN(NUM_AUXEVOL_GFS, "+gf.upper()+"GF, idx3)] = rescaled_BSSN_rfm_basis."+gf+";\n"
     body += """
   } // END LOOP over all gridpoints on given grid
 
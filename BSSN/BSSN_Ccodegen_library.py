@@ -283,7 +283,29 @@ def add_rhs_eval_to_Cfunction_dict(includes=None, rel_path_to_Cparams=os.path.jo
                                    LapseCondition="OnePlusLog", ShiftCondition="GammaDriving2ndOrder_Covariant",
                                    enable_KreissOliger_dissipation=False, enable_stress_energy_source_terms=False,
                                    leave_Ricci_symbolic=True, OMP_pragma_on="i2",
-                                   func_name_suffix=""):
+                                   func_name_suffix="", FD_unroll_i0=1, fuse_Ricci="none", FD_upwind_branch=False):
+    # fuse_Ricci sets how rhs_eval() obtains the 3-Ricci tensor RbarDD:
+    #   "none":      read from the RbarDD AUXEVOL gridfunctions, as set by Ricci_eval()
+    #   "registers": RbarDD expressions are substituted into the BSSN RHSs, which are evaluated together
+    #   "row_tiles": RbarDD is computed along each i0 row into a small buffer, then read by the BSSN RHSs
+    #                in a second i0 loop over the same row, keeping register pressure of each loop low
+    #   With "registers" or "row_tiles", rhs_eval() does not read the RbarDD gridfunctions, so the caller
+    #   may drop Ricci_eval() from the MoL RHS_string. Ricci_eval() and the RbarDD AUXEVOL gridfunctions
+    #   remain needed by any other kernel that reads RbarDD, e.g., BSSN constraints with leave_Ricci_symbolic=True.
+    #   tests/test_BSSN_fuse_Ricci.py checks that all three modes produce the same RHSs.
+    if fuse_Ricci not in ("none", "registers", "row_tiles"):
+        print("Error: fuse_Ricci = \"" + fuse_Ricci + "\" unsupported; choose \"none\", \"registers\", or \"row_tiles\".")
+        sys.exit(1)
+    if fuse_Ricci != "none" and enable_split_for_optimizations_doesnt_help:
+        print("Error: fuse_Ricci = \"" + fuse_Ricci + "\" is incompatible with enable_split_for_optimizations_doesnt_help.")
+        sys.exit(1)
+    if fuse_Ricci == "row_tiles" and FD_unroll_i0 > 1:
+        print("Error: fuse_Ricci = \"row_tiles\" is incompatible with FD_unroll_i0 > 1.")
+        sys.exit(1)
+    if fuse_Ricci == "registers":
+        leave_Ricci_symbolic = False
+    elif fuse_Ricci == "row_tiles":
+        leave_Ricci_symbolic = True
     if includes is None:
         includes = []
     if enable_SIMD:
@@ -294,6 +316,8 @@ def add_rhs_eval_to_Cfunction_dict(includes=None, rel_path_to_Cparams=os.path.jo
 
     # Set up the C function for the BSSN RHSs
     desc = "Evaluate the BSSN RHSs"
+    if fuse_Ricci != "none":
+        desc += ", computing the 3-Ricci tensor in the same kernel (fuse_Ricci=\"" + fuse_Ricci + "\")"
     func_name = "rhs_eval" + func_name_suffix
     params = "const paramstruct *restrict params, "
     if enable_rfm_precompute:
@@ -319,6 +343,12 @@ def add_rhs_eval_to_Cfunction_dict(includes=None, rel_path_to_Cparams=os.path.jo
 
     FD_outCparams = "outCverbose=False,enable_SIMD=" + str(enable_SIMD)
     FD_outCparams += ",GoldenKernelsEnable=" + str(enable_golden_kernels)
+    if FD_unroll_i0 > 1:
+        # Unroll the i0 loop, reusing gridfunction values read from memory (scalar code only)
+        FD_outCparams += ",FD_unroll_i0=" + str(FD_unroll_i0)
+    if FD_upwind_branch:
+        # Evaluate only the needed one-sided stencil of each shift-advection (upwinded) derivative
+        FD_outCparams += ",FD_upwind_branch=True"
 
     loopopts = get_loopopts("InteriorPoints", enable_SIMD, enable_rfm_precompute, OMP_pragma_on)
     FDorder = par.parval_from_str("finite_difference::FD_CENTDERIVS_ORDER")
@@ -344,6 +374,9 @@ def add_rhs_eval_to_Cfunction_dict(includes=None, rel_path_to_Cparams=os.path.jo
                               params=FD_outCparams,
                               upwindcontrolvec=betaU)
         postloop = "\n    } // END #pragma omp parallel\n"
+    elif fuse_Ricci == "row_tiles":
+        body = Ricci_row_tiles__rhs_eval_body(BSSN_RHSs_SymbExpressions, betaU, FD_outCparams, enable_SIMD)
+        postloop = ""
     else:
         preloop += ""
         body = fin.FD_outputC("returnstring", BSSN_RHSs_SymbExpressions,
@@ -395,11 +428,37 @@ def Ricci__generate_symbolic_expressions():
     return Ricci_SymbExpressions
 
 
+# Ricci_row_tiles__rhs_eval_body() returns the loop interior for rhs_eval() with fuse_Ricci="row_tiles":
+#   for each (i1,i2), a first i0 loop stores RbarDD along the row into the RbarDD??_row[] buffers,
+#   and a second i0 loop evaluates the BSSN RHSs, reading RbarDD from these buffers (see loop.simple_loop()).
+def Ricci_row_tiles__rhs_eval_body(BSSN_RHSs_SymbExpressions, betaU, FD_outCparams, enable_SIMD):
+    # SIMD reads & writes of the last point(s) along a row may extend up to SIMD_width-1 points past the row.
+    row_size = "Nxx_plus_2NGHOSTS0 + SIMD_width" if enable_SIMD else "Nxx_plus_2NGHOSTS0"
+    Ricci_exprs = []
+    RHSs_body = fin.FD_outputC("returnstring", BSSN_RHSs_SymbExpressions,
+                               params=FD_outCparams, upwindcontrolvec=betaU)
+    declarations = ""
+    # Ricci__generate_symbolic_expressions() returns RbarDD00, RbarDD01, RbarDD02, RbarDD11, RbarDD12, RbarDD22, in order.
+    gfnames = ["RbarDD" + str(i) + str(j) for i in range(3) for j in range(i, 3)]
+    for gfname, lhsrhs in zip(gfnames, Ricci__generate_symbolic_expressions()):
+        row = gfname + "_row"
+        declarations += "REAL " + row + "[" + row_size + "];\n"
+        Ricci_exprs.append(lhrh(lhs=row + "[i0]", rhs=lhsrhs.rhs))
+        # The BSSN RHSs read RbarDD only at (i0,i1,i2) (it is not differentiated).
+        RbarDD_read = gri.gfaccess("in_gfs", gfname, "i0,i1,i2")
+        if RbarDD_read not in RHSs_body:
+            print("Error: Could not find the read of " + gfname + " in the BSSN RHSs.")
+            sys.exit(1)
+        RHSs_body = RHSs_body.replace(RbarDD_read, row + "[i0]")
+    Ricci_body = fin.FD_outputC("returnstring", Ricci_exprs, params=FD_outCparams)
+    return declarations + lp.i0_loop_split_marker + "\n" + Ricci_body + "\n" + lp.i0_loop_split_marker + "\n" + RHSs_body
+
+
 # Register C function Ricci_eval() for evaluating 3-Ricci tensor
 def add_Ricci_eval_to_Cfunction_dict(includes=None, rel_path_to_Cparams=os.path.join("."),
                                      enable_rfm_precompute=True, enable_golden_kernels=False, enable_SIMD=True,
                                      enable_split_for_optimizations_doesnt_help=False, OMP_pragma_on="i2",
-                                     func_name_suffix=""):
+                                     func_name_suffix="", FD_unroll_i0=1):
     if includes is None:
         includes = []
     if enable_SIMD:
@@ -422,6 +481,9 @@ def add_Ricci_eval_to_Cfunction_dict(includes=None, rel_path_to_Cparams=os.path.
     Ricci_SymbExpressions = Ricci__generate_symbolic_expressions()
     FD_outCparams = "outCverbose=False,enable_SIMD=" + str(enable_SIMD)
     FD_outCparams += ",GoldenKernelsEnable=" + str(enable_golden_kernels)
+    if FD_unroll_i0 > 1:
+        # Unroll the i0 loop, reusing gridfunction values read from memory (scalar code only)
+        FD_outCparams += ",FD_unroll_i0=" + str(FD_unroll_i0)
     loopopts = get_loopopts("InteriorPoints", enable_SIMD, enable_rfm_precompute, OMP_pragma_on)
 
     FDorder = par.parval_from_str("finite_difference::FD_CENTDERIVS_ORDER")
@@ -868,12 +930,12 @@ void lowlevel_decompose_psi4_into_swm2_modes(const int Nxx_plus_2NGHOSTS1,const
         ph_array[i2-NGHOSTS] = xx[2][i2];
 
         // Compute real & imaginary parts of psi_4, output to diagnostic_output_gfs
-        const REAL psi4r = (diagnostic_output_gfs[IDX4S(PSI4_PART0REGF, i0,i1,i2)] +
-                            diagnostic_output_gfs[IDX4S(PSI4_PART1REGF, i0,i1,i2)] +
-                            diagnostic_output_gfs[IDX4S(PSI4_PART2REGF, i0,i1,i2)]);
-        const REAL psi4i = (diagnostic_output_gfs[IDX4S(PSI4_PART0IMGF, i0,i1,i2)] +
-                            diagnostic_output_gfs[IDX4S(PSI4_PART1IMGF, i0,i1,i2)] +
-                            diagnostic_output_gfs[IDX4S(PSI4_PART2IMGF, i0,i1,i2)]);
+        const REAL psi4r = (diagnostic_output_gfs[IDX4SN(NUM_AUX_GFS, PSI4_PART0REGF, i0,i1,i2)] +
+                            diagnostic_output_gfs[IDX4SN(NUM_AUX_GFS, PSI4_PART1REGF, i0,i1,i2)] +
+                            diagnostic_output_gfs[IDX4SN(NUM_AUX_GFS, PSI4_PART2REGF, i0,i1,i2)]);
+        const REAL psi4i = (diagnostic_output_gfs[IDX4SN(NUM_AUX_GFS, PSI4_PART0IMGF, i0,i1,i2)] +
+                            diagnostic_output_gfs[IDX4SN(NUM_AUX_GFS, PSI4_PART1IMGF, i0,i1,i2)] +
+                            diagnostic_output_gfs[IDX4SN(NUM_AUX_GFS, PSI4_PART2IMGF, i0,i1,i2)]);
 
         // Store result to "2D" array (actually 1D array with 2D storage):
         const int idx2d = (i1-NGHOSTS)*(Nxx_plus_2NGHOSTS2-2*NGHOSTS)+(i2-NGHOSTS);
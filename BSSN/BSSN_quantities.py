@@ -84,14 +84,16 @@ def BSSN_basic_tensors():
     DIM = 3
 
     # Step 3.a.i: gammabarDD and AbarDD:
-    gammabarDD = ixp.zerorank2()
-    AbarDD = ixp.zerorank2()
-    for i in range(DIM):
-        for j in range(DIM):
-            # gammabar_{ij}  = h_{ij}*ReDD[i][j] + gammahat_{ij}
-            gammabarDD[i][j] = hDD[i][j] * rfm.ReDD[i][j] + rfm.ghatDD[i][j]
-            # Abar_{ij}      = a_{ij}*ReDD[i][j]
-            AbarDD[i][j] = aDD[i][j] * rfm.ReDD[i][j]
+    #   Symmetric tensors are built as CompactIndexedExp's, so that only independent
+    #   components are computed, then exported as the usual nested lists.
+    gammabarDD = ixp.CompactIndexedExp(rank=2, symmetry="sym01")
+    AbarDD = ixp.CompactIndexedExp(rank=2, symmetry="sym01")
+    for i, j in gammabarDD.independent_indices():
+        # gammabar_{ij}  = h_{ij}*ReDD[i][j] + gammahat_{ij}
+        gammabarDD[i][j] = hDD[i][j] * rfm.ReDD[i][j] + rfm.ghatDD[i][j]
+        # Abar_{ij}      = a_{ij}*ReDD[i][j]
+        AbarDD[i][j] = aDD[i][j] * rfm.ReDD[i][j]
+    gammabarDD, AbarDD = gammabarDD.tolist(), AbarDD.tolist()
 
     # Step 3.a.ii: LambdabarU, betaU, and BU:
     LambdabarU = ixp.zerorank1()
@@ -120,48 +122,44 @@ def gammabar__inverse_and_derivs():
 
     # Step 4.b.i: gammabarDDdD[i][j][k]
     #               = \hat{\gamma}_{ij,k} + h_{ij,k} \text{ReDD[i][j]} + h_{ij} \text{ReDDdD[i][j][k]}.
-    gammabarDD_dD = ixp.zerorank3()
-    gammabarDD_dupD = ixp.zerorank3()
+    gammabarDD_dD = ixp.CompactIndexedExp(rank=3, symmetry="sym01")
+    gammabarDD_dupD = ixp.CompactIndexedExp(rank=3, symmetry="sym01")
     hDD_dD = ixp.declarerank3("hDD_dD", "sym01")
     hDD_dupD = ixp.declarerank3("hDD_dupD", "sym01")
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                gammabarDD_dD[i][j][k] = rfm.ghatDDdD[i][j][k] + \
-                                         hDD_dD[i][j][k] * rfm.ReDD[i][j] + hDD[i][j] * rfm.ReDDdD[i][j][k]
+    for i, j, k in gammabarDD_dD.independent_indices():
+        gammabarDD_dD[i][j][k] = rfm.ghatDDdD[i][j][k] + \
+                                 hDD_dD[i][j][k] * rfm.ReDD[i][j] + hDD[i][j] * rfm.ReDDdD[i][j][k]
 
-                # Compute associated upwinded derivative, needed for the \bar{\gamma}_{ij} RHS
-                gammabarDD_dupD[i][j][k] = rfm.ghatDDdD[i][j][k] + \
-                                           hDD_dupD[i][j][k] * rfm.ReDD[i][j] + hDD[i][j] * rfm.ReDDdD[i][j][k]
+        # Compute associated upwinded derivative, needed for the \bar{\gamma}_{ij} RHS
+        gammabarDD_dupD[i][j][k] = rfm.ghatDDdD[i][j][k] + \
+                                   hDD_dupD[i][j][k] * rfm.ReDD[i][j] + hDD[i][j] * rfm.ReDDdD[i][j][k]
+    gammabarDD_dD, gammabarDD_dupD = gammabarDD_dD.tolist(), gammabarDD_dupD.tolist()
 
     # Step 4.b.ii: Compute gammabarDD_dDD in terms of the rescaled BSSN quantity hDD
     #      and its derivatives, as well as the reference metric and rescaling
     #      matrix, and its derivatives (expression given below):
     hDD_dDD = ixp.declarerank4("hDD_dDD", "sym01_sym23")
-    gammabarDD_dDD = ixp.zerorank4()
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                for l in range(DIM):
-                    # gammabar_{ij,kl} = gammahat_{ij,kl}
-                    #                  + h_{ij,kl} ReDD[i][j]
-                    #                  + h_{ij,k} ReDDdD[i][j][l] + h_{ij,l} ReDDdD[i][j][k]
-                    #                  + h_{ij} ReDDdDD[i][j][k][l]
-                    gammabarDD_dDD[i][j][k][l] = rfm.ghatDDdDD[i][j][k][l]
-                    gammabarDD_dDD[i][j][k][l] += hDD_dDD[i][j][k][l] * rfm.ReDD[i][j]
-                    gammabarDD_dDD[i][j][k][l] += hDD_dD[i][j][k] * rfm.ReDDdD[i][j][l] + \
-                                                  hDD_dD[i][j][l] * rfm.ReDDdD[i][j][k]
-                    gammabarDD_dDD[i][j][k][l] += hDD[i][j] * rfm.ReDDdDD[i][j][k][l]
+    gammabarDD_dDD = ixp.CompactIndexedExp(rank=4, symmetry="sym01_sym23")
+    for i, j, k, l in gammabarDD_dDD.independent_indices():
+        # gammabar_{ij,kl} = gammahat_{ij,kl}
+        #                  + h_{ij,kl} ReDD[i][j]
+        #                  + h_{ij,k} ReDDdD[i][j][l] + h_{ij,l} ReDDdD[i][j][k]
+        #                  + h_{ij} ReDDdDD[i][j][k][l]
+        gammabarDD_dDD[i][j][k][l] = rfm.ghatDDdDD[i][j][k][l]
+        gammabarDD_dDD[i][j][k][l] += hDD_dDD[i][j][k][l] * rfm.ReDD[i][j]
+        gammabarDD_dDD[i][j][k][l] += hDD_dD[i][j][k] * rfm.ReDDdD[i][j][l] + \
+                                      hDD_dD[i][j][l] * rfm.ReDDdD[i][j][k]
+        gammabarDD_dDD[i][j][k][l] += hDD[i][j] * rfm.ReDDdDD[i][j][k][l]
+    gammabarDD_dDD = gammabarDD_dDD.tolist()
 
     # Step 4.b.iii: Define barred Christoffel symbol \bar{\Gamma}^{i}_{kl} = GammabarUDD[i][k][l] (see expression below)
-    GammabarUDD = ixp.zerorank3()
-    for i in range(DIM):
-        for k in range(DIM):
-            for l in range(DIM):
-                for m in range(DIM):
-                    # Gammabar^i_{kl} = 1/2 * gammabar^{im} ( gammabar_{mk,l} + gammabar_{ml,k} - gammabar_{kl,m}):
-                    GammabarUDD[i][k][l] += sp.Rational(1, 2) * gammabarUU[i][m] * \
-                                            (gammabarDD_dD[m][k][l] + gammabarDD_dD[m][l][k] - gammabarDD_dD[k][l][m])
+    GammabarUDD = ixp.CompactIndexedExp(rank=3, symmetry="sym12")
+    for i, k, l in GammabarUDD.independent_indices():
+        for m in range(DIM):
+            # Gammabar^i_{kl} = 1/2 * gammabar^{im} ( gammabar_{mk,l} + gammabar_{ml,k} - gammabar_{kl,m}):
+            GammabarUDD[i][k][l] += sp.Rational(1, 2) * gammabarUU[i][m] * \
+                                    (gammabarDD_dD[m][k][l] + gammabarDD_dD[m][l][k] - gammabarDD_dD[k][l][m])
+    GammabarUDD = GammabarUDD.tolist()
 
 
 # Step 5: det(gammabarDD) and its derivatives
@@ -220,13 +218,13 @@ def AbarUU_AbarUD_trAbar_AbarDD_dD():
     gammabar__inverse_and_derivs()
 
     # Step 6.a.i: Compute Abar^{ij} in terms of Abar_{ij} and gammabar^{ij}
-    AbarUU = ixp.zerorank2()
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                for l in range(DIM):
-                    # Abar^{ij} = gammabar^{ik} gammabar^{jl} Abar_{kl}
-                    AbarUU[i][j] += gammabarUU[i][k] * gammabarUU[j][l] * AbarDD[k][l]
+    AbarUU = ixp.CompactIndexedExp(rank=2, symmetry="sym01")
+    for i, j in AbarUU.independent_indices():
+        for k in range(DIM):
+            for l in range(DIM):
+                # Abar^{ij} = gammabar^{ik} gammabar^{jl} Abar_{kl}
+                AbarUU[i][j] += gammabarUU[i][k] * gammabarUU[j][l] * AbarDD[k][l]
+    AbarUU = AbarUU.tolist()
 
     # Step 6.a.ii: Compute Abar^i_j in terms of Abar_{ij} and gammabar^{ij}
     AbarUD = ixp.zerorank2()
@@ -244,15 +242,14 @@ def AbarUU_AbarUD_trAbar_AbarDD_dD():
             trAbar += gammabarUU[k][j] * AbarDD[j][k]
 
     # Step 6.a.iv: Compute Abar_{ij,k}
-    AbarDD_dD = ixp.zerorank3()
-    AbarDD_dupD = ixp.zerorank3()
+    AbarDD_dD = ixp.CompactIndexedExp(rank=3, symmetry="sym01")
+    AbarDD_dupD = ixp.CompactIndexedExp(rank=3, symmetry="sym01")
     aDD_dD = ixp.declarerank3("aDD_dD", "sym01")
     aDD_dupD = ixp.declarerank3("aDD_dupD", "sym01")
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                AbarDD_dupD[i][j][k] = rfm.ReDDdD[i][j][k] * aDD[i][j] + rfm.ReDD[i][j] * aDD_dupD[i][j][k]
-                AbarDD_dD[i][j][k] = rfm.ReDDdD[i][j][k] * aDD[i][j] + rfm.ReDD[i][j] * aDD_dD[i][j][k]
+    for i, j, k in AbarDD_dD.independent_indices():
+        AbarDD_dupD[i][j][k] = rfm.ReDDdD[i][j][k] * aDD[i][j] + rfm.ReDD[i][j] * aDD_dupD[i][j][k]
+        AbarDD_dD[i][j][k] = rfm.ReDDdD[i][j][k] * aDD[i][j] + rfm.ReDD[i][j] * aDD_dD[i][j][k]
+    AbarDD_dD, AbarDD_dupD = AbarDD_dD.tolist(), AbarDD_dupD.tolist()
 
 
 # Step 7: The conformal ("barred") Ricci tensor RbarDD
@@ -269,43 +266,40 @@ def RicciBar__gammabarDD_dHatD__DGammaUDD__DGammaU():
     gammabar__inverse_and_derivs()
 
     # Step 7.a.i: Define \varepsilon_{ij} = epsDD[i][j]
-    epsDD = ixp.zerorank3()
-    for i in range(DIM):
-        for j in range(DIM):
-            epsDD[i][j] = hDD[i][j] * rfm.ReDD[i][j]
+    #   As in Step 2, tensors symmetric in (i,j) are built as CompactIndexedExp's.
+    epsDD = ixp.CompactIndexedExp(rank=2, symmetry="sym01")
+    for i, j in epsDD.independent_indices():
+        epsDD[i][j] = hDD[i][j] * rfm.ReDD[i][j]
+    epsDD = epsDD.tolist()
 
     # Step 7.a.ii: Define epsDD_dD[i][j][k]
     hDD_dD = ixp.declarerank3("hDD_dD", "sym01")
-    epsDD_dD = ixp.zerorank3()
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                epsDD_dD[i][j][k] = hDD_dD[i][j][k] * rfm.ReDD[i][j] + hDD[i][j] * rfm.ReDDdD[i][j][k]
+    epsDD_dD = ixp.CompactIndexedExp(rank=3, symmetry="sym01")
+    for i, j, k in epsDD_dD.independent_indices():
+        epsDD_dD[i][j][k] = hDD_dD[i][j][k] * rfm.ReDD[i][j] + hDD[i][j] * rfm.ReDDdD[i][j][k]
+    epsDD_dD = epsDD_dD.tolist()
 
     # Step 7.a.iii: Define epsDD_dDD[i][j][k][l]
     hDD_dDD = ixp.declarerank4("hDD_dDD", "sym01_sym23")
-    epsDD_dDD = ixp.zerorank4()
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                for l in range(DIM):
-                    epsDD_dDD[i][j][k][l] = hDD_dDD[i][j][k][l] * rfm.ReDD[i][j] + \
-                                            hDD_dD[i][j][k] * rfm.ReDDdD[i][j][l] + \
-                                            hDD_dD[i][j][l] * rfm.ReDDdD[i][j][k] + \
-                                            hDD[i][j] * rfm.ReDDdDD[i][j][k][l]
+    epsDD_dDD = ixp.CompactIndexedExp(rank=4, symmetry="sym01_sym23")
+    for i, j, k, l in epsDD_dDD.independent_indices():
+        epsDD_dDD[i][j][k][l] = hDD_dDD[i][j][k][l] * rfm.ReDD[i][j] + \
+                                hDD_dD[i][j][k] * rfm.ReDDdD[i][j][l] + \
+                                hDD_dD[i][j][l] * rfm.ReDDdD[i][j][k] + \
+                                hDD[i][j] * rfm.ReDDdDD[i][j][k][l]
+    epsDD_dDD = epsDD_dDD.tolist()
 
     # Step 7.a.iv: DhatgammabarDDdD[i][j][l] = \bar{\gamma}_{ij;\hat{l}}
     # \bar{\gamma}_{ij;\hat{l}} = \varepsilon_{i j,l}
     #                           - \hat{\Gamma}^m_{i l} \varepsilon_{m j}
     #                           - \hat{\Gamma}^m_{j l} \varepsilon_{i m}
-    gammabarDD_dHatD = ixp.zerorank3()
-    for i in range(DIM):
-        for j in range(DIM):
-            for l in range(DIM):
-                gammabarDD_dHatD[i][j][l] = epsDD_dD[i][j][l]
-                for m in range(DIM):
-                    gammabarDD_dHatD[i][j][l] += - rfm.GammahatUDD[m][i][l] * epsDD[m][j] \
-                                                 - rfm.GammahatUDD[m][j][l] * epsDD[i][m]
+    gammabarDD_dHatD = ixp.CompactIndexedExp(rank=3, symmetry="sym01")
+    for i, j, l in gammabarDD_dHatD.independent_indices():
+        gammabarDD_dHatD[i][j][l] = epsDD_dD[i][j][l]
+        for m in range(DIM):
+            gammabarDD_dHatD[i][j][l] += - rfm.GammahatUDD[m][i][l] * epsDD[m][j] \
+                                         - rfm.GammahatUDD[m][j][l] * epsDD[i][m]
+    gammabarDD_dHatD = gammabarDD_dHatD.tolist()
 
     # Step 7.a.v: \bar{\gamma}_{ij;\hat{l},k} = DhatgammabarDD_dHatD_dD[i][j][l][k]:
     #        \bar{\gamma}_{ij;\hat{l},k} = \varepsilon_{ij,lk}
@@ -313,33 +307,29 @@ def RicciBar__gammabarDD_dHatD__DGammaUDD__DGammaU():
     #                                      - \hat{\Gamma}^m_{i l} \varepsilon_{m j,k}
     #                                      - \hat{\Gamma}^m_{j l,k} \varepsilon_{i m}
     #                                      - \hat{\Gamma}^m_{j l} \varepsilon_{i m,k}
-    gammabarDD_dHatD_dD = ixp.zerorank4()
-    for i in range(DIM):
-        for j in range(DIM):
-            for l in range(DIM):
-                for k in range(DIM):
-                    gammabarDD_dHatD_dD[i][j][l][k] = epsDD_dDD[i][j][l][k]
-                    for m in range(DIM):
-                        gammabarDD_dHatD_dD[i][j][l][k] += -rfm.GammahatUDDdD[m][i][l][k] * epsDD[m][j] \
-                                                           - rfm.GammahatUDD[m][i][l] * epsDD_dD[m][j][k] \
-                                                           - rfm.GammahatUDDdD[m][j][l][k] * epsDD[i][m] \
-                                                           - rfm.GammahatUDD[m][j][l] * epsDD_dD[i][m][k]
+    gammabarDD_dHatD_dD = ixp.CompactIndexedExp(rank=4, symmetry="sym01")
+    for i, j, l, k in gammabarDD_dHatD_dD.independent_indices():
+        gammabarDD_dHatD_dD[i][j][l][k] = epsDD_dDD[i][j][l][k]
+        for m in range(DIM):
+            gammabarDD_dHatD_dD[i][j][l][k] += -rfm.GammahatUDDdD[m][i][l][k] * epsDD[m][j] \
+                                               - rfm.GammahatUDD[m][i][l] * epsDD_dD[m][j][k] \
+                                               - rfm.GammahatUDDdD[m][j][l][k] * epsDD[i][m] \
+                                               - rfm.GammahatUDD[m][j][l] * epsDD_dD[i][m][k]
+    gammabarDD_dHatD_dD = gammabarDD_dHatD_dD.tolist()
 
     # Step 7.a.vi: \bar{\gamma}_{ij;\hat{l}\hat{k}} = DhatgammabarDD_dHatDD[i][j][l][k]
     #          \bar{\gamma}_{ij;\hat{l}\hat{k}} = \partial_k \hat{D}_{l} \varepsilon_{i j}
     #                                           - \hat{\Gamma}^m_{lk} \left(\hat{D}_{m} \varepsilon_{i j}\right)
     #                                           - \hat{\Gamma}^m_{ik} \left(\hat{D}_{l} \varepsilon_{m j}\right)
     #                                           - \hat{\Gamma}^m_{jk} \left(\hat{D}_{l} \varepsilon_{i m}\right)
-    gammabarDD_dHatDD = ixp.zerorank4()
-    for i in range(DIM):
-        for j in range(DIM):
-            for l in range(DIM):
-                for k in range(DIM):
-                    gammabarDD_dHatDD[i][j][l][k] = gammabarDD_dHatD_dD[i][j][l][k]
-                    for m in range(DIM):
-                        gammabarDD_dHatDD[i][j][l][k] += - rfm.GammahatUDD[m][l][k] * gammabarDD_dHatD[i][j][m] \
-                                                         - rfm.GammahatUDD[m][i][k] * gammabarDD_dHatD[m][j][l] \
-                                                         - rfm.GammahatUDD[m][j][k] * gammabarDD_dHatD[i][m][l]
+    gammabarDD_dHatDD = ixp.CompactIndexedExp(rank=4, symmetry="sym01")
+    for i, j, l, k in gammabarDD_dHatDD.independent_indices():
+        gammabarDD_dHatDD[i][j][l][k] = gammabarDD_dHatD_dD[i][j][l][k]
+        for m in range(DIM):
+            gammabarDD_dHatDD[i][j][l][k] += - rfm.GammahatUDD[m][l][k] * gammabarDD_dHatD[i][j][m] \
+                                             - rfm.GammahatUDD[m][i][k] * gammabarDD_dHatD[m][j][l] \
+                                             - rfm.GammahatUDD[m][j][k] * gammabarDD_dHatD[i][m][l]
+    gammabarDD_dHatDD = gammabarDD_dHatDD.tolist()
 
     # Step 7.b: Second term of RhatDD: compute \hat{D}_{j} \bar{\Lambda}^{k} = LambarU_dHatD[k][j]
     lambdaU_dD = ixp.declarerank2("lambdaU_dD", "nosym")
@@ -355,11 +345,10 @@ def RicciBar__gammabarDD_dHatD__DGammaUDD__DGammaU():
     #           + \Delta_{i k}^{m} \Delta_{m j l}) terms
 
     # Step 7.c.i: Define \Delta^i_{jk} = \bar{\Gamma}^i_{jk} - \hat{\Gamma}^i_{jk} = DGammaUDD[i][j][k]
-    DGammaUDD = ixp.zerorank3()
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                DGammaUDD[i][j][k] = GammabarUDD[i][j][k] - rfm.GammahatUDD[i][j][k]
+    DGammaUDD = ixp.CompactIndexedExp(rank=3, symmetry="sym12")
+    for i, j, k in DGammaUDD.independent_indices():
+        DGammaUDD[i][j][k] = GammabarUDD[i][j][k] - rfm.GammahatUDD[i][j][k]
+    DGammaUDD = DGammaUDD.tolist()
 
     # Step 7.c.ii: Define \Delta^i = \bar{\gamma}^{jk} \Delta^i_{jk}
     DGammaU = ixp.zerorank1()
@@ -386,44 +375,42 @@ def RicciBar__gammabarDD_dHatD__DGammaUDD__DGammaU():
         return
 
     # Step 7.d: Summing the terms and defining \bar{R}_{ij}
+    #   RbarDD is symmetric, so (as in Step 7.a) only its independent components are summed.
     # Step 7.d.i: Add the first term to RbarDD:
     #         Rbar_{ij} += - \frac{1}{2} \bar{\gamma}^{k l} \hat{D}_{k} \hat{D}_{l} \bar{\gamma}_{i j}
-    RbarDD = ixp.zerorank2()
-    RbarDDpiece = ixp.zerorank2()
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                for l in range(DIM):
-                    RbarDD[i][j] += -sp.Rational(1, 2) * gammabarUU[k][l] * gammabarDD_dHatDD[i][j][l][k]
-                    RbarDDpiece[i][j] += -sp.Rational(1, 2) * gammabarUU[k][l] * gammabarDD_dHatDD[i][j][l][k]
+    RbarDD = ixp.CompactIndexedExp(rank=2, symmetry="sym01")
+    RbarDDpiece = ixp.CompactIndexedExp(rank=2, symmetry="sym01")
+    for i, j in RbarDD.independent_indices():
+        for k in range(DIM):
+            for l in range(DIM):
+                RbarDD[i][j] += -sp.Rational(1, 2) * gammabarUU[k][l] * gammabarDD_dHatDD[i][j][l][k]
+                RbarDDpiece[i][j] += -sp.Rational(1, 2) * gammabarUU[k][l] * gammabarDD_dHatDD[i][j][l][k]
 
     # Step 7.d.ii: Add the second term to RbarDD:
     #         Rbar_{ij} += (1/2) * (gammabar_{ki} Lambar^k_{;\hat{j}} + gammabar_{kj} Lambar^k_{;\hat{i}})
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                RbarDD[i][j] += sp.Rational(1, 2) * (gammabarDD[k][i] * LambarU_dHatD[k][j] +
-                                                     gammabarDD[k][j] * LambarU_dHatD[k][i])
+    for i, j in RbarDD.independent_indices():
+        for k in range(DIM):
+            RbarDD[i][j] += sp.Rational(1, 2) * (gammabarDD[k][i] * LambarU_dHatD[k][j] +
+                                                 gammabarDD[k][j] * LambarU_dHatD[k][i])
 
     # Step 7.d.iii: Add the remaining term to RbarDD:
     #      Rbar_{ij} += \Delta^{k} \Delta_{(i j) k} = 1/2 \Delta^{k} (\Delta_{i j k} + \Delta_{j i k})
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                RbarDD[i][j] += sp.Rational(1, 2) * DGammaU[k] * (DGammaDDD[i][j][k] + DGammaDDD[j][i][k])
+    for i, j in RbarDD.independent_indices():
+        for k in range(DIM):
+            RbarDD[i][j] += sp.Rational(1, 2) * DGammaU[k] * (DGammaDDD[i][j][k] + DGammaDDD[j][i][k])
 
     # Step 7.d.iv: Add the final term to RbarDD:
     #      Rbar_{ij} += \bar{\gamma}^{k l} (\Delta^{m}_{k i} \Delta_{j m l}
     #                   + \Delta^{m}_{k j} \Delta_{i m l}
     #                   + \Delta^{m}_{i k} \Delta_{m j l})
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                for l in range(DIM):
-                    for m in range(DIM):
-                        RbarDD[i][j] += gammabarUU[k][l] * (DGammaUDD[m][k][i] * DGammaDDD[j][m][l] +
-                                                            DGammaUDD[m][k][j] * DGammaDDD[i][m][l] +
-                                                            DGammaUDD[m][i][k] * DGammaDDD[m][j][l])
+    for i, j in RbarDD.independent_indices():
+        for k in range(DIM):
+            for l in range(DIM):
+                for m in range(DIM):
+                    RbarDD[i][j] += gammabarUU[k][l] * (DGammaUDD[m][k][i] * DGammaDDD[j][m][l] +
+                                                        DGammaUDD[m][k][j] * DGammaDDD[i][m][l] +
+                                                        DGammaUDD[m][i][k] * DGammaDDD[m][j][l])
+    RbarDD, RbarDDpiece = RbarDD.tolist(), RbarDDpiece.tolist()
 
 
 # Step 8: The unrescaled shift vector betaU spatial derivatives:
@@ -46,66 +46,53 @@ def Psi4(specify_tetrad=True):
         mim4U = ixp.declarerank1("mim4U", DIM=4)
         n4U = ixp.declarerank1("n4U", DIM=4)
 
-    # Step 2: Construct the (rank-4) Riemann curvature tensor associated with the ADM 3-metric:
-    RDDDD = ixp.zerorank4()
+    # Step 2: Construct the (rank-4) Riemann curvature tensor associated with the ADM 3-metric.
+    #   R_{iklm} is antisymmetric in (i,k) and in (l,m), so only its 9 independent
+    #   components are computed and stored:
+    RDDDD = ixp.CompactIndexedExp(rank=4, symmetry="anti01_anti23")
     gammaDDdDD = AB.gammaDDdDD
 
-    for i in range(DIM):
-        for k in range(DIM):
-            for l in range(DIM):
-                for m in range(DIM):
-                    RDDDD[i][k][l][m] = sp.Rational(1, 2) * \
-                                        (gammaDDdDD[i][m][k][l] + gammaDDdDD[k][l][i][m] - gammaDDdDD[i][l][k][m] -
-                                         gammaDDdDD[k][m][i][l])
+    for i, k, l, m in RDDDD.independent_indices():
+        RDDDD[i][k][l][m] = sp.Rational(1, 2) * \
+                            (gammaDDdDD[i][m][k][l] + gammaDDdDD[k][l][i][m] - gammaDDdDD[i][l][k][m] -
+                             gammaDDdDD[k][m][i][l])
 
     # ... then we add the term on the right:
     gammaDD = AB.gammaDD
     GammaUDD = AB.GammaUDD
 
-    for i in range(DIM):
-        for k in range(DIM):
-            for l in range(DIM):
-                for m in range(DIM):
-                    for n in range(DIM):
-                        for p in range(DIM):
-                            RDDDD[i][k][l][m] += gammaDD[n][p] * \
-                                                 (GammaUDD[n][k][l] * GammaUDD[p][i][m] - GammaUDD[n][k][m] * GammaUDD[p][i][l])
+    for i, k, l, m in RDDDD.independent_indices():
+        for n in range(DIM):
+            for p in range(DIM):
+                RDDDD[i][k][l][m] += gammaDD[n][p] * \
+                                     (GammaUDD[n][k][l] * GammaUDD[p][i][m] - GammaUDD[n][k][m] * GammaUDD[p][i][l])
 
     # Step 3: Construct the (rank-4) tensor in term 1 of psi_4 (referring to Eq 5.1 in
     #   Baker, Campanelli, Lousto (2001); https://arxiv.org/pdf/gr-qc/0104063.pdf
-    rank4term1DDDD = ixp.zerorank4()
+    rank4term1DDDD = ixp.CompactIndexedExp(rank=4, symmetry="anti01_anti23")
     KDD = AB.KDD
 
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                for l in range(DIM):
-                    rank4term1DDDD[i][j][k][l] = RDDDD[i][j][k][l] + KDD[i][k] * KDD[l][j] - KDD[i][l] * KDD[k][j]
+    for i, j, k, l in rank4term1DDDD.independent_indices():
+        rank4term1DDDD[i][j][k][l] = RDDDD[i][j][k][l] + KDD[i][k] * KDD[l][j] - KDD[i][l] * KDD[k][j]
 
     # Step 4: Construct the (rank-3) tensor in term 2 of psi_4 (referring to Eq 5.1 in
     #   Baker, Campanelli, Lousto (2001); https://arxiv.org/pdf/gr-qc/0104063.pdf
-    rank3term2DDD = ixp.zerorank3()
+    rank3term2DDD = ixp.CompactIndexedExp(rank=3, symmetry="anti12")
     KDDdD = AB.KDDdD
 
-    for j in range(DIM):
-        for k in range(DIM):
-            for l in range(DIM):
-                rank3term2DDD[j][k][l] = sp.Rational(1, 2) * (KDDdD[j][k][l] - KDDdD[j][l][k])
+    for j, k, l in rank3term2DDD.independent_indices():
+        rank3term2DDD[j][k][l] = sp.Rational(1, 2) * (KDDdD[j][k][l] - KDDdD[j][l][k])
 
     # ... then we construct the second term in this sum:
     #  \Gamma^{p}_{j[k} K_{l]p} = \frac{1}{2} (\Gamma^{p}_{jk} K_{lp}-\Gamma^{p}_{jl} K_{kp}):
-    for j in range(DIM):
-        for k in range(DIM):
-            for l in range(DIM):
-                for p in range(DIM):
-                    rank3term2DDD[j][k][l] += sp.Rational(1, 2) * (
-                                GammaUDD[p][j][k] * KDD[l][p] - GammaUDD[p][j][l] * KDD[k][p])
+    for j, k, l in rank3term2DDD.independent_indices():
+        for p in range(DIM):
+            rank3term2DDD[j][k][l] += sp.Rational(1, 2) * (
+                        GammaUDD[p][j][k] * KDD[l][p] - GammaUDD[p][j][l] * KDD[k][p])
 
     # Finally, we multiply the term by $-8$:
-    for j in range(DIM):
-        for k in range(DIM):
-            for l in range(DIM):
-                rank3term2DDD[j][k][l] *= sp.sympify(-8)
+    for j, k, l in rank3term2DDD.independent_indices():
+        rank3term2DDD[j][k][l] *= sp.sympify(-8)
 
     # Step 5: Construct the (rank-2) tensor in term 3 of psi_4 (referring to Eq 5.1 in
     #   Baker, Campanelli, Lousto (2001); https://arxiv.org/pdf/gr-qc/0104063.pdf
@@ -158,26 +145,31 @@ def Psi4(specify_tetrad=True):
     # We split psi_4 into three pieces, to expedite & possibly parallelize C code generation.
     psi4_re_pt = [sp.sympify(0),sp.sympify(0),sp.sympify(0)]
     psi4_im_pt = [sp.sympify(0),sp.sympify(0),sp.sympify(0)]
+    # The rank-4 and rank-3 contractions iterate only over independent components, each
+    #   multiplying the signed sum of tetrad products over all indices sharing its storage.
     # First term:
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                for l in range(DIM):
-                    psi4_re_pt[0] += rank4term1DDDD[i][j][k][l] * tetrad_product__Real_psi4(n4U, mre4U, mim4U,
-                                                                                            i + 1, j + 1,k + 1, l + 1)
-                    psi4_im_pt[0] += rank4term1DDDD[i][j][k][l] * tetrad_product__Imag_psi4(n4U, mre4U, mim4U,
-                                                                                            i + 1, j + 1, k + 1, l + 1)
+    for index in rank4term1DDDD.independent_indices():
+        i, j, k, l = index
+        tetrad_re = sp.sympify(0)
+        tetrad_im = sp.sympify(0)
+        for sign, (a, b, c, d) in rank4term1DDDD.orbit(index):
+            tetrad_re += sign * tetrad_product__Real_psi4(n4U, mre4U, mim4U, a + 1, b + 1, c + 1, d + 1)
+            tetrad_im += sign * tetrad_product__Imag_psi4(n4U, mre4U, mim4U, a + 1, b + 1, c + 1, d + 1)
+        psi4_re_pt[0] += rank4term1DDDD[i][j][k][l] * tetrad_re
+        psi4_im_pt[0] += rank4term1DDDD[i][j][k][l] * tetrad_im
 
     # Second term:
-    for j in range(DIM):
-        for k in range(DIM):
-            for l in range(DIM):
-                psi4_re_pt[1] += rank3term2DDD[j][k][l] * \
-                           sp.Rational(1, 2) * (+tetrad_product__Real_psi4(n4U, mre4U, mim4U, 0, j + 1, k + 1, l + 1)
-                                                - tetrad_product__Real_psi4(n4U, mre4U, mim4U, j + 1, 0, k + 1, l + 1))
-                psi4_im_pt[1] += rank3term2DDD[j][k][l] * \
-                           sp.Rational(1, 2) * (+tetrad_product__Imag_psi4(n4U, mre4U, mim4U, 0, j + 1, k + 1, l + 1)
-                                                - tetrad_product__Imag_psi4(n4U, mre4U, mim4U, j + 1, 0, k + 1, l + 1))
+    for index in rank3term2DDD.independent_indices():
+        j, k, l = index
+        tetrad_re = sp.sympify(0)
+        tetrad_im = sp.sympify(0)
+        for sign, (b, c, d) in rank3term2DDD.orbit(index):
+            tetrad_re += sign * sp.Rational(1, 2) * (+tetrad_product__Real_psi4(n4U, mre4U, mim4U, 0, b + 1, c + 1, d + 1)
+                                                     - tetrad_product__Real_psi4(n4U, mre4U, mim4U, b + 1, 0, c + 1, d + 1))
+            tetrad_im += sign * sp.Rational(1, 2) * (+tetrad_product__Imag_psi4(n4U, mre4U, mim4U, 0, b + 1, c + 1, d + 1)
+                                                     - tetrad_product__Imag_psi4(n4U, mre4U, mim4U, b + 1, 0, c + 1, d + 1))
+        psi4_re_pt[1] += rank3term2DDD[j][k][l] * tetrad_re
+        psi4_im_pt[1] += rank3term2DDD[j][k][l] * tetrad_im
     # Third term:
     for j in range(DIM):
         for l in range(DIM):
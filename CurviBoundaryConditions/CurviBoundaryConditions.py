@@ -318,7 +318,10 @@ def Cfunction__EigenCoord_set_x0x1x2_inbounds__i0i1i2_inbounds_single_pt():
   REAL Cart_to_xx0_inbounds,Cart_to_xx1_inbounds,Cart_to_xx2_inbounds;
 """
     # Step 2.a: Sanity check: First make sure that rfm.Cart_to_xx has been set. Error out if not!
-    if rfm.Cart_to_xx[0] == 0 or rfm.Cart_to_xx[1] == 0 or rfm.Cart_to_xx[2] == 0:
+    #   Every EigenCoord (Spherical, Cylindrical, SymTP, Cartesian) has a closed-form Cart_to_xx,
+    #   so unlike Cart_to_xx_and_nearest_i0i1i2(), this never needs the Newton-Raphson inversion
+    #   used for e.g., SinhSphericalv2 (whose EigenCoord is Spherical).
+    if not rfm.Cart_to_xx_has_closed_form():
         print("ERROR: rfm.Cart_to_xx[], which maps Cartesian -> xx, has not been set for")
         print("       reference_metric::CoordSystem = "+par.parval_from_str("reference_metric::CoordSystem"))
         print("       Boundary conditions in curvilinear coordinates REQUiRE this be set.")
@@ -903,6 +906,8 @@ def setup_Cfunction_FD1_arbitrary_upwind(dirn, radiation_BC_FD_order=-1):
     name = "FD1_arbitrary_upwind_x"+str(dirn)+"_dirn"
     params = """const paramstruct *restrict params, const REAL *restrict gf,
                                                 const int i0,const int i1,const int i2, const int offset"""
+    # gf points to a single gridfunction in an array of NUM_EVOL_GFS gridfunctions;
+    #   gf[IDX4ptS(0, idx)] is its value at gridpoint idx in any grid::GridFuncMemLayout.
     body = r"""switch(offset) {
 """
     tmp_list = []
@@ -922,14 +927,14 @@ def setup_Cfunction_FD1_arbitrary_upwind(dirn, radiation_BC_FD_order=-1):
             if i > 0:
                 body += "          "
             if offset == "0":
-                body += "+"+str(sp.ccode(coeff))+"*gf[IDX3S(i0,i1,i2)]\n"
+                body += "+"+str(sp.ccode(coeff))+"*gf[IDX4ptS(0, IDX3S(i0,i1,i2))]\n"
             else:
                 if dirn == 0:
-                    body += "+"+str(sp.ccode(coeff))+"*gf[IDX3S(i0+"+offset+",i1,i2)]\n"
+                    body += "+"+str(sp.ccode(coeff))+"*gf[IDX4ptS(0, IDX3S(i0+"+offset+",i1,i2))]\n"
                 elif dirn == 1:
-                    body += "+"+str(sp.ccode(coeff))+"*gf[IDX3S(i0,i1+"+offset+",i2)]\n"
+                    body += "+"+str(sp.ccode(coeff))+"*gf[IDX4ptS(0, IDX3S(i0,i1+"+offset+",i2))]\n"
                 elif dirn == 2:
-                    body += "+"+str(sp.ccode(coeff))+"*gf[IDX3S(i0,i1,i2+"+offset+")]\n"
+                    body += "+"+str(sp.ccode(coeff))+"*gf[IDX4ptS(0, IDX3S(i0,i1,i2+"+offset+"))]\n"
         body = body[:-1].replace("+-", "-") + ") * invdx"+str(dirn)+";\n"
     body += """}
 return 0.0 / 0.0;  // poison output if offset computed incorrectly
@@ -968,8 +973,6 @@ def setup_Cfunction_compute_partial_r_f(radiation_BC_FD_order=-1):
   // FD1_stencil_radius = radiation_BC_FD_order/2 = """ + str(int(radiation_BC_FD_order/2)) + r"""
   const int FD1_stencil_radius = """ + str(int(radiation_BC_FD_order/2)) + r""";
 
-  const int ntot = Nxx_plus_2NGHOSTS0*Nxx_plus_2NGHOSTS1*Nxx_plus_2NGHOSTS2;
-
   ///////////////////////////////////////////////////////////
   // Next we'll compute partial_xi f, using a maximally-centered stencil.
   //   The {i0,i1,i2}_offset parameters set the offset of the maximally-centered
@@ -994,7 +997,7 @@ def setup_Cfunction_compute_partial_r_f(radiation_BC_FD_order=-1):
             body += "  // Next adjust i"+si+"_offset so that FD stencil never goes out of bounds.\n"
             body += "  if(dest_i"+si+" < FD1_stencil_radius) i"+si+"_offset = FD1_stencil_radius-dest_i"+si+";\n"
             body += "  else if(dest_i"+si+" > (Nxx_plus_2NGHOSTS"+si+"-FD1_stencil_radius-1)) i"+si+"_offset = (Nxx_plus_2NGHOSTS"+si+"-FD1_stencil_radius-1) - dest_i"+si+";\n"
-            body += "  const REAL partial_x"+si+"_f=FD1_arbitrary_upwind_x"+si+"_dirn(params,&gfs[which_gf*ntot],dest_i0,dest_i1,dest_i2,i"+si+"_offset);\n"
+            body += "  const REAL partial_x"+si+"_f=FD1_arbitrary_upwind_x"+si+"_dirn(params,&gfs[IDX4ptS(which_gf, 0)],dest_i0,dest_i1,dest_i2,i"+si+"_offset);\n"
     body += "  return partial_x0_partial_r*partial_x0_f + partial_x1_partial_r*partial_x1_f + partial_x2_partial_r*partial_x2_f;\n"
     rel_path_to_Cparams = os.path.join(".")
 
@@ -132,6 +132,8 @@ def add_to_Cfunction_dict_MoL_malloc(MoL_method, which_gfs):
     params = "const paramstruct *restrict params, MoL_gridfunctions_struct *restrict gridfuncs"
 
     # Generate the body of the function
+    #   (num_gfs*Nxx_plus_2NGHOSTS_tot elements hold num_gfs gridfunctions in any grid::GridFuncMemLayout,
+    #    and the RK update loops over all these elements regardless of their ordering)
     body = "const int Nxx_plus_2NGHOSTS_tot = Nxx_plus_2NGHOSTS0*Nxx_plus_2NGHOSTS1*Nxx_plus_2NGHOSTS2;\n"
     for gridfunctions in gridfunctions_list:
         num_gfs = "NUM_EVOL_GFS"
@@ -200,11 +200,11 @@ def expr_convert_to_SIMD_intrins(expr, map_sym_to_rat=None, prefix="", SIMD_find
         args = subtree.expr.args
         if func == Pow:
             exponent = lookup_rational(args[1])
-            if   exponent == 0.5:
+            if   exponent == Rational(1, 2):
                 subtree.expr = SqrtSIMD(args[0])
                 subtree.children.pop(1)
-            elif exponent == -0.5:
-                subtree.expr = DivSIMD(1, SqrtSIMD(args[0]))
+            elif exponent == Rational(-1, 2):
+                subtree.expr = IntegerPowSIMD(SqrtSIMD(args[0]), -1)
                 tree.build(subtree)
             elif exponent == Rational(1, 3):
                 subtree.expr = CbrtSIMD(args[0])
@@ -11,6 +11,7 @@
 #define SubSIMD(a,b) _mm512_sub_pd((a),(b))
 #define MulSIMD(a,b) _mm512_mul_pd((a),(b))
 #define DivSIMD(a,b) _mm512_div_pd((a),(b))
+#define SqrtSIMD(a) _mm512_sqrt_pd((a))
 #define ExpSIMD(a) _mm512_exp_pd((a))
 #define SinSIMD(a) _mm512_sin_pd((a))
 #define CosSIMD(a) _mm512_cos_pd((a))
@@ -23,6 +24,9 @@
 //    The result from this comparison is: result[i] = (a OP b) ? 1 : 0, stored in an 8-bit mask array.
 //    Then if result==1 we set upwind = 0+1, and if result==0 we set upwind = 0
 #define UPWIND_ALG(a) _mm512_mask_add_pd(upwind_Integer_0,  _mm512_cmp_pd_mask( (a) , upwind_Integer_0, _CMP_GT_OQ), upwind_Integer_0 ,upwind_Integer_1)
+// Bitmask of SIMD lanes i with a[i] > 0, for branching on the sign of the upwind control vector (FD_upwind_branch=True):
+#define UPWIND_LANES_POSITIVE(a) ((int)_mm512_cmp_pd_mask( (a), _mm512_setzero_pd(), _CMP_GT_OQ ))
+#define UPWIND_ALL_LANES 0xFF
 
 // If compiled with AVX SIMD instructions enabled:
 #elif __AVX__
@@ -38,6 +42,8 @@
 //     on the result, against the number 1, because AND(NaN,1)=1, and AND(0,1)=0,
 //     where NaN=0xffffff... in double precision.
 #define UPWIND_ALG(a) _mm256_and_pd(_mm256_cmp_pd( (a), upwind_Integer_0, _CMP_GT_OQ ), upwind_Integer_1)
+#define UPWIND_LANES_POSITIVE(a) _mm256_movemask_pd(_mm256_cmp_pd( (a), _mm256_setzero_pd(), _CMP_GT_OQ ))
+#define UPWIND_ALL_LANES 0xF
 #define ReadSIMD(a) _mm256_loadu_pd(a)
 #define WriteSIMD(a,b) _mm256_storeu_pd(a,(b))
 #define ConstSIMD(a) _mm256_set1_pd(a)
@@ -45,6 +51,7 @@
 #define SubSIMD(a,b) _mm256_sub_pd((a),(b))
 #define MulSIMD(a,b) _mm256_mul_pd((a),(b))
 #define DivSIMD(a,b) _mm256_div_pd((a),(b))
+#define SqrtSIMD(a) _mm256_sqrt_pd((a))
 #define ExpSIMD(a) _mm256_exp_pd((a))
 #define SinSIMD(a) _mm256_sin_pd((a))
 #define CosSIMD(a) _mm256_cos_pd((a))
@@ -76,11 +83,14 @@
 #define SubSIMD(a,b) _mm_sub_pd((a),(b))
 #define MulSIMD(a,b) _mm_mul_pd((a),(b))
 #define DivSIMD(a,b) _mm_div_pd((a),(b))
+#define SqrtSIMD(a) _mm_sqrt_pd((a))
 #define ExpSIMD(a) _mm_exp_pd((a))
 #define SinSIMD(a) _mm_sin_pd((a))
 #define CosSIMD(a) _mm_cos_pd((a))
 // See description above UPWIND_ALG for __AVX__:
 #define UPWIND_ALG(a) _mm_and_pd(_mm_cmpgt_pd( (a), upwind_Integer_0 ), upwind_Integer_1)
+#define UPWIND_LANES_POSITIVE(a) _mm_movemask_pd(_mm_cmpgt_pd( (a), _mm_setzero_pd() ))
+#define UPWIND_ALL_LANES 0x3
 
 #ifdef __FMA__ // There are no mainstream non-AVX+ chips that have FMA, but we include the following for completeness.
 #define FusedMulAddSIMD(a,b,c) _mm_fmadd_pd((a),(b),(c))
@@ -122,4 +132,6 @@
 //  upwinding control vector in BSSN (the shift)
 //  acts like a *negative* velocity.
 #define UPWIND_ALG(UpwindVecU) UpwindVecU > 0.0 ? 1.0 : 0.0
+#define UPWIND_LANES_POSITIVE(UpwindVecU) ((UpwindVecU) > 0.0)
+#define UPWIND_ALL_LANES 1
 #endif
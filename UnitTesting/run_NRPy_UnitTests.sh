@@ -55,7 +55,7 @@ add_test WeylScal4NRPy/tests/test_WeylScal4NRPy.py
 # TODO: add your tests here
 echo "Starting doctest unit tests!"
 failed_unittest=0
-for file in expr_tree.py indexedexp.py loop.py functional.py finite_difference_helpers.py assert_equal.py sugar.py; do
+for file in expr_tree.py indexedexp.py loop.py functional.py finite_difference_helpers.py assert_equal.py sugar.py outputC_cache.py outputC_profiler.py outputC_opcount.py loop_tiling_autotune.py reference_metric_cache.py; do
     echo Running doctest on file: $file
     $PYTHONEXEC -m doctest $file
     if [ $? == 1 ]
@@ -75,6 +75,15 @@ then
     fi
     echo Doctest of cse_helpers.py finished.
 fi
+for file in tests/test_outputC.py tests/test_loop_tiling.py tests/test_finite_difference.py tests/test_BSSN_fuse_Ricci.py tests/test_Cart_to_xx.py tests/test_cse_collect.py tests/test_outputC_opcount.py tests/test_cse_preprocess.py tests/test_reference_metric_cache.py tests/test_rfm_precompute_2D_tables.py tests/test_indexedexp_compact.py tests/test_GridFuncMemLayout.py; do
+    echo Running unittest on file: $file
+    $PYTHONEXEC $file
+    if [ $? == 1 ]
+    then
+        failed_unittest=1
+    fi
+    echo Unittest of $file finished.
+done
 # Uncomment this test when parse_BSSN is fixed.
 # for file in tests/test_parse_BSSN.py; do
 #     echo Running unittest on file: $file
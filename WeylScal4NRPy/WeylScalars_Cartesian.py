@@ -164,36 +164,29 @@ def WeylScalars_Cartesian():
     gammaDD_dD = ixp.declarerank3("gammaDD_dD", "sym01")
 
     # Define the Christoffel symbols
-    GammaUDD = ixp.zerorank3(3)
-    for i in range(3):
-        for k in range(3):
-            for l in range(3):
-                for m in range(3):
-                    GammaUDD[i][k][l] += (sp.Rational(1, 2)) * gammaUU[i][m] * \
-                                         (gammaDD_dD[m][k][l] + gammaDD_dD[m][l][k] - gammaDD_dD[k][l][m])
+    GammaUDD = ixp.CompactIndexedExp(rank=3, symmetry="sym12", dimension=3)
+    for i, k, l in GammaUDD.independent_indices():
+        for m in range(3):
+            GammaUDD[i][k][l] += (sp.Rational(1, 2)) * gammaUU[i][m] * \
+                                 (gammaDD_dD[m][k][l] + gammaDD_dD[m][l][k] - gammaDD_dD[k][l][m])
 
     # Step 6.a: Declare and construct the Riemann curvature tensor:
     # R_{abcd} = \frac{1}{2} (\gamma_{ad,cb}+\gamma_{bc,da}-\gamma_{ac,bd}-\gamma_{bd,ac})
     #            + \gamma_{je} \Gamma^{j}_{bc}\Gamma^{e}_{ad} - \gamma_{je} \Gamma^{j}_{bd} \Gamma^{e}_{ac}
     gammaDD_dDD = ixp.declarerank4("gammaDD_dDD","sym01_sym23")
-    RiemannDDDD = ixp.zerorank4()
-    for a in range(3):
-        for b in range(3):
-            for c in range(3):
-                for d in range(3):
-                    RiemannDDDD[a][b][c][d] += (gammaDD_dDD[a][d][c][b] +
-                                               gammaDD_dDD[b][c][d][a] -
-                                               gammaDD_dDD[a][c][b][d] -
-                                               gammaDD_dDD[b][d][a][c]) * sp.Rational(1,2)
-
-    for a in range(3):
-        for b in range(3):
-            for c in range(3):
-                for d in range(3):
-                    for e in range(3):
-                        for j in range(3):
-                            RiemannDDDD[a][b][c][d] +=  gammaDD[j][e] * GammaUDD[j][b][c] * GammaUDD[e][a][d] - \
-                                                        gammaDD[j][e] * GammaUDD[j][b][d] * GammaUDD[e][a][c]
+    # R_{abcd} is antisymmetric in (a,b) and in (c,d); only independent components are computed.
+    RiemannDDDD = ixp.CompactIndexedExp(rank=4, symmetry="anti01_anti23")
+    for a, b, c, d in RiemannDDDD.independent_indices():
+        RiemannDDDD[a][b][c][d] += (gammaDD_dDD[a][d][c][b] +
+                                   gammaDD_dDD[b][c][d][a] -
+                                   gammaDD_dDD[a][c][b][d] -
+                                   gammaDD_dDD[b][d][a][c]) * sp.Rational(1,2)
+
+    for a, b, c, d in RiemannDDDD.independent_indices():
+        for e in range(3):
+            for j in range(3):
+                RiemannDDDD[a][b][c][d] +=  gammaDD[j][e] * GammaUDD[j][b][c] * GammaUDD[e][a][d] - \
+                                            gammaDD[j][e] * GammaUDD[j][b][d] * GammaUDD[e][a][c]
 
 
     # Step 6.b: We also need the extrinsic curvature tensor $K_{ij}$.
@@ -207,28 +200,21 @@ def WeylScalars_Cartesian():
     # Step 7: Build the formula for \psi_4.
     # Gauss equation: involving the Riemann tensor and extrinsic curvature.
     # GaussDDDD[i][j][k][l] =& R_{ijkl} + 2K_{i[k}K_{l]j}
-    GaussDDDD = ixp.zerorank4()
-    for i in range(3):
-        for j in range(3):
-            for k in range(3):
-                for l in range(3):
-                    GaussDDDD[i][j][k][l] += RiemannDDDD[i][j][k][l] + kDD[i][k]*kDD[l][j] - kDD[i][l]*kDD[k][j]
+    GaussDDDD = ixp.CompactIndexedExp(rank=4, symmetry="anti01_anti23")
+    for i, j, k, l in GaussDDDD.independent_indices():
+        GaussDDDD[i][j][k][l] += RiemannDDDD[i][j][k][l] + kDD[i][k]*kDD[l][j] - kDD[i][l]*kDD[k][j]
 
     # Codazzi equation: involving partial derivatives of the extrinsic curvature.
     # We will first need to declare derivatives of kDD
     # CodazziDDD[j][k][l] =& -2 (K_{j[k,l]} + \Gamma^p_{j[k} K_{l]p})
     kDD_dD = ixp.declarerank3("kDD_dD","sym01")
-    CodazziDDD = ixp.zerorank3()
-    for j in range(3):
-        for k in range(3):
-            for l in range(3):
-                CodazziDDD[j][k][l] += kDD_dD[j][l][k] - kDD_dD[j][k][l]
+    CodazziDDD = ixp.CompactIndexedExp(rank=3, symmetry="anti12")
+    for j, k, l in CodazziDDD.independent_indices():
+        CodazziDDD[j][k][l] += kDD_dD[j][l][k] - kDD_dD[j][k][l]
 
-    for j in range(3):
-        for k in range(3):
-            for l in range(3):
-                for p in range(3):
-                    CodazziDDD[j][k][l] += GammaUDD[p][j][l]*kDD[k][p] - GammaUDD[p][j][k]*kDD[l][p]
+    for j, k, l in CodazziDDD.independent_indices():
+        for p in range(3):
+            CodazziDDD[j][k][l] += GammaUDD[p][j][l]*kDD[k][p] - GammaUDD[p][j][k]*kDD[l][p]
 
     # Another piece. While not associated with any particular equation,
     # this is still useful for organizational purposes.
@@ -288,31 +274,54 @@ def WeylScalars_Cartesian():
             psi0r += RojoDD[j][l] * nn * nn * (remtetU[j]*remtetU[l]-immtetU[j]*immtetU[l])
             psi0i += RojoDD[j][l] * nn * nn * (remtetU[j]*immtetU[l]+immtetU[j]*remtetU[l])
 
-    for l in range(3):
-        for j in range(3):
-            for k in range(3):
-                psi4r += 2 * CodazziDDD[j][k][l] * ntetU[k] * nn * (remtetU[j]*remtetU[l]-immtetU[j]*immtetU[l])
-                psi4i += 2 * CodazziDDD[j][k][l] * ntetU[k] * nn * (-remtetU[j]*immtetU[l]-immtetU[j]*remtetU[l])
-                psi3r += 1 * CodazziDDD[j][k][l] * nn * ((ntetU[j]-ltetU[j])*remtetU[k]*ntetU[l]-remtetU[j]*ltetU[k]*ntetU[l])
-                psi3i +=-1 * CodazziDDD[j][k][l] * nn * ((ntetU[j]-ltetU[j])*immtetU[k]*ntetU[l]-immtetU[j]*ltetU[k]*ntetU[l])
-                psi2r += 1 * CodazziDDD[j][k][l] * nn * (ntetU[l]*(remtetU[j]*remtetU[k]+immtetU[j]*immtetU[k])-ltetU[k]*(remtetU[j]*remtetU[l]+immtetU[j]*immtetU[l]))
-                psi2i += 1 * CodazziDDD[j][k][l] * nn * (ntetU[l]*(immtetU[j]*remtetU[k]-remtetU[j]*immtetU[k])-ltetU[k]*(remtetU[j]*immtetU[l]-immtetU[j]*remtetU[l]))
-                psi1r += 1 * CodazziDDD[j][k][l] * nn * (ltetU[j]*remtetU[k]*ltetU[l]-remtetU[j]*ntetU[k]*ltetU[l]-ntetU[j]*remtetU[k]*ltetU[l])
-                psi1i += 1 * CodazziDDD[j][k][l] * nn * (ltetU[j]*immtetU[k]*ltetU[l]-immtetU[j]*ntetU[k]*ltetU[l]-ntetU[j]*immtetU[k]*ltetU[l])
-                psi0r += 2 * CodazziDDD[j][k][l] * nn * ltetU[k]*(remtetU[j]*remtetU[l]-immtetU[j]*immtetU[l])
-                psi0i += 2 * CodazziDDD[j][k][l] * nn * ltetU[k]*(remtetU[j]*immtetU[l]+immtetU[j]*remtetU[l])
-
-    for l in range(3):
-        for j in range(3):
-            for k in range(3):
-                for i in range(3):
-                    psi4r += GaussDDDD[i][j][k][l] * ntetU[i] * ntetU[k] * (remtetU[j]*remtetU[l]-immtetU[j]*immtetU[l])
-                    psi4i += GaussDDDD[i][j][k][l] * ntetU[i] * ntetU[k] * (-remtetU[j]*immtetU[l]-immtetU[j]*remtetU[l])
-                    psi3r += GaussDDDD[i][j][k][l] * ltetU[i] * ntetU[j] * remtetU[k] * ntetU[l]
-                    psi3i +=-GaussDDDD[i][j][k][l] * ltetU[i] * ntetU[j] * immtetU[k] * ntetU[l]
-                    psi2r += GaussDDDD[i][j][k][l] * ltetU[i] * ntetU[l] * (remtetU[j]*remtetU[k]+immtetU[j]*immtetU[k])
-                    psi2i += GaussDDDD[i][j][k][l] * ltetU[i] * ntetU[l] * (immtetU[j]*remtetU[k]-remtetU[j]*immtetU[k])
-                    psi1r += GaussDDDD[i][j][k][l] * ntetU[i] * ltetU[j] * remtetU[k] * ltetU[l]
-                    psi1i += GaussDDDD[i][j][k][l] * ntetU[i] * ltetU[j] * immtetU[k] * ltetU[l]
-                    psi0r += GaussDDDD[i][j][k][l] * ltetU[i] * ltetU[k] * (remtetU[j]*remtetU[l]-immtetU[j]*immtetU[l])
-                    psi0i += GaussDDDD[i][j][k][l] * ltetU[i] * ltetU[k] * (remtetU[j]*immtetU[l]+immtetU[j]*remtetU[l])
+    # The Codazzi and Gauss contractions iterate only over independent components: tetrad
+    #   factors of all indices sharing storage with a component are summed (with sign) first.
+    for index in CodazziDDD.independent_indices():
+        tetradC = [sp.sympify(0) for _ in range(10)]
+        for sign, (j, k, l) in CodazziDDD.orbit(index):
+            tetradC[0] += sign * 2 * ntetU[k] * nn * (remtetU[j]*remtetU[l]-immtetU[j]*immtetU[l])
+            tetradC[1] += sign * 2 * ntetU[k] * nn * (-remtetU[j]*immtetU[l]-immtetU[j]*remtetU[l])
+            tetradC[2] += sign * nn * ((ntetU[j]-ltetU[j])*remtetU[k]*ntetU[l]-remtetU[j]*ltetU[k]*ntetU[l])
+            tetradC[3] -= sign * nn * ((ntetU[j]-ltetU[j])*immtetU[k]*ntetU[l]-immtetU[j]*ltetU[k]*ntetU[l])
+            tetradC[4] += sign * nn * (ntetU[l]*(remtetU[j]*remtetU[k]+immtetU[j]*immtetU[k])-ltetU[k]*(remtetU[j]*remtetU[l]+immtetU[j]*immtetU[l]))
+            tetradC[5] += sign * nn * (ntetU[l]*(immtetU[j]*remtetU[k]-remtetU[j]*immtetU[k])-ltetU[k]*(remtetU[j]*immtetU[l]-immtetU[j]*remtetU[l]))
+            tetradC[6] += sign * nn * (ltetU[j]*remtetU[k]*ltetU[l]-remtetU[j]*ntetU[k]*ltetU[l]-ntetU[j]*remtetU[k]*ltetU[l])
+            tetradC[7] += sign * nn * (ltetU[j]*immtetU[k]*ltetU[l]-immtetU[j]*ntetU[k]*ltetU[l]-ntetU[j]*immtetU[k]*ltetU[l])
+            tetradC[8] += sign * 2 * nn * ltetU[k]*(remtetU[j]*remtetU[l]-immtetU[j]*immtetU[l])
+            tetradC[9] += sign * 2 * nn * ltetU[k]*(remtetU[j]*immtetU[l]+immtetU[j]*remtetU[l])
+        j, k, l = index
+        psi4r += CodazziDDD[j][k][l] * tetradC[0]
+        psi4i += CodazziDDD[j][k][l] * tetradC[1]
+        psi3r += CodazziDDD[j][k][l] * tetradC[2]
+        psi3i += CodazziDDD[j][k][l] * tetradC[3]
+        psi2r += CodazziDDD[j][k][l] * tetradC[4]
+        psi2i += CodazziDDD[j][k][l] * tetradC[5]
+        psi1r += CodazziDDD[j][k][l] * tetradC[6]
+        psi1i += CodazziDDD[j][k][l] * tetradC[7]
+        psi0r += CodazziDDD[j][k][l] * tetradC[8]
+        psi0i += CodazziDDD[j][k][l] * tetradC[9]
+
+    for index in GaussDDDD.independent_indices():
+        tetradG = [sp.sympify(0) for _ in range(10)]
+        for sign, (i, j, k, l) in GaussDDDD.orbit(index):
+            tetradG[0] += sign * ntetU[i] * ntetU[k] * (remtetU[j]*remtetU[l]-immtetU[j]*immtetU[l])
+            tetradG[1] += sign * ntetU[i] * ntetU[k] * (-remtetU[j]*immtetU[l]-immtetU[j]*remtetU[l])
+            tetradG[2] += sign * ltetU[i] * ntetU[j] * remtetU[k] * ntetU[l]
+            tetradG[3] -= sign * ltetU[i] * ntetU[j] * immtetU[k] * ntetU[l]
+            tetradG[4] += sign * ltetU[i] * ntetU[l] * (remtetU[j]*remtetU[k]+immtetU[j]*immtetU[k])
+            tetradG[5] += sign * ltetU[i] * ntetU[l] * (immtetU[j]*remtetU[k]-remtetU[j]*immtetU[k])
+            tetradG[6] += sign * ntetU[i] * ltetU[j] * remtetU[k] * ltetU[l]
+            tetradG[7] += sign * ntetU[i] * ltetU[j] * immtetU[k] * ltetU[l]
+            tetradG[8] += sign * ltetU[i] * ltetU[k] * (remtetU[j]*remtetU[l]-immtetU[j]*immtetU[l])
+            tetradG[9] += sign * ltetU[i] * ltetU[k] * (remtetU[j]*immtetU[l]+immtetU[j]*remtetU[l])
+        i, j, k, l = index
+        psi4r += GaussDDDD[i][j][k][l] * tetradG[0]
+        psi4i += GaussDDDD[i][j][k][l] * tetradG[1]
+        psi3r += GaussDDDD[i][j][k][l] * tetradG[2]
+        psi3i += GaussDDDD[i][j][k][l] * tetradG[3]
+        psi2r += GaussDDDD[i][j][k][l] * tetradG[4]
+        psi2i += GaussDDDD[i][j][k][l] * tetradG[5]
+        psi1r += GaussDDDD[i][j][k][l] * tetradG[6]
+        psi1i += GaussDDDD[i][j][k][l] * tetradG[7]
+        psi0r += GaussDDDD[i][j][k][l] * tetradG[8]
+        psi0i += GaussDDDD[i][j][k][l] * tetradG[9]
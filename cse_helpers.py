@@ -11,9 +11,18 @@
 from expr_tree import ExprTree  # NRPy+: Contains expression tree data structure class definitions and manipulation functions
 import sympy as sp              # SymPy: The Python computer algebra package upon which NRPy+ depends
 import sys                      # Standard Python module for multiplatform OS-level functions
+import re                       # Standard Python module for regular expressions
 from collections import OrderedDict
+import multiprocessing          # Standard Python module for process-based parallelism
+import heapq                    # Standard Python module for priority queues
+import random                   # Standard Python module for pseudo-random numbers
+import hashlib                  # Standard Python module for hashing, used to name loop-invariant temporaries
+try:
+    import symengine as se      # SymEngine: optional compiled symbolic backend, used for CSE if installed
+except ImportError:
+    se = None
 
-def cse_preprocess(expr_list, prefix='', declare=False, factor=True, negative=False, debug=False):
+def cse_preprocess(expr_list, prefix='', declare=False, factor=True, negative=False, debug=False, shared=False):
     """ Perform CSE Preprocessing
 
         :arg:    single SymPy expression or list of SymPy expressions
@@ -22,6 +31,7 @@ def cse_preprocess(expr_list, prefix='', declare=False, factor=True, negative=Fa
         :arg:    perform partial factorization (excluding negative symbol)
         :arg:    include negative symbol in partial factorization
         :arg:    back-substitute and check difference for debugging
+        :arg:    preprocess each distinct subexpression of the list only once (see _cse_preprocess_shared)
         :return: modified SymPy expression(s) where all integers and rationals were replaced
                     with temporary placeholder variables that allow for partial factorization
 
@@ -52,10 +62,15 @@ def cse_preprocess(expr_list, prefix='', declare=False, factor=True, negative=Fa
         >>> expr = Mul((-1)**3, (3*x + 3*y), evaluate=False)
         >>> cse_preprocess(expr, declare=True)
         ([_Integer_3*_NegativeOne_*(x + y)], OrderedDict([(_NegativeOne_, -1), (_Integer_3, 3)]))
+
+        >>> cse_preprocess([exp(3*x + 3*y), -x/12 - y/12 + exp(3*x + 3*y)], declare=True, shared=True)
+        ([exp(_Integer_3*(x + y)), _Rational_1_12*(_NegativeOne_*x + _NegativeOne_*y) + exp(_Integer_3*(x + y))], OrderedDict([(_Integer_3, 3), (_Rational_1_12, 1/12), (_NegativeOne_, -1)]))
     """
     if not isinstance(expr_list, list):
         expr_list = [expr_list]
     expr_list = expr_list[:]
+    if shared:
+        return _cse_preprocess_shared(expr_list, prefix, declare, factor, negative, debug)
     _NegativeOne_ = sp.Symbol(prefix + '_NegativeOne_')
     map_sym_to_rat, map_rat_to_sym = OrderedDict(), OrderedDict()
     for i, expr in enumerate(expr_list):
@@ -88,29 +103,13 @@ def cse_preprocess(expr_list, prefix='', declare=False, factor=True, negative=Fa
         expr = tree.reconstruct()
         # If factor == True, then perform partial factoring (excluding _NegativeOne_)
         if factor == True:
-            # Handle the separate case of function argument(s)
-            for subtree in tree.preorder():
-                if isinstance(subtree.expr, sp.Function):
-                    arg = subtree.children[0]
-                    for var in map_sym_to_rat:
-                        if var != _NegativeOne_:
-                            arg.expr = sp.collect(arg.expr, var)
-                    tree.build(arg)
-            expr = tree.reconstruct()
-            # Perform partial factoring on expression(s)
-            for var in map_sym_to_rat:
-                if var != _NegativeOne_:
-                    expr = sp.collect(expr, var)
+            # Perform partial factoring on expression(s), including function argument(s), in a single pass
+            expr = cse_collect(expr, [var for var in map_sym_to_rat if var != _NegativeOne_])
             tree.root.expr = expr
             tree.build(tree.root)
         # If negative == True, then perform partial factoring on _NegativeOne_
         if negative == True:
-            for subtree in tree.preorder():
-                if isinstance(subtree.expr, sp.Function):
-                    arg = subtree.children[0]
-                    arg.expr = sp.collect(arg.expr, _NegativeOne_)
-                    tree.build(arg)
-            expr = sp.collect(tree.reconstruct(), _NegativeOne_)
+            expr = cse_collect(expr, [_NegativeOne_])
             tree.root.expr = expr
             tree.build(tree.root)
         # If declare == True, then simplify (-1)^n
@@ -160,6 +159,549 @@ def cse_preprocess(expr_list, prefix='', declare=False, factor=True, negative=Fa
     assert type(expr_list) == list
     return expr_list, map_sym_to_rat
 
+def _cse_preprocess_shared(expr_list, prefix, declare, factor, negative, debug):
+    """ Perform CSE Preprocessing, Sharing Work Between Expressions
+
+        Equivalent to cse_preprocess(expr_list, prefix, declare, factor, negative, debug), but each step
+        (rational replacement, partial factorization, and the _NegativeOne_ handling) is memoised by
+        subexpression over the entire list, rather than applied to a new expression tree of each expression.
+        Since SymPy expressions are hash-consed, the subexpressions shared by the expressions of the list
+        (e.g., the Ricci tensor components) are rewritten only once.
+
+        >>> from sympy.abc import x, y
+        >>> from sympy import cos, sin
+        >>> expr_list = [cos(x/3 + y/3)**2, sin(x/3 + y/3)*cos(x/3 + y/3)]
+        >>> cse_preprocess(expr_list, shared=True) == cse_preprocess(expr_list)
+        True
+    """
+    _NegativeOne_ = sp.Symbol(prefix + '_NegativeOne_')
+    _One_ = sp.Symbol(prefix + '_Integer_1')
+    map_sym_to_rat, map_rat_to_sym = OrderedDict(), OrderedDict()
+    rational_memo, collect_memo, negative_memo, power_memo, one_memo = {}, {}, {}, {}, {}
+
+    def rewrite(expr, rule, memo):
+        # Rebuild expr bottom-up (as ExprTree.reconstruct() does) with rule(subexpr) -> replacement or None
+        replacement = rule(expr)
+        if replacement is not None:
+            return replacement
+        if not expr.args:
+            return expr
+        try:
+            return memo[expr]
+        except KeyError:
+            pass
+        args = tuple(rewrite(arg, rule, memo) for arg in expr.args)
+        result = expr.func(*args, evaluate=False) if args != expr.args else expr
+        memo[expr] = result
+        return result
+
+    def negative_one():
+        try: return map_rat_to_sym[sp.S.NegativeOne]
+        except KeyError:
+            map_sym_to_rat[_NegativeOne_], map_rat_to_sym[sp.S.NegativeOne] = sp.S.NegativeOne, _NegativeOne_
+            return _NegativeOne_
+
+    def replace_rationals(expr, parent_func):
+        # Replace rationals with symbols, in the order of their first appearance in a preorder traversal
+        if isinstance(expr, sp.Rational) and expr != sp.S.NegativeOne:
+            # Ignore replacing exponent of power function with symbol
+            if parent_func == sp.Pow: return expr
+            # If rational < 0, factor out negative, leaving positive rational
+            sign = 1 if expr >= 0 else -1
+            expr *= sign
+            # Declare unique symbol for rational on first appearance
+            try: repl = map_rat_to_sym[expr]
+            except KeyError:
+                p, q = expr.p, expr.q
+                var_name = prefix + '_Rational_' + str(p) + '_' + str(q) \
+                    if q != 1 else prefix + '_Integer_' + str(p)
+                repl = sp.Symbol(var_name)
+                map_sym_to_rat[repl], map_rat_to_sym[expr] = expr, repl
+            if sign > 0: return repl
+            return sp.Mul(negative_one() if declare == True else sp.S.NegativeOne, repl, evaluate=False)
+        # If declare == True, then declare symbol for negative one
+        if declare == True and expr == sp.S.NegativeOne:
+            return negative_one()
+        if not expr.args:
+            return expr
+        try:
+            return rational_memo[expr]
+        except KeyError:
+            pass
+        args = tuple(replace_rationals(arg, expr.func) for arg in expr.args)
+        result = expr.func(*args, evaluate=False) if args != expr.args else expr
+        rational_memo[expr] = result
+        return result
+
+    def simplify_power_of_negative_one(expr):
+        # Simplify (-1)^n, where -1 is _NegativeOne_
+        if expr.func == sp.Pow and expr.args[0] == _NegativeOne_:
+            return _One_ if expr.args[1] % 2 == 0 else _NegativeOne_
+        return None
+
+    for i, expr in enumerate(expr_list):
+        expr = replace_rationals(expr, None)
+        # If factor == True, then perform partial factoring (excluding _NegativeOne_)
+        if factor == True:
+            expr = cse_collect(expr, [var for var in map_sym_to_rat if var != _NegativeOne_], collect_memo)
+        # If negative == True, then perform partial factoring on _NegativeOne_
+        if negative == True:
+            expr = cse_collect(expr, [_NegativeOne_], negative_memo)
+        # If declare == True, then simplify (-1)^n
+        if declare == True:
+            expr = rewrite(expr, simplify_power_of_negative_one, power_memo)
+        # Replace any left-over one(s) after partial factoring
+        if factor == True or negative == True:
+            tmp_expr = rewrite(expr, lambda subexpr: _One_ if subexpr == sp.S.One else None, one_memo)
+            if tmp_expr != expr:
+                try: map_rat_to_sym[sp.S.One]
+                except KeyError:
+                    map_sym_to_rat[_One_], map_rat_to_sym[sp.S.One] = sp.S.One, _One_
+                expr = tmp_expr
+        # If debug == True, then back-substitute everything and check difference
+        if debug == True:
+            expr_diff = expr.xreplace(map_sym_to_rat) - expr_list[i]
+            if sp.simplify(expr_diff) != 0:
+                raise Warning('Expression Difference: ' + str(expr_diff))
+        expr_list[i] = expr
+    return expr_list, map_sym_to_rat
+
+def _expand_power_base(expr):
+    """ Shallow sp.expand_power_base(), which can only modify a power of a product. """
+    if expr.is_Pow and expr.base.is_Mul:
+        return sp.expand_power_base(expr, deep=False)
+    return expr
+
+def _parse_collect_factor(factor):
+    """ Split a factor into (base, rational exponent, symbolic exponent), as done by sp.collect(). """
+    base, rat_expo, sym_expo = factor, sp.S.One, None
+    if factor.is_Pow:
+        base = factor.base
+        if factor.exp.is_Number:
+            rat_expo = factor.exp
+        else:
+            coeff, tail = factor.exp.as_coeff_Mul()
+            if coeff.is_Number:
+                rat_expo, sym_expo = coeff, tail
+            else:
+                sym_expo = factor.exp
+    elif isinstance(factor, sp.exp):
+        arg = factor.exp
+        if arg.is_Rational:
+            base, rat_expo = sp.E, arg
+        elif arg.is_Mul:
+            coeff, tail = arg.as_coeff_Mul(rational=True)
+            base, rat_expo = sp.exp(tail), coeff
+    return base, rat_expo, sym_expo
+
+def _collect_factor_product(factors):
+    return sp.Mul(*[base if sym_expo is None and rat_expo == 1 else
+                    sp.Pow(base, rat_expo if sym_expo is None else rat_expo*sym_expo)
+                    for base, rat_expo, sym_expo in factors])
+
+def cse_collect(expr, syms, memo=None):
+    """ Partial Factorization by Symbols in a Single Pass
+
+        :arg:    SymPy expression
+        :arg:    list of symbols (e.g., rational symbols from cse_preprocess)
+        :arg:    dictionary of memoised results, to share between calls whose lists of symbols
+                    extend each other with new symbols (default: not shared)
+        :return: expression partially factored by each symbol, which is equivalent to calling
+                    sp.collect() for each symbol (in order) on the expression and on the first
+                    argument of every function in the expression
+
+        Each distinct subexpression is visited once, and an addition is only collected
+        with respect to the symbols that it contains, whereas each sp.collect() call
+        traverses the entire expression.
+
+        >>> from sympy.abc import a, b, x, y, z
+        >>> from sympy import collect, exp
+        >>> expr = a*x + a*y + b*x + b*z + exp(a*x + a*y + b*x) + b**2*z
+        >>> cse_collect(expr, [a, b])
+        a*(x + y) + b**2*z + b*(x + z) + exp(a*(x + y) + b*x)
+        >>> collect(collect(expr, a), b)
+        a*(x + y) + b**2*z + b*(x + z) + exp(a*x + a*y + b*x)
+    """
+    syms = list(syms)
+    if not syms:
+        return expr
+    if memo is None:
+        memo = {}
+    sym_position = memo.setdefault("sym_position", {})
+    for sym in syms:
+        sym_position.setdefault(sym, len(sym_position))
+    syms_in_memo, visit_memo = memo.setdefault("syms_in", {}), memo.setdefault("visit", {})
+
+    def syms_in(expr):
+        try:
+            return syms_in_memo[expr]
+        except KeyError:
+            pass
+        if expr in sym_position:
+            result = frozenset([expr])
+        else:
+            result = frozenset().union(*[syms_in(arg) for arg in expr.args])
+        syms_in_memo[expr] = result
+        return result
+
+    def collect_add(expr, first_position):
+        # The symbols (in order) from syms[first_position:] contained in this addition
+        add_syms = sorted((sym for sym in syms_in(expr) if sym_position[sym] >= first_position), key=sym_position.get)
+        if not add_syms:
+            # sp.collect() only normalizes powers of products, such as (x*y)**2 -> x**2*y**2
+            return sp.Add(*[_expand_power_base(term) for term in expr.args])
+        for sym in add_syms:
+            if not expr.is_Add:
+                break
+            expr = collect_add_by(expr, sym)
+        return expr
+
+    def collect_add_by(expr, sym):
+        # Apply sp.collect(expr, sym) to the terms of expr (an addition), whose subexpressions are already collected:
+        #   terms with a factor sym**p (p a number) are grouped by sym**p
+        collected, disliked = OrderedDict(), []
+        for term in expr.args:
+            term = _expand_power_base(term)
+            if sym in syms_in(term):
+                factors = [_parse_collect_factor(factor) for factor in sp.Mul.make_args(term)]
+                j = next((j for j, factor in enumerate(factors) if factor[0] == sym and factor[2] is None), None)
+                if j is not None:
+                    key = _collect_factor_product([factors.pop(j)])
+                    collected.setdefault(key, []).append(_expand_power_base(_collect_factor_product(factors)))
+                    continue
+            disliked.append(term)
+        result = []
+        for key, coefficients in collected.items():
+            coefficient = sp.Add(*coefficients)
+            # Later symbols are collected in the new sum of coefficients, as by subsequent sp.collect() calls
+            if coefficient.is_Add:
+                coefficient = collect_add(coefficient, sym_position[sym] + 1)
+            result.append(key*coefficient)
+        return sp.Add(*(result + disliked))
+
+    def visit(expr, collect):
+        if not expr.args:
+            return expr
+        try:
+            return visit_memo[(expr, collect)]
+        except KeyError:
+            pass
+        if isinstance(expr, sp.Function):
+            # As in cse_preprocess(), collect the first argument of a function
+            args = (visit(expr.args[0], True),) + tuple(visit(arg, False) for arg in expr.args[1:])
+            result = expr.func(*args, evaluate=False) if args != expr.args else expr
+        elif collect and expr.is_Add:
+            result = sp.Add(*[visit(arg, True) for arg in expr.args])
+            if result.is_Add:
+                result = collect_add(result, 0)
+        elif collect and expr.is_Mul:
+            result = sp.Mul(*[visit(arg, True) for arg in expr.args])
+        elif collect and expr.is_Pow:
+            # sp.collect() does not collect the exponent, but the functions within it are collected
+            result = sp.Pow(visit(expr.base, True), visit(expr.exp, False))
+        else:
+            args = tuple(visit(arg, False) for arg in expr.args)
+            result = expr.func(*args, evaluate=False) if args != expr.args else expr
+        visit_memo[(expr, collect)] = result
+        return result
+
+    return visit(expr, True)
+
+def _subtree_set(expr):
+    """ Return the set of non-atomic subtrees of expr, traversing expr as a DAG. """
+    subtrees, stack = set(), [expr]
+    while stack:
+        subexpr = stack.pop()
+        if subexpr.args and subexpr not in subtrees:
+            subtrees.add(subexpr)
+            stack.extend(subexpr.args)
+    return subtrees
+
+def partition_expr_list(expr_list, num_partitions):
+    """ Partition Expression List by Subexpression Overlap
+
+        :arg:    list of SymPy expressions
+        :arg:    (maximum) number of partitions
+        :return: list of partitions, where each partition is a sorted list of indices into expr_list;
+                    expressions that share many subtrees are placed in the same partition, while
+                    the total number of subtrees in each partition is kept roughly balanced
+
+        >>> from sympy.abc import a, b, c, d
+        >>> from sympy import cos, sin
+        >>> partition_expr_list([cos(a + b), sin(c*d), cos(a + b)**2, sin(c*d) + 1], 2)
+        [[0, 2], [1, 3]]
+    """
+    # The signature of each expression is the set of its non-atomic subtrees;
+    #   two expressions are connected in the overlap graph if their signatures intersect.
+    signatures = [_subtree_set(expr) for expr in expr_list]
+    num_partitions = max(1, min(num_partitions, len(expr_list)))
+    capacity = 1.25 * len(set().union(*signatures)) / num_partitions
+    partition_sigs = [set() for _ in range(num_partitions)]
+    partitions = [[] for _ in range(num_partitions)]
+    # Greedily place the largest expressions first, each into the partition
+    #   it overlaps the most with, as long as that partition does not exceed
+    #   its share of the distinct subtrees.
+    for i in sorted(range(len(expr_list)), key=lambda i: -len(signatures[i])):
+        best, best_overlap = None, 0
+        for k in range(num_partitions):
+            if len(partition_sigs[k] | signatures[i]) > capacity and partition_sigs[k]:
+                continue
+            overlap = len(signatures[i] & partition_sigs[k])
+            if overlap > best_overlap:
+                best, best_overlap = k, overlap
+        if best is None:
+            best = min(range(num_partitions), key=lambda k: len(partition_sigs[k]))
+        partitions[best].append(i)
+        partition_sigs[best] |= signatures[i]
+    return sorted(sorted(partition) for partition in partitions if partition)
+
+def _cse_worker(expr_list, prefix, order):
+    return sp.cse(expr_list, sp.numbered_symbols(prefix), order=order)
+
+def cse_partitioned(expr_list, symbols, order='canonical', num_partitions=2, nprocs=None):
+    """ Perform Partitioned (Parallel) CSE
+
+        :arg:    list of SymPy expressions
+        :arg:    iterator of symbols for the common subexpressions (e.g., sp.numbered_symbols('tmp'))
+        :arg:    ordering of the CSE (passed to sp.cse)
+        :arg:    number of partitions of expr_list
+        :arg:    number of processes (default: min(num_partitions, number of CPUs))
+        :return: output with the same format as sp.cse: (list of ordered pairs
+                    (symbol, replaced expression), list of reduced expressions),
+                    where each common subexpression is set before it is used
+
+        The expression list is split into partitions that share few subexpressions
+        (see partition_expr_list). Subtrees shared between partitions are hoisted
+        into a separate list of shared expressions, and CSE is performed on the
+        shared expressions and on each partition in a process pool. The common
+        subexpressions are then merged, identical subexpressions are deduplicated,
+        and a final CSE pass over the (much smaller) merged result hoists any
+        remaining subexpressions shared between partitions.
+
+        >>> from sympy.abc import x, y, z
+        >>> from sympy import cos, sin, numbered_symbols
+        >>> expr_list = [cos(x + y)**2 + cos(x + y), sin(x*z)**2 + sin(x*z), cos(x + y)*sin(x*z)]
+        >>> cse_partitioned(expr_list, numbered_symbols('tmp'), nprocs=1)
+        ([(tmp0, sin(x*z)), (tmp1, cos(x + y))], [tmp1**2 + tmp1, tmp0**2 + tmp0, tmp0*tmp1])
+    """
+    expr_list = list(expr_list)
+    partitions = partition_expr_list(expr_list, num_partitions)
+
+    # Find subtrees shared between partitions. Only the outermost shared subtrees
+    #   (those reached from a partition without passing through another shared
+    #   subtree) are replaced by placeholders; nested ones are handled by the CSE
+    #   of the shared expressions.
+    owner = {}
+    for k, partition in enumerate(partitions):
+        for i in partition:
+            for subexpr in _subtree_set(expr_list[i]):
+                if owner.setdefault(subexpr, k) != k:
+                    owner[subexpr] = -1
+    shared_exprs, map_shared_to_placeholder = [], {}
+    for partition in partitions:
+        visited, stack = set(), [expr_list[i] for i in partition]
+        while stack:
+            subexpr = stack.pop()
+            if not subexpr.args or subexpr in visited:
+                continue
+            visited.add(subexpr)
+            if owner[subexpr] == -1:
+                if subexpr not in map_shared_to_placeholder:
+                    map_shared_to_placeholder[subexpr] = sp.Symbol('_CSEshared_' + str(len(shared_exprs)))
+                    shared_exprs.append(subexpr)
+            else:
+                stack.extend(subexpr.args)
+
+    prefixes = ['_CSEpartition' + str(k) + '_' for k in range(len(partitions))]
+    args = [(shared_exprs, '_CSEshared_tmp', order)] + \
+           [([expr_list[i].xreplace(map_shared_to_placeholder) for i in partition], prefixes[k], order)
+            for k, partition in enumerate(partitions)]
+    if nprocs is None:
+        nprocs = min(len(args), multiprocessing.cpu_count())
+    results = None
+    if nprocs > 1 and len(partitions) > 1:
+        try:
+            with multiprocessing.Pool(nprocs) as pool:
+                results = pool.starmap(_cse_worker, args)
+        except (OSError, RuntimeError, AssertionError):
+            # Process pools are unavailable in some environments (e.g., within daemonic processes)
+            results = None
+    if results is None:
+        results = [_cse_worker(*arg) for arg in args]
+
+    # Merge the common subexpressions of the shared expressions and of each
+    #   partition, renaming them with the caller's symbols and deduplicating
+    #   identical replacements.
+    map_rhs_to_sym = {}
+    replaced, reduced = [], [None] * len(expr_list)
+    def merge(local_replaced, local_to_global):
+        for sym, rhs in local_replaced:
+            rhs = rhs.xreplace(local_to_global)
+            try: local_to_global[sym] = map_rhs_to_sym[rhs]
+            except KeyError:
+                new_sym = next(symbols)
+                local_to_global[sym] = map_rhs_to_sym[rhs] = new_sym
+                replaced.append((new_sym, rhs))
+    shared_to_global = {}
+    merge(results[0][0], shared_to_global)
+    for shared_expr, rhs in zip(shared_exprs, results[0][1]):
+        merge([(map_shared_to_placeholder[shared_expr], rhs)], shared_to_global)
+    for partition, (partition_replaced, partition_reduced) in zip(partitions, results[1:]):
+        local_to_global = dict(shared_to_global)
+        merge(partition_replaced, local_to_global)
+        for i, expr in zip(partition, partition_reduced):
+            reduced[i] = expr.xreplace(local_to_global)
+
+    # Hoist subexpressions shared between partitions
+    merged_replaced, merged_reduced = sp.cse([rhs for _, rhs in replaced] + reduced, symbols, order=order)
+    merged_syms = {sym for sym, _ in merged_replaced}
+    # If an entire replaced expression was hoisted, keep its original symbol (not an alias of the new one)
+    alias = {}
+    for (sym, _), rhs in zip(replaced, merged_reduced[:len(replaced)]):
+        if rhs in merged_syms and rhs not in alias:
+            alias[rhs] = sym
+    replaced = [(alias.get(sym, sym), rhs.xreplace(alias)) for sym, rhs in merged_replaced] + \
+               [(sym, rhs.xreplace(alias)) for (sym, _), rhs in zip(replaced, merged_reduced[:len(replaced)])
+                if alias.get(rhs) != sym]
+    reduced = [expr.xreplace(alias) for expr in merged_reduced[len(merged_reduced) - len(reduced):]]
+
+    # Sort the replaced expressions so that none are evaluated before they are set
+    lookup = OrderedDict((sym, rhs) for sym, rhs in replaced)
+    replaced_sorted, done = [], set()
+    def visit(sym):
+        if sym in done: return
+        done.add(sym)
+        for dep in lookup[sym].free_symbols:
+            if dep in lookup: visit(dep)
+        replaced_sorted.append((sym, lookup[sym]))
+    for sym in lookup: visit(sym)
+    return replaced_sorted, reduced
+
+_warned_symengine_unavailable = False
+
+def _sympy_to_symengine(expr_list):
+    # Convert SymPy expressions to SymEngine, converting each distinct subexpression only once;
+    #   se.sympify() would traverse shared subexpressions repeatedly, which can be slower than sp.cse.
+    #   Also return the set of SymPy symbols in expr_list (expr.free_symbols has the same problem).
+    converted, symbols = {}, set()
+    for root in expr_list:
+        stack = [root]
+        while stack:
+            expr = stack[-1]
+            if expr in converted:
+                stack.pop()
+                continue
+            pending = [arg for arg in expr.args if arg not in converted]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            args = [converted[arg] for arg in expr.args]
+            if not args:
+                converted[expr] = se.sympify(expr)
+                if isinstance(expr, sp.Symbol):
+                    symbols.add(expr)
+            elif expr.func == sp.Add:
+                converted[expr] = se.Add(*args)
+            elif expr.func == sp.Mul:
+                converted[expr] = se.Mul(*args)
+            elif expr.func == sp.Pow:
+                converted[expr] = se.Pow(*args)
+            else:
+                # Convert e.g. sin(arg) as sin(dummy), then substitute the converted argument for the dummy.
+                dummies = [sp.Dummy() for _ in args]
+                converted[expr] = se.sympify(expr.func(*dummies)).subs({se.sympify(dummy): arg for dummy, arg in zip(dummies, args)})
+    return [converted[expr] for expr in expr_list], symbols
+
+def symengine_is_available():
+    return se is not None
+
+def cse_symengine(expr_list, symbols, order='canonical'):
+    """ Perform CSE Using SymEngine
+
+        :arg:    list of SymPy expressions
+        :arg:    iterator of symbols for the common subexpressions (e.g., sp.numbered_symbols('tmp'))
+        :arg:    ordering of the CSE (unused; accepted for compatibility with sp.cse)
+        :return: output with the same format as sp.cse, or None if SymEngine is not installed
+                    or could not convert the expressions, in which case sp.cse should be used
+
+        >>> from sympy.abc import x, y
+        >>> from sympy import cse, numbered_symbols, sin
+        >>> expr_list = [(x + y)**2 + sin(x + y), sin(x + y)]
+        >>> cse_out = cse_symengine(expr_list, numbered_symbols('tmp'))
+        >>> cse_out is None or cse_outputs_agree(cse_out, cse(expr_list))
+        True
+    """
+    global _warned_symengine_unavailable
+    if se is None:
+        if not _warned_symengine_unavailable:
+            print("Warning: SymEngine is not installed; falling back to SymPy for CSE.")
+            _warned_symengine_unavailable = True
+        return None
+    try:
+        se_expr_list, free_symbols = _sympy_to_symengine(expr_list)
+        se_replaced, se_reduced = se.cse(se_expr_list)
+        replaced = [(sp.sympify(sym), sp.sympify(expr)) for sym, expr in se_replaced]
+        reduced = [sp.sympify(expr) for expr in se_reduced]
+    except (TypeError, ValueError, RuntimeError, NotImplementedError, se.SympifyError) as err:
+        print("Warning: SymEngine could not perform CSE (" + str(err) + "); falling back to SymPy.")
+        return None
+    # Rename SymEngine's temporaries (x0, x1, ...) to the requested symbols, and restore the
+    #   original symbols, since SymEngine drops SymPy assumptions (e.g., real=True).
+    excluded = {str(sym) for sym in free_symbols}
+    rename = {sp.Symbol(str(sym)): sym for sym in free_symbols}
+    rename.update({sym: _new_symbol(symbols, excluded) for sym, _ in replaced})
+    replaced = [(rename[sym], expr.xreplace(rename)) for sym, expr in replaced]
+    reduced = [expr.xreplace(rename) for expr in reduced]
+    return replaced, reduced
+
+def _evaluate_cse_output(cse_output, values):
+    replaced, reduced = cse_output
+    values = dict(values)
+    for sym, expr in replaced:
+        values[sym] = expr.xreplace(values).evalf(30)
+    return [expr.xreplace(values).evalf(30) for expr in reduced]
+
+def cse_outputs_agree(cse_output_a, cse_output_b, num_points=3, seed=1, rel_tol=1e-12):
+    """ Check Numerical Equivalence of Two CSE Outputs
+
+        :arg:    output from CSE, in the same tuple format as sp.cse()
+        :arg:    output from CSE of the same expressions, e.g., by a different CSE backend
+        :arg:    number of random points at which to evaluate the expressions
+        :arg:    seed of the random number generator
+        :arg:    relative tolerance
+        :return: True if all reduced expressions agree at all points (evaluated with 30 digits
+                    of precision, with free symbols drawn uniformly from [0.1, 1]), False if they
+                    disagree, or None if they could not be evaluated numerically
+
+        >>> from sympy.abc import x, y
+        >>> from sympy import cse, sin, symbols
+        >>> x0 = symbols('x0')
+        >>> cse_outputs_agree(cse([(x + y)**2 + sin(x + y)]), ([(x0, x + y)], [x0**2 + sin(x0)]))
+        True
+        >>> cse_outputs_agree(cse([(x + y)**2 + sin(x + y)]), ([(x0, x + y)], [x0**2 + sin(x0) + 1e-10]))
+        False
+    """
+    if len(cse_output_a[1]) != len(cse_output_b[1]):
+        return False
+    temporaries = {sym for sym, _ in cse_output_a[0]} | {sym for sym, _ in cse_output_b[0]}
+    free_symbols = set()
+    for _, expr in cse_output_a[0] + cse_output_b[0]:
+        free_symbols |= expr.free_symbols
+    for expr in list(cse_output_a[1]) + list(cse_output_b[1]):
+        free_symbols |= expr.free_symbols
+    free_symbols = sorted(free_symbols - temporaries, key=str)
+    rng = random.Random(seed)
+    for _ in range(num_points):
+        values = {sym: sp.Float(rng.uniform(0.1, 1.0), 30) for sym in free_symbols}
+        for a, b in zip(_evaluate_cse_output(cse_output_a, values), _evaluate_cse_output(cse_output_b, values)):
+            if not (a.is_number and b.is_number) or a.has(sp.nan, sp.zoo, sp.oo, -sp.oo):
+                return None
+            a, b = complex(a), complex(b)
+            if abs(a - b) > rel_tol * max(abs(a), abs(b)):
+                return False
+    return True
+
 def cse_postprocess(cse_output):
     """ Perform CSE Postprocessing
 
@@ -223,26 +765,43 @@ def cse_postprocess(cse_output):
     # Sort the replaced expressions
     # so that none are evaluated before
     # they are set.
+    # Note: SymPy does not cache free_symbols, which traverses the entire expression tree;
+    #       hence the free symbols of each replaced/reduced expression are stored and updated below.
     lookup = {}
     for repl in replaced:
         lookup[str(repl[0])] = repl
+    free_names = {name: {str(sym) for sym in repl[1].free_symbols} for name, repl in lookup.items()}
     replaced2 = []
     while len(lookup) > 0:
         new_lookup = {}
-        for repl in lookup.values():
-            found = False
-            for sym in repl[1].free_symbols:
-                if str(sym) in lookup:
-                    found = True
-                    break
-            if found:
-                new_lookup[str(repl[0])] = repl
+        for name, repl in lookup.items():
+            if any(free_name in lookup for free_name in free_names[name]):
+                new_lookup[name] = repl
             else:
                 replaced2 += [repl]
         assert len(new_lookup) < len(lookup)
         lookup = new_lookup
     assert len(replaced) == len(replaced2)
     replaced = replaced2
+    replaced_free_symbols = [repl[1].free_symbols for repl in replaced]
+    reduced_free_symbols = [expr.free_symbols for expr in reduced]
+
+    def back_substitute(i, sym, expr):
+        # Substitute expr for sym in all expressions after replaced[i], then remove replaced[i]
+        #   (since sym is a symbol, xreplace() is equivalent to, but much faster than, subs())
+        for k in range(i + 1, len(replaced)):
+            if sym in replaced_free_symbols[k]:
+                replaced[k] = (replaced[k][0], replaced[k][1].xreplace({sym: expr}))
+                replaced_free_symbols[k] = replaced[k][1].free_symbols
+        for k in range(len(reduced)):
+            if sym in reduced_free_symbols[k]:
+                reduced[k] = reduced[k].xreplace({sym: expr})
+                reduced_free_symbols[k] = reduced[k].free_symbols
+        replaced.pop(i)
+        replaced_free_symbols.pop(i)
+
+    def count_symbol(sym_name, expr):
+        return sum(1 for arg in sp.preorder_traversal(expr) if arg.func == sp.Symbol and arg.name == sym_name)
 
     i = 0
     while i < len(replaced):
@@ -250,45 +809,491 @@ def cse_postprocess(cse_output):
         # Search through replaced expressions for negative symbols
         if (expr.func == sp.Mul and len(expr.args) == 2 and any(a1.func == sp.Symbol and \
                (a2 == sp.S.NegativeOne or '_NegativeOne_' in str(a2)) for a1, a2 in [args, reversed(args)])):
-            for k in range(i + 1, len(replaced)):
-                if sym in replaced[k][1].free_symbols:
-                    replaced[k] = (replaced[k][0], replaced[k][1].subs(sym, expr))
-            for k in range(len(reduced)):
-                if sym in reduced[k].free_symbols:
-                    reduced[k] = reduced[k].subs(sym, expr)
             # Remove the replaced expression from the list
-            replaced.pop(i)
+            back_substitute(i, sym, expr)
             if i != 0: i -= 1
         # Search through replaced expressions for addition/product of 2 or less symbols
         if ((expr.func == sp.Add or expr.func == sp.Mul) and 0 < len(expr.args) < 3 and \
                 all((arg.func == sp.Symbol or arg.is_integer or arg.is_rational) for arg in expr.args)) or \
                 (expr.func == sp.Pow and expr.args[0].func == sp.Symbol and expr.args[1] == 2):
             sym_count = 0 # Count the number of occurrences of the substituted symbol
+            sym_name = str(sym)
             for k in range(len(replaced) - i):
                 # Check if the substituted symbol appears in the replaced expressions
-                if sym in replaced[i + k][1].free_symbols:
-                    for arg in sp.preorder_traversal(replaced[i + k][1]):
-                        if arg.func == sp.Symbol and str(arg) == str(sym):
-                            sym_count += 1
+                if sym in replaced_free_symbols[i + k]:
+                    sym_count += count_symbol(sym_name, replaced[i + k][1])
             for k in range(len(reduced)):
                 # Check if the substituted symbol appears in the reduced expression
-                if sym in reduced[k].free_symbols:
-                    for arg in sp.preorder_traversal(reduced[k]):
-                        if arg.func == sp.Symbol and str(arg) == str(sym):
-                            sym_count += 1
+                if sym in reduced_free_symbols[k]:
+                    sym_count += count_symbol(sym_name, reduced[k])
             # If the number of occurrences of the substituted symbol is 2 or less, back-substitute
             if 0 < sym_count < 3:
-                for k in range(i + 1, len(replaced)):
-                    if sym in replaced[k][1].free_symbols:
-                        replaced[k] = (replaced[k][0], replaced[k][1].subs(sym, expr))
-                for k in range(len(reduced)):
-                    if sym in reduced[k].free_symbols:
-                        reduced[k] = reduced[k].subs(sym, expr)
                 # Remove the replaced expression from the list
-                replaced.pop(i); i -= 1
+                back_substitute(i, sym, expr); i -= 1
         i += 1
     return replaced, reduced
 
+def _definition_position(replaced, expr):
+    # Return the index right after the last replaced expression that expr depends on
+    position = 0
+    for i, (sym, _) in enumerate(replaced):
+        if sym in expr.free_symbols:
+            position = i + 1
+    return position
+
+def _used_symbol_names(replaced, reduced):
+    names = {str(sym) for sym, _ in replaced}
+    for expr in [expr for _, expr in replaced] + reduced:
+        names |= {str(sym) for sym in expr.free_symbols}
+    return names
+
+def _new_symbol(symbols, excluded):
+    sym = next(symbols)
+    while str(sym) in excluded:
+        sym = next(symbols)
+    excluded.add(str(sym))
+    return sym
+
+def cse_hoist_reciprocals(cse_output, symbols, map_sym_to_rat=None, min_divisions=2, min_power=2):
+    """ Hoist Reciprocals of Repeated Denominators
+
+        :arg:    output from CSE (postprocessed), in the same tuple format as cse_postprocess()
+        :arg:    iterator yielding new symbols for the reciprocal temporaries
+        :arg:    map of symbols to rationals from cse_preprocess(), used to look up declared exponents
+        :arg:    minimum number of divisions by a denominator for its reciprocal to be hoisted
+        :arg:    minimum power of a denominator for its reciprocal to be hoisted
+        :return: CSE output in which each denominator divided by at least min_divisions times
+                    (or raised to a power of at least min_power) is replaced by one reciprocal temporary,
+                    and divisions by it (including b**(-n/2) for integer n) by multiplications
+
+        >>> from sympy.abc import a, x, y, z
+        >>> from sympy import cse, sin, sqrt, numbered_symbols
+        >>> cse_out = cse_postprocess(cse([x/a + y/a**2, z/(a*x) + sin(y)/a**3 + 1/sqrt(a)]))
+        >>> cse_out
+        ([(x0, 1/a)], [x*x0 + y/a**2, x0*z/x + sin(y)/a**3 + 1/sqrt(a)])
+        >>> cse_hoist_reciprocals(cse_out, numbered_symbols('x'))
+        ([(x0, 1/a)], [x*x0 + x0**2*y, sqrt(x0) + x0**3*sin(y) + x0*z/x])
+        >>> cse_hoist_reciprocals(cse([x/(y + z) + y/(y + z)**2]), numbered_symbols('x'))
+        ([(x0, y + z), (x1, 1/x0)], [x*x1 + x1**2*y])
+    """
+    replaced, reduced = cse_output
+    replaced, reduced = replaced[:], reduced[:]
+    if map_sym_to_rat is None:
+        map_sym_to_rat = {}
+
+    def negative_exponent(expr):
+        # Return the positive integer or half-integer p such that expr == base**(-p); otherwise None
+        if expr.func != sp.Pow or not expr.args[0].free_symbols:
+            return None
+        exponent = map_sym_to_rat.get(expr.args[1], expr.args[1])
+        if exponent.is_Rational and exponent < 0 and exponent.q in (1, 2):
+            return -exponent
+        return None
+
+    # Step 1: Count the number of divisions by each denominator.
+    num_divisions, max_power = OrderedDict(), {}
+    for expr in [expr for _, expr in replaced] + reduced:
+        for subexpr in sp.preorder_traversal(expr):
+            power = negative_exponent(subexpr)
+            if power is not None:
+                base = subexpr.args[0]
+                num_divisions[base] = num_divisions.get(base, 0) + 1
+                max_power[base] = max(max_power.get(base, 0), power)
+    bases = [base for base in num_divisions if num_divisions[base] >= min_divisions or max_power[base] >= min_power]
+    if not bases:
+        return replaced, reduced
+
+    # Step 2: Reuse existing reciprocal temporaries, e.g., (x0, 1/a), and create new ones as needed.
+    excluded = _used_symbol_names(replaced, reduced)
+    reciprocal = {}
+    for sym, expr in replaced:
+        if negative_exponent(expr) == 1 and expr.args[0] in bases:
+            reciprocal.setdefault(expr.args[0], sym)
+    for base in bases:
+        if base in reciprocal:
+            definition = replaced.pop([sym for sym, _ in replaced].index(reciprocal[base]))
+        else:
+            reciprocal[base] = _new_symbol(symbols, excluded)
+            definition = (reciprocal[base], sp.Pow(base, -1))
+        # (Re-)insert the reciprocal right after the last replaced expression it depends on,
+        #   so that it is defined before any rewritten division by its denominator.
+        replaced.insert(_definition_position(replaced, base), definition)
+
+    # Step 3: Rewrite divisions as multiplications by the reciprocals.
+    def rewrite(expr):
+        mapping = {}
+        for subexpr in sp.preorder_traversal(expr):
+            power = negative_exponent(subexpr)
+            if power is not None and subexpr.args[0] in reciprocal:
+                mapping[subexpr] = sp.Pow(reciprocal[subexpr.args[0]], power)
+        return expr.xreplace(mapping)
+    for i, (sym, expr) in enumerate(replaced):
+        if reciprocal.get(expr.args[0] if expr.func == sp.Pow else None) != sym:
+            replaced[i] = (sym, rewrite(expr))
+    reduced = [rewrite(expr) for expr in reduced]
+    return replaced, reduced
+
+def cse_reduce_powers(cse_output, symbols, map_sym_to_rat=None):
+    """ Strength-Reduce Integer and Half-Integer Powers
+
+        :arg:    output from CSE (postprocessed), in the same tuple format as cse_postprocess()
+        :arg:    iterator yielding new symbols for the temporaries
+        :arg:    map of symbols to rationals from cse_preprocess(), used to look up declared exponents
+        :return: CSE output where negative powers b**(-n) and b**(-n/2) (n > 1) are computed from a shared
+                    reciprocal 1/b (see cse_hoist_reciprocals()), and positive powers b**n and b**(n/2) are
+                    computed by multiplying shared temporaries sqrt(b), b**2, b**4, b**8, ...
+
+        >>> from sympy.abc import x, y
+        >>> from sympy import cse, sqrt, numbered_symbols, Rational
+        >>> cse_reduce_powers(cse_postprocess(cse([x**6*y + x**4, x**7 + sqrt(x)**3, y/x**3])), numbered_symbols('x'))
+        ([(x1, x**2), (x2, x1**2), (x3, sqrt(x)), (x0, 1/x)], [x1*x2*y + x2, x*x1*x2 + x*x3, x0**3*y])
+        >>> cse_reduce_powers(cse_postprocess(cse([x**2 + y, sqrt(x)])), numbered_symbols('x'))
+        ([], [x**2 + y, sqrt(x)])
+        >>> cse_reduce_powers(cse_postprocess(cse([x**Rational(-3, 2) + 1/sqrt(y)])), numbered_symbols('x'))
+        ([(x0, 1/x), (x1, sqrt(x0))], [x0*x1 + 1/sqrt(y)])
+    """
+    # Hoisting the reciprocal 1/b of b**(-3/2), b**(-5/2), ... leaves only multiplications and a square root
+    replaced, reduced = cse_hoist_reciprocals(cse_output, symbols, map_sym_to_rat=map_sym_to_rat, min_power=sp.Rational(3, 2))
+
+    def reducible_exponent(expr):
+        # Return exponent e if expr == base**e is a positive integer or half-integer power; otherwise None
+        if expr.func != sp.Pow or not expr.args[0].free_symbols:
+            return None
+        exponent = expr.args[1]
+        if exponent.is_Rational and exponent > 0 and exponent.q in (1, 2):
+            return exponent
+        return None
+
+    # Step 1: Collect the exponents of each base.
+    exponents = OrderedDict()
+    for expr in [expr for _, expr in replaced] + reduced:
+        for subexpr in sp.preorder_traversal(expr):
+            exponent = reducible_exponent(subexpr)
+            if exponent is not None:
+                exponents.setdefault(subexpr.args[0], []).append(exponent)
+    # b**2, b**3, and sqrt(b) are already output optimally by sp.ccode(), unless b**2 can be shared with b**3.
+    for base in list(exponents):
+        if set(exponents[base]) in ({2}, {3}, {2, sp.Rational(1, 2)}, {3, sp.Rational(1, 2)}, {sp.Rational(1, 2)}):
+            del exponents[base]
+    if not exponents:
+        return replaced, reduced
+
+    # Step 2: For each base, define temporaries sqrt(b), b**2, b**4, ..., and any product of
+    #         those used more than once, reusing existing temporaries, e.g., (x0, b**2), if present.
+    excluded = _used_symbol_names(replaced, reduced)
+    existing = {}
+    for sym, expr in replaced:
+        if expr.func == sp.Pow and expr.args[0] in exponents:
+            existing.setdefault(expr, sym)
+    mapping, new_definitions = {}, set()
+    for base, base_exponents in exponents.items():
+        definitions = []
+        def temporary(value, expr):
+            if value in existing:
+                sym = existing[value]
+                replaced.remove((sym, value))
+            else:
+                sym = _new_symbol(symbols, excluded)
+            definitions.append((sym, expr))
+            new_definitions.add(sym)
+            return sym
+        int_powers = [int(sp.floor(exponent)) for exponent in base_exponents]
+        # Binary powers: binary_power[j] = base**(2**j)
+        binary_power = [base]
+        while 2**len(binary_power) <= max(int_powers):
+            j = len(binary_power)
+            binary_power.append(temporary(base**(2**j), binary_power[j - 1]**2))
+        power = {0: sp.S.One, 1: base}
+        for n in sorted(set(int_powers)):
+            if n not in power:
+                product = sp.Mul(*[binary_power[j] for j in range(len(binary_power)) if n & (1 << j)])
+                power[n] = temporary(base**n, product) if int_powers.count(n) > 1 and product.is_Mul else product
+        sqrt_base = temporary(sp.sqrt(base), sp.sqrt(base)) if any(e.q == 2 for e in base_exponents) else None
+        for exponent, n in zip(base_exponents, int_powers):
+            mapping[base**exponent] = power[n]*sqrt_base if exponent.q == 2 else power[n]
+        position = _definition_position(replaced, base)
+        replaced[position:position] = definitions
+
+    # Step 3: Rewrite the powers in terms of the temporaries (within the bases only, for the new temporaries).
+    replaced = [(sym, expr.func(*[arg.xreplace(mapping) for arg in expr.args]) if sym in new_definitions
+                 else expr.xreplace(mapping)) for sym, expr in replaced]
+    reduced = [expr.xreplace(mapping) for expr in reduced]
+    return replaced, reduced
+
+def _schedule_dependencies(cse_output):
+    # Return (deps, users): deps[i] = indices of replaced expressions read by statement i,
+    #   users[j] = indices of statements reading replaced expression j, where statement
+    #   i < len(replaced) refers to replaced[i], and i >= len(replaced) to reduced[i - len(replaced)]
+    replaced, reduced = cse_output
+    defined = {sym: j for j, (sym, _) in enumerate(replaced)}
+    if len(defined) != len(replaced):
+        # A symbol is defined more than once (e.g., a reassigned SCALAR_TMP)
+        return None, None
+    deps, users = [], [[] for _ in replaced]
+    for i, expr in enumerate([expr for _, expr in replaced] + list(reduced)):
+        deps.append(sorted(defined[sym] for sym in expr.free_symbols if sym in defined))
+        for j in deps[i]:
+            users[j].append(i)
+    return deps, users
+
+def _schedule_ordering(cse_output, output_varnames):
+    # Return order_deps: order_deps[i] = indices of statements that must be evaluated before statement i
+    #   without being read by it, since an output overwrites a variable that another statement reads:
+    #   statements reading the old value precede the output, and outputs reading the new value follow it.
+    replaced, reduced = cse_output
+    num_replaced = len(replaced)
+    order_deps = [set() for _ in range(num_replaced + len(reduced))]
+    if not output_varnames:
+        return [[] for _ in order_deps]
+    readers = {}
+    for i, expr in enumerate([expr for _, expr in replaced] + list(reduced)):
+        for sym in expr.free_symbols:
+            readers.setdefault(str(sym), []).append(i)
+    writers = {}
+    for n, varname in enumerate(output_varnames):
+        if varname is not None:
+            writers.setdefault(str(varname), []).append(num_replaced + n)
+    for varname, writer_list in writers.items():
+        for j in writer_list:
+            for i in readers.get(varname, []):
+                if i < j:
+                    order_deps[j].add(i)
+                elif i > j:
+                    order_deps[i].add(j)
+        # Outputs writing the same variable keep their original order
+        for j, k in zip(writer_list, writer_list[1:]):
+            order_deps[k].add(j)
+    return [sorted(order_dep) for order_dep in order_deps]
+
+def _peak_live(deps, users, num_replaced, order):
+    remaining_uses = [len(user) for user in users]
+    live = peak = 0
+    for i in order:
+        # Operands read by statement i are live while it is evaluated, along with its result.
+        if i < num_replaced and remaining_uses[i] > 0:
+            live += 1
+        peak = max(peak, live)
+        for j in deps[i]:
+            remaining_uses[j] -= 1
+            if remaining_uses[j] == 0:
+                live -= 1
+    return peak
+
+def cse_peak_live(cse_output, order=None):
+    """ Estimate Register Pressure of CSE Output
+
+        :arg:    output from CSE (postprocessed), in the same tuple format as cse_postprocess()
+        :arg:    evaluation order of the statements, as returned by cse_schedule() (default: original order)
+        :return: maximum number of CSE temporaries simultaneously live, i.e., defined and still to be read
+
+        >>> from sympy.abc import a, b
+        >>> from sympy import cos, sin, symbols
+        >>> x0, x1 = symbols('x0 x1')
+        >>> cse_out = ([(x0, sin(a)), (x1, sin(b))], [x0 + cos(x0), x1 + cos(x1)])
+        >>> cse_peak_live(cse_out), cse_peak_live(cse_out, [0, 2, 1, 3])
+        (2, 1)
+    """
+    replaced, reduced = cse_output
+    deps, users = _schedule_dependencies(cse_output)
+    if deps is None:
+        return len(replaced)
+    if order is None:
+        order = range(len(replaced) + len(reduced))
+    return _peak_live(deps, users, len(replaced), order)
+
+def _schedule_sethi_ullman(deps, order_deps, num_replaced):
+    # Evaluate the outputs one at a time, in their original order, each right after its
+    #   not-yet-evaluated operands, which are evaluated recursively (as in Sethi-Ullman numbering)
+    #   starting with the operand that requires the most registers. Ordering constraints between
+    #   outputs always point forward in the original order, so only those on temporaries are visited.
+    need = []  # Registers needed to evaluate each replaced expression, treating the DAG as a tree
+    for i in range(num_replaced):
+        operand_needs = sorted((need[j] for j in deps[i]), reverse=True)
+        need.append(max([1] + [n + k for k, n in enumerate(operand_needs)]))
+    scheduled = [False] * len(deps)
+    order = []
+    def visit(operands):
+        # Iterative depth-first post-order traversal, since expressions may be deeply nested
+        stack = [iter(sorted(operands, key=lambda j: -need[j]))]
+        path = []
+        while stack:
+            j = next(stack[-1], None)
+            if j is None:
+                stack.pop()
+                if path:
+                    i = path.pop()
+                    scheduled[i] = True
+                    order.append(i)
+            elif not scheduled[j]:
+                scheduled[j] = True  # Mark on entry: deps are acyclic, so j cannot be re-entered
+                path.append(j)
+                stack.append(iter(sorted(deps[j], key=lambda k: -need[k])))
+    for i in range(num_replaced, len(deps)):
+        visit(deps[i] + [j for j in order_deps[i] if j < num_replaced])
+        order.append(i)
+    # Unused temporaries, if any, are evaluated last.
+    visit([j for j in range(num_replaced) if not scheduled[j]])
+    return order
+
+def _schedule_greedy(deps, users, order_deps, num_replaced):
+    # Greedy list scheduling: among all statements whose operands (and ordering constraints) have been
+    #   evaluated, evaluate the statement that frees the most temporaries (i.e., is the last reader of
+    #   the most operands), net of the temporary it defines. Ties are broken by the original order.
+    num_statements = len(deps)
+    remaining_uses = [len(user) for user in users]
+    order_deps = [[j for j in order_deps[i] if j not in deps[i]] for i in range(num_statements)]
+    order_users = [[] for _ in range(num_statements)]
+    for i in range(num_statements):
+        for j in order_deps[i]:
+            order_users[j].append(i)
+    unscheduled_deps = [len(deps[i]) + len(order_deps[i]) for i in range(num_statements)]
+    scheduled = [False] * num_statements
+    score = [-1 if i < num_replaced and users[i] else 0 for i in range(num_statements)]
+    for i in range(num_statements):
+        score[i] += sum(1 for j in deps[i] if remaining_uses[j] == 1)
+
+    # Scores only increase as statements are scheduled; stale heap entries are skipped when popped.
+    ready = [(-score[i], i) for i in range(num_statements) if unscheduled_deps[i] == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        negscore, i = heapq.heappop(ready)
+        if scheduled[i] or -negscore != score[i]:
+            continue
+        scheduled[i] = True
+        order.append(i)
+        for j in deps[i]:
+            remaining_uses[j] -= 1
+            if remaining_uses[j] == 1:
+                # The last remaining reader of temporary j now frees it
+                k = next(k for k in users[j] if not scheduled[k])
+                score[k] += 1
+                if unscheduled_deps[k] == 0:
+                    heapq.heappush(ready, (-score[k], k))
+        for k in (users[i] if i < num_replaced else []) + order_users[i]:
+            unscheduled_deps[k] -= 1
+            if unscheduled_deps[k] == 0:
+                heapq.heappush(ready, (-score[k], k))
+    return order
+
+def cse_schedule(cse_output, output_varnames=None):
+    """ Register-Pressure-Aware Scheduling of CSE Output
+
+        Reorders the CSE temporaries and final assignments to reduce the maximum number of
+        simultaneously live temporaries (see cse_peak_live()). Two heuristics are applied to
+        the dependency graph: a Sethi-Ullman-style depth-first evaluation of each output, and
+        greedy list scheduling; the order with the lower peak live count is returned.
+
+        :arg:    output from CSE (postprocessed), in the same tuple format as cse_postprocess()
+        :arg:    name of the variable assigned by each reduced expression (default: none read by any
+                    statement); statements reading a variable before it is overwritten by an output stay
+                    ahead of that output, and outputs reading the overwritten variable stay after it
+        :return: list of statement indices in evaluation order, where index i < len(replaced)
+                    refers to replaced[i] and index i >= len(replaced) to reduced[i - len(replaced)]
+
+        >>> from sympy.abc import a, b
+        >>> from sympy import cos, sin, symbols
+        >>> x0, x1 = symbols('x0 x1')
+        >>> cse_out = ([(x0, sin(a)), (x1, sin(b))], [x0 + cos(x0), x1 + cos(x1)])
+        >>> cse_schedule(cse_out)
+        [0, 2, 1, 3]
+        >>> cse_schedule(cse_out, output_varnames=['b', None])
+        [0, 1, 2, 3]
+
+        An output reading a variable assigned by an earlier output is evaluated after it:
+
+        >>> Foo, y = symbols('Foo y')
+        >>> cse_out = ([(x0, sin(a))], [x0 + a*cos(y), Foo*x0 + y])
+        >>> cse_schedule(cse_out, output_varnames=['Foo', 'Bar'])
+        [0, 1, 2]
+    """
+    replaced, reduced = cse_output
+    num_replaced = len(replaced)
+    deps, users = _schedule_dependencies(cse_output)
+    if deps is None:
+        return list(range(num_replaced + len(reduced)))
+    order_deps = _schedule_ordering(cse_output, output_varnames)
+    orders = [_schedule_sethi_ullman(deps, order_deps, num_replaced),
+              _schedule_greedy(deps, users, order_deps, num_replaced)]
+    return min(orders, key=lambda order: _peak_live(deps, users, num_replaced, order))
+
+def cse_loop_invariants(cse_output, symbol_loop_indices, innermost=0, prefix='tmp'):
+    """ Loop-Invariant Analysis of CSE Output
+
+        Determines the loop indices on which each CSE temporary depends, given the loop indices
+        on which every other free symbol depends. Subexpressions independent of the innermost
+        loop index within expressions that do depend on it (e.g., sin(xx1) in sin(xx1)*u) become
+        new temporaries, as do invariant factors or terms of products and sums. Each temporary
+        independent of the innermost loop index is named prefix + 'inv_' + a hash of its
+        definition, so that such temporaries hoisted out of several blocks of code into one
+        scope never clash: equal names imply equal definitions.
+
+        :arg:    output from CSE (postprocessed), with temporaries named prefix followed by a number
+        :arg:    function mapping a free symbol (other than a CSE temporary) to the frozenset of loop indices it depends on
+        :arg:    innermost loop index
+        :arg:    prefix of the names of CSE temporaries
+        :return: CSE output with loop-invariant temporaries, list of the frozensets of loop indices
+                    on which each replaced expression depends if it is a loop-invariant temporary
+                    (independent of the innermost loop index), otherwise None
+
+        >>> from sympy import cos, sin, symbols
+        >>> a, b, xx1, xx2, x0, x1, x2 = symbols('a b xx1 xx2 x0 x1 x2')
+        >>> loop_indices = {a: frozenset([0, 1, 2]), b: frozenset(), xx1: frozenset([1]), xx2: frozenset([2])}
+        >>> cse_out = ([(x0, sin(xx1)), (x1, x0*cos(xx2)), (x2, a*x1)], [x0 + x2 + a*b*cos(xx1)])
+        >>> cse_out, indices = cse_loop_invariants(cse_out, loop_indices.get, prefix='x')
+        >>> [sorted(idx) if idx is not None else None for idx in indices]
+        [[1], [1, 2], None, [1]]
+        >>> cse_out
+        ([(xinv_7c3aeee1, sin(xx1)), (xinv_31c9b9fb, xinv_7c3aeee1*cos(xx2)), (x2, a*xinv_31c9b9fb), (xinv_ea523c32, b*cos(xx1))], [a*xinv_ea523c32 + x2 + xinv_7c3aeee1])
+    """
+    replaced, reduced = cse_output
+    is_CSE_temp = re.compile(re.escape(prefix) + r'[0-9]+$').match
+    loop_indices, rename, new_replaced = {}, {}, []
+    invariant_temps = {}  # Map of definitions to names of temporaries independent of the innermost loop index
+
+    def indices_of(expr):
+        if expr not in loop_indices:
+            loop_indices[expr] = frozenset().union(*[loop_indices[sym] if sym in loop_indices else symbol_loop_indices(sym)
+                                                     for sym in expr.free_symbols])
+        return loop_indices[expr]
+
+    def invariant_temp(expr, indices):
+        if expr not in invariant_temps:
+            sym = sp.Symbol(prefix + 'inv_' + hashlib.md5(str(expr).encode()).hexdigest()[:8])
+            invariant_temps[expr] = sym
+            loop_indices[sym] = indices
+            new_replaced.append((sym, expr))
+        return invariant_temps[expr]
+
+    def hoist(expr):
+        # Replace each subexpression of expr that is independent of the innermost loop index by a temporary
+        if expr.is_Atom or not isinstance(expr, sp.Expr):
+            return expr
+        indices = indices_of(expr)
+        if innermost not in indices:
+            return invariant_temp(expr, indices)
+        args = list(expr.args)
+        if expr.is_Add or expr.is_Mul:
+            invariant_args = [arg for arg in args if innermost not in indices_of(arg)]
+            if len(invariant_args) > 1:
+                invariant_expr = expr.func(*invariant_args)
+                args = [arg for arg in args if innermost in indices_of(arg)] + \
+                       [invariant_expr if invariant_expr.is_Atom else invariant_temp(invariant_expr, indices_of(invariant_expr))]
+        return expr.func(*[hoist(arg) for arg in args])
+
+    for sym, expr in replaced:
+        expr = expr.xreplace(rename)
+        indices = indices_of(expr)
+        if is_CSE_temp(str(sym)) and innermost not in indices:
+            rename[sym] = expr if expr.is_Atom else invariant_temp(expr, indices)
+            continue
+        expr = hoist(expr)
+        loop_indices[sym] = indices
+        new_replaced.append((sym, expr))
+    reduced = [hoist(expr.xreplace(rename)) for expr in reduced]
+    invariant_syms = set(invariant_temps.values())
+    return (new_replaced, reduced), [loop_indices[sym] if sym in invariant_syms else None for sym, _ in new_replaced]
+
 if __name__ == "__main__":
     import doctest
     sys.exit(doctest.testmod()[0])
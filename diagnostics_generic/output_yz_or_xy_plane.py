@@ -106,6 +106,10 @@ def output_plane_yz_or_xy_body(plane="yz", include_ghosts=True):
     return out_str
 
 
+# Each element of list_of_outputs is a C expression evaluated at gridpoint idx = IDX3S(i0,i1,i2),
+#   e.g., "y_n_gfs[IDX4ptS(CFGF,idx)]". Gridfunctions stored in arrays other than NUM_EVOL_GFS-sized
+#   ones (e.g., AUX gridfunctions in diagnostic_output_gfs) should be accessed with
+#   IDX4ptSN(NUM_AUX_GFS,HGF,idx), which is correct in any grid::GridFuncMemLayout.
 def add_to_Cfunction_dict__plane_diagnostics(plane="xy", include_ghosts=False,
                                                list_of_outputs=None, num_sig_figs=8):
     includes = ["NRPy_basic_defines.h", "NRPy_function_prototypes.h"]
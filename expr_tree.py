@@ -16,6 +16,14 @@
     while the __str__ representation will return a string of the class name
     and root expression. The Node subclass has a field for an expression and
     a field for subexpression children (implemented as a mutable list).
+
+    The tree is built and traversed iteratively (using an explicit stack),
+    so that the depth of an expression is not limited by Python's recursion
+    limit. Identical subexpressions under the same type of parent are
+    hash-consed into a single (shared) node, so that the tree is in fact a
+    directed acyclic graph: each distinct node is stored, visited, modified,
+    and reconstructed only once, and any modification of a shared node
+    applies to every occurrence of its subexpression.
 """
 # Author: Ken Sible
 # Email:  ksible *at* outlook *dot* com
@@ -34,6 +42,8 @@ class ExprTree:
         [cos(a + b)**2, cos(a + b), a + b, a, b, 2]
     """
 
+    __slots__ = ('root',)
+
     def __init__(self, expr):
         self.root = self.Node(expr, None)
         self.build(self.root)
@@ -51,12 +61,29 @@ class ExprTree:
             >>> tree.build(tree.root, clear=True)
             >>> [node.expr for node in tree.preorder()]
             [sin(a*b)**2, sin(a*b), a*b, a, b, 2]
+
+            Identical subexpressions (with the same type of parent) share a node.
+
+            >>> tree = ExprTree((a*b + 1)**2 + (a*b + 1)**3)
+            >>> [node.expr for node in tree.preorder()]
+            [(a*b + 1)**3 + (a*b + 1)**2, (a*b + 1)**2, a*b + 1, 1, a*b, a, b, 2, (a*b + 1)**3, 3]
+            >>> tree.root.children[0].children[0] is tree.root.children[1].children[0]
+            True
         """
         if clear: del node.children[:]
-        for arg in node.expr.args:
-            subtree = self.Node(arg, node.expr.func)
-            node.append(subtree)
-            self.build(subtree)
+        Node, interned = self.Node, {}
+        stack = [node]
+        while stack:
+            parent = stack.pop()
+            func = parent.expr.func
+            children = parent.children
+            for arg in parent.expr.args:
+                key = (arg, func)
+                child = interned.get(key)
+                if child is None:
+                    child = interned[key] = Node(arg, func)
+                    if arg.args: stack.append(child)
+                children.append(child)
 
     def preorder(self, node=None):
         """ Generate iterator for preorder traversal.
@@ -74,10 +101,15 @@ class ExprTree:
         """
         if node is None:
             node = self.root
-        yield node
-        for child in node.children:
-            for subtree in self.preorder(child):
-                yield subtree
+        visited, stack = set(), [node]
+        while stack:
+            node = stack.pop()
+            if node in visited: continue
+            visited.add(node)
+            yield node
+            # The children are read only after resuming, so that the
+            #   client may modify (or rebuild) the node before descending
+            stack.extend(reversed(node.children))
 
     def postorder(self, node=None):
         """ Generate iterator for postorder traversal.
@@ -95,10 +127,17 @@ class ExprTree:
         """
         if node is None:
             node = self.root
-        for child in node.children:
-            for subtree in self.postorder(child):
-                yield subtree
-        yield node
+        visited, stack = {node}, [(node, iter(node.children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in visited:
+                    visited.add(child)
+                    stack.append((child, iter(child.children)))
+                    break
+            else:
+                stack.pop()
+                yield node
 
     def reconstruct(self, evaluate=False):
         """
@@ -122,6 +161,8 @@ class ExprTree:
 
     class Node:
         """ Expression Tree Node """
+        __slots__ = ('expr', 'func', 'children')
+
         def __init__(self, expr, func):
             self.expr = expr
             self.func = func
@@ -9,14 +9,20 @@
 # Author: Zachariah B. Etienne
 #         zachetie **at** gmail **dot* com
 
-from outputC import parse_outCparams_string, outC_function_dict, outC_function_prototype_dict, outC_NRPy_basic_defines_h_dict, outC_function_master_list  # NRPy+: Core C code output module
+from outputC import parse_outCparams_string, output_Ccode_string, outC_function_dict, outC_function_prototype_dict, outC_NRPy_basic_defines_h_dict, outC_function_master_list  # NRPy+: Core C code output module
 import NRPy_param_funcs as par   # NRPy+: parameter interface
+import outputC_profiler as outCprof  # NRPy+: Opt-in per-phase profiling of outputC() and FD_outputC()
 import sympy as sp               # SymPy: The Python computer algebra package upon which NRPy+ depends
 import grid as gri               # NRPy+: Functions having to do with numerical grids
-import os, sys                   # Standard Python module for multiplatform OS-level functions
+import os, sys, json             # Standard Python modules for multiplatform OS-level functions and JSON I/O
+import itertools                 # Standard Python module for efficient looping
+from fractions import Fraction   # Standard Python module for exact rational arithmetic
 from finite_difference_helpers import extract_from_list_of_deriv_vars__base_gfs_and_deriv_ops_lists
 from finite_difference_helpers import generate_list_of_deriv_vars_from_lhrh_sympyexpr_list
 from finite_difference_helpers import read_gfs_from_memory, FDparams, construct_Ccode
+from finite_difference_helpers import free_symbols_of_lhrh_sympyexpr_list
+from finite_difference_helpers import read_gfs_from_memory_unrolled_i0, construct_unrolled_i0_Ccode
+from collections import OrderedDict  # Standard Python: Dictionary that remembers insertion order
 
 # Step 1: Initialize free parameters for this module:
 modulename = __name__
@@ -24,9 +30,17 @@ modulename = __name__
 par.initialize_param(par.glb_param("int",  modulename, "FD_CENTDERIVS_ORDER",          4))
 par.initialize_param(par.glb_param("bool", modulename, "enable_FD_functions",      False))
 par.initialize_param(par.glb_param("int",  modulename, "FD_KO_ORDER__CENTDERIVS_PLUS", 2))
-
+# Optional on-disk JSON table of finite difference coefficients, shared across runs (see fdcoeffs_1D()).
+#  It is off by default, and nothing is written to disk unless enable_FD_coeffs_table is set to True
+#  AND FD_coeffs_table_file is set to the path of the table, e.g.,
+#  par.set_parval_from_str("finite_difference::FD_coeffs_table_file", "/path/to/nrpy_FD_coeffs.json")
+par.initialize_param(par.glb_param("bool", modulename, "enable_FD_coeffs_table",   False))
+par.initialize_param(par.glb_param("char", modulename, "FD_coeffs_table_file",        ""))
+
+@outCprof.profiled("FD_outputC")
 def FD_outputC(filename, sympyexpr_list, params="", upwindcontrolvec="",idxs=None):
     outCparams = parse_outCparams_string(params)
+    prof = outCprof.current_record()
 
     # Step 0.a:
     # In case sympyexpr_list is a single sympy expression,
@@ -35,6 +49,9 @@ def FD_outputC(filename, sympyexpr_list, params="", upwindcontrolvec="",idxs=Non
     #     sympyexpr_list is indeed a list.
     if not isinstance(sympyexpr_list, list):
         sympyexpr_list = [sympyexpr_list]
+    if prof:
+        prof.set_stat("num_exprs", len(sympyexpr_list))
+        prof.set_stat("tree_size", outCprof.expr_tree_size([lhrh.rhs for lhrh in sympyexpr_list]))
 
     # Step 0.b:
     # finite_difference.py takes control over outCparams.includebraces here,
@@ -62,14 +79,38 @@ def FD_outputC(filename, sympyexpr_list, params="", upwindcontrolvec="",idxs=Non
     FDparams.enable_FD_functions = par.parval_from_str("enable_FD_functions")
     FDparams.DIM                 = par.parval_from_str("DIM")
     FDparams.MemAllocStyle       = par.parval_from_str("MemAllocStyle")
+    FDparams.GridFuncMemLayout   = par.parval_from_str("GridFuncMemLayout")
     FDparams.upwindcontrolvec    = upwindcontrolvec
     FDparams.fullindent          = indent + outCparams.preindent
     FDparams.outCparams          = params
 
+    # SIMD reads & writes (ReadSIMD()/WriteSIMD()) assume consecutive points along i0 are adjacent in memory.
+    if FDparams.GridFuncMemLayout == "interleaved" and outCparams.enable_SIMD == "True":
+        print("Error: enable_SIMD=True is not supported with grid::GridFuncMemLayout = interleaved.")
+        sys.exit(1)
+
+    # Step 0.d: Unrolling the i0 loop (see construct_unrolled_i0_Ccode()) reuses
+    #     gridfunction values read from memory across consecutive points along i0.
+    #     Only scalar (non-SIMD) code with NRPy+ loops (loop.simple_loop()) is supported.
+    unroll_factor = int(outCparams.FD_unroll_i0)
+    if unroll_factor > 1 and (outCparams.enable_SIMD == "True" or gri.ET_driver == "CarpetX"):
+        print("Error: FD_unroll_i0 > 1 is not supported with enable_SIMD=True or the CarpetX driver.")
+        sys.exit(1)
+
+    # Step 0.e: Branching on the sign of the upwind control vector (see construct_Ccode())
+    #     requires the finite difference stencils to be inlined.
+    if outCparams.FD_upwind_branch == "True" and FDparams.enable_FD_functions:
+        print("Error: FD_upwind_branch=True is not supported with enable_FD_functions=True.")
+        sys.exit(1)
+
     # Step 1: Generate from list of SymPy expressions in the form
     #     [lhrh(lhs=var, rhs=expr),lhrh(...),...]
     #     all derivative expressions, which we will process next.
-    list_of_deriv_vars = generate_list_of_deriv_vars_from_lhrh_sympyexpr_list(sympyexpr_list, FDparams)
+    #     The free symbols of sympyexpr_list are found once, and
+    #     reused when planning the reads from memory in Step 4.
+    with prof.phase("FD_deriv_vars"):
+        free_symbols = free_symbols_of_lhrh_sympyexpr_list(sympyexpr_list)
+        list_of_deriv_vars = generate_list_of_deriv_vars_from_lhrh_sympyexpr_list(sympyexpr_list, FDparams, free_symbols)
 
     # Step 2a: Extract from list_of_deriv_vars a list of base gridfunctions
     #         and a list of derivative operators. Usually takes list of SymPy
@@ -85,31 +126,37 @@ def FD_outputC(filename, sympyexpr_list, params="", upwindcontrolvec="",idxs=Non
     # Next, check each base gridfunction to determine whether
     #     it is indeed registered as a gridfunction.
     #     If not, exit with error.
+    gfnames = set(str(gf.name) for gf in gri.glb_gridfcs_list)
     for basegf in list_of_base_gridfunction_names_in_derivs:
-        is_gf = False
-        for gf in gri.glb_gridfcs_list:
-            if basegf == str(gf.name):
-                is_gf = True
-        if not is_gf:
+        if basegf not in gfnames:
             print("Error: Attempting to take the derivative of "+basegf+", which is not a registered gridfunction.")
             print("       Make sure your gridfunction name does not have any underscores in it!")
 
     # Step 2c:
+    # Index the derivative variables by derivative operator: operators
+    #     such as dD0 typically appear in the derivatives of many
+    #     gridfunctions, yet need to be processed only once.
+    deriv_op_index = OrderedDict()
+    for i in range(len(list_of_deriv_operators)):
+        deriv_op_index.setdefault(list_of_deriv_operators[i], []).append(i)
+
+    # Step 2d:
     # Check each derivative operator to make sure it is
     #     supported. If not, error out.
-    for i in range(len(list_of_deriv_operators)):
+    for deriv_op in deriv_op_index:
         found_derivID = False
         for derivID in ["dD", "dupD", "ddnD", "dKOD"]:
-            if derivID in list_of_deriv_operators[i]:
+            if derivID in deriv_op:
                 found_derivID = True
         if not found_derivID:
-            print("Error: Valid derivative operator in "+list_of_deriv_operators[i]+" not found.")
+            print("Error: Valid derivative operator in "+deriv_op+" not found.")
             sys.exit(1)
 
     # Step 3:
     # Evaluate the finite difference stencil for each
-    #     derivative operator, being careful not to
-    #     needlessly recompute.
+    #     distinct derivative operator, being careful not to
+    #     needlessly recompute: all derivative variables
+    #     with the same operator share the same stencil.
     # Note: Each finite difference stencil consists
     #     of two parts:
     #     1) The coefficient, and
@@ -122,37 +169,49 @@ def FD_outputC(filename, sympyexpr_list, params="", upwindcontrolvec="",idxs=Non
     #     etc.
     fdcoeffs = [[] for i in range(len(list_of_deriv_operators))]
     fdstencl = [[[] for i in range(4)] for j in range(len(list_of_deriv_operators))]
-    for i in range(len(list_of_deriv_operators)):
-        fdcoeffs[i], fdstencl[i] = compute_fdcoeffs_fdstencl(list_of_deriv_operators[i])
+    NGHOSTS = int(outCparams.FD_NGHOSTS) if outCparams.FD_NGHOSTS != "" else None
+    with prof.phase("FD_coeffs"):
+        for deriv_op, deriv_var_idxs in deriv_op_index.items():
+            fdcoeffs_op, fdstencl_op = compute_fdcoeffs_fdstencl(deriv_op, NGHOSTS=NGHOSTS)
+            for i in deriv_var_idxs:
+                fdcoeffs[i], fdstencl[i] = fdcoeffs_op, fdstencl_op
+    prof.set_stat("num_deriv_vars", len(list_of_deriv_vars), phase="FD_coeffs")
+    prof.set_stat("num_deriv_ops", len(deriv_op_index), phase="FD_coeffs")
 
     # Step 4: Create C code to read gridfunctions from memory
-    read_from_memory_Ccode = read_gfs_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sympyexpr_list, FDparams, idxs)
+    with prof.phase("read_gfs_from_memory"):
+        read_from_memory_Ccode = read_gfs_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sympyexpr_list, FDparams, idxs,
+                                                      free_symbols)
+        if unroll_factor > 1:
+            block_read_Ccode, point_read_Ccode = \
+                read_gfs_from_memory_unrolled_i0(list_of_base_gridfunction_names_in_derivs, fdstencl, sympyexpr_list, FDparams,
+                                                 unroll_factor, idxs, free_symbols)
 
     # Step 5: construct C code.
     Coutput = ""
     if outCparams.includebraces == "True":
         Coutput = outCparams.preindent + "{\n"
-    Coutput = construct_Ccode(sympyexpr_list, list_of_deriv_vars,
-                           list_of_base_gridfunction_names_in_derivs, list_of_deriv_operators,
-                           fdcoeffs, fdstencl, read_from_memory_Ccode, FDparams, Coutput)
+    with prof.phase("construct_Ccode"):
+        if unroll_factor > 1 and read_from_memory_Ccode != "":
+            # The C code for a single point is generated once, with a placeholder
+            #   for the reads from memory, then replicated across the unrolled points.
+            placeholder = "// <NRPy+ FD reads from memory>"
+            Ccode = construct_Ccode(sympyexpr_list, list_of_deriv_vars,
+                                    list_of_base_gridfunction_names_in_derivs, list_of_deriv_operators,
+                                    fdcoeffs, fdstencl, placeholder + "\n", FDparams, "")
+            Coutput += construct_unrolled_i0_Ccode(Ccode, placeholder, read_from_memory_Ccode,
+                                                   block_read_Ccode, point_read_Ccode, FDparams)
+        else:
+            Coutput = construct_Ccode(sympyexpr_list, list_of_deriv_vars,
+                                      list_of_base_gridfunction_names_in_derivs, list_of_deriv_operators,
+                                      fdcoeffs, fdstencl, read_from_memory_Ccode, FDparams, Coutput)
     if outCparams.includebraces == "True":
         Coutput += outCparams.preindent+"}"
 
     # Step 6: Output the C code in desired format: stdout, string, or file.
-    if filename == "stdout":
-        print(Coutput)
-    elif filename == "returnstring":
-        return Coutput
-    else:
-        # Output to the file specified by outCfilename
-        with open(filename, outCparams.outCfileaccess) as file:
-            file.write(Coutput)
-        successstr = ""
-        if outCparams.outCfileaccess == "a":
-            successstr = "Appended "
-        elif outCparams.outCfileaccess == "w":
-            successstr = "Wrote "
-        print(successstr + "to file \"" + filename + "\"")
+    prof.set_stat("num_bytes", len(Coutput), phase="output")
+    with prof.phase("output"):
+        return output_Ccode_string(Coutput, filename, outCparams.outCfileaccess)
 
 ################
 # TO BE DEPRECATED:
@@ -285,25 +344,117 @@ def register_C_functions_and_NRPy_basic_defines(NGHOSTS_account_for_onezone_upwi
 #  .... row, but with each element e_j -> e_j^(L-1)
 #  A1 is used later to validate the inverted
 #  matrix.
+# The inverse of this matrix is not computed by SymPy's
+#  matrix inversion. Instead, column m of A^{-1} is given by
+#  the m'th derivative finite difference weights divided by m!,
+#  which Fornberg's algorithm (see Fornberg_weights() below)
+#  computes exactly, and which are memoised by fdcoeffs_1D().
 def setup_FD_matrix__return_inverse(STENCILWIDTH, UPDOWNWIND_stencil_shift):
-    # Set up matrix based on the stencil size (FDORDER+1).
-    #         See documentation above for details on how this
-    #         matrix is set up.
-    M = sp.zeros(STENCILWIDTH, STENCILWIDTH)
-    for i in range(STENCILWIDTH):
-        for j in range(STENCILWIDTH):
-            if i == 0:
-                M[(i, j)] = 1  # Setting n^0 = 1 for all n, including n=0, because this matches the pattern
-            else:
-                dist_from_xeq0_col = j - sp.Rational((STENCILWIDTH - 1), 2) + UPDOWNWIND_stencil_shift
-                if dist_from_xeq0_col == 0:
-                    M[(i, j)] = 0
-                else:
-                    M[(i, j)] = dist_from_xeq0_col ** i
-    return M**(-1)
-
-
-def compute_fdcoeffs_fdstencl(derivstring, FDORDER=-1):
+    fdcoeffs_1D(STENCILWIDTH, UPDOWNWIND_stencil_shift, STENCILWIDTH-1)  # Memoises all columns at once
+    return sp.Matrix(STENCILWIDTH, STENCILWIDTH,
+                     lambda i, m: fdcoeffs_1D(STENCILWIDTH, UPDOWNWIND_stencil_shift, m)[i] / sp.factorial(m))
+
+
+# Fornberg's algorithm [B. Fornberg, Math. Comp. 51, 699 (1988)]:
+#  Given the stencil points xpts (relative to the point at which
+#  the derivative is evaluated), return weights[m][j], the finite
+#  difference weight of point xpts[j] for the m'th derivative,
+#  for all m <= max_deriv_order. All arithmetic is exact,
+#  so xpts must be integers or fractions.Fraction's.
+def Fornberg_weights(xpts, max_deriv_order):
+    N = len(xpts)
+    weights = [[Fraction(0)]*N for _m in range(max_deriv_order+1)]
+    weights[0][0] = Fraction(1)
+    c1 = Fraction(1)
+    c4 = Fraction(xpts[0])
+    for i in range(1, N):
+        mn = min(i, max_deriv_order)
+        c2 = Fraction(1)
+        c5 = c4
+        c4 = Fraction(xpts[i])
+        for j in range(i):
+            c3 = xpts[i] - xpts[j]
+            c2 *= c3
+            if j == i-1:
+                for m in range(mn, 0, -1):
+                    weights[m][i] = c1*(m*weights[m-1][i-1] - c5*weights[m][i-1])/c2
+                weights[0][i] = -c1*c5*weights[0][i-1]/c2
+            for m in range(mn, 0, -1):
+                weights[m][j] = (c4*weights[m][j] - m*weights[m-1][j])/c3
+            weights[0][j] = c4*weights[0][j]/c3
+        c1 = c2
+    return weights
+
+
+# In-process memo of 1D finite difference weights, keyed by
+#  (stencil width, stencil shift, derivative order); see fdcoeffs_1D().
+_fdcoeffs_1D_dict = {}
+# Contents of the on-disk table FD_coeffs_table_file, once read.
+_FD_coeffs_table = None
+
+def _load_FD_coeffs_table():
+    global _FD_coeffs_table
+    if _FD_coeffs_table is None:
+        _FD_coeffs_table = {}
+        try:
+            with open(par.parval_from_str(modulename + "::FD_coeffs_table_file"), "r") as file:
+                _FD_coeffs_table = json.load(file)
+        except (IOError, OSError, ValueError):
+            pass
+    return _FD_coeffs_table
+
+def _store_FD_coeffs_table():
+    filename = par.parval_from_str(modulename + "::FD_coeffs_table_file")
+    try:
+        if os.path.dirname(filename) != "":
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # Write to a temporary file, then rename: parallel codegen processes may share the table.
+        tmpfilename = filename + ".tmp" + str(os.getpid())
+        with open(tmpfilename, "w") as file:
+            json.dump(_FD_coeffs_table, file, sort_keys=True)
+        os.replace(tmpfilename, filename)
+    except (IOError, OSError) as err:
+        print("Warning: finite_difference could not write to " + filename + ": " + str(err))
+
+# fdcoeffs_1D(): Return the tuple of finite difference weights (as
+#  SymPy Rationals) for the deriv_order'th derivative, at the
+#  STENCILWIDTH points j - (STENCILWIDTH-1)/2 + UPDOWNWIND_stencil_shift,
+#  j = 0, ..., STENCILWIDTH-1. Weights are memoised in-process and,
+#  if enable_FD_coeffs_table is True, in the on-disk table
+#  FD_coeffs_table_file, keyed by "STENCILWIDTH,shift,deriv_order".
+def fdcoeffs_1D(STENCILWIDTH, UPDOWNWIND_stencil_shift, deriv_order):
+    key = (STENCILWIDTH, UPDOWNWIND_stencil_shift, deriv_order)
+    if key in _fdcoeffs_1D_dict:
+        return _fdcoeffs_1D_dict[key]
+    if not 0 <= deriv_order < STENCILWIDTH:
+        print("Error: A stencil of width "+str(STENCILWIDTH)+" cannot represent a derivative of order "+str(deriv_order)+".")
+        sys.exit(1)
+
+    enable_table = par.parval_from_str(modulename + "::enable_FD_coeffs_table")
+    if enable_table:
+        if par.parval_from_str(modulename + "::FD_coeffs_table_file") == "":
+            print("Error: enable_FD_coeffs_table is True, but FD_coeffs_table_file is not set.")
+            print("       Set finite_difference::FD_coeffs_table_file to the path of the on-disk table.")
+            sys.exit(1)
+        keystr = ",".join(str(k) for k in key)
+        table = _load_FD_coeffs_table()
+        if keystr in table:
+            _fdcoeffs_1D_dict[key] = tuple(sp.Rational(weight) for weight in table[keystr])
+            return _fdcoeffs_1D_dict[key]
+
+    # Compute the weights for all derivative orders up to deriv_order at once.
+    center = Fraction(STENCILWIDTH - 1, 2) - UPDOWNWIND_stencil_shift
+    weights = Fornberg_weights([j - center for j in range(STENCILWIDTH)], deriv_order)
+    for m in range(deriv_order+1):
+        _fdcoeffs_1D_dict.setdefault((STENCILWIDTH, UPDOWNWIND_stencil_shift, m),
+                                     tuple(sp.Rational(w.numerator, w.denominator) for w in weights[m]))
+    if enable_table:
+        _FD_coeffs_table[keystr] = [str(weight) for weight in _fdcoeffs_1D_dict[key]]
+        _store_FD_coeffs_table()
+    return _fdcoeffs_1D_dict[key]
+
+
+def compute_fdcoeffs_fdstencl(derivstring, FDORDER=-1, NGHOSTS=None):
     # Step 0: Set finite differencing order, stencil size, and up/downwinding
     if FDORDER == -1:
         FDORDER = par.parval_from_str("FD_CENTDERIVS_ORDER")
@@ -323,20 +474,31 @@ def compute_fdcoeffs_fdstencl(derivstring, FDORDER=-1):
     elif "dfulldnD" in derivstring:
         UPDOWNWIND_stencil_shift = -int(FDORDER/2)
 
-    # Step 1: Set up FD matrix and return the inverse, as documented above.
-    Minv = setup_FD_matrix__return_inverse(STENCILWIDTH, UPDOWNWIND_stencil_shift)
-
-    # Step 2:
+    # Step 1:
     #     Based on the input derivative string,
-    #     pick out the relevant row of the matrix
-    #     inverse, as outlined in the detailed code
-    #     comments prior to this function definition.
+    #     determine the derivative type and order.
     derivtype = "FirstDeriv"
     matrixrow = 1
-    if "DDD" in derivstring:
-        print("Error: Only derivatives up to second order currently supported.")
+    num_dirns = derivstring.count("D")
+    if num_dirns > 3:
+        print("Error: Only derivatives up to third order currently supported.")
         print("       Feel free to contribute to NRPy+ to extend its functionality!")
         sys.exit(1)
+    elif "DDD" in derivstring:
+        if derivstring[len(derivstring)-1] == derivstring[len(derivstring)-2] == derivstring[len(derivstring)-3]:
+            # Unmixed third derivative. A centered stencil of width FDORDER+1 would
+            #     only be (FDORDER-2)'th-order accurate, so widen it by 2 points.
+            #     Note that this requires NGHOSTS >= FDORDER/2 + 1, which is checked if NGHOSTS is given.
+            derivtype = "ThirdDeriv"
+            matrixrow = 3
+            STENCILWIDTH = FDORDER+3
+            stencil_radius = int((STENCILWIDTH-1)/2) + abs(UPDOWNWIND_stencil_shift)
+            if NGHOSTS is not None and NGHOSTS < stencil_radius:
+                raise ValueError("The "+derivstring+" stencil extends "+str(stencil_radius)+" points from the center, but "
+                                 "NGHOSTS = "+str(NGHOSTS)+". Call register_C_functions_and_NRPy_basic_defines("
+                                 "NGHOSTS_account_for_onezone_upwind=True), so that NGHOSTS = FD_CENTDERIVS_ORDER/2 + 1.")
+        else:
+            derivtype = "MixedDeriv"
     elif "DD" in derivstring:
 
         if derivstring[len(derivstring)-1] == derivstring[len(derivstring)-2]:
@@ -347,7 +509,7 @@ def compute_fdcoeffs_fdstencl(derivstring, FDORDER=-1):
         else:
             # Assuming i!=j, we call \partial_i \partial_j gf a MIXED second derivative,
             #     which is computed using a composite of first derivative operations.
-            derivtype = "MixedSecondDeriv"
+            derivtype = "MixedDeriv"
     elif "dKOD" in derivstring:
         derivtype = "KreissOligerDeriv"
         matrixrow = STENCILWIDTH - 1
@@ -355,23 +517,26 @@ def compute_fdcoeffs_fdstencl(derivstring, FDORDER=-1):
         # Up/downwinded and first derivs are all of "FirstDeriv" type
         pass
 
-    # Step 3:
+    # Step 2:
     #     Set finite difference coefficients
     #     and stencil points corresponding to
     #     each finite difference coefficient.
+    #     The 1D coefficients are computed by
+    #     Fornberg's algorithm, and memoised.
     fdcoeffs = []
     fdstencl = []
-    if derivtype != "MixedSecondDeriv":
+    if derivtype != "MixedDeriv":
+        weights = fdcoeffs_1D(STENCILWIDTH, UPDOWNWIND_stencil_shift, matrixrow)
         for i in range(STENCILWIDTH):
             idx4 = [0, 0, 0, 0]
             # First compute finite difference coefficient.
-            fdcoeff = sp.factorial(matrixrow)*Minv[(i, matrixrow)]
+            fdcoeff = weights[i]
             # Do not store fdcoeff or fdstencil if
             # finite difference coefficient is zero.
             if fdcoeff != 0:
-                fdcoeffs.append(fdcoeff)
                 if derivtype == "KreissOligerDeriv":
-                    fdcoeffs[i] *= (-1)**(sp.Rational((STENCILWIDTH+1), 2))/2**matrixrow
+                    fdcoeff *= (-1)**(sp.Rational((STENCILWIDTH+1), 2))/2**matrixrow
+                fdcoeffs.append(fdcoeff)
 
                 # Next store finite difference stencil point
                 # corresponding to coefficient.
@@ -381,29 +546,35 @@ def compute_fdcoeffs_fdstencl(derivstring, FDORDER=-1):
                     idx4[dirn] = gridpt_posn
                 fdstencl.append(idx4)
     else:
-        # Mixed second derivative finite difference coeffs
-        #     consist of products of first deriv coeffs,
-        #     defined in first Minv matrix row.
-        for i in range(STENCILWIDTH):
-            for j in range(STENCILWIDTH):
-                idx4 = [0, 0, 0, 0]
-
-                # First compute finite difference coefficient.
-                fdcoeff = (sp.factorial(matrixrow)*Minv[(i, matrixrow)]) * \
-                          (sp.factorial(matrixrow)*Minv[(j, matrixrow)])
-
-                # Do not store fdcoeff or fdstencil if
-                # finite difference coefficient is zero.
-                if fdcoeff != 0:
-                    fdcoeffs.append(fdcoeff)
-
-                    # Next store finite difference stencil point
-                    # corresponding to coefficient.
-                    gridpt_posn1 = i - int((STENCILWIDTH - 1) / 2)
-                    gridpt_posn2 = j - int((STENCILWIDTH - 1) / 2)
-                    dirn1 = int(derivstring[len(derivstring) - 1])
-                    dirn2 = int(derivstring[len(derivstring) - 2])
-                    idx4[dirn1] = gridpt_posn1
-                    idx4[dirn2] = gridpt_posn2
-                    fdstencl.append(idx4)
+        # Mixed derivative finite difference coeffs
+        #     consist of products of 1D centered finite
+        #     difference coeffs in each direction, looping
+        #     over directions from the last one in derivstring.
+        dirns = []
+        for dirn in reversed(derivstring[len(derivstring)-num_dirns:]):
+            if int(dirn) not in dirns:
+                dirns.append(int(dirn))
+        stencils_1D = []
+        for dirn in dirns:
+            deriv_order = derivstring[len(derivstring)-num_dirns:].count(str(dirn))
+            weights = fdcoeffs_1D(STENCILWIDTH, 0, deriv_order)
+            stencils_1D.append([(weights[i], i - int((STENCILWIDTH - 1) / 2)) for i in range(STENCILWIDTH)])
+        for points in itertools.product(*stencils_1D):
+            idx4 = [0, 0, 0, 0]
+
+            # First compute finite difference coefficient.
+            fdcoeff = points[0][0]
+            for weight, _gridpt_posn in points[1:]:
+                fdcoeff *= weight
+
+            # Do not store fdcoeff or fdstencil if
+            # finite difference coefficient is zero.
+            if fdcoeff != 0:
+                fdcoeffs.append(fdcoeff)
+
+                # Next store finite difference stencil point
+                # corresponding to coefficient.
+                for dirn, (_weight, gridpt_posn) in zip(dirns, points):
+                    idx4[dirn] = gridpt_posn
+                fdstencl.append(idx4)
     return fdcoeffs, fdstencl
@@ -9,26 +9,65 @@
 # Author: Zachariah B. Etienne
 #         zachetie **at** gmail **dot* com
 from outputC import superfast_uniq, outputC, outC_function_dict, add_to_Cfunction_dict  # NRPy+: Core C code output module
+from outputC import parse_outCparams_string  # NRPy+: Core C code output module
+import outputC_opcount as outCopc   # NRPy+: Static operation counts of generated C code
+import outputC_profiler as outCprof # NRPy+: Opt-in per-phase profiling of outputC() and FD_outputC()
 from suffixes import getsuffix
 import NRPy_param_funcs as par      # NRPy+: parameter interface
 import sympy as sp                  # SymPy: The Python computer algebra package upon which NRPy+ depends
 import grid as gri                  # NRPy+: Functions having to do with numerical grids
 import sys                          # Standard Python module for multiplatform OS-level functions
-from collections import namedtuple  # Standard Python: Enable namedtuple data type
+from collections import namedtuple, OrderedDict  # Standard Python: Enable namedtuple and ordered dictionary data types
+import loop as lp                   # NRPy+: Generate C code loops
 from fstr import f
 
-FDparams = namedtuple('FDparams', 'PRECISION FD_CD_order enable_FD_functions enable_SIMD DIM MemAllocStyle upwindcontrolvec fullindent outCparams')
+FDparams = namedtuple('FDparams', 'PRECISION FD_CD_order enable_FD_functions enable_SIMD DIM MemAllocStyle GridFuncMemLayout upwindcontrolvec fullindent outCparams')
 
 #########################################
 # STEP 1: EXTRACT DERIVATIVES TO COMPUTE
 #         FROM LIST OF SYMPY EXPRESSIONS
 
-def generate_list_of_deriv_vars_from_lhrh_sympyexpr_list(sympyexpr_list,FDparams):
+def free_symbols_of_lhrh_sympyexpr_list(sympyexpr_list):
+    """
+    Return the free symbols appearing in all RHSs, and those appearing
+    in all LHSs (string LHSs are returned as is), each as a list
+    without duplicates. Unlike calling .free_symbols on each expression,
+    each distinct subexpression is visited only once across the list.
+    :param sympyexpr_list <- list of SymPy expressions in the form [lhrh(lhs=var, rhs=expr),lhrh(...),...]:
+    :return rhs_symbols, lhs_symbols:
+    >>> from outputC import lhrh
+    >>> from sympy.abc import a, b, c, x, y
+    >>> rhs_symbols, lhs_symbols = free_symbols_of_lhrh_sympyexpr_list([lhrh(lhs=a, rhs=sp.sin(x*y) + x*y), \
+                                                                       lhrh(lhs="out[i]", rhs=b*x*y + c)])
+    >>> sorted(rhs_symbols, key=str), lhs_symbols
+    ([b, c, x, y], [a, 'out[i]'])
+    """
+    def free_symbols(expr_list):
+        symbols = []
+        visited = set()
+        stack = list(reversed(expr_list))
+        while stack:
+            expr = stack.pop()
+            if expr in visited:
+                continue
+            visited.add(expr)
+            if isinstance(expr, str) or expr.is_Symbol:
+                symbols.append(expr)
+            elif getattr(expr, "bound_symbols", None):
+                # e.g., integration variables are not free symbols
+                stack.extend(expr.free_symbols)
+            else:
+                stack.extend(expr.args)
+        return symbols
+    return free_symbols([lhrh.rhs for lhrh in sympyexpr_list]), free_symbols([lhrh.lhs for lhrh in sympyexpr_list])
+
+def generate_list_of_deriv_vars_from_lhrh_sympyexpr_list(sympyexpr_list,FDparams,free_symbols=None):
     """
     Generate from list of SymPy expressions in the form
     [lhrh(lhs=var, rhs=expr),lhrh(...),...]
     all derivative expressions.
     :param sympyexpr_list <- list of SymPy expressions in the form [lhrh(lhs=var, rhs=expr),lhrh(...),...]:
+    :param free_symbols <- (optional) output of free_symbols_of_lhrh_sympyexpr_list(sympyexpr_list):
     :return list of derivative variables; creating _ddnD in case upwinding is enabled with control vector:
     >>> from outputC import lhrh
     >>> import indexedexp as ixp
@@ -51,26 +90,28 @@ def generate_list_of_deriv_vars_from_lhrh_sympyexpr_list(sympyexpr_list,FDparams
     #     that are registered neither as gridfunctions nor
     #     as C parameters. These *must* be derivatives,
     #     so we call the list "list_of_deriv_vars"
+    if free_symbols is None:
+        free_symbols = free_symbols_of_lhrh_sympyexpr_list(sympyexpr_list)
+    rhs_symbols = free_symbols[0]
     list_of_deriv_vars_with_duplicates = []
-    for expr in sympyexpr_list:
-        for var in expr.rhs.free_symbols:
-            vartype = gri.variable_type(var)
-            if vartype == "other":
-                # vartype=="other" should ONLY refer to derivatives, so
-                #    if "_dD" or variants do not appear in a variable classified
-                #    neither as a gridfunction nor a Cparameter, then error out.
-                if ("_dD"   in str(var)) or \
-                   ("_dKOD" in str(var)) or \
-                   ("_dupD" in str(var)) or \
-                   ("_ddnD" in str(var)):
-                    list_of_deriv_vars_with_duplicates.append(var)
-                else:
-                    print("Error: Unregistered variable \""+str(var)+"\" in SymPy expression for "+expr.lhs)
-                    print("All variables in SymPy expressions passed to FD_outputC() must be registered")
-                    print("in NRPy+ as either a gridfunction or Cparameter, by calling")
-                    print(str(var)+" = register_gridfunctions...() (in ixp/grid) if \""+str(var)+"\" is a gridfunction, or")
-                    print(str(var)+" = Cparameters() (in par) otherwise (e.g., if it is a free parameter set at C runtime).")
-                    raise Exception()
+    for var, vartype in zip(rhs_symbols, gri.variable_types(rhs_symbols)):
+        if vartype == "other":
+            # vartype=="other" should ONLY refer to derivatives, so
+            #    if "_dD" or variants do not appear in a variable classified
+            #    neither as a gridfunction nor a Cparameter, then error out.
+            if ("_dD"   in str(var)) or \
+               ("_dKOD" in str(var)) or \
+               ("_dupD" in str(var)) or \
+               ("_ddnD" in str(var)):
+                list_of_deriv_vars_with_duplicates.append(var)
+            else:
+                expr = next(expr for expr in sympyexpr_list if var in expr.rhs.free_symbols)
+                print("Error: Unregistered variable \""+str(var)+"\" in SymPy expression for "+expr.lhs)
+                print("All variables in SymPy expressions passed to FD_outputC() must be registered")
+                print("in NRPy+ as either a gridfunction or Cparameter, by calling")
+                print(str(var)+" = register_gridfunctions...() (in ixp/grid) if \""+str(var)+"\" is a gridfunction, or")
+                print(str(var)+" = Cparameters() (in par) otherwise (e.g., if it is a free parameter set at C runtime).")
+                raise Exception()
     list_of_deriv_vars = superfast_uniq(list_of_deriv_vars_with_duplicates)
 
     # Upwinding with respect to a control vector: algorithm description.
@@ -325,7 +366,35 @@ def varsuffix(name, idx4, FDparams):
         return base_suffix 
     return base_suffix + "_" + ijkl_string(idx4, FDparams).replace(",", "_").replace("+", "p").replace("-", "m")
 
-def read_gfs_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sympyexpr_list, FDparams, idxs=None):
+# unique_idx(): A function that maps a gridpoint
+#     index (i,j,k,l) to a unique memory "address",
+#     which will correspond to the correct ordering
+#     of actual memory addresses.
+#
+#     Input: a list of 4 indices, e.g., (i,j,k,l)
+#            corresponding to a gridpoint's *spatial*
+#            index in memory (thus we support up to
+#            4D in space). If spatial dimension is
+#            less than 4D, then just set latter
+#            index/indices to zero. E.g., for 2D
+#            spatial indexing, set (i,j,0,0).
+#     Output: a single number, which when sorted
+#            will yield a unique "address" in memory
+#            such that consecutive addresses are
+#            consecutive in memory.
+def unique_idx(idx4,FDparams):
+    # os and sz are set *just for the purposes of ensuring indices are ordered in memory*
+    #    Do not modify the values of os and sz.
+    os = 50  # offset
+    sz = 100 # assumed size in each direction
+    if FDparams.MemAllocStyle == "210":
+        return str(int(idx4[0])+os + sz*( (int(idx4[1])+os) + sz*( (int(idx4[2])+os) + sz*( int(idx4[3])+os ) ) ))
+    if FDparams.MemAllocStyle == "012":
+        return str(int(idx4[3])+os + sz*( (int(idx4[2])+os) + sz*( (int(idx4[1])+os) + sz*( int(idx4[0])+os ) ) ))
+    print("Error: MemAllocStyle = "+FDparams.MemAllocStyle+" unsupported.")
+    sys.exit(1)
+
+def read_gfs_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sympyexpr_list, FDparams, idxs=None, free_symbols=None):
     # with open(list_of_base_gridfunction_names_in_derivs[0]+".txt","w") as file:
     #     file.write(str(list_of_base_gridfunction_names_in_derivs))
     #     file.write(str(fdstencl))
@@ -337,6 +406,8 @@ def read_gfs_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sy
     :param fdstencl:
     :param sympyexpr_list:
     :param FDparams:
+    :param idxs:
+    :param free_symbols: (optional) output of free_symbols_of_lhrh_sympyexpr_list(sympyexpr_list)
     :return:
     >>> from outputC import lhrh
     >>> import indexedexp as ixp
@@ -378,45 +449,70 @@ def read_gfs_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sy
     <BLANKLINE>
     """
 
+    # Steps 4a-4d: Plan the points to read from memory
+    planned_reads = plan_gfs_reads_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sympyexpr_list,
+                                               FDparams, free_symbols)
+
+    # Step 4e: Create the full C code string
+    #      for reading from memory:
+    read_from_memory_Ccode = ""
+    if idxs is None:
+        idxs = set()
+    for gfname, point in planned_reads:
+        read_from_memory_Ccode += read_from_memory_Ccode_onept(gfname, point, FDparams, idxs)
+    return read_from_memory_Ccode
+
+def plan_gfs_reads_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sympyexpr_list, FDparams,
+                               free_symbols=None):
+    """ Return the (gridfunction name, point) pairs read_gfs_from_memory() reads from memory, in order;
+        each point is a string of 4 comma-separated integers (see read_from_memory_Ccode_onept()).
+        Reads are sorted by memory address: gridfunction by gridfunction, or, if
+        FDparams.GridFuncMemLayout == "interleaved", point by point.
+
+    >>> from outputC import lhrh
+    >>> import NRPy_param_funcs as par
+    >>> import grid as gri
+    >>> gri.glb_gridfcs_list = []
+    >>> uu, vv = gri.register_gridfunctions("EVOL",["uu","vv"])
+    >>> a0 = par.Cparameters("REAL",__name__,["a0"],1)
+    >>> FDparams.MemAllocStyle="210"
+    >>> FDparams.GridFuncMemLayout="interleaved"
+    >>> plan_gfs_reads_from_memory(["uu","vv"], [[[0,0,0,0], [1,0,0,0]], [[0,0,0,0], [1,0,0,0]]], [lhrh(lhs=a0,rhs=uu)], FDparams)
+    [('uu', '0,0,0,0'), ('vv', '0,0,0,0'), ('uu', '1,0,0,0'), ('vv', '1,0,0,0')]
+    >>> FDparams.GridFuncMemLayout="contiguous"
+    >>> plan_gfs_reads_from_memory(["uu","vv"], [[[0,0,0,0], [1,0,0,0]], [[0,0,0,0], [1,0,0,0]]], [lhrh(lhs=a0,rhs=uu)], FDparams)
+    [('uu', '0,0,0,0'), ('uu', '1,0,0,0'), ('vv', '0,0,0,0'), ('vv', '1,0,0,0')]
+    """
     # Step 4a: Compile list of points to read from memory
     #          for each gridfunction i, based on list
-    #          provided in fdstencil[i][].
+    #          provided in fdstencil[i][]. Derivatives of the
+    #          same gridfunction with the same operator share
+    #          a stencil, so each such pair is planned once.
+    gfidx_of_name = {}
+    for i in range(len(gri.glb_gridfcs_list)):
+        gfidx_of_name.setdefault(gri.glb_gridfcs_list[i].name, i)
     list_of_points_read_from_memory_with_duplicates = [[] for i in range(len(gri.glb_gridfcs_list))]
+    planned_gf_stencils = set()
     for j in range(len(list_of_base_gridfunction_names_in_derivs)):
         derivgfname = list_of_base_gridfunction_names_in_derivs[j]
-        # Next find the corresponding gridfunction index:
-        for i in range(len(gri.glb_gridfcs_list)):
-            gfname = gri.glb_gridfcs_list[i].name
-            # If the gridfunction for the derivative matches, then
-            #    add to the list of points read from memory:
-            if derivgfname == gfname:
-                for k in range(len(fdstencl[j])):
-                    list_of_points_read_from_memory_with_duplicates[i].append(str(fdstencl[j][k][0]) + "," +
-                                                                              str(fdstencl[j][k][1]) + "," +
-                                                                              str(fdstencl[j][k][2]) + "," +
-                                                                              str(fdstencl[j][k][3]))
-
-    def get_symbols(arg):
-        if hasattr(arg, "free_symbols"):
-            return list(arg.free_symbols)
-        elif type(arg) == str:
-            return [arg]
-        else:
-            assert False
+        stencil = tuple(tuple(idx4) for idx4 in fdstencl[j])
+        # If the gridfunction for the derivative is registered, then
+        #    add to the list of points read from memory:
+        if derivgfname in gfidx_of_name and (derivgfname, stencil) not in planned_gf_stencils:
+            planned_gf_stencils.add((derivgfname, stencil))
+            for idx4 in stencil:
+                list_of_points_read_from_memory_with_duplicates[gfidx_of_name[derivgfname]].append(
+                    str(idx4[0]) + "," + str(idx4[1]) + "," + str(idx4[2]) + "," + str(idx4[3]))
 
     # Step 4b: "Zeroth derivative" case:
     #     If gridfunction appears in expression not
     #     as derivative (i.e., by itself), it must
     #     be read from memory as well.
-    for expr in range(len(sympyexpr_list)):
-        for var in get_symbols(sympyexpr_list[expr].rhs) + get_symbols(sympyexpr_list[expr].lhs):
-            vartype = gri.variable_type(var)
-            if vartype == "gridfunction":
-                for i in range(len(gri.glb_gridfcs_list)):
-                    gfname = gri.glb_gridfcs_list[i].name
-                    if gfname == str(var):
-                        list_of_points_read_from_memory_with_duplicates[i].append("0,0,0,0")
-
+    if free_symbols is None:
+        free_symbols = free_symbols_of_lhrh_sympyexpr_list(sympyexpr_list)
+    for var in free_symbols[0] + free_symbols[1]:
+        if str(var) in gfidx_of_name:
+            list_of_points_read_from_memory_with_duplicates[gfidx_of_name[str(var)]].append("0,0,0,0")
 
     # Step 4c: Remove duplicates when reading from memory;
     #     do not needlessly read the same variable
@@ -430,50 +526,18 @@ def read_gfs_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sy
     #      main memory by how they are stored
     #      in memory.
 
-    # Step 4d.i: Define a function that maps a gridpoint
-    #     index (i,j,k,l) to a unique memory "address",
-    #     which will correspond to the correct ordering
-    #     of actual memory addresses.
-    #
-    #     Input: a list of 4 indices, e.g., (i,j,k,l)
-    #            corresponding to a gridpoint's *spatial*
-    #            index in memory (thus we support up to
-    #            4D in space). If spatial dimension is
-    #            less than 4D, then just set latter
-    #            index/indices to zero. E.g., for 2D
-    #            spatial indexing, set (i,j,0,0).
-    #     Output: a single number, which when sorted
-    #            will yield a unique "address" in memory
-    #            such that consecutive addresses are
-    #            consecutive in memory.
-    def unique_idx(idx4,FDparams):
-        # os and sz are set *just for the purposes of ensuring indices are ordered in memory*
-        #    Do not modify the values of os and sz.
-        os = 50  # offset
-        sz = 100 # assumed size in each direction
-        if FDparams.MemAllocStyle == "210":
-            return str(int(idx4[0])+os + sz*( (int(idx4[1])+os) + sz*( (int(idx4[2])+os) + sz*( int(idx4[3])+os ) ) ))
-        if FDparams.MemAllocStyle == "012":
-            return str(int(idx4[3])+os + sz*( (int(idx4[2])+os) + sz*( (int(idx4[1])+os) + sz*( int(idx4[0])+os ) ) ))
-        print("Error: MemAllocStyle = "+FDparams.MemAllocStyle+" unsupported.")
-        sys.exit(1)
+    # Step 4d.i: unique_idx() maps a gridpoint
+    #     index (i,j,k,l) to a unique memory "address".
 
     # Step 4d.ii: For each gridfunction and
     #      point read from memory, call unique_idx,
     #      then sort according to memory "address"
     # Input: list_of_points_read_from_memory[gridfunction][point],
     #        gri.glb_gridfcs_list[gridfunction]
-    # Output: 1) A list of points to be read from
-    #            memory, sorted according to memory
-    #            "address":
-    #            sorted_list_of_points_read_from_memory[gridfunction][point]
-    #        2) A list containing the gridfunction
-    #           read at each point, with the number
-    #           of elements corresponding exactly
-    #           to the total number of points read
-    #           from memory for all gridfunctions:
-    #           read_from_memory_gf[]
-    read_from_memory_gf    = []
+    # Output: A list of points to be read from
+    #         memory, sorted according to memory
+    #         "address":
+    #         sorted_list_of_points_read_from_memory[gridfunction][point]
     sorted_list_of_points_read_from_memory = [[] for i in range(len(gri.glb_gridfcs_list))]
     for gfidx in range(len(gri.glb_gridfcs_list)):
         # Continue only if reading at least one point of gfidx from memory.
@@ -483,28 +547,129 @@ def read_gfs_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sy
         if len(list_of_points_read_from_memory[gfidx]) > 0:
             read_from_memory_index = []
             for idx in list_of_points_read_from_memory[gfidx]:
-                read_from_memory_gf.append(gri.glb_gridfcs_list[gfidx])
                 idxsplit = idx.split(',')
                 idx4 = [int(idxsplit[0]),int(idxsplit[1]),int(idxsplit[2]),int(idxsplit[3])]
                 read_from_memory_index.append(unique_idx(idx4, FDparams))
-                # https://stackoverflow.com/questions/13668393/python-sorting-two-lists
-                _unused_list, sorted_list_of_points_read_from_memory[gfidx] = \
-                    [list(x) for x in zip(*sorted(zip(read_from_memory_index, list_of_points_read_from_memory[gfidx]),
-                                                  key=itemgetter(0)))]
-    # Step 4e: Create the full C code string
-    #      for reading from memory:
+            # https://stackoverflow.com/questions/13668393/python-sorting-two-lists
+            _unused_list, sorted_list_of_points_read_from_memory[gfidx] = \
+                [list(x) for x in zip(*sorted(zip(read_from_memory_index, list_of_points_read_from_memory[gfidx]),
+                                              key=itemgetter(0)))]
 
-    read_from_memory_Ccode = ""
-    count = 0
+    # Step 4d.iii: Flatten into a list of (gridfunction name, point) pairs
+    planned_reads = []
+    for gfidx in range(len(sorted_list_of_points_read_from_memory)):
+        for point in sorted_list_of_points_read_from_memory[gfidx]:
+            planned_reads.append((gri.glb_gridfcs_list[gfidx].name, point))
+
+    # Step 4d.iv: In the interleaved layout, all gridfunctions at a point are
+    #      adjacent in memory, so sort by point (the sort is stable,
+    #      keeping gridfunctions at each point in registration order).
+    if FDparams.GridFuncMemLayout == "interleaved":
+        planned_reads.sort(key=lambda read: int(unique_idx([int(idx) for idx in read[1].split(',')], FDparams)))
+    return planned_reads
+
+def read_gfs_from_memory_unrolled_i0(list_of_base_gridfunction_names_in_derivs, fdstencl, sympyexpr_list, FDparams,
+                                     unroll_factor, idxs=None, free_symbols=None):
+    """
+    Same as read_gfs_from_memory(), but for unroll_factor consecutive points
+    along i0: (i0,i1,i2), (i0+1,i1,i2), ... Each gridfunction value needed at any
+    of these points is read from memory only once, into a variable prefixed with
+    "UnrolledBlock". For each point, the variables read_gfs_from_memory() would
+    declare are then set from these, e.g., at the second point hDD01_i0m1_i1_i2
+    is set to UnrolledBlockhDD01 (read at i0,i1,i2).
+
+    :param unroll_factor: number of consecutive points along i0
+    :return: C code reading the gridfunctions from memory, list of C code setting the variables at each point
+    >>> from outputC import lhrh
+    >>> import indexedexp as ixp
+    >>> import NRPy_param_funcs as par
+    >>> import grid as gri
+    >>> gri.glb_gridfcs_list = []
+    >>> uu    = gri.register_gridfunctions("EVOL","uu")
+    >>> uu_dD = ixp.declarerank1("uu_dD")
+    >>> a0    = par.Cparameters("REAL",__name__,["a0"],1)
+    >>> FDparams.DIM=3
+    >>> FDparams.enable_SIMD="False"
+    >>> FDparams.PRECISION="double"
+    >>> FDparams.MemAllocStyle="210"
+    >>> block_Ccode, point_Ccode = read_gfs_from_memory_unrolled_i0(["uu"], [[[-1,0,0,0], [1,0,0,0]]], \
+                                                                     [lhrh(lhs=a0,rhs=uu + uu_dD[0])], FDparams, 2)
+    >>> print(block_Ccode)
+    const double UnrolledBlockuu_i0m1_i1_i2 = in_gfs[IDX4S(UUGF, i0-1,i1,i2)];
+    const double UnrolledBlockuu = in_gfs[IDX4S(UUGF, i0,i1,i2)];
+    const double UnrolledBlockuu_i0p1_i1_i2 = in_gfs[IDX4S(UUGF, i0+1,i1,i2)];
+    const double UnrolledBlockuu_i0p2_i1_i2 = in_gfs[IDX4S(UUGF, i0+2,i1,i2)];
+    <BLANKLINE>
+    >>> print(point_Ccode[1])
+    const double uu_i0m1_i1_i2 = UnrolledBlockuu;
+    const double uu = UnrolledBlockuu_i0p1_i1_i2;
+    const double uu_i0p1_i1_i2 = UnrolledBlockuu_i0p2_i1_i2;
+    <BLANKLINE>
+    """
+    planned_reads = plan_gfs_reads_from_memory(list_of_base_gridfunction_names_in_derivs, fdstencl, sympyexpr_list,
+                                               FDparams, free_symbols)
     if idxs is None:
         idxs = set()
-    for gfidx in range(len(sorted_list_of_points_read_from_memory)):
-        for pt in range(len(sorted_list_of_points_read_from_memory[gfidx])):
-            read_from_memory_Ccode += read_from_memory_Ccode_onept(read_from_memory_gf[count].name,
-                                                                   sorted_list_of_points_read_from_memory[gfidx][pt],
-                                                                   FDparams,idxs)
-            count += 1
-    return read_from_memory_Ccode
+    block_points = OrderedDict()
+    point_Ccode = ["" for _u in range(unroll_factor)]
+    for gfname, point in planned_reads:
+        if gri.find_gftype(gfname) == "SCALAR_TMP":
+            print("Error: Cannot unroll the i0 loop over the SCALAR_TMP gridfunction "+gfname+".")
+            sys.exit(1)
+        idx4 = [int(idx) for idx in point.split(',')]
+        for u in range(unroll_factor):
+            block_idx4 = [idx4[0] + u] + idx4[1:]
+            block_points.setdefault(gfname, OrderedDict())[tuple(block_idx4)] = None
+            point_Ccode[u] += type__var(gfname, FDparams) + varsuffix(gfname, idx4, FDparams) + \
+                " = UnrolledBlock" + gfname + varsuffix(gfname, block_idx4, FDparams) + ";\n"
+    block_reads = []
+    for gfname, points in block_points.items():
+        for block_idx4 in sorted(points, key=lambda idx4: int(unique_idx(idx4, FDparams))):
+            block_reads.append((gfname, block_idx4))
+    if FDparams.GridFuncMemLayout == "interleaved":
+        block_reads.sort(key=lambda read: int(unique_idx(read[1], FDparams)))
+    block_Ccode = ""
+    for gfname, block_idx4 in block_reads:
+        idxs.add(",".join([str(ii) for ii in block_idx4]))
+        block_Ccode += type__var("UnrolledBlock" + gfname, FDparams) + varsuffix(gfname, list(block_idx4), FDparams) + \
+            " = " + gri.gfaccess("in_gfs", gfname, ijkl_string(list(block_idx4), FDparams)) + ";\n"
+    return block_Ccode, point_Ccode
+
+def construct_unrolled_i0_Ccode(Ccode, placeholder, read_from_memory_Ccode, block_read_Ccode, point_read_Ccode, FDparams):
+    """
+    Given the C code Ccode for a single point, in which the line placeholder stands
+    for the reads from memory, return C code for loop.simple_loop() to unroll the i0 loop:
+    a block computing len(point_read_Ccode) consecutive points along i0 (each in its own
+    scope, in which i0 is redefined), enclosed by loop.unrolling_markers(), followed by
+    the C code for a single point, for the remaining points.
+    """
+    def replace_placeholder(Ccode, replacement, indent):
+        lines = []
+        for line in Ccode.splitlines():
+            if line.strip() == placeholder:
+                leading_whitespace = line[:len(line) - len(line.lstrip())]
+                lines += [leading_whitespace + Cline for Cline in replacement.splitlines() if Cline != ""]
+            else:
+                lines.append(line)
+        return "".join((line if line.lstrip().startswith("#") else indent + line) + "\n" for line in lines)
+
+    unroll_factor = len(point_read_Ccode)
+    fullindent = FDparams.fullindent
+    begin_marker, end_marker = lp.unrolling_markers(unroll_factor)
+    Coutput_chunks = [fullindent + begin_marker + "\n", fullindent + "{\n"]
+    Coutput_chunks += [fullindent + "  " + line + "\n" for line in block_read_Ccode.splitlines()]
+    for u in range(1, unroll_factor):
+        Coutput_chunks.append(fullindent + "  const int i0_point" + str(u) + " = i0 + " + str(u) + ";\n")
+    for u in range(unroll_factor):
+        Coutput_chunks.append(fullindent + "  {\n")
+        if u > 0:
+            Coutput_chunks.append(fullindent + "    const int i0 = i0_point" + str(u) + ";\n")
+        Coutput_chunks.append(fullindent + "    " + lp.unrolled_point_marker + "\n")
+        Coutput_chunks.append(replace_placeholder(Ccode, point_read_Ccode[u], "    "))
+        Coutput_chunks.append(fullindent + "  }\n")
+    Coutput_chunks += [fullindent + "}\n", fullindent + end_marker + "\n"]
+    Coutput_chunks.append(replace_placeholder(Ccode, read_from_memory_Ccode, ""))
+    return "".join(Coutput_chunks)
 #################################
 
 #################################
@@ -514,21 +679,20 @@ def construct_FD_exprs_as_SymPy_exprs(list_of_deriv_vars,
                                       fdcoeffs, fdstencl):
     FDexprs = []
     FDlhsvarnames = []
+    invdx = []
+    for d in range(FDparams.DIM):
+        invdx.append(sp.Symbol("invdx" + str(d)))
     # Step 5.a.ii.A: Output finite difference expressions to
     #                Coutput string
     for i in range(len(list_of_deriv_vars)):
-        FDexprs.append(sp.sympify(0))  # Append a new element to the list of derivative expressions.
         FDlhsvarnames.append(type__var(list_of_deriv_vars[i], FDparams))
         var = list_of_base_gridfunction_names_in_derivs[i]
-        for j in range(len(fdcoeffs[i])):
-            varname = str(var) + varsuffix(str(var),fdstencl[i][j], FDparams)
-            FDexprs[i] += fdcoeffs[i][j] * sp.sympify(varname)
+        # Sum all stencil terms at once, rather than one at a time:
+        FDexprs.append(sp.Add(*[fdcoeffs[i][j] * sp.Symbol(str(var) + varsuffix(str(var), fdstencl[i][j], FDparams))
+                                for j in range(len(fdcoeffs[i]))]))
 
         # Multiply each expression by the appropriate power
         #   of 1/dx[i]
-        invdx = []
-        for d in range(FDparams.DIM):
-            invdx.append(sp.sympify("invdx" + str(d)))
         # First-order or Kreiss-Oliger derivatives:
         if (len(list_of_deriv_operators[i]) == 5 and "dKOD" in list_of_deriv_operators[i]) or \
                 (len(list_of_deriv_operators[i]) == 3 and "dD" in list_of_deriv_operators[i]) or \
@@ -541,6 +705,10 @@ def construct_FD_exprs_as_SymPy_exprs(list_of_deriv_vars,
             dirn1 = int(list_of_deriv_operators[i][len(list_of_deriv_operators[i]) - 2])
             dirn2 = int(list_of_deriv_operators[i][len(list_of_deriv_operators[i]) - 1])
             FDexprs[i] *= invdx[dirn1] * invdx[dirn2]
+        # Third-order derivs:
+        elif len(list_of_deriv_operators[i]) == 7 and "dDDD" in list_of_deriv_operators[i]:
+            for dirn in list_of_deriv_operators[i][len(list_of_deriv_operators[i]) - 3:]:
+                FDexprs[i] *= invdx[int(dirn)]
         else:
             print("Error: was unable to parse derivative operator: ", list_of_deriv_operators[i])
             sys.exit(1)
@@ -596,6 +764,11 @@ def add_FD_func_to_outC_function_dict(list_of_deriv_vars,
             dirn2 = int(op[len(op) - 1])
             used_invdx[dirn1] = used_invdx[dirn2] = True
             rhs_expr *= invdx[dirn1]*invdx[dirn2]
+        # Third-order derivs:
+        elif len(op) == 7 and "dDDD" in op:
+            for dirn in op[len(op) - 3:]:
+                used_invdx[int(dirn)] = True
+                rhs_expr *= invdx[int(dirn)]
         else:
             print("Error: was unable to parse derivative operator: ", op)
             sys.exit(1)
@@ -631,7 +804,7 @@ def add_FD_func_to_outC_function_dict(list_of_deriv_vars,
             p = "preindent=1,enable_SIMD="+FDparams.enable_SIMD+",outCverbose=False,CSE_preprocess=True,includebraces=False"
             outFDstr = outputC(rhs_expr, "retval", "returnstring", params=p)
             outFDstr = outFDstr.replace("retval = ", "return ")
-            add_to_Cfunction_dict(desc=" * (__FD_OPERATOR_FUNC__) Finite difference operator for "+str(op).replace("dDD", "second derivative: ").
+            add_to_Cfunction_dict(desc=" * (__FD_OPERATOR_FUNC__) Finite difference operator for "+str(op).replace("dDDD", "third derivative: ").replace("dDD", "second derivative: ").
                                   replace("dD", "first derivative: ").replace("dKOD", "Kreiss-Oliger derivative: ").
                                   replace("dupD", "upwinded derivative: ").replace("ddnD", "downwinded derivative: ") + " direction. In Cartesian coordinates, directions 0,1,2 correspond to x,y,z directions, respectively.",
                                   c_type="static " + c_type + " _NOINLINE _UNUSED",
@@ -639,6 +812,57 @@ def add_FD_func_to_outC_function_dict(list_of_deriv_vars,
                                   params=outfunc_params, preloop="", body=outFDstr)
     return FDfunccall_list
 
+def construct_upwind_branch_Ccode(upwind_directions, list_of_deriv_vars, list_of_deriv_operators, upwind_stencils):
+    """
+    Control-vector upwinding with FD_upwind_branch=True: In each upwind direction,
+    branch on the sign of the control vector component, evaluating only the needed
+    one-sided stencils: upwinded (_dupD) if UpwindControlVectorU[dirn] > 0 (as in
+    UPWIND_ALG()), and downwinded (_ddnD) otherwise. With SIMD, a branch is taken
+    only if all SIMD lanes agree on the sign; otherwise both stencils are evaluated
+    and blended, as with FD_upwind_branch=False.
+
+    :param upwind_directions: Sorted list of upwind directions
+    :param list_of_deriv_vars: List of derivative variables
+    :param list_of_deriv_operators: List of derivative operators, corresponding to list_of_deriv_vars
+    :param upwind_stencils: Dictionary of upwinded & downwinded stencil expressions, keyed by derivative variable name
+    :return: (C code, flops per point evaluating one-sided stencils, flops per point evaluating & blending both)
+    """
+    enable_SIMD = FDparams.enable_SIMD == "True"
+    params = FDparams.outCparams + ",CSE_varprefix=FDPart2,includebraces=False,CSE_preprocess=True,SIMD_find_more_subs=True"
+    def indent(Ccode):
+        return "".join("  " + line + "\n" for line in Ccode.splitlines() if line != "")
+
+    Ccode = ""
+    flops_branch, flops_blend = 0, 0
+    for dirn in upwind_directions:
+        d = str(dirn)
+        up_vars = [str(list_of_deriv_vars[i]) for i in range(len(list_of_deriv_vars))
+                   if list_of_deriv_operators[i] == "dupD" + d]
+        dn_vars = [var.replace("_dupD", "_ddnD") for var in up_vars]
+        # The upwinded and downwinded stencils are both assigned to the _dupD variables.
+        up_Ccode = outputC([upwind_stencils[var] for var in up_vars], up_vars, "returnstring", params=params)
+        dn_Ccode = outputC([upwind_stencils[var] for var in dn_vars], up_vars, "returnstring", params=params)
+        blend_Ccode  = type__var("UpWind" + d, FDparams) + " = UPWIND_ALG(UpwindControlVectorU" + d + ");\n"
+        blend_Ccode += outputC([upwind_stencils[var] for var in up_vars + dn_vars],
+                               [type__var(var, FDparams) for var in up_vars + dn_vars], "returnstring", params=params)
+        blend_Ccode += outputC([sp.Symbol("UpWind" + d)*(sp.Symbol("UpwindAlgInput" + up) - sp.Symbol("UpwindAlgInput" + dn))
+                                + sp.Symbol("UpwindAlgInput" + dn) for up, dn in zip(up_vars, dn_vars)], up_vars, "returnstring",
+                               params=FDparams.outCparams + ",CSE_varprefix=FDPart2blend,includebraces=False")
+        flops_branch += max(outCopc.count_ops_in_Ccode(up_Ccode, FDparams.PRECISION)["flops"],
+                            outCopc.count_ops_in_Ccode(dn_Ccode, FDparams.PRECISION)["flops"])
+        flops_blend  += outCopc.count_ops_in_Ccode(blend_Ccode, FDparams.PRECISION)["flops"]
+
+        Ccode += ("REAL_SIMD_ARRAY " if enable_SIMD else FDparams.PRECISION + " ") + ", ".join(up_vars) + ";\n"
+        if enable_SIMD:
+            Ccode += "const int UpWindLanes" + d + " = UPWIND_LANES_POSITIVE(UpwindControlVectorU" + d + ");\n"
+            Ccode += "if (UpWindLanes" + d + " == UPWIND_ALL_LANES) {\n" + indent(up_Ccode) + \
+                     "} else if (UpWindLanes" + d + " == 0) {\n" + indent(dn_Ccode) + \
+                     "} else {\n" + indent(blend_Ccode) + "}\n"
+        else:
+            Ccode += "if (UpwindControlVectorU" + d + " > 0.0) {\n" + indent(up_Ccode) + \
+                     "} else {\n" + indent(dn_Ccode) + "}\n"
+    return Ccode, flops_branch, flops_blend
+
 def construct_Ccode(sympyexpr_list, list_of_deriv_vars,
                     list_of_base_gridfunction_names_in_derivs,list_of_deriv_operators,
                     fdcoeffs, fdstencl, read_from_memory_Ccode, FDparams, Coutput):
@@ -727,17 +951,17 @@ def construct_Ccode(sympyexpr_list, list_of_deriv_vars,
     # a1 = c*hDD_dupD021*vU1;
     # <BLANKLINE>
 
-    def indent_Ccode(Ccode):
-        Ccodesplit = Ccode.splitlines()
-        outstring = ""
-        for i in range(len(Ccodesplit)):
-            if Ccodesplit[i] != "":
-                if Ccodesplit[i].lstrip().startswith("#"):
+    # The C code is accumulated as a list of chunks and joined once at the end,
+    #   as repeated string concatenation is quadratic in the output size.
+    Coutput_chunks = [Coutput]
+    def append_indented_Ccode(Ccode):
+        for line in Ccode.splitlines():
+            if line != "":
+                if line.lstrip().startswith("#"):
                     # Remove all indentation from preprocessor statements (lines that start with "#")
-                    outstring += Ccodesplit[i].lstrip() + '\n'
+                    Coutput_chunks.append(line.lstrip() + '\n')
                 else:
-                    outstring += FDparams.fullindent + Ccodesplit[i] + '\n'
-        return outstring.rstrip(" ")  # make sure to remove trailing whitespace!
+                    Coutput_chunks.append(FDparams.fullindent + line + '\n')
 
     # Step 5.a.i: Read gridfunctions from memory at needed pts.
     # *** No need to do anything here; already set in
@@ -800,6 +1024,18 @@ def construct_Ccode(sympyexpr_list, list_of_deriv_vars,
             FDexprs.append(FDparams.upwindcontrolvec[dirn])
             FDlhsvarnames.append(type__var("UpwindControlVectorU" + str(dirn), FDparams))
 
+    # Step 5.b.ii: With FD_upwind_branch=True, the upwinded and downwinded stencils are
+    #    evaluated in Step 5.b.iii instead (see construct_upwind_branch_Ccode()), so
+    #    are removed from the finite difference expressions evaluated in Step 5.a.ii.
+    upwind_branch = len(upwind_directions) > 0 and parse_outCparams_string(FDparams.outCparams).FD_upwind_branch == "True"
+    if upwind_branch:
+        is_upwind_stencil = [i < len(list_of_deriv_vars) and len(list_of_deriv_operators[i]) == 5 and
+                             ("dupD" in list_of_deriv_operators[i] or "ddnD" in list_of_deriv_operators[i])
+                             for i in range(len(FDexprs))]
+        upwind_stencils = dict((str(list_of_deriv_vars[i]), FDexprs[i]) for i in range(len(FDexprs)) if is_upwind_stencil[i])
+        FDexprs       = [FDexprs[i] for i in range(len(FDexprs)) if not is_upwind_stencil[i]]
+        FDlhsvarnames = [FDlhsvarnames[i] for i in range(len(FDlhsvarnames)) if not is_upwind_stencil[i]]
+
     # Step 5.x: Output useful code comment regarding
     #           which step we are on. *At most* this
     #           is a 3-step process:
@@ -815,44 +1051,61 @@ def construct_Ccode(sympyexpr_list, list_of_deriv_vars,
         NRPy_FD__Number_of_Steps += 1
 
     if len(read_from_memory_Ccode) > 0:
-        Coutput += indent_Ccode("/*\n * NRPy+ Finite Difference Code Generation, Step "
-                                + str(NRPy_FD_StepNumber) + " of " + str(NRPy_FD__Number_of_Steps) +
-                                ": Read from main memory and compute finite difference stencils:\n */\n")
+        append_indented_Ccode("/*\n * NRPy+ Finite Difference Code Generation, Step "
+                              + str(NRPy_FD_StepNumber) + " of " + str(NRPy_FD__Number_of_Steps) +
+                              ": Read from main memory and compute finite difference stencils:\n */\n")
         NRPy_FD_StepNumber = NRPy_FD_StepNumber + 1
         if FDparams.enable_FD_functions:
             # Compute finite differences using function calls (instead of inlined calculations)
-            Coutput += indent_Ccode(read_from_memory_Ccode)
+            append_indented_Ccode(read_from_memory_Ccode)
             for funccall in funccall_list:
-                Coutput += indent_Ccode(funccall)
+                append_indented_Ccode(funccall)
             if FDparams.upwindcontrolvec != "":
                 # Compute finite differences using inlined calculations
                 params = FDparams.outCparams
                 # We choose the CSE temporary variable prefix "FDpart1" for the finite difference coefficients:
                 params += ",CSE_varprefix=FDPart1,includebraces=False,CSE_preprocess=True,SIMD_find_more_subs=True"
-                Coutput += indent_Ccode(outputC(FDexprs, FDlhsvarnames, "returnstring", params=params))
+                append_indented_Ccode(outputC(FDexprs, FDlhsvarnames, "returnstring", params=params))
 
         else:
             # Compute finite differences using inlined calculations
             params = FDparams.outCparams.replace("preindent=1", "preindent=0")  # Remove an unnecessary indentation
             # We choose the CSE temporary variable prefix "FDpart1" for the finite difference coefficients:
             params += ",CSE_varprefix=FDPart1,includebraces=False,CSE_preprocess=True,SIMD_find_more_subs=True"
-            Coutput += indent_Ccode(outputC(FDexprs, FDlhsvarnames, "returnstring",params=params,
-                                            prestring=read_from_memory_Ccode))
+            append_indented_Ccode(outputC(FDexprs, FDlhsvarnames, "returnstring",params=params,
+                                          prestring=read_from_memory_Ccode))
 
-    # Step 5.b.ii: Implement control-vector upwinding algorithm.
-    if FDparams.upwindcontrolvec != "":
+    # Step 5.b.iii: Implement control-vector upwinding algorithm.
+    if upwind_branch:
+        upwind_Ccode, flops_branch, flops_blend = \
+            construct_upwind_branch_Ccode(upwind_directions, list_of_deriv_vars, list_of_deriv_operators, upwind_stencils)
+        prof = outCprof.current_record()
+        prof.set_stat("upwind_flops_branch", flops_branch, phase="construct_Ccode")
+        prof.set_stat("upwind_flops_blend", flops_blend, phase="construct_Ccode")
+        append_indented_Ccode("/*\n * NRPy+ Finite Difference Code Generation, Step "
+                              + str(NRPy_FD_StepNumber) + " of " + str(NRPy_FD__Number_of_Steps) +
+                              ": Implement upwinding algorithm, evaluating only the needed one-sided stencils\n"
+                              " *   (" + str(flops_branch) + " flops per point, vs. " + str(flops_blend) +
+                              " evaluating & blending both upwinded and downwinded stencils):\n */\n")
+        NRPy_FD_StepNumber = NRPy_FD_StepNumber + 1
+        if FDparams.enable_SIMD == "True":
+            for n in ["0", "1"]:
+                append_indented_Ccode("const double tmp_upwind_Integer_"+n+" = "+n+".000000000000000000000000000000000;\n")
+                append_indented_Ccode("const REAL_SIMD_ARRAY upwind_Integer_"+n+" = ConstSIMD(tmp_upwind_Integer_"+n+");\n")
+        append_indented_Ccode(upwind_Ccode)
+    elif FDparams.upwindcontrolvec != "":
         if len(upwind_directions) > 0:
-            Coutput += indent_Ccode("/*\n * NRPy+ Finite Difference Code Generation, Step "
-                                    + str(NRPy_FD_StepNumber) + " of " + str(NRPy_FD__Number_of_Steps) +
-                                    ": Implement upwinding algorithm:\n */\n")
+            append_indented_Ccode("/*\n * NRPy+ Finite Difference Code Generation, Step "
+                                  + str(NRPy_FD_StepNumber) + " of " + str(NRPy_FD__Number_of_Steps) +
+                                  ": Implement upwinding algorithm:\n */\n")
             NRPy_FD_StepNumber = NRPy_FD_StepNumber + 1
             if FDparams.enable_SIMD == "True":
                 for n in ["0", "1"]:
-                    Coutput += indent_Ccode("const double tmp_upwind_Integer_"+n+" = "+n+".000000000000000000000000000000000;\n")
-                    Coutput += indent_Ccode("const REAL_SIMD_ARRAY upwind_Integer_"+n+" = ConstSIMD(tmp_upwind_Integer_"+n+");\n")
+                    append_indented_Ccode("const double tmp_upwind_Integer_"+n+" = "+n+".000000000000000000000000000000000;\n")
+                    append_indented_Ccode("const REAL_SIMD_ARRAY upwind_Integer_"+n+" = ConstSIMD(tmp_upwind_Integer_"+n+");\n")
             for dirn in upwind_directions:
-                Coutput += indent_Ccode(type__var("UpWind" + str(dirn), FDparams) +
-                                        " = UPWIND_ALG(UpwindControlVectorU" + str(dirn) + ");\n")
+                append_indented_Ccode(type__var("UpWind" + str(dirn), FDparams) +
+                                      " = UPWIND_ALG(UpwindControlVectorU" + str(dirn) + ");\n")
         upwindU = [sp.sympify(0) for i in range(FDparams.DIM)]
         for dirn in upwind_directions:
             upwindU[dirn] = sp.sympify("UpWind" + str(dirn))
@@ -868,14 +1121,14 @@ def construct_Ccode(sympyexpr_list, list_of_deriv_vars,
         # For convenience, we require type__var() above to
         # prefix up/downwinded variables with "UpwindAlgInput".
         # Here we do not wish to have this prefix.
-        Coutput += indent_Ccode(outputC(upwind_expr_list, var_list,
-                                        "returnstring", params=FDparams.outCparams + ",CSE_varprefix=FDPart2,includebraces=False"))
+        append_indented_Ccode(outputC(upwind_expr_list, var_list,
+                                      "returnstring", params=FDparams.outCparams + ",CSE_varprefix=FDPart2,includebraces=False"))
 
     # Step 5.c.i: Add input RHS & LHS expressions from
     #             sympyexpr_list[]
-    Coutput += indent_Ccode("/*\n * NRPy+ Finite Difference Code Generation, Step "
-                            + str(NRPy_FD_StepNumber) + " of " + str(NRPy_FD__Number_of_Steps) +
-                            ": Evaluate SymPy expressions and write to main memory:\n */\n")
+    append_indented_Ccode("/*\n * NRPy+ Finite Difference Code Generation, Step "
+                          + str(NRPy_FD_StepNumber) + " of " + str(NRPy_FD__Number_of_Steps) +
+                          ": Evaluate SymPy expressions and write to main memory:\n */\n")
     exprs = []
     lhsvarnames = []
     for i in range(len(sympyexpr_list)):
@@ -889,8 +1142,8 @@ def construct_Ccode(sympyexpr_list, list_of_deriv_vars,
     #              sympyexpr_list[].lhs.
     write_to_mem_string = ""
     if FDparams.enable_SIMD == "True":
-        for i in range(len(sympyexpr_list)):
-            write_to_mem_string += "WriteSIMD(&" + sympyexpr_list[i].lhs + ", __RHS_exp_" + str(i) + ");\n"
+        write_to_mem_string = "".join("WriteSIMD(&" + sympyexpr_list[i].lhs + ", __RHS_exp_" + str(i) + ");\n"
+                                      for i in range(len(sympyexpr_list)))
 
     # outputC requires as its second argument a list of strings.
     #   Sometimes when the lhs's are simple constants, but the inputs
@@ -900,11 +1153,11 @@ def construct_Ccode(sympyexpr_list, list_of_deriv_vars,
     for lhs in lhsvarnames:
         lhsvarnamestrings.append(str(lhs))
 
-    Coutput += indent_Ccode(outputC(exprs, lhsvarnamestrings, "returnstring",
-                                    params=FDparams.outCparams + ",CSE_varprefix=FDPart3,includebraces=False,preindent=0",
-                                    prestring="", poststring=write_to_mem_string))
+    append_indented_Ccode(outputC(exprs, lhsvarnamestrings, "returnstring",
+                                  params=FDparams.outCparams + ",CSE_varprefix=FDPart3,includebraces=False,preindent=0",
+                                  prestring="", poststring=write_to_mem_string))
 
-    return Coutput
+    return "".join(Coutput_chunks)
 #################################
 
 if __name__ == "__main__":
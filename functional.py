@@ -89,12 +89,15 @@ def product(*iterable, **kwargs):
         a: 2
         b: 1
         b: 2
+
+        >>> list(product(range(2), repeat=1))
+        [(0,), (1,)]
     """
     if 'repeat' in kwargs:
         if kwargs['repeat'] > 1 and len(iterable) == 1:
             iterable = kwargs['repeat'] * iterable
     f = lambda A, B: [list(flatten([x] + [y])) for x in A for y in B]
-    for prod in reduce(f, iterable):
+    for prod in reduce(f, iterable, [[]]):
         yield tuple(prod)
 
 if __name__ == "__main__":
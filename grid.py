@@ -7,7 +7,7 @@
 import NRPy_param_funcs as par      # NRPy+: Parameter interface
 import sympy as sp                  # Import SymPy, a computer algebra system written entirely in Python
 from collections import namedtuple  # Standard Python `collections` module: defines named tuples data structure
-import os                           # Standard Python module for multiplatform OS-level functions
+import os, sys                      # Standard Python modules for multiplatform OS-level functions
 from suffixes import setsuffix
 import re
 from fstr import f
@@ -39,6 +39,11 @@ glb_griddata_struct_list = []
 thismodule = __name__
 par.initialize_param(par.glb_param("char", thismodule, "GridFuncMemAccess", "SENRlike"))
 par.initialize_param(par.glb_param("char", thismodule, "MemAllocStyle", "210"))
+# Layout of the gridfunctions in each gridfunction array (GridFuncMemAccess = SENRlike only):
+#   "contiguous":  each gridfunction is stored in its own contiguous 3D block (default)
+#   "interleaved": the gridfunction index varies fastest, i.e., all gridfunctions
+#                  in an array are stored contiguously at each gridpoint
+par.initialize_param(par.glb_param("char", thismodule, "GridFuncMemLayout", "contiguous"))
 par.initialize_param(par.glb_param("int",  thismodule, "DIM", 3))
 
 Nxx = par.Cparameters("int", thismodule, ["Nxx0", "Nxx1", "Nxx2"], [64, 32, 64])  # Default to 64x32x64 grid
@@ -83,6 +88,24 @@ def variable_type(var):
         print("Here's the list of registered gridfunctions:", grid.glb_gridfcs_list)
         sys.exit(1)
 
+def variable_types(varlist):
+    """ Same as [variable_type(var) for var in varlist], but builds the gridfunction and Cparameter lookup tables only once. """
+    gf_map = glb_gridfcs_map()
+    Cparam_names = set(Cparam.parname for Cparam in par.glb_Cparams_list)
+    vartypes = []
+    for var in varlist:
+        var_is_gf = str(var) in gf_map
+        var_is_parameter = str(var) in Cparam_names
+        if var_is_parameter and var_is_gf:
+            raise Exception("Error: variable "+str(var)+" is registered both as a gridfunction and as a Cparameter.")
+        if var_is_parameter:
+            vartypes.append("Cparameter")
+        elif var_is_gf:
+            vartypes.append("gridfunction")
+        else:
+            vartypes.append("other")
+    return vartypes
+
 def find_gfnames():
     return sorted(list(glb_gridfcs_map().keys()))
 
@@ -107,6 +130,13 @@ def find_gfmodule(varname,die=True):
     else:
         return var_data.external_module
 
+def num_gfs_Cmacro(gftype):
+    """ Return the C macro for the number of gridfunctions of type gftype (see gridfunction_defines()). """
+    if gftype in ("EVOL", "AUX", "AUXEVOL", "EXTERNAL"):
+        return "NUM_" + gftype + "_GFS"
+    print("Error: gridfunctions of type "+gftype+" are not supported with grid::GridFuncMemLayout = interleaved.")
+    sys.exit(1)
+
 from var_access import var_from_access, set_access
 
 def gfaccess(gfarrayname = "", varname = "", ijklstring = "", context = "DECL"):
@@ -149,8 +179,16 @@ def _gfaccess(gfarrayname, varname, ijklstring, context):
             gfarrayname = "scalar_tmp_gfs"
         elif gftype == "EVOL":
             pass
-        # Return gfarrayname[IDX3(varname,i0)] for DIM=1, gfarrayname[IDX3(varname,i0,i1)] for DIM=2, etc.
-        retstring += gfarrayname + "[IDX" + str(DIM+1) + "S(" + varname.upper()+"GF" + ", "
+        if par.parval_from_str("GridFuncMemLayout") == "interleaved" and DIM != 3:
+            print("Error: grid::GridFuncMemLayout = interleaved currently requires that gridfunctions be 3D.")
+            sys.exit(1)
+        if par.parval_from_str("GridFuncMemLayout") == "interleaved" and gftype != "EVOL":
+            # Interleaved layout: the stride between gridpoints is the number of gridfunctions in the array,
+            #   so gridfunctions other than EVOL are accessed with IDX4SN(NUM_..._GFS, varname, i0,i1,i2).
+            retstring += gfarrayname + "[IDX" + str(DIM+1) + "SN(" + num_gfs_Cmacro(gftype) + ", " + varname.upper()+"GF" + ", "
+        else:
+            # Return gfarrayname[IDX3(varname,i0)] for DIM=1, gfarrayname[IDX3(varname,i0,i1)] for DIM=2, etc.
+            retstring += gfarrayname + "[IDX" + str(DIM+1) + "S(" + varname.upper()+"GF" + ", "
     elif par.parval_from_str("GridFuncMemAccess") == "ETK":
         # Return varname[CCTK_GFINDEX3D(i0,i1,i2)] for DIM=3. Error otherwise
         if DIM != 3:
@@ -503,7 +541,9 @@ def register_C_functions_and_NRPy_basic_defines(enable_griddata_struct=True,
 
     # Then set up the dictionary entry for grid in NRPy_basic_defines
     Nbd_str  = gridfunction_defines()
-    Nbd_str += r"""
+    GridFuncMemLayout = par.parval_from_str("GridFuncMemLayout")
+    if GridFuncMemLayout == "contiguous":
+        Nbd_str += r"""
 // Declare the IDX4S(gf,i,j,k) macro, which enables us to store 4-dimensions of
 //   data in a 1D array. In this case, consecutive values of "i"
 //   (all other indices held to a fixed value) are consecutive in memory, where
@@ -514,7 +554,30 @@ def register_C_functions_and_NRPy_basic_defines(enable_griddata_struct=True,
   ( (i) + Nxx_plus_2NGHOSTS0 * ( (j) + Nxx_plus_2NGHOSTS1 * ( (k) + Nxx_plus_2NGHOSTS2 * (g) ) ) )
 #define IDX4ptS(g,idx) ( (idx) + (Nxx_plus_2NGHOSTS0*Nxx_plus_2NGHOSTS1*Nxx_plus_2NGHOSTS2) * (g) )
 #define IDX3S(i,j,k) ( (i) + Nxx_plus_2NGHOSTS0 * ( (j) + Nxx_plus_2NGHOSTS1 * ( (k) ) ) )
-#define LOOP_REGION(i0min,i0max, i1min,i1max, i2min,i2max)              \
+// IDX4SN() and IDX4ptSN() index an array of num_gfs gridfunctions; num_gfs only matters for
+//   the interleaved layout (grid::GridFuncMemLayout), where the array type sets the stride.
+#define IDX4SN(num_gfs,g,i,j,k) IDX4S(g,i,j,k)
+#define IDX4ptSN(num_gfs,g,idx) IDX4ptS(g,idx)
+"""
+    elif GridFuncMemLayout == "interleaved":
+        Nbd_str += r"""
+// Interleaved gridfunction memory layout (grid::GridFuncMemLayout = interleaved): the
+//   gridfunction index varies fastest, so all num_gfs gridfunctions in an array are
+//   consecutive in memory at each gridpoint, and gridpoints are separated by num_gfs
+//   elements. IDX4SN(num_gfs,gf,i,j,k) and IDX4ptSN(num_gfs,gf,idx) index an array of
+//   num_gfs gridfunctions; IDX4S() and IDX4ptS() index arrays of NUM_EVOL_GFS
+//   gridfunctions (e.g., y_n_gfs and rhs_gfs). Gridpoint indices are ordered as in
+//   the contiguous layout: consecutive values of "i" are adjacent gridpoints, etc.
+#define IDX3S(i,j,k) ( (i) + Nxx_plus_2NGHOSTS0 * ( (j) + Nxx_plus_2NGHOSTS1 * ( (k) ) ) )
+#define IDX4SN(num_gfs,g,i,j,k) ( (g) + (num_gfs) * IDX3S(i,j,k) )
+#define IDX4ptSN(num_gfs,g,idx) ( (g) + (num_gfs) * (idx) )
+#define IDX4S(g,i,j,k) IDX4SN(NUM_EVOL_GFS,g,i,j,k)
+#define IDX4ptS(g,idx) IDX4ptSN(NUM_EVOL_GFS,g,idx)
+"""
+    else:
+        print("Error: grid::GridFuncMemLayout = "+GridFuncMemLayout+" unsupported.")
+        sys.exit(1)
+    Nbd_str += r"""#define LOOP_REGION(i0min,i0max, i1min,i1max, i2min,i2max)              \
   for(int i2=i2min;i2<i2max;i2++) for(int i1=i1min;i1<i1max;i1++) for(int i0=i0min;i0<i0max;i0++)
 #define LOOP_OMP(__OMP_PRAGMA__, i0,i0min,i0max, i1,i1min,i1max, i2,i2min,i2max) _Pragma(__OMP_PRAGMA__) \
     for(int (i2)=(i2min);(i2)<(i2max);(i2)++) for(int (i1)=(i1min);(i1)<(i1max);(i1)++) for(int (i0)=(i0min);(i0)<(i0max);(i0)++)
@@ -0,0 +1,74 @@
+# Benchmark of the partial factorization step of cse_preprocess() on the BSSN RHS expression list:
+#   the single-pass cse_helpers.cse_collect() versus one sp.collect() call per rational symbol
+#   (on the expression and on the first argument of every function), as previously done.
+#
+# Usage (from the NRPy+ root directory):
+#   python in_progress/benchmark_cse_collect.py [CoordSystem] [maximum number of expressions]
+# e.g., python in_progress/benchmark_cse_collect.py Spherical 6
+
+import os, sys, time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import sympy as sp                                 # SymPy: The Python computer algebra package upon which NRPy+ depends
+import NRPy_param_funcs as par                     # NRPy+: Parameter interface
+import reference_metric as rfm                     # NRPy+: Reference metric support
+import BSSN.BSSN_RHSs as rhs                       # NRPy+: BSSN RHS expressions
+import BSSN.BSSN_gauge_RHSs as gaugerhs            # NRPy+: BSSN gauge RHS expressions
+from expr_tree import ExprTree                     # NRPy+: Expression tree data structure
+from cse_helpers import cse_preprocess, cse_collect  # NRPy+: CSE preprocessing
+
+def sequential_collect(expr, syms):
+    """ Reference: partial factorization by repeated calls to sp.collect() """
+    tree = ExprTree(expr)
+    for subtree in tree.preorder():
+        if isinstance(subtree.expr, sp.Function):
+            arg = subtree.children[0]
+            for var in syms:
+                arg.expr = sp.collect(arg.expr, var)
+            tree.build(arg)
+    expr = tree.reconstruct()
+    for var in syms:
+        expr = sp.collect(expr, var)
+    return expr
+
+def BSSN_RHS_expression_list(CoordSystem):
+    par.set_parval_from_str("reference_metric::CoordSystem", CoordSystem)
+    rfm.reference_metric()
+    rhs.BSSN_RHSs()
+    gaugerhs.BSSN_gauge_RHSs()
+    expr_list = [rhs.cf_rhs, rhs.trK_rhs, gaugerhs.alpha_rhs]
+    expr_list += [gaugerhs.vet_rhsU[i] for i in range(3)] + [gaugerhs.bet_rhsU[i] for i in range(3)]
+    expr_list += [rhs.Lambdabar_rhsU[i] for i in range(3)]
+    expr_list += [rhs.h_rhsDD[i][j] for i in range(3) for j in range(i, 3)]
+    expr_list += [rhs.a_rhsDD[i][j] for i in range(3) for j in range(i, 3)]
+    return expr_list
+
+if __name__ == "__main__":
+    CoordSystem = sys.argv[1] if len(sys.argv) > 1 else "Spherical"
+    num_exprs = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    expr_list = BSSN_RHS_expression_list(CoordSystem)[:num_exprs]
+
+    # Replace rationals by symbols, without partial factorization
+    expr_list, map_sym_to_rat = cse_preprocess(expr_list, factor=False)
+    syms = list(map_sym_to_rat)
+    print("%d expressions, %d rational symbols" % (len(expr_list), len(syms)))
+
+    total_time_reference, total_time = 0.0, 0.0
+    num_identical = 0
+    for i, expr in enumerate(expr_list):
+        start = time.time()
+        reference = sequential_collect(expr, syms)
+        time_reference = time.time() - start
+        start = time.time()
+        result = cse_collect(expr, syms)
+        time_result = time.time() - start
+        identical = result == reference
+        num_identical += identical
+        total_time_reference += time_reference
+        total_time += time_result
+        print("expression %2d: sp.collect() %8.3f s, cse_collect() %8.3f s, speedup %6.1fx%s" %
+              (i, time_reference, time_result, time_reference / max(time_result, 1e-9),
+               "" if identical else ", DIFFERENT RESULT"))
+    print("total:         sp.collect() %8.3f s, cse_collect() %8.3f s, speedup %6.1fx; %d of %d results identical" %
+          (total_time_reference, total_time, total_time_reference / max(total_time, 1e-9), num_identical, len(expr_list)))
+    sys.exit(0 if num_identical == len(expr_list) else 1)
@@ -421,6 +421,183 @@ def declarerank3(symbol, symmetry, DIM=-1):
 def declarerank4(symbol, symmetry, DIM=-1):
     return declare_indexedexp(rank=4, symbol=symbol, symmetry=symmetry, dimension=DIM)
 
+# Map each index of a rank-N, dimension-DIM indexed expression with the given symmetry
+#   to (sign, canonical index), or to None if the symmetry forces the component to zero,
+#   and each canonical index to its orbit [(sign, index), ...], in sorted index order.
+#   Computed once per (rank, symmetry, DIM), by symmetrizing an indexed expression
+#   of distinct symbols with the same functions used by declare_indexedexp().
+_compact_symmetry_maps = {}
+def _compact_symmetry_map(rank, symmetry, dimension):
+    key = (rank, symmetry, dimension)
+    if key not in _compact_symmetry_maps:
+        indices = list(func.product(range(dimension), repeat=rank))
+        symbol_to_index = {}
+        def namefun(symbol, index, shape):
+            iterable = []
+            for i in range(shape[0]):
+                sym = sp.Symbol('cmp' + '_'.join(str(n) for n in index + [i]))
+                symbol_to_index[sym] = tuple(index + [i])
+                iterable.append(sym)
+            return iterable
+        indexedexp = _init(rank * [dimension], 'cmp', namefun=namefun)
+        if symmetry and symmetry != 'nosym':
+            symmetrize_rankN = {2: symmetrize_rank2, 3: symmetrize_rank3, 4: symmetrize_rank4}.get(rank)
+            if symmetrize_rankN is None:
+                raise Exception('cannot symmetrize indexed expression of rank ' + str(rank))
+            indexedexp = symmetrize_rankN(indexedexp, symmetry, dimension)
+        index_map, orbits = {}, {}
+        for index in indices:
+            component = indexedexp
+            for i in index: component = component[i]
+            if component == 0:
+                index_map[index] = None
+                continue
+            elif component in symbol_to_index:
+                index_map[index] = (1, symbol_to_index[component])
+            else:
+                index_map[index] = (-1, symbol_to_index[-component])
+            orbits.setdefault(index_map[index][1], []).append((index_map[index][0], index))
+        _compact_symmetry_maps[key] = (index_map, orbits)
+    return _compact_symmetry_maps[key]
+
+class CompactIndexedExp:
+    """ Indexed Expression Storing Only Independent Components
+
+        Components related by the symmetry (same options as declare_indexedexp(),
+        e.g., 'sym01', 'sym01_sym23', 'anti01_anti23') share storage, so
+        expressions need only be constructed for independent_indices().
+        List-style access T[i][j] is supported for reading and assignment;
+        assigning to any component sets all components related to it.
+
+        >>> T = CompactIndexedExp(rank=2, symbol='M', symmetry='sym01', dimension=3)
+        >>> T.independent_indices()
+        [(0, 0), (0, 1), (0, 2), (1, 1), (1, 2), (2, 2)]
+        >>> T[1][0], T[0][1]
+        (M01, M01)
+        >>> T[2][1] = 7
+        >>> T.tolist()
+        [[M00, M01, M02], [M01, M11, 7], [M02, 7, M22]]
+
+        >>> A = CompactIndexedExp(rank=3, symmetry='anti12', dimension=3)
+        >>> len(A.independent_indices())
+        9
+        >>> A[0][2][1] = sp.Symbol('x')
+        >>> A[0][1][2], A[0][1][1]
+        (-x, 0)
+
+        When accumulating, loop over independent components only:
+
+        >>> R = CompactIndexedExp(rank=4, symmetry='anti01_anti23', dimension=3)
+        >>> for i, j, k, l in R.independent_indices():
+        ...     R[i][j][k][l] += i + 2*j + 3*k + 4*l
+        >>> R[0][1][1][2], R[1][0][1][2], R[1][0][2][1]
+        (13, -13, 13)
+    """
+
+    __slots__ = ('rank', 'symmetry', 'dimension', '_index_map', '_orbits', '_independent_indices', 'components')
+
+    def __init__(self, rank, symbol=None, symmetry=None, dimension=None):
+        if not dimension or dimension == -1:
+            dimension = par.parval_from_str('DIM')
+        if symbol is not None:
+            if not isinstance(symbol, str) or not re.match(r'[\w_]', symbol):
+                raise ValueError('symbol must be an alphabetic string')
+        if not isinstance(dimension, int) or dimension <= 0:
+            raise ValueError('dimension must be a positive integer')
+        self.rank, self.symmetry, self.dimension = rank, symmetry, dimension
+        self._index_map, self._orbits = _compact_symmetry_map(rank, symmetry, dimension)
+        self._independent_indices = sorted(self._orbits)
+        # Independent components are named as in declare_indexedexp(), e.g., hDD01
+        self.components = {index: sp.Symbol(symbol + ''.join(str(n) for n in index)) if symbol else sp.sympify(0)
+                           for index in self._independent_indices}
+
+    def independent_indices(self):
+        """ Return the (lexicographically sorted) list of independent component indices. """
+        return list(self._independent_indices)
+
+    def orbit(self, index):
+        """ Return [(sign, index), ...] for all indices sharing storage with independent component index.
+
+            >>> T = CompactIndexedExp(rank=2, symmetry='anti01', dimension=2)
+            >>> T.orbit((0, 1))
+            [(1, (0, 1)), (-1, (1, 0))]
+        """
+        return list(self._orbits[index])
+
+    def multiplicity(self, index):
+        """ Return the number of indices sharing storage with independent component index. """
+        return len(self._orbits[index])
+
+    def tolist(self):
+        """ Return the equivalent nested-list indexed expression; components related by symmetry are shared. """
+        def build(index):
+            if len(index) == self.rank:
+                return self._get(index)
+            return [build(index + (i,)) for i in range(self.dimension)]
+        return build(())
+
+    def _get(self, index):
+        value = self._index_map[index]
+        if value is None:
+            return sp.sympify(0)
+        return value[0] * self.components[value[1]]
+
+    def _set(self, index, expr):
+        value = self._index_map[index]
+        if value is None:
+            if expr != 0:
+                raise ValueError('component ' + str(index) + ' is zero by symmetry \'' + str(self.symmetry) + '\'')
+            return
+        self.components[value[1]] = value[0] * expr
+
+    def __getitem__(self, i):
+        if self.rank == 1:
+            return self._get((i,))
+        return _CompactIndexedExpView(self, (i,))
+
+    def __setitem__(self, i, expr):
+        if self.rank != 1:
+            raise TypeError('assignment requires all ' + str(self.rank) + ' indices')
+        self._set((i,), expr)
+
+    def __len__(self):
+        return self.dimension
+
+    def __iter__(self):
+        return (self[i] for i in range(self.dimension))
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+class _CompactIndexedExpView:
+    """ Partially-indexed CompactIndexedExp, e.g., T[i] of a rank-2 T """
+
+    __slots__ = ('parent', 'index')
+
+    def __init__(self, parent, index):
+        self.parent, self.index = parent, index
+
+    def __getitem__(self, i):
+        index = self.index + (i,)
+        if len(index) == self.parent.rank:
+            return self.parent._get(index)
+        return _CompactIndexedExpView(self.parent, index)
+
+    def __setitem__(self, i, expr):
+        index = self.index + (i,)
+        if len(index) != self.parent.rank:
+            raise TypeError('assignment requires all ' + str(self.parent.rank) + ' indices')
+        self.parent._set(index, expr)
+
+    def __len__(self):
+        return self.parent.dimension
+
+    def __iter__(self):
+        return (self[i] for i in range(self.parent.dimension))
+
+    def __repr__(self):
+        return repr(list(self))
+
 class NonInvertibleMatrixError(ZeroDivisionError):
     """ Matrix Not Invertible; Division By Zero """
 
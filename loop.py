@@ -126,6 +126,214 @@ def loop(idx_var, lower_bound, upper_bound, increment, pragma, padding='  ', int
     if not interior: return header, footer
     return header + ''.join(interior) + footer
 
+def loop_indices_of_variable(varname, invariant_varnames=()):
+    """ Determine the simple_loop() loop indices (0, 1, 2 for i0, i1, i2) on which a C variable may depend.
+
+        The coordinates xx0, xx1, xx2 (see Read_xxs) depend on i0, i1, i2, respectively, and
+        precomputed reference metric quantities (e.g., f2_of_xx0_xx1__D1 or ghatDD00_of_xx0_xx1, see
+        enable_rfm_precompute) on the loop indices of the coordinates in their name. Variables in invariant_varnames
+        (e.g., C parameters) depend on no loop index, and any other variable (e.g., a gridfunction)
+        may depend on all loop indices.
+
+        :arg:    name of C variable
+        :arg:    names of C variables that do not depend on any loop index
+        :return: frozenset of loop indices
+
+        >>> loop_indices_of_variable('xx1')
+        frozenset({1})
+        >>> sorted(loop_indices_of_variable('f2_of_xx0_xx1__DD00', invariant_varnames=['f2_of_xx0_xx1__DD00']))
+        [0, 1]
+        >>> sorted(loop_indices_of_variable('GammahatUDD122_of_xx0_xx2'))
+        [0, 2]
+        >>> loop_indices_of_variable('invdx0', invariant_varnames=['invdx0'])
+        frozenset()
+        >>> sorted(loop_indices_of_variable('hDD00'))
+        [0, 1, 2]
+    """
+    match = re.match(r'xx([0-2])$', varname) or re.match(r'[A-Za-z][A-Za-z0-9]*_of_((?:xx[0-2]_?)+)', varname)
+    if match:
+        return frozenset(int(idx) for idx in re.findall(r'xx([0-2])', match.group(0)))
+    if varname in invariant_varnames:
+        return frozenset()
+    return frozenset([0, 1, 2])
+
+# Loop levels above the innermost loop of simple_loop(), from outermost to innermost:
+#   before the loop nest, and within the i2 and i1 loops (before the nested loop).
+hoisting_levels = ["outer", "i2", "i1"]
+
+def hoisting_level(loop_indices):
+    """ Return the outermost loop level (see hoisting_levels) at which code depending
+        on loop_indices may be evaluated, or None if it depends on the innermost index i0.
+
+        >>> [hoisting_level(indices) for indices in ([], [2], [1, 2], [0, 1])]
+        ['outer', 'i2', 'i1', None]
+    """
+    if 0 in loop_indices:
+        return None
+    if 1 in loop_indices:
+        return "i1"
+    if 2 in loop_indices:
+        return "i2"
+    return "outer"
+
+def hoisting_markers(level):
+    """ Return the pair of C comments delimiting code in a loop interior that simple_loop()
+        moves out of the innermost loop to the given loop level (see hoisting_levels).
+        Where the code is not moved, the markers are ordinary comments.
+    """
+    return "// <NRPy+ hoist to loop level " + level + ">", "// </NRPy+ hoist to loop level " + level + ">"
+
+def extract_hoisted_code(interior, levels=hoisting_levels):
+    """ Remove the code between hoisting_markers() of the given levels from a loop interior.
+
+        Statements repeated at a level (e.g., identical constants declared
+        by several blocks of code) are kept only once.
+
+        :arg:    loop interior
+        :arg:    loop levels whose code should be removed
+        :return: loop interior without the removed code, dict of lists of removed lines keyed by level
+
+        >>> begin, end = hoisting_markers("i1")
+        >>> block = [begin, "const double a = sin(xx1);", end]
+        >>> interior, hoisted = extract_hoisted_code("\\n".join(["{"] + block + ["b = a*c;", "}", "{"] + block + ["d = a;", "}"]))
+        >>> print(interior)
+        {
+        b = a*c;
+        }
+        {
+        d = a;
+        }
+        >>> hoisted
+        {'outer': [], 'i2': [], 'i1': ['const double a = sin(xx1);']}
+    """
+    hoisted = {level: [] for level in hoisting_levels}
+    begin_markers = {hoisting_markers(level)[0]: level for level in levels}
+    kept_lines = []
+    level = None
+    for line in interior.split('\n'):
+        stripped = line.strip()
+        if level is None:
+            if stripped in begin_markers:
+                level = begin_markers[stripped]
+            else:
+                kept_lines.append(line)
+        elif stripped == hoisting_markers(level)[1]:
+            level = None
+        elif stripped != "" and not (stripped.endswith(";") and stripped in hoisted[level]):
+            hoisted[level].append(stripped)
+    return '\n'.join(kept_lines), hoisted
+
+def unrolling_markers(unroll_factor):
+    """ Return the comment lines enclosing C code that computes unroll_factor consecutive points along i0
+        (generated by FD_outputC() with FD_unroll_i0), which simple_loop() places in an i0 loop unrolled
+        by unroll_factor; the C code following these lines computes a single point (for the remaining points).
+        Within the unrolled code, unrolled_point_marker marks where each point reads the i0-dependent
+        quantities (see Read_xxs and enable_rfm_precompute).
+
+        >>> unrolling_markers(4)
+        ('// <NRPy+ unroll i0 by 4>', '// </NRPy+ unroll i0 by 4>')
+    """
+    return "// <NRPy+ unroll i0 by " + str(unroll_factor) + ">", "// </NRPy+ unroll i0 by " + str(unroll_factor) + ">"
+
+unrolled_point_marker = "// <NRPy+ unrolled i0 point>"
+
+def extract_unrolled_code(interior):
+    """ Remove the code between unrolling_markers() from a loop interior.
+
+        :arg:    loop interior
+        :return: unroll factor (1 if no markers are found), unrolled code, remaining loop interior
+
+        >>> begin, end = unrolling_markers(2)
+        >>> extract_unrolled_code("\\n".join(["{", begin, "{ a = in[i0]; b = in[i0+1]; }", end, "a = in[i0];", "}"]))
+        (2, '{ a = in[i0]; b = in[i0+1]; }', '{\\na = in[i0];\\n}')
+        >>> extract_unrolled_code("a = in[i0];")
+        (1, '', 'a = in[i0];')
+    """
+    match = re.search(r'^[ \t]*// <NRPy\+ unroll i0 by ([0-9]+)>[ \t]*$', interior, flags=re.MULTILINE)
+    if not match:
+        return 1, '', interior
+    unroll_factor = int(match.group(1))
+    end_marker = unrolling_markers(unroll_factor)[1]
+    end = interior.index(end_marker, match.end())
+    end_of_line = interior.find('\n', end)
+    end_of_line = len(interior) if end_of_line == -1 else end_of_line + 1
+    unrolled = interior[match.end():interior.rfind('\n', 0, end)].strip('\n')
+    return unroll_factor, unrolled, interior[:match.start()] + interior[end_of_line:]
+
+i0_loop_split_marker = "// <NRPy+ split i0 loop>"
+
+def split_i0_loop_interior(interior):
+    """ Split a loop interior at lines consisting of i0_loop_split_marker, which simple_loop() turns
+        into consecutive i0 loops within the same (i1,i2) iteration; code before the first marker is
+        placed in the i1 loop, before these i0 loops.
+
+        :arg:    loop interior
+        :return: code before the first marker (None if there is no marker), list of i0 loop interiors
+
+        >>> split_i0_loop_interior("\\n".join(["REAL buf[N];", i0_loop_split_marker, "buf[i0] = a;", i0_loop_split_marker, "b = buf[i0];"]))
+        ('REAL buf[N];', ['buf[i0] = a;', 'b = buf[i0];'])
+        >>> split_i0_loop_interior("b = a;")
+        (None, ['b = a;'])
+    """
+    chunks = [[]]
+    for line in interior.split('\n'):
+        if line.strip() == i0_loop_split_marker:
+            chunks.append([])
+        else:
+            chunks[-1].append(line)
+    chunks = ['\n'.join(chunk).strip('\n') for chunk in chunks]
+    if len(chunks) == 1:
+        return None, chunks
+    return chunks[0], chunks[1:]
+
+def parse_tile_size(options):
+    """ Parse the tile sizes set by the 'tile_size=(T2,T1,T0)' loop option.
+        With enable_SIMD, T0 must be a multiple of SIMD_width, which is set by SIMD/SIMD_intrinsics.h
+        at compile time (8 with AVX-512, 4 with AVX, 2 with SSE). T0 is checked here only if the
+        'SIMD_width=N' loop option is given; otherwise simple_loop() checks it in the generated C code.
+
+        :arg:    loop options
+        :return: list of tile sizes [T2, T1, T0] (strings), or None if not set
+
+        >>> parse_tile_size('InteriorPoints,tile_size=(4, 16,0),enable_SIMD')
+        ['4', '16', '0']
+        >>> print(parse_tile_size('InteriorPoints'))
+        None
+        >>> parse_tile_size('InteriorPoints,tile_size=(0,4,12),enable_SIMD,SIMD_width=4')
+        ['0', '4', '12']
+        >>> parse_tile_size('InteriorPoints,tile_size=(0,4,12),enable_SIMD,SIMD_width=8')
+        Traceback (most recent call last):
+        ...
+        ValueError: with enable_SIMD, T0 in tile_size=(T2,T1,T0) must be a multiple of SIMD_width (8).
+    """
+    if "tile_size=" not in options:
+        return None
+    match = re.search(r'tile_size=\(([^()]*)\)', options)
+    tile_size = [size.strip() for size in match.group(1).split(',')] if match else []
+    if len(tile_size) != 3 or not all(size.isdigit() for size in tile_size):
+        raise ValueError('tile_size must be specified as tile_size=(T2,T1,T0), with nonnegative integers T2, T1, T0.')
+    SIMD_width = re.search(r'SIMD_width=([0-9]+)', options)
+    if "enable_SIMD" in options and SIMD_width and int(tile_size[2]) % int(SIMD_width.group(1)) != 0:
+        raise ValueError('with enable_SIMD, T0 in tile_size=(T2,T1,T0) must be a multiple of SIMD_width (' +
+                         SIMD_width.group(1) + ').')
+    return tile_size
+
+def tile_size_loopopt(tile_size):
+    """ Return the loop option that sets tile sizes [T2, T1, T0] (see simple_loop()).
+
+        >>> tile_size_loopopt([4, 16, 0])
+        'tile_size=(4,16,0)'
+    """
+    return "tile_size=(" + ",".join(str(size) for size in tile_size) + ")"
+
+def tile(loop_string, tile_loops, padding):
+    """ Nest loop_string inside the loops over tiles, given as (header, footer) pairs from outermost to innermost. """
+    if not tile_loops:
+        return loop_string
+    return ''.join(header for header, _footer in tile_loops) + \
+        ''.join(padding*len(tile_loops) + line + '\n' for line in loop_string.splitlines()) + \
+        ''.join(footer for _header, footer in tile_loops[::-1])
+
 def simple_loop(options, interior):
     """ Generate a simple loop in C (for use inside of a function).
 
@@ -143,6 +351,19 @@ def simple_loop(options, interior):
             } // END LOOP: for (int i1 = 0; i1 < Nxx_plus_2NGHOSTS1; i1++)
           } // END LOOP: for (int i2 = 0; i2 < Nxx_plus_2NGHOSTS2; i2++)
         <BLANKLINE>
+
+        >>> print(simple_loop('InteriorPoints,tile_size=(0,8,0)', '// <INTERIOR>'))
+          #pragma omp parallel for
+          for (int i1B = NGHOSTS; i1B < NGHOSTS+Nxx1; i1B += 8) {
+            for (int i2 = NGHOSTS; i2 < NGHOSTS+Nxx2; i2++) {
+              for (int i1 = i1B; i1 < MIN(NGHOSTS+Nxx1, i1B + 8); i1++) {
+                for (int i0 = NGHOSTS; i0 < NGHOSTS+Nxx0; i0++) {
+                  // <INTERIOR>
+                } // END LOOP: for (int i0 = NGHOSTS; i0 < NGHOSTS+Nxx0; i0++)
+              } // END LOOP: for (int i1 = i1B; i1 < MIN(NGHOSTS+Nxx1, i1B + 8); i1++)
+            } // END LOOP: for (int i2 = NGHOSTS; i2 < NGHOSTS+Nxx2; i2++)
+          } // END LOOP: for (int i1B = NGHOSTS; i1B < NGHOSTS+Nxx1; i1B += 8)
+        <BLANKLINE>
     """
     if not options:
         return interior
@@ -195,14 +416,93 @@ def simple_loop(options, interior):
 
     padding = '  '
 
+    # 'tile_size=(T2,T1,T0)': cache blocking; loop over tiles of up to T2 x T1 x T0 points (0: no tiling in this direction).
+    #   Unless the pragma is placed on an inner loop, the loop(s) over tiles are parallelized instead of the i2 loop.
+    #   With enable_SIMD, T0 must be a multiple of SIMD_width (see parse_tile_size()). Unless the
+    #   'SIMD_width=N' option is given, this is checked when compiling, for the SIMD intrinsics in use.
+    tile_loops = []
+    if "tile_size=" in options:
+        tile_size = parse_tile_size(options)
+        tiled = [i for i in range(3) if tile_size[i] != "0"]
+        tile_pragma = ""
+        if tiled and "pragma_on_i1" not in options and "pragma_on_i0" not in options:
+            tile_pragma = pragma
+            if pragma and len(tiled) > 1 and "collapse" not in pragma:
+                tile_pragma += " collapse(" + str(len(tiled)) + ")"
+            pragma = ""
+        for depth, i in enumerate(tiled):
+            idx_var = ["i2", "i1", "i0"][i]
+            tile_loops.append(loop1D(idx_var + "B", i2i1i0_mins[i], i2i1i0_maxs[i], tile_size[i],
+                                     tile_pragma if depth == 0 else "", padding*(depth + 1)))
+            i2i1i0_mins[i] = idx_var + "B"
+            i2i1i0_maxs[i] = "MIN(%s, %sB + %s)" % (i2i1i0_maxs[i], idx_var, tile_size[i])
+        if "enable_SIMD" in options and tile_size[2] != "0" and "SIMD_width=" not in options:
+            SIMD_width_check = padding + "#if (" + tile_size[2] + ") % SIMD_width != 0\n" + \
+                padding + "#error \"with enable_SIMD, T0 in tile_size=(T2,T1,T0) must be a multiple of SIMD_width\"\n" + \
+                padding + "#endif\n"
+            tile_loops[0] = (SIMD_width_check + tile_loops[0][0], tile_loops[0][1])
+
+    # Move loop-invariant code (see hoisting_markers()) out of the innermost loop. Code is moved into
+    #   the i2 and i1 loops only if these loops read the coordinates (on which such code depends).
+    hoisted = {level: [] for level in hoisting_levels}
+    if "// <NRPy+ hoist to loop level " in interior:
+        levels = hoisting_levels if "Read_xxs" in options or "enable_rfm_precompute" in options else ["outer"]
+        interior, hoisted = extract_hoisted_code(interior, levels)
+    for i, level, depth in [(2, "i2", 2), (1, "i1", 3)]:
+        if hoisted[level]:
+            Read_1Darrays[i] = ('\n' + padding*depth).join(([Read_1Darrays[i]] if Read_1Darrays[i] else []) + hoisted[level])
+
+    # Unroll the innermost loop if the interior computes several consecutive points along i0 (see unrolling_markers())
+    unroll_factor, unrolled_interior, interior = extract_unrolled_code(interior)
+    if unroll_factor > 1 and "enable_SIMD" in options:
+        raise ValueError('no SIMD support for unrolling the i0 loop (currently).')
+    # Split the innermost loop into consecutive i0 loops (see split_i0_loop_interior())
+    i1_code, i0_interiors = split_i0_loop_interior(interior)
+    if i1_code is not None and unroll_factor > 1:
+        raise ValueError('an i0 loop cannot be both split and unrolled (currently).')
+
     loop_order = [pragma, Read_1Darrays[2], Read_1Darrays[1]]
     if "pragma_on_i1" in options:
         loop_order = ["", Read_1Darrays[2] + "\n" + padding*2 + pragma, Read_1Darrays[1]]
     elif "pragma_on_i0" in options:
         loop_order = ["", Read_1Darrays[2], Read_1Darrays[1] + "\n" + padding*3 + pragma]
 
-    return loop(["i2", "i1", "i0"], i2i1i0_mins, i2i1i0_maxs, increment, loop_order,
-                padding=padding, interior=Read_1Darrays[0] + ("\n" if Read_1Darrays[0] else "") + interior)
+    if i1_code is not None:
+        i0_pragma = pragma if "pragma_on_i0" in options else ""
+        loop_order[2] = '\n'.join(([Read_1Darrays[1]] if Read_1Darrays[1] else []) + [line for line in i1_code.split('\n') if line] +
+                                  ([i0_pragma] if i0_pragma else []))
+        loop_order[2] = loop_order[2].replace('\n', '\n' + padding*3)
+        interiors = [Read_1Darrays[0] + ("\n" if Read_1Darrays[0] else "") + i0_interior for i0_interior in i0_interiors]
+        split_loop = loop(["i2", "i1", "i0"], i2i1i0_mins, i2i1i0_maxs, increment, loop_order,
+                          padding=padding, interior=interiors[0])
+        i0_header, i0_footer = loop1D("i0", i2i1i0_mins[2], i2i1i0_maxs[2], increment[2], i0_pragma, padding*3)
+        next_i0_loops = ''.join(i0_header + ''.join(padding*4 + line + '\n' for line in i0_interior.split('\n')) + i0_footer
+                                for i0_interior in interiors[1:])
+        return ''.join(padding + line + '\n' for line in hoisted["outer"]) + \
+            tile(split_loop.replace(i0_footer, i0_footer + next_i0_loops, 1), tile_loops, padding)
+
+    interior = Read_1Darrays[0] + ("\n" if Read_1Darrays[0] else "") + interior
+    if unroll_factor == 1:
+        return ''.join(padding + line + '\n' for line in hoisted["outer"]) + \
+            tile(loop(["i2", "i1", "i0"], i2i1i0_mins, i2i1i0_maxs, increment, loop_order,
+                      padding=padding, interior=interior), tile_loops, padding)
+
+    # Unrolled i0 loop, over as many points as possible, followed by a loop over the remaining points.
+    #   Each unrolled point reads the i0-dependent quantities in its own scope.
+    unrolled_interior = '\n'.join(line.replace(unrolled_point_marker, Read_1Darrays[0]) for line in unrolled_interior.split('\n')
+                                  if Read_1Darrays[0] or line.strip() != unrolled_point_marker)
+    i0_pragma = pragma if "pragma_on_i0" in options else ""
+    i0_unrolled_end = "const int i0_unrolled_end = {0} + (({1}) - ({0}))/{2}*{2};".format(i2i1i0_mins[2], i2i1i0_maxs[2],
+                                                                                      unroll_factor)
+    loop_order[2] = (Read_1Darrays[1] + "\n" + padding*3 if Read_1Darrays[1] else "") + i0_unrolled_end + \
+        ("\n" + padding*3 + i0_pragma if i0_pragma else "")
+    unrolled_loop = loop(["i2", "i1", "i0"], i2i1i0_mins, i2i1i0_maxs[:2] + ["i0_unrolled_end"],
+                         increment[:2] + [str(unroll_factor)], loop_order, padding=padding, interior=unrolled_interior)
+    _unrolled_header, unrolled_footer = loop1D("i0", i2i1i0_mins[2], "i0_unrolled_end", str(unroll_factor), "", padding*3)
+    remainder_header, remainder_footer = loop1D("i0", "i0_unrolled_end", i2i1i0_maxs[2], "1", i0_pragma, padding*3)
+    remainder_loop = remainder_header + ''.join(padding*4 + line + '\n' for line in interior.split('\n')) + remainder_footer
+    return ''.join(padding + line + '\n' for line in hoisted["outer"]) + \
+        tile(unrolled_loop.replace(unrolled_footer, unrolled_footer + remainder_loop, 1), tile_loops, padding)
 
 if __name__ == "__main__":
     import doctest
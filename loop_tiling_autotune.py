@@ -0,0 +1,240 @@
+""" Autotuning of Loop Tile Sizes
+
+    The following script implements autotuning of the cache-blocking tile
+    sizes of loops generated by loop.simple_loop() (loop option
+    "tile_size=(T2,T1,T0)"). autotune_tile_sizes() takes a C function
+    already registered with outputC.add_to_Cfunction_dict(), compiles one
+    variant of it per candidate tile size (via cmdline_helper.new_C_compile()),
+    together with a main() that times each variant on a representative grid,
+    and records the fastest tile size for this C function and grid size in
+    a JSON database.
+
+    Later builds may apply the recorded tile sizes to C functions
+    registered with outputC with the loop option "tuned_tile_size"
+    (unless their loopopts already set tile_size) by setting the NRPy+
+    parameter tuned_tile_sizes_Nxx to the grid size of interest; the
+    loops of all other C functions are never changed. Tile sizes are
+    machine dependent, so the database is stored by default in the
+    user's cache directory.
+
+    NRPy+ parameters (all within module "loop_tiling_autotune"):
+        tile_size_database   : char, JSON file recording the fastest tile sizes
+        tuned_tile_sizes_Nxx : char, grid size "Nxx0,Nxx1,Nxx2" for which recorded tile sizes
+                               are applied to generated loops (default: "", disabled)
+"""
+
+import NRPy_param_funcs as par  # NRPy+: parameter interface
+import loop as lp               # NRPy+: C loop generation
+import json, os, re, sys        # Standard Python modules for JSON I/O, regular expressions, and multiplatform OS-level functions
+
+thismodule = __name__
+par.initialize_param(par.glb_param("char", thismodule, "tile_size_database",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "nrpy_tile_sizes.json")))
+par.initialize_param(par.glb_param("char", thismodule, "tuned_tile_sizes_Nxx", ""))
+
+# Tile sizes [T2, T1, T0] tried by default; 0 disables tiling in that direction.
+#   Untiled i0 loops keep full rows contiguous in memory (and in SIMD registers).
+default_tile_size_candidates = [[0, 0, 0], [0, 4, 0], [0, 8, 0], [0, 16, 0],
+                                [4, 4, 0], [8, 8, 0], [16, 16, 0], [4, 16, 0]]
+
+def Nxx_key(Nxx):
+    """ Database key of grid size Nxx = [Nxx0, Nxx1, Nxx2].
+
+        >>> Nxx_key([64, "32", 16])
+        '64x32x16'
+    """
+    return "x".join(str(int(n)) for n in Nxx)
+
+# Loaded tile size databases, keyed by filename: (modification time & size of the file, database).
+#   A database is read again only if its file has changed since it was loaded.
+_tile_size_databases = {}
+
+def load_tile_size_database(filename=None):
+    """ Return the tile size database stored in filename (default: tile_size_database), or {} if none.
+
+        >>> import tempfile
+        >>> filename = os.path.join(tempfile.mkdtemp(), "tile_sizes.json")
+        >>> load_tile_size_database(filename)
+        {}
+        >>> record_tile_size("rhs_eval", [64, 32, 16], [0, 8, 0], 1e-3, {}, filename=filename)
+        >>> tuned_tile_size("rhs_eval", [64, 32, 16], filename=filename)
+        [0, 8, 0]
+        >>> sorted(os.listdir(os.path.dirname(filename)))
+        ['tile_sizes.json']
+    """
+    if filename is None:
+        filename = par.parval_from_str(thismodule + "::tile_size_database")
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    if filename not in _tile_size_databases or _tile_size_databases[filename][0] != stamp:
+        with open(filename, "r") as file:
+            _tile_size_databases[filename] = (stamp, json.load(file))
+    return _tile_size_databases[filename][1]
+
+def record_tile_size(name, Nxx, tile_size, seconds_per_call, timings, filename=None):
+    """ Record the fastest tile size for C function name and grid size Nxx in the database. """
+    if filename is None:
+        filename = par.parval_from_str(thismodule + "::tile_size_database")
+    database = json.loads(json.dumps(load_tile_size_database(filename)))  # Copy; the loaded database is shared
+    database.setdefault(name, {})[Nxx_key(Nxx)] = {"tile_size": list(tile_size),
+                                                   "seconds_per_call": seconds_per_call,
+                                                   "timings": timings}
+    if os.path.dirname(filename) != "":
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+    # Write to a temporary file, then rename, so that concurrent or interrupted runs never leave a partial database.
+    tmpfilename = filename + ".tmp" + str(os.getpid())
+    with open(tmpfilename, "w") as file:
+        json.dump(database, file, indent=2, sort_keys=True)
+    os.replace(tmpfilename, filename)
+
+def tuned_tile_size(name, Nxx, filename=None):
+    """ Return the recorded tile size [T2, T1, T0] for C function name and grid size Nxx, or None if not recorded. """
+    entry = load_tile_size_database(filename).get(name, {}).get(Nxx_key(Nxx))
+    return None if entry is None else entry["tile_size"]
+
+def add_tuned_tile_size_to_loopopts(name, loopopts):
+    """ Replace the "tuned_tile_size" loop option of C function name by its recorded tile size,
+        if tuned_tile_sizes_Nxx is set. Called by outputC when registering C functions;
+        loopopts without the "tuned_tile_size" option are returned unchanged.
+
+        >>> import tempfile
+        >>> par.set_parval_from_str(thismodule + "::tile_size_database", os.path.join(tempfile.mkdtemp(), "tile_sizes.json"))
+        >>> record_tile_size("rhs_eval", [64, 32, 16], [0, 8, 0], 1e-3, {})
+        >>> add_tuned_tile_size_to_loopopts("rhs_eval", "InteriorPoints,tuned_tile_size")
+        'InteriorPoints'
+        >>> par.set_parval_from_str(thismodule + "::tuned_tile_sizes_Nxx", "64,32,16")
+        >>> add_tuned_tile_size_to_loopopts("rhs_eval", "InteriorPoints,tuned_tile_size")
+        'InteriorPoints,tile_size=(0,8,0)'
+        >>> add_tuned_tile_size_to_loopopts("rhs_eval", "InteriorPoints")
+        'InteriorPoints'
+    """
+    if "tuned_tile_size" not in loopopts:
+        return loopopts
+    loopopts = ",".join(opt for opt in loopopts.split(",") if opt.strip() != "tuned_tile_size")
+    Nxx = par.parval_from_str(thismodule + "::tuned_tile_sizes_Nxx")
+    if Nxx == "" or "Points" not in loopopts or "tile_size=" in loopopts:
+        return loopopts
+    tile_size = tuned_tile_size(name, Nxx.split(","))
+    if tile_size is None or all(int(size) == 0 for size in tile_size):
+        return loopopts
+    return loopopts + "," + lp.tile_size_loopopt(tile_size)
+
+def autotune_tile_sizes(Ccodesrootdir, name, Nxx, setup_Ccode, call_args, addl_Cfunctions=None,
+                        tile_size_candidates=None, num_calls=10, compiler_opt_option="fast",
+                        addl_CFLAGS=None, addl_libraries=None, record=True):
+    """ Time C function name with each candidate tile size, and record the fastest.
+
+        :arg:    C code root directory, containing NRPy_basic_defines.h and other headers needed by the C function
+        :arg:    name of the C function, as registered with outputC.add_to_Cfunction_dict()
+        :arg:    grid size [Nxx0, Nxx1, Nxx2] of the representative grid
+        :arg:    C code (within main()) that sets up & initializes all arguments of the C function on this grid
+        :arg:    arguments of the C function call, e.g., "&params, in_gfs, rhs_gfs"
+        :arg:    names of other registered C functions called by setup_Ccode, e.g., ["set_Cparameters_to_default"]
+        :arg:    list of tile sizes [T2, T1, T0] to try (default: default_tile_size_candidates)
+        :arg:    number of timed calls per tile size
+        :arg:    compiler optimization option, CFLAGS, and libraries, as in cmdline_helper.new_C_compile()
+        :arg:    record the fastest tile size in the tile size database
+        :return: (fastest tile size, dict of seconds per call, keyed by the tile size loop option)
+
+        The C function variants and the timing main() are compiled in the subdirectory
+        tile_autotune/ of Ccodesrootdir, which is added to the include path.
+        The C functions registered with outputC are restored on return.
+    """
+    import outputC as outC         # NRPy+: Core C code output module
+    import cmdline_helper as cmd   # NRPy+: Multi-platform Python command-line interface
+
+    if addl_Cfunctions is None:
+        addl_Cfunctions = []
+    if tile_size_candidates is None:
+        tile_size_candidates = default_tile_size_candidates
+    elements = {}
+    for Cfuncname in [name] + addl_Cfunctions:
+        matches = [item for item in outC.outC_function_master_list if item.name == Cfuncname]
+        if not matches:
+            print("Error (in autotune_tile_sizes): C function " + Cfuncname + "() has not been registered with outputC.")
+            sys.exit(1)
+        elements[Cfuncname] = matches[-1]
+    element = elements[name]
+    if "Points" not in element.loopopts:
+        print("Error (in autotune_tile_sizes): C function " + name + "() does not loop over grid points.")
+        sys.exit(1)
+    loopopts = re.sub(r',?tile_size=\([^()]*\)', '', element.loopopts)
+
+    # Compile only the C function variants and the timing main(), then restore the registered C functions.
+    saved = (list(outC.outC_function_master_list), dict(outC.outC_function_dict),
+             dict(outC.outC_function_prototype_dict), dict(outC.outC_function_outdir_dict),
+             dict(outC.outC_function_chunks_dict))
+    builddir = os.path.join(Ccodesrootdir, "tile_autotune")
+    try:
+        del outC.outC_function_master_list[:]
+        outC.outC_function_dict.clear()
+        outC.outC_function_prototype_dict.clear()
+        outC.outC_function_outdir_dict.clear()
+        outC.outC_function_chunks_dict.clear()
+
+        for Cfuncname in addl_Cfunctions:
+            outC.add_to_Cfunction_dict(**elements[Cfuncname]._asdict())
+        variant_names = []
+        for i, tile_size in enumerate(tile_size_candidates):
+            variant = element._replace(name=name + "__tile" + str(i),
+                                       loopopts=loopopts + "," + lp.tile_size_loopopt(tile_size))
+            outC.add_to_Cfunction_dict(**variant._asdict())
+            variant_names.append(variant.name)
+
+        body = setup_Ccode + "\n"
+        for i, variant_name in enumerate(variant_names):
+            body += """  {
+    // Warm up caches (and first touch memory), then time num_calls calls.
+    %s(%s);
+    struct timespec start, end;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    for (int n = 0; n < %d; n++) %s(%s);
+    clock_gettime(CLOCK_MONOTONIC, &end);
+    printf("%d %%.9e\\n", ((end.tv_sec - start.tv_sec) + 1e-9*(end.tv_nsec - start.tv_nsec)) / %d);
+  }
+""" % (variant_name, call_args, num_calls, variant_name, call_args, i, num_calls)
+        body += "  return 0;\n"
+        outC.add_to_Cfunction_dict(
+            includes=["NRPy_basic_defines.h", "time.h"],
+            prefunc="".join(outC.outC_function_prototype_dict[Cfuncname] + "\n" for Cfuncname in addl_Cfunctions + variant_names),
+            desc="Time " + name + "() with each candidate tile size; output: <candidate index> <seconds per call>",
+            c_type="int", name="main", params="int argc, const char *argv[]",
+            body=body, enableCparameters=False)
+
+        cmd.new_C_compile(builddir, "tile_autotune", compiler_opt_option=compiler_opt_option,
+                          addl_CFLAGS=["-I" + os.path.abspath(Ccodesrootdir)] + (addl_CFLAGS if addl_CFLAGS else []),
+                          addl_libraries=addl_libraries)
+    finally:
+        outC.outC_function_master_list[:] = saved[0]
+        outC.outC_function_dict.clear()
+        outC.outC_function_dict.update(saved[1])
+        outC.outC_function_prototype_dict.clear()
+        outC.outC_function_prototype_dict.update(saved[2])
+        outC.outC_function_outdir_dict.clear()
+        outC.outC_function_outdir_dict.update(saved[3])
+        outC.outC_function_chunks_dict.clear()
+        outC.outC_function_chunks_dict.update(saved[4])
+
+    timings_file = os.path.join(builddir, "tile_autotune_timings.txt")
+    cmd.Execute_input_string(os.path.join(os.path.abspath(builddir), "tile_autotune"), timings_file)
+    timings = {}
+    with open(timings_file, "r") as file:
+        for line in file:
+            index, seconds = line.split()
+            timings[lp.tile_size_loopopt(tile_size_candidates[int(index)])] = float(seconds)
+    if len(timings) != len(tile_size_candidates):
+        print("Error (in autotune_tile_sizes): Timing run of " + name + "() did not complete.")
+        sys.exit(1)
+    best = min(range(len(tile_size_candidates)),
+               key=lambda i: timings[lp.tile_size_loopopt(tile_size_candidates[i])])
+    best_tile_size = list(tile_size_candidates[best])
+    if record:
+        record_tile_size(name, Nxx, best_tile_size, timings[lp.tile_size_loopopt(best_tile_size)], timings)
+    return best_tile_size, timings
+
+if __name__ == "__main__":
+    import doctest
+    sys.exit(doctest.testmod()[0])
@@ -12,12 +12,20 @@
 __all__ = ['lhrh', 'outCparams', 'nrpyAbs', 'superfast_uniq', 'check_if_string__error_if_not',
            'outputC', 'parse_outCparams_string',
            'outC_NRPy_basic_defines_h_dict',
-           'outC_function_prototype_dict', 'outC_function_dict', 'Cfunction', 'add_to_Cfunction_dict', 'outCfunction']
+           'outC_function_prototype_dict', 'outC_function_dict', 'Cfunction', 'Cfunction_chunks', 'add_to_Cfunction_dict',
+           'outCfunction']
 
 import loop as lp                             # NRPy+: C code loop interface
 import NRPy_param_funcs as par                # NRPy+: parameter interface
 from SIMD import expr_convert_to_SIMD_intrins # NRPy+: SymPy expression => SIMD intrinsics interface
-from cse_helpers import cse_preprocess,cse_postprocess  # NRPy+: CSE preprocessing and postprocessing
+from cse_helpers import cse_preprocess,cse_postprocess,cse_partitioned  # NRPy+: CSE preprocessing, postprocessing, and partitioning
+from cse_helpers import cse_symengine,cse_outputs_agree  # NRPy+: CSE with SymEngine and its validation
+from cse_helpers import cse_hoist_reciprocals,cse_reduce_powers  # NRPy+: CSE division elimination and power strength reduction
+from cse_helpers import cse_schedule,cse_peak_live  # NRPy+: Register-pressure-aware scheduling of CSE output
+from cse_helpers import cse_loop_invariants  # NRPy+: Loop-invariant analysis of CSE output
+import outputC_cache as outCcache             # NRPy+: Content-addressed on-disk cache of outputC() results
+import outputC_profiler as outCprof           # NRPy+: Opt-in per-phase profiling of outputC() and FD_outputC()
+import loop_tiling_autotune as lptune         # NRPy+: Autotuned tile sizes of generated loops
 import sympy as sp                            # SymPy: The Python computer algebra package upon which NRPy+ depends
 import re, sys, os, stat                      # Standard Python: regular expressions, system, and multiplatform OS funcs
 from collections import namedtuple            # Standard Python: Enable namedtuple data type
@@ -26,7 +34,7 @@ from grid import find_gftype
 from var_access import var_from_access
 
 lhrh = namedtuple('lhrh', 'lhs rhs')
-outCparams = namedtuple('outCparams', 'preindent includebraces declareoutputvars outCfileaccess outCverbose CSE_enable CSE_varprefix CSE_sorting CSE_preprocess enable_SIMD SIMD_find_more_subs SIMD_find_more_FMAsFMSs SIMD_debug enable_TYPE')
+outCparams = namedtuple('outCparams', 'preindent includebraces declareoutputvars outCfileaccess outCverbose CSE_enable CSE_varprefix CSE_sorting CSE_preprocess enable_SIMD SIMD_find_more_subs SIMD_find_more_FMAsFMSs SIMD_debug enable_TYPE CSE_partitions CSE_hoist_reciprocals CSE_reduce_powers CSE_schedule CSE_backend CSE_backend_validate CSE_hoist_loop_invariants CSE_preprocess_shared FD_unroll_i0 FD_upwind_branch FD_NGHOSTS')
 
 # Sometimes SymPy has problems evaluating complicated expressions involving absolute
 #    values, resulting in hangs. So instead of using sp.Abs(), if we instead use
@@ -35,8 +43,8 @@ outCparams = namedtuple('outCparams', 'preindent includebraces declareoutputvars
 nrpyAbs = sp.Function('nrpyAbs')
 custom_functions_for_SymPy_ccode = {
     "nrpyAbs": "fabs",
-    'Pow': [(lambda b, e: e == 0.5, lambda b, e: 'sqrt(%s)'     % (b)),
-            (lambda b, e: e ==-0.5, lambda b, e: '(1.0/sqrt(%s))'     % (b)),
+    'Pow': [(lambda b, e: e == sp.S.Half, lambda b, e: 'sqrt(%s)'     % (b)),
+            (lambda b, e: e ==-sp.S.Half, lambda b, e: '(1.0/sqrt(%s))'     % (b)),
             (lambda b, e: e == sp.S.One/3, lambda b, e: 'cbrt(%s)' % (b)),
             (lambda b, e: e ==-sp.S.One/3, lambda b, e: '(1.0/cbrt(%s))' % (b)),
             (lambda b, e: e == 2, lambda b, e: '((%s)*(%s))'                % (b,b)),
@@ -205,6 +213,10 @@ def map_synthesize_muladd(expr):
 
 # Parameter initialization is called once, within nrpy.py.
 par.initialize_param(par.glb_param("char", __name__, "PRECISION", "double")) # __name__ = "outputC", this module's name.
+# If stream_Cfunctions is True, add_to_Cfunction_dict() does not store each complete C function as a
+#   string in outC_function_dict. Instead, construct_Makefile_from_outC_function_dict() writes each
+#   function to its file chunk by chunk, from outC_function_chunks_dict; see outC_function_chunks().
+par.initialize_param(par.glb_param("bool", __name__, "stream_Cfunctions", False))
 # par.initialize_param(par.glb_param("bool", thismodule, "enable_SIMD", False))
 
 # super fast 'uniq' function:
@@ -216,18 +228,17 @@ def superfast_uniq(seq): # Author: Dave Kirby
 
 
 def indent_Ccode(Ccode, indent="  "):
-    Ccodesplit = Ccode.splitlines()
-    outstring = ""
-    for i in range(len(Ccodesplit)):
-        if Ccodesplit[i] != "":
-            if Ccodesplit[i].lstrip().startswith("#"):
+    outlines = []
+    for line in Ccode.splitlines():
+        if line != "":
+            if line.lstrip().startswith("#"):
                 # Remove all indentation from preprocessor statements (lines that start with "#")
-                outstring += Ccodesplit[i].lstrip() + '\n'
+                outlines.append(line.lstrip() + '\n')
             else:
-                outstring += indent + Ccodesplit[i] + '\n'
+                outlines.append(indent + line + '\n')
         else:
-            outstring += '\n'
-    return outstring.rstrip(" ")  # make sure to remove trailing whitespace!
+            outlines.append('\n')
+    return "".join(outlines).rstrip(" ")  # make sure to remove trailing whitespace!
 
 
 def check_if_string__error_if_not(allegedstring, stringdesc):
@@ -289,6 +300,17 @@ def parse_outCparams_string(params):
     SIMD_find_more_FMAsFMSs = "True" # Finding too many FMAs/FMSs can degrade performance; currently tuned to optimize BSSN
     SIMD_debug = "False"
     enable_TYPE = "True"
+    CSE_partitions = "1"  # Number of partitions for parallel CSE; "1" disables partitioning
+    CSE_hoist_reciprocals = "False"  # Replace repeated divisions by the same denominator with multiplications by its reciprocal
+    CSE_reduce_powers = "False"  # Compute integer & half-integer powers from shared reciprocals, square roots, and squares
+    CSE_schedule = "False"  # Reorder CSE temporaries & output assignments to reduce the number of simultaneously live temporaries
+    CSE_backend = "sympy"  # "sympy" or "symengine"; CSE with SymEngine (if installed) is much faster than with SymPy
+    CSE_backend_validate = "False"  # Check CSE by SymEngine against CSE by SymPy, at random points
+    CSE_hoist_loop_invariants = "False"  # Mark CSE temporaries independent of i0 for loop.simple_loop() to hoist out of the i0 loop
+    CSE_preprocess_shared = "False"  # In CSE preprocessing, rewrite each distinct subexpression of all expressions only once
+    FD_unroll_i0 = "1"  # FD_outputC: unroll i0 by this factor, reading each gridfunction value once per unrolled block; requires loop.simple_loop()
+    FD_upwind_branch = "False"  # FD_outputC: branch on the sign of the upwind control vector, evaluating only the needed one-sided stencil
+    FD_NGHOSTS = ""  # FD_outputC: if set, error out if any unmixed third derivative stencil extends beyond this many ghost zones
 
     if params != "":
         params2 = re.sub("^,","",params)
@@ -345,6 +367,40 @@ def parse_outCparams_string(params):
                 SIMD_debug = value[i]
             elif parname == "enable_TYPE":
                 enable_TYPE = value[i]
+            elif parname == "CSE_partitions":
+                if not value[i].isdigit() or int(value[i]) < 1:
+                    print("Error: CSE_partitions must be set to a positive integer. "+value[i]+" is not.")
+                    sys.exit(1)
+                CSE_partitions = value[i]
+            elif parname == "CSE_hoist_reciprocals":
+                CSE_hoist_reciprocals = value[i]
+            elif parname == "CSE_reduce_powers":
+                CSE_reduce_powers = value[i]
+            elif parname == "CSE_schedule":
+                CSE_schedule = value[i]
+            elif parname == "CSE_backend":
+                if value[i] not in ("sympy", "symengine"):
+                    print("Error: CSE_backend must be set to \"sympy\" or \"symengine\". "+value[i]+" is not.")
+                    sys.exit(1)
+                CSE_backend = value[i]
+            elif parname == "CSE_backend_validate":
+                CSE_backend_validate = value[i]
+            elif parname == "CSE_hoist_loop_invariants":
+                CSE_hoist_loop_invariants = value[i]
+            elif parname == "CSE_preprocess_shared":
+                CSE_preprocess_shared = value[i]
+            elif parname == "FD_unroll_i0":
+                if not value[i].isdigit() or int(value[i]) < 1:
+                    print("Error: FD_unroll_i0 must be set to a positive integer. "+value[i]+" is not.")
+                    sys.exit(1)
+                FD_unroll_i0 = value[i]
+            elif parname == "FD_upwind_branch":
+                FD_upwind_branch = value[i]
+            elif parname == "FD_NGHOSTS":
+                if not value[i].isdigit():
+                    print("Error: FD_NGHOSTS must be set to a nonnegative integer. "+value[i]+" is not.")
+                    sys.exit(1)
+                FD_NGHOSTS = value[i]
             elif parname == "GoldenKernelsEnable" and value[i] == "True":
                 # GoldenKernelsEnable==True enables the most optimized kernels,
                 #   at the expense of ~3x longer codegen runtimes.
@@ -370,14 +426,18 @@ def parse_outCparams_string(params):
     return outCparams(preindent,includebraces,declareoutputvars,outCfileaccess,outCverbose,
                       CSE_enable,CSE_varprefix,CSE_sorting,CSE_preprocess,
                       enable_SIMD,SIMD_find_more_subs,SIMD_find_more_FMAsFMSs,SIMD_debug,
-                      enable_TYPE)
+                      enable_TYPE,CSE_partitions,CSE_hoist_reciprocals,CSE_reduce_powers,CSE_schedule,
+                      CSE_backend,CSE_backend_validate,CSE_hoist_loop_invariants,CSE_preprocess_shared,FD_unroll_i0,
+                      FD_upwind_branch,FD_NGHOSTS)
 
 # Input: sympyexpr = a single SymPy expression *or* a list of SymPy expressions
 #        output_varname_str = a single output variable name *or* a list of output
 #                             variable names, one per sympyexpr.
 # Output: C code, as a string.
+@outCprof.profiled("outputC")
 def outputC(sympyexpr, output_varname_str, filename = "stdout", params = "", prestring = "", poststring = ""):
     outCparams = parse_outCparams_string(params)
+    prof = outCprof.current_record()
     preindent = outCparams.preindent
     TYPE = par.parval_from_str("PRECISION")
 
@@ -388,8 +448,10 @@ def outputC(sympyexpr, output_varname_str, filename = "stdout", params = "", pre
     #  commentblock: comment block containing the input SymPy string,
     #                set only if outCverbose==True
     #  outstring:    the output C code string
-    commentblock = ""
-    outstring = ""
+    #  Both are accumulated as lists of chunks and joined once in Step 7,
+    #    as repeated string concatenation is quadratic in the output size.
+    commentblock = []
+    outstring = []
 
     # Step 1: If enable_SIMD==True, then check if TYPE=="double". If not, error out.
     #         Otherwise set TYPE="REAL_SIMD_ARRAY", which should be #define'd
@@ -424,31 +486,47 @@ def outputC(sympyexpr, output_varname_str, filename = "stdout", params = "", pre
         sympyexprtmp = [sympyexpr]
         sympyexpr = sympyexprtmp
     sympyexpr = sympyexpr[:]  # pass-by-value (copy list)
+    if prof:
+        prof.set_stat("num_exprs", len(sympyexpr))
+        prof.set_stat("tree_size", outCprof.expr_tree_size(sympyexpr))
+
+    # Step 2c: If the outputC cache is enabled, look up the final C code
+    #          string. On a cache hit, skip all symbolic work.
+    cache_key = None
+    if outCcache.outputC_cache_is_enabled():
+        gftypes = [find_gftype(var_from_access(nm), die=False) for nm in output_varname_str]
+        cache_key = outCcache.outputC_cache_key(sympyexpr, output_varname_str, outCparams,
+                                                prestring, poststring, gftypes)
+        cached_Ccode = outCcache.outputC_cache_load(cache_key)
+        if cached_Ccode is not None:
+            prof.set_stat("cache_hit", True)
+            with prof.phase("output"):
+                return output_Ccode_string(cached_Ccode, filename, outCparams.outCfileaccess)
 
     # Step 3: If outCparams.verbose = True, then output the original SymPy
     #         expression(s) in code comments prior to actual C code
     if outCparams.outCverbose == "True":
-        commentblock += preindent+"/*\n"+preindent+" *  Original SymPy expression"
+        commentblock.append(preindent+"/*\n"+preindent+" *  Original SymPy expression")
         if len(output_varname_str)>1:
-            commentblock += "s"
-        commentblock += ":\n"
+            commentblock.append("s")
+        commentblock.append(":\n")
         for i, varname in enumerate(output_varname_str):
             if i == 0:
                 if len(output_varname_str) != 1:
-                    commentblock += preindent+" *  \"["
+                    commentblock.append(preindent+" *  \"[")
                 else:
-                    commentblock += preindent+" *  \""
+                    commentblock.append(preindent+" *  \"")
             else:
-                commentblock += preindent+" *    "
-            commentblock += varname + " = " + str(sympyexpr[i])
+                commentblock.append(preindent+" *    ")
+            commentblock.append(varname + " = " + str(sympyexpr[i]))
             if i == len(output_varname_str)-1:
                 if len(output_varname_str) != 1:
-                    commentblock += "]\"\n"
+                    commentblock.append("]\"\n")
                 else:
-                    commentblock += "\"\n"
+                    commentblock.append("\"\n")
             else:
-                commentblock += ",\n"
-        commentblock += preindent+" */\n"
+                commentblock.append(",\n")
+        commentblock.append(preindent+" */\n")
 
     # Step 4: Add proper indentation of C code:
     if outCparams.includebraces == "True":
@@ -469,37 +547,55 @@ def outputC(sympyexpr, output_varname_str, filename = "stdout", params = "", pre
     #         nearly consistent with SymPy's ccode() function,
     #         though with support for float & long double types
     #         as well.
-    SIMD_RATIONAL_decls = RATIONAL_decls = ""
+    # RATIONAL_decls and SIMD_RATIONAL_decls hold one declaration per constant, named in RATIONAL_varnms & SIMD_const_varnms
+    SIMD_RATIONAL_decls = []
+    RATIONAL_decls = []
+    RATIONAL_varnms = []
+    SIMD_const_varnms = []
+    # C code of CSE temporaries to be hoisted out of the innermost loop, keyed by loop level (see loop.hoisting_levels)
+    hoisted_Ccode = {level: [] for level in lp.hoisting_levels}
+
+    def ccode_and_postproc(expr, assign_to):
+        with prof.phase("ccode"):
+            Ccode = sp.ccode(dosubs(expr), assign_to, user_functions=custom_functions_for_SymPy_ccode)
+        with prof.phase("ccode_postproc"):
+            return ccode_postproc(Ccode)
 
     if outCparams.CSE_enable == "False":
         # If CSE is disabled:
         # Synthesizing `muladd` calls seems to slow down the code
         # sympyexpr = list(map(map_synthesize_muladd, sympyexpr))
         for i in range(len(sympyexpr)):
-            outstring += outtypestring + ccode_postproc(sp.ccode(dosubs(sympyexpr[i]), output_varname_str[i],
-                                                                 user_functions=custom_functions_for_SymPy_ccode))+"\n"
+            outstring.append(outtypestring + ccode_and_postproc(sympyexpr[i], output_varname_str[i])+"\n")
+        prof.set_stat("num_exprs", len(sympyexpr), phase="ccode")
     # Step 6b: If CSE enabled, then perform CSE using SymPy and then
     #          resulting C code.
     else:
         # If CSE is enabled:
-        SIMD_const_varnms = []
         SIMD_const_values = []
+        map_sym_to_rat = {}
 
         varprefix = '' if outCparams.CSE_varprefix == 'tmp' else outCparams.CSE_varprefix
         if outCparams.CSE_preprocess == "True" or outCparams.enable_SIMD == "True":
             # If CSE_preprocess == True, then perform partial factorization
             # If enable_SIMD == True, then declare _NegativeOne_ in preprocessing
             factor_negative = eval(outCparams.enable_SIMD) and eval(outCparams.SIMD_find_more_subs)
-            sympyexpr, map_sym_to_rat = cse_preprocess(sympyexpr, prefix=varprefix,
-                declare=eval(outCparams.enable_SIMD), negative=factor_negative, factor=eval(outCparams.CSE_preprocess))
+            with prof.phase("cse_preprocess"):
+                sympyexpr, map_sym_to_rat = cse_preprocess(sympyexpr, prefix=varprefix,
+                    declare=eval(outCparams.enable_SIMD), negative=factor_negative, factor=eval(outCparams.CSE_preprocess),
+                    shared=eval(outCparams.CSE_preprocess_shared))
+            if prof:
+                prof.set_stat("num_exprs", len(sympyexpr), phase="cse_preprocess")
+                prof.set_stat("tree_size", outCprof.expr_tree_size(sympyexpr), phase="cse_preprocess")
             for v in map_sym_to_rat:
                 p, q = float(map_sym_to_rat[v].p), float(map_sym_to_rat[v].q)
                 if outCparams.enable_SIMD == "False":
-                    RATIONAL_decls += indent + 'const double ' + str(v) + ' = '
                     # Since Integer is a subclass of Rational in SymPy, we need only check whether
                     # the denominator q = 1 to determine if a rational is an integer.
-                    if q != 1: RATIONAL_decls += str(p) + '/' + str(q) + ';\n'
-                    else:      RATIONAL_decls += str(p) + ';\n'
+                    if q != 1: value = str(p) + '/' + str(q)
+                    else:      value = str(p)
+                    RATIONAL_decls.append(indent + 'const double ' + str(v) + ' = ' + value + ';\n')
+                    RATIONAL_varnms.append(str(v))
 
         #####
         # Prior to the introduction of the SCALAR_TMP type, NRPy+
@@ -544,34 +640,106 @@ def outputC(sympyexpr, output_varname_str, filename = "stdout", params = "", pre
             CSE_results = sp.cse(sympyexpr_group, sp.numbered_symbols(outCparams.CSE_varprefix),
                                  order=outCparams.CSE_sorting)
         else:
-            CSE_tmp = sp.cse(sympyexpr_group, sp.numbered_symbols(outCparams.CSE_varprefix),
-                                                 order=outCparams.CSE_sorting)
-            CSE_results = cse_postprocess(CSE_tmp)
+            CSE_tmp = None
+            # Neither SymEngine nor partitioned CSE (yet) respect the ordering requirements of SCALAR_TMPs (sp.Eq objects)
+            contains_Eq = any(isinstance(expr, sp.Eq) for expr in sympyexpr_group)
+            if outCparams.CSE_backend == "symengine" and not contains_Eq:
+                with prof.phase("cse"):
+                    CSE_tmp = cse_symengine(sympyexpr_group, sp.numbered_symbols(outCparams.CSE_varprefix),
+                                            order=outCparams.CSE_sorting)
+                if CSE_tmp is not None and outCparams.CSE_backend_validate == "True":
+                    with prof.phase("cse_backend_validate"):
+                        CSE_reference = sp.cse(sympyexpr_group, sp.numbered_symbols(outCparams.CSE_varprefix),
+                                               order=outCparams.CSE_sorting)
+                        agree = cse_outputs_agree(CSE_tmp, CSE_reference)
+                    if agree is False:
+                        print("Error: CSE by SymEngine and SymPy yield numerically different expressions for "+str(names_group)+".")
+                        sys.exit(1)
+                    if agree is None:
+                        print("Warning: Could not numerically validate CSE by SymEngine for "+str(names_group)+".")
+            if CSE_tmp is None and int(outCparams.CSE_partitions) > 1 and len(sympyexpr_group) > 1 and not contains_Eq:
+                with prof.phase("cse"):
+                    CSE_tmp = cse_partitioned(sympyexpr_group, sp.numbered_symbols(outCparams.CSE_varprefix),
+                                              order=outCparams.CSE_sorting, num_partitions=int(outCparams.CSE_partitions))
+            elif CSE_tmp is None:
+                with prof.phase("cse"):
+                    CSE_tmp = sp.cse(sympyexpr_group, sp.numbered_symbols(outCparams.CSE_varprefix),
+                                                         order=outCparams.CSE_sorting)
+            with prof.phase("cse_postprocess"):
+                CSE_results = cse_postprocess(CSE_tmp)
+        if outCparams.CSE_hoist_reciprocals == "True":
+            # Replace repeated divisions by the same denominator with multiplications by its reciprocal
+            with prof.phase("cse_hoist_reciprocals"):
+                CSE_results = cse_hoist_reciprocals(CSE_results, sp.numbered_symbols(outCparams.CSE_varprefix),
+                                                    map_sym_to_rat=map_sym_to_rat)
+        if outCparams.CSE_reduce_powers == "True":
+            # Replace pow() calls by multiplications of shared reciprocals, square roots, and squares
+            with prof.phase("cse_reduce_powers"):
+                CSE_results = cse_reduce_powers(CSE_results, sp.numbered_symbols(outCparams.CSE_varprefix),
+                                                map_sym_to_rat=map_sym_to_rat)
+        if prof:
+            prof.set_stat("num_exprs", len(sympyexpr_group), phase="cse")
+            prof.set_stat("num_CSE_temps", len(CSE_results[0]), phase="cse_postprocess")
+            prof.set_stat("tree_size", outCprof.expr_tree_size([rhs for _, rhs in CSE_results[0]] + list(CSE_results[1])),
+                          phase="cse_postprocess")
 
         # cse_postprocess moves SCALAR_TMP out of the group
         sympyexpr_group = sympyexpr_group2
         names_group = names_group2
 
-        for commonsubexpression in CSE_results[0]:
-            FULLTYPESTRING = "const " + TYPE + " "
-            if outCparams.enable_TYPE == "False":
-                FULLTYPESTRING = ""
-
-            if outCparams.enable_SIMD == "True":
-                outstring += indent + FULLTYPESTRING + str(commonsubexpression[0]) + " = " + \
-                             str(expr_convert_to_SIMD_intrins(commonsubexpression[1],map_sym_to_rat,varprefix,outCparams.SIMD_find_more_FMAsFMSs)) + ";\n"
-            else:
-                outstring += indent + FULLTYPESTRING + ccode_postproc(sp.ccode(dosubs(commonsubexpression[1]), commonsubexpression[0],
-                                                                user_functions=custom_functions_for_SymPy_ccode)) + "\n"
-
-        for i, result in enumerate(CSE_results[1]):
-            if outCparams.enable_SIMD == "True":
-                outstring += outtypestring + names_group[i] + " = " + \
-                             str(expr_convert_to_SIMD_intrins(result,map_sym_to_rat,varprefix,outCparams.SIMD_find_more_FMAsFMSs)) + ";\n"
+        # Loop level (see loop.hoisting_levels) of each CSE temporary; None for the innermost loop
+        CSE_loop_levels = [None] * len(CSE_results[0])
+        if outCparams.CSE_hoist_loop_invariants == "True":
+            # CSE temporaries and subexpressions independent of the innermost loop index i0 (e.g., functions of
+            #   only xx1, xx2 and C parameters) are emitted between hoisting markers, to be moved by
+            #   loop.simple_loop() to the outermost loop level at which they can be evaluated.
+            with prof.phase("cse_hoist_loop_invariants"):
+                invariant_varnms = {Cparam.parname for Cparam in par.glb_Cparams_list} | set(map(str, map_sym_to_rat))
+                CSE_results, CSE_loop_indices = cse_loop_invariants(CSE_results,
+                        lambda sym: lp.loop_indices_of_variable(str(sym), invariant_varnms), prefix=outCparams.CSE_varprefix)
+                CSE_loop_levels = [lp.hoisting_level(indices) if indices is not None else None for indices in CSE_loop_indices]
+            prof.set_stat("num_hoisted_temps", len(CSE_loop_levels) - CSE_loop_levels.count(None), phase="cse_hoist_loop_invariants")
+
+        # Statement i < len(CSE_results[0]) defines CSE temporary CSE_results[0][i];
+        #   statement i >= len(CSE_results[0]) assigns output CSE_results[1][i - len(CSE_results[0])]
+        num_CSE_temps = len(CSE_results[0])
+        statement_order = range(num_CSE_temps + len(CSE_results[1]))
+        if outCparams.CSE_schedule == "True":
+            # Interleave CSE temporaries and output assignments to shorten the live ranges of the
+            #   temporaries. Statements reading a variable overwritten by an output keep their order
+            #   relative to that output.
+            with prof.phase("cse_schedule"):
+                statement_order = cse_schedule(CSE_results, output_varnames=[var_from_access(nm) for nm in names_group])
+                peak_live_unscheduled = cse_peak_live(CSE_results)
+                peak_live = cse_peak_live(CSE_results, statement_order)
+            prof.set_stat("peak_live_unscheduled", peak_live_unscheduled, phase="cse_schedule")
+            prof.set_stat("peak_live", peak_live, phase="cse_schedule")
+            if outCparams.outCverbose == "True":
+                outstring.append(indent + "// Register-pressure-aware schedule: at most " + str(peak_live) +
+                                 " CSE temporaries simultaneously live (" + str(peak_live_unscheduled) + " unscheduled)\n")
+
+        FULLTYPESTRING = "const " + TYPE + " "
+        if outCparams.enable_TYPE == "False":
+            FULLTYPESTRING = ""
+        for statement in statement_order:
+            if statement < num_CSE_temps:
+                commonsubexpression = CSE_results[0][statement]
+                Ccode = hoisted_Ccode[CSE_loop_levels[statement]] if CSE_loop_levels[statement] else outstring
+                if outCparams.enable_SIMD == "True":
+                    with prof.phase("SIMD"):
+                        Ccode.append(indent + FULLTYPESTRING + str(commonsubexpression[0]) + " = " +
+                                     str(expr_convert_to_SIMD_intrins(commonsubexpression[1],map_sym_to_rat,varprefix,outCparams.SIMD_find_more_FMAsFMSs)) + ";\n")
+                else:
+                    Ccode.append(indent + FULLTYPESTRING + ccode_and_postproc(commonsubexpression[1], commonsubexpression[0]) + "\n")
             else:
-                result = dosubs(result)
-                outstring += outtypestring+ccode_postproc(sp.ccode(result,names_group[i],
-                                                                   user_functions=custom_functions_for_SymPy_ccode))+"\n"
+                i = statement - num_CSE_temps
+                result = CSE_results[1][i]
+                if outCparams.enable_SIMD == "True":
+                    with prof.phase("SIMD"):
+                        outstring.append(outtypestring + names_group[i] + " = " +
+                                         str(expr_convert_to_SIMD_intrins(result,map_sym_to_rat,varprefix,outCparams.SIMD_find_more_FMAsFMSs)) + ";\n")
+                else:
+                    outstring.append(outtypestring+ccode_and_postproc(result, names_group[i])+"\n")
         # Finish processing a group
 
         # Complication: SIMD functions require numerical constants to be stored in SIMD arrays
@@ -604,20 +772,52 @@ def outputC(sympyexpr, output_varname_str, filename = "stdout", params = "", pre
 
             for i in range(len(SIMD_const_varnms)):
                 if outCparams.enable_TYPE == "False":
-                    SIMD_RATIONAL_decls += indent + SIMD_const_varnms[i] + " = " + SIMD_const_values[i]+";"
+                    SIMD_RATIONAL_decls.append(indent + SIMD_const_varnms[i] + " = " + SIMD_const_values[i]+";\n")
+                else:
+                    SIMD_RATIONAL_decls.append(indent + "const double " + "tmp" + SIMD_const_varnms[i] + " = " + SIMD_const_values[i] + ";\n" +
+                                               indent + "const REAL_SIMD_ARRAY " + SIMD_const_varnms[i] + " = ConstSIMD(" + "tmp" + SIMD_const_varnms[i] + ");\n\n")
+
+    # Step 6c: If CSE temporaries are hoisted out of the innermost loop, declare each constant
+    #          at the outermost loop level at which it is used (together with the hoisted temporaries).
+    hoisted_decls = {level: [] for level in lp.hoisting_levels}
+    if any(hoisted_Ccode.values()):
+        varnms_at_level = {level: set(re.findall(r"\w+", "".join(hoisted_Ccode[level]))) for level in lp.hoisting_levels}
+        for varnms, decls in [(RATIONAL_varnms, RATIONAL_decls), (SIMD_const_varnms, SIMD_RATIONAL_decls)]:
+            innermost_decls = []
+            for varnm, decl in zip(varnms, decls):
+                level = next((level for level in lp.hoisting_levels if varnm in varnms_at_level[level]), None)
+                if level is None:
+                    innermost_decls.append(decl)
                 else:
-                    SIMD_RATIONAL_decls += indent + "const double " + "tmp" + SIMD_const_varnms[i] + " = " + SIMD_const_values[i] + ";\n"
-                    SIMD_RATIONAL_decls += indent + "const REAL_SIMD_ARRAY " + SIMD_const_varnms[i] + " = ConstSIMD(" + "tmp" + SIMD_const_varnms[i] + ");\n"
-                SIMD_RATIONAL_decls += "\n"
+                    hoisted_decls[level].append(decl)
+            decls[:] = innermost_decls
 
     # Step 7: Construct final output string
-    final_Ccode_output_str = commentblock
+    final_Ccode_output_chunks = commentblock
     # Step 7a: Output C code in indented curly brackets if
     #          outCparams.includebraces = True
-    if outCparams.includebraces == "True": final_Ccode_output_str += outCparams.preindent+"{\n"
-    final_Ccode_output_str += prestring + RATIONAL_decls + SIMD_RATIONAL_decls + outstring + poststring
-    if outCparams.includebraces == "True": final_Ccode_output_str += outCparams.preindent+"}\n"
-
+    if outCparams.includebraces == "True": final_Ccode_output_chunks.append(outCparams.preindent+"{\n")
+    final_Ccode_output_chunks.append(prestring)
+    for level in lp.hoisting_levels:
+        if hoisted_Ccode[level]:
+            begin_marker, end_marker = lp.hoisting_markers(level)
+            final_Ccode_output_chunks.append(indent + begin_marker + "\n")
+            final_Ccode_output_chunks.extend(hoisted_decls[level] + hoisted_Ccode[level])
+            final_Ccode_output_chunks.append(indent + end_marker + "\n")
+    final_Ccode_output_chunks.extend(RATIONAL_decls + SIMD_RATIONAL_decls + outstring)
+    final_Ccode_output_chunks.append(poststring)
+    if outCparams.includebraces == "True": final_Ccode_output_chunks.append(outCparams.preindent+"}\n")
+    final_Ccode_output_str = "".join(final_Ccode_output_chunks)
+
+    # Step 7b: Store the final C code in the outputC cache, if enabled
+    if cache_key is not None:
+        outCcache.outputC_cache_store(cache_key, final_Ccode_output_str)
+
+    prof.set_stat("num_bytes", len(final_Ccode_output_str), phase="output")
+    with prof.phase("output"):
+        return output_Ccode_string(final_Ccode_output_str, filename, outCparams.outCfileaccess)
+
+def output_Ccode_string(final_Ccode_output_str, filename, outCfileaccess):
     # Step 8: If filename == "stdout", then output
     #         C code to standard out (useful for copy-paste or interactive
     #         mode). Otherwise output to file specified in variable name.
@@ -628,90 +828,127 @@ def outputC(sympyexpr, output_varname_str, filename = "stdout", params = "", pre
         return final_Ccode_output_str
     else:
         # Output to the file specified by the function input parameter string 'filename':
-        with open(filename, outCparams.outCfileaccess) as file:
+        with open(filename, outCfileaccess) as file:
             file.write(final_Ccode_output_str)
         successstr = ""
-        if outCparams.outCfileaccess == "a":
+        if outCfileaccess == "a":
             successstr = "Appended "
-        elif outCparams.outCfileaccess == "w":
+        elif outCfileaccess == "w":
             successstr = "Wrote "
         print(successstr + "to file \"" + filename + "\"")
 
 from defines_dict import outC_NRPy_basic_defines_h_dict 
 
 outC_function_prototype_dict = {}
-outC_function_dict           = {}
 outC_function_outdir_dict    = {}
 outC_function_element = namedtuple('outC_function_element', 'includes prefunc desc c_type name params preloop body loopopts postloop enableCparameters rel_path_to_Cparams')
 outC_function_master_list = []
 
-def Cfunction(includes=None, prefunc="", desc="", c_type="void", name=None, params=None, preloop="", body=None,
-              loopopts="", postloop="", enableCparameters=True, rel_path_to_Cparams=os.path.join("./")):
+def _Cfunction_check_args(includes, name, params, body):
     if name is None or params is None or body is None: # use "is None" instead of "==None", as the former is more correct.
         print("Cfunction() error: strings must be provided for function name, parameters, and body")
         sys.exit(1)
-    func_prototype = c_type+" "+name+"("+params+")"
-
-    include_Cparams_str = ""
-    if enableCparameters:
-        if "enable_SIMD" in loopopts or "SIMD_width" in body:  # If using manual SIMD looping, SIMD_width will appear in body.
-            include_Cparams_str = "#include \"" + os.path.join(rel_path_to_Cparams, "set_Cparameters-SIMD.h") + "\"\n"
-        else:
-            include_Cparams_str = "#include \"" + os.path.join(rel_path_to_Cparams, "set_Cparameters.h") + "\"\n"
+    if includes is not None and not isinstance(includes, list):
+        print("Error in Cfunction(name="+name+"): includes must be set to a list of strings")
+        print("e.g., includes=[\"stdio.h\",\"stdlib.h\"] ;  or None (default)")
+        print("Found includes = " + str(includes))
+        sys.exit(1)
 
-    complete_func = ""
+def Cfunction_chunks(includes=None, prefunc="", desc="", c_type="void", name=None, params=None, preloop="", body=None,
+                     loopopts="", postloop="", enableCparameters=True, rel_path_to_Cparams=os.path.join("./")):
+    """ Generate the complete C function returned by Cfunction() as a sequence of string chunks,
+        e.g., to write it to a file without first assembling it into a single string.
+        Arguments are as in Cfunction(), but are not checked.
+    """
     if includes is not None:
-        if not isinstance(includes, list):
-            print("Error in Cfunction(name="+name+"): includes must be set to a list of strings")
-            print("e.g., includes=[\"stdio.h\",\"stdlib.h\"] ;  or None (default)")
-            print("Found includes = " + str(includes))
-            sys.exit(1)
         for inc in includes:
             if "<" in inc:  # for C++ style code e.g., #include <cstdio>
-                complete_func += "#include " + inc + "\n"
+                yield "#include " + inc + "\n"
             else:
                 if "NRPy_basic_defines.h" in inc or "NRPy_function_prototypes.h" in inc or \
                         "SIMD_intrinsics.h" in inc:
                     inc = os.path.join(rel_path_to_Cparams, inc)
-                complete_func += "#include \"" + inc + "\"\n"
-        # complete_func += "\n"
+                yield "#include \"" + inc + "\"\n"
 
     if prefunc != "":
-        complete_func += prefunc + "\n"
-
-    def indent_Ccode(indent, Ccode):
-        Ccodesplit = Ccode.splitlines()
-        outstring = ""
-        for i in range(len(Ccodesplit)):
-            outstring += indent + Ccodesplit[i] + '\n'
-        return outstring
+        yield prefunc + "\n"
 
     if desc != "":
-        complete_func += "/*\n" + indent_Ccode(" * ", desc) + " */\n"
-    complete_func += func_prototype + " {\n"+include_Cparams_str+preloop+"\n"+lp.simple_loop(loopopts, body)+postloop+"}\n"
+        yield "/*\n" + "".join(" * " + line + "\n" for line in desc.splitlines()) + " */\n"
+
+    include_Cparams_str = ""
+    if enableCparameters:
+        if "enable_SIMD" in loopopts or "SIMD_width" in body:  # If using manual SIMD looping, SIMD_width will appear in body.
+            include_Cparams_str = "#include \"" + os.path.join(rel_path_to_Cparams, "set_Cparameters-SIMD.h") + "\"\n"
+        else:
+            include_Cparams_str = "#include \"" + os.path.join(rel_path_to_Cparams, "set_Cparameters.h") + "\"\n"
+    yield c_type+" "+name+"("+params+")" + " {\n"+include_Cparams_str+preloop+"\n"
+    yield lp.simple_loop(loopopts, body)
+    yield postloop+"}\n"
 
+def Cfunction(includes=None, prefunc="", desc="", c_type="void", name=None, params=None, preloop="", body=None,
+              loopopts="", postloop="", enableCparameters=True, rel_path_to_Cparams=os.path.join("./")):
+    _Cfunction_check_args(includes, name, params, body)
+    func_prototype = c_type+" "+name+"("+params+")"
+    outCprof.assign_unassigned_records_to_Cfunction(name)
+
+    complete_func = "".join(Cfunction_chunks(includes, prefunc, desc, c_type, name, params, preloop, body,
+                                             loopopts, postloop, enableCparameters, rel_path_to_Cparams))
     return func_prototype+";", complete_func
 
 
+outC_function_dict = {}
+# C functions registered with outputC::stream_Cfunctions = True: name -> function returning a fresh
+#   iterator over the chunks of the complete C function (see Cfunction_chunks()).
+outC_function_chunks_dict = {}
+
+
+def outC_function_chunks(name):
+    """ Return an iterable over the chunks of the complete C function registered as name,
+        whether it was stored as a string in outC_function_dict or is streamed from outC_function_chunks_dict.
+
+        :arg:    name of a C function registered with add_to_Cfunction_dict()
+        :return: iterable of strings, which concatenate to the complete C function
+    """
+    if name in outC_function_dict:
+        return [outC_function_dict[name]]
+    return outC_function_chunks_dict[name]()
+
+
 def add_to_Cfunction_dict(includes=None, prefunc="", desc="", c_type="void", name=None, params=None,
                           preloop="", body=None, loopopts="", postloop="",
                           path_from_rootsrcdir_to_this_Cfunc="default", enableCparameters=True,
                           rel_path_to_Cparams=os.path.join("./")):
+    _Cfunction_check_args(includes, name, params, body)
 
     namesuffix = ""
 
-    if outC_function_element(includes, prefunc, desc, c_type, name + namesuffix, params,
-                             preloop, body, loopopts, postloop,
-                             enableCparameters, rel_path_to_Cparams) in outC_function_master_list:
+    # Apply autotuned tile sizes, if requested by the "tuned_tile_size" loop option (see loop_tiling_autotune.py)
+    loopopts = lptune.add_tuned_tile_size_to_loopopts(name + namesuffix, loopopts)
+
+    element = outC_function_element(includes, prefunc, desc, c_type, name + namesuffix, params,
+                                    preloop, body, loopopts, postloop,
+                                    enableCparameters, rel_path_to_Cparams)
+    if element in outC_function_master_list:
         print("OUCH! Found " + name + namesuffix + " in outC_function_master_list.")
 
-    outC_function_master_list.append(outC_function_element(includes, prefunc, desc, c_type, name + namesuffix, params,
-                                                           preloop, body, loopopts, postloop,
-                                                           enableCparameters, rel_path_to_Cparams))
+    outC_function_master_list.append(element)
 
     outC_function_outdir_dict[name + namesuffix] = path_from_rootsrcdir_to_this_Cfunc
     # print(name, namesuffix, path_from_rootsrcdir_to_this_Cfunc)
     # print(outC_function_outdir_dict)
+    # Finite-difference operator functions are collected from outC_function_dict into
+    #   finite_difference_functions.h, so they are never streamed.
+    if par.parval_from_str("outputC::stream_Cfunctions") and "__FD_OPERATOR_FUNC__" not in desc:
+        outCprof.assign_unassigned_records_to_Cfunction(name + namesuffix)
+        outC_function_prototype_dict[name + namesuffix] = c_type+" "+name+namesuffix+"("+params+");"
+        # The loop is generated only when the function is written; loop.simple_loop() depends only on its arguments.
+        outC_function_chunks_dict[name + namesuffix] = \
+            lambda: Cfunction_chunks(includes, prefunc, desc, c_type, name + namesuffix, params, preloop, body,
+                                     loopopts, postloop, enableCparameters, rel_path_to_Cparams)
+        outC_function_dict.pop(name + namesuffix, None)
+        return
+    outC_function_chunks_dict.pop(name + namesuffix, None)
     outC_function_prototype_dict[name + namesuffix], outC_function_dict[name + namesuffix] = \
         Cfunction(includes, prefunc, desc, c_type, name + namesuffix, params, preloop, body, loopopts, postloop,
                   enableCparameters, rel_path_to_Cparams)
@@ -720,13 +957,16 @@ def add_to_Cfunction_dict(includes=None, prefunc="", desc="", c_type="void", nam
 def outCfunction(outfile="", includes=None, prefunc="", desc="",
                  c_type="void", name=None, params=None, preloop="", body=None, loopopts="", postloop="",
                  enableCparameters=True, rel_path_to_Cparams=os.path.join("./")):
-    _ignoreprototype, Cfunc = Cfunction(includes, prefunc, desc, c_type, name, params, preloop, body,
-                                        loopopts, postloop, enableCparameters, rel_path_to_Cparams)
     if outfile == "returnstring":
+        _ignoreprototype, Cfunc = Cfunction(includes, prefunc, desc, c_type, name, params, preloop, body,
+                                            loopopts, postloop, enableCparameters, rel_path_to_Cparams)
         return Cfunc
+    _Cfunction_check_args(includes, name, params, body)
+    outCprof.assign_unassigned_records_to_Cfunction(name)
     print("Writing file:",outfile,"in dir",os.getcwd())
     with open(outfile, "w") as file:
-        file.write(Cfunc)
+        file.writelines(Cfunction_chunks(includes, prefunc, desc, c_type, name, params, preloop, body,
+                                         loopopts, postloop, enableCparameters, rel_path_to_Cparams))
         print("Output C function "+name+"() to file "+outfile)
 
 
@@ -734,7 +974,7 @@ def construct_Makefile_from_outC_function_dict(Ccodesrootdir, exec_name, uses_fr
                                                compiler_opt_option="fastdebug", addl_CFLAGS=None,
                                                addl_libraries=None, mkdir_Ccodesrootdir=True, use_make=True, CC="gcc",
                                                create_lib=False,  include_dirs=None):
-    if not create_lib and "main" not in outC_function_dict:
+    if not create_lib and "main" not in outC_function_dict and "main" not in outC_function_chunks_dict:
         print("construct_Makefile_from_outC_function_dict() error: C codes will not compile if main() function not defined!")
         print("    Make sure that the main() function registered to outC_function_dict has name \"main\".")
         sys.exit(1)
@@ -761,14 +1001,14 @@ def construct_Makefile_from_outC_function_dict(Ccodesrootdir, exec_name, uses_fr
                 import cmdline_helper as cmd
                 cmd.mkdir(os.path.join(Ccodesrootdir, subdir))
                 with open(add_to_Makefile(Ccodesrootdir, os.path.join(subdir, item.name+".c")), "w") as file:
-                    file.write(outC_function_dict[item.name])
+                    file.writelines(outC_function_chunks(item.name))
             elif outC_function_outdir_dict[item.name] != "default":
                 subdir = outC_function_outdir_dict[item.name]
                 with open(add_to_Makefile(Ccodesrootdir, os.path.join(subdir, item.name+".c")), "w") as file:
-                    file.write(outC_function_dict[item.name])
+                    file.writelines(outC_function_chunks(item.name))
             else:
                 with open(add_to_Makefile(Ccodesrootdir, os.path.join(item.name+".c")), "w") as file:
-                    file.write(outC_function_dict[item.name])
+                    file.writelines(outC_function_chunks(item.name))
             list_of_uniq_functions += [item.name]
     CFLAGS      = " -O2 -march=native -g -fopenmp -Wall -Wno-unused-variable"
     DEBUGCFLAGS = " -O2 -g -Wall -Wno-unused-variable -Wno-unknown-pragmas"  # OpenMP requires -fopenmp, and when disabling
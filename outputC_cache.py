@@ -0,0 +1,221 @@
+""" Content-Addressed On-Disk Cache for outputC()
+
+    The following script implements a persistent cache for the C code
+    generated by outputC(). Each entry is keyed on a stable hash of
+    everything that determines the generated C code: the input SymPy
+    expressions (via srepr), the output variable names, the parsed
+    outCparams, PRECISION, the gridfunction types and variable suffixes
+    of the symbols involved, and the source code of the NRPy+ modules
+    that generate code (including loop.py, grid.py and the finite
+    difference modules, which FD_outputC() drives outputC() through),
+    together with the values of the grid, outputC and finite_difference
+    parameters. On a cache hit, outputC() returns the stored C code without
+    calling cse_preprocess(), sp.cse(), or sp.ccode(). The cache directory
+    is bounded in size; once a running estimate of its size exceeds the
+    bound, the least-recently used entries are evicted first.
+
+    NRPy+ parameters (all within module "outputC_cache"):
+        enable_outputC_cache : bool, enable the cache (default: False)
+        outputC_cache_dir    : char, directory storing cached C code
+        outputC_cache_max_MB : int,  maximum cache size in megabytes
+"""
+
+import NRPy_param_funcs as par  # NRPy+: parameter interface
+import sympy as sp              # SymPy: The Python computer algebra package upon which NRPy+ depends
+import hashlib, os, sys         # Standard Python modules for hashing and multiplatform OS-level functions
+
+thismodule = __name__
+par.initialize_param(par.glb_param("bool", thismodule, "enable_outputC_cache", False))
+par.initialize_param(par.glb_param("char", thismodule, "outputC_cache_dir",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "nrpy_outputC")))
+par.initialize_param(par.glb_param("int",  thismodule, "outputC_cache_max_MB", 512))
+
+# Hit/miss counters, reset with reset_outputC_cache_stats()
+outputC_cache_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+# Modules whose source code determines the output of outputC() and FD_outputC(); if any of
+#   these change, all previously cached entries become unreachable.
+_codegen_source_files = ["outputC.py", "cse_helpers.py", "expr_tree.py", "SIMD.py", "suffixes.py", "var_access.py",
+                         "grid.py", "loop.py", "finite_difference.py", "finite_difference_helpers.py", "outputC_cache.py"]
+_codegen_source_hash = None
+# Modules whose parameters (e.g., grid::GridFuncMemLayout, finite_difference::FD_CENTDERIVS_ORDER) may affect generated code
+_codegen_param_modules = ["grid", "outputC", "finite_difference"]
+
+# Running estimate of the cache size in bytes, per cache directory: the cache directory is rescanned
+#   (and least-recently used entries evicted) only when the estimate exceeds outputC_cache_max_MB,
+#   or every _rescan_interval stores, to account for entries stored by other processes.
+_cache_bytes_estimate = {}
+_stores_since_rescan = {}
+_rescan_interval = 256
+
+def outputC_cache_is_enabled():
+    return par.parval_from_str(thismodule + "::enable_outputC_cache")
+
+def reset_outputC_cache_stats():
+    for key in outputC_cache_stats:
+        outputC_cache_stats[key] = 0
+
+def codegen_source_hash():
+    """ Return a hash of the source code of all modules that influence outputC() output. """
+    global _codegen_source_hash
+    if _codegen_source_hash is None:
+        hasher = hashlib.sha256()
+        rootdir = os.path.dirname(os.path.abspath(__file__))
+        for filename in _codegen_source_files:
+            path = os.path.join(rootdir, filename)
+            if os.path.isfile(path):
+                with open(path, "rb") as file:
+                    hasher.update(file.read())
+        _codegen_source_hash = hasher.hexdigest()
+    return _codegen_source_hash
+
+def outputC_cache_key(sympyexpr_list, output_varname_list, outCparams, prestring="", poststring="", gftypes=None):
+    """ Compute stable, content-addressed key for a single outputC() call.
+
+        :arg:    list of SymPy expressions
+        :arg:    list of output variable names
+        :arg:    parsed outCparams namedtuple
+        :arg:    string prepended to the C code
+        :arg:    string appended to the C code
+        :arg:    list of gridfunction types of the output variables (or None)
+        :return: hexadecimal digest
+
+        >>> import outputC
+        >>> from sympy.abc import x, y
+        >>> key1 = outputC_cache_key([x + y], ["out"], ("", "True"))
+        >>> key2 = outputC_cache_key([x + y], ["out"], ("", "True"))
+        >>> key3 = outputC_cache_key([x * y], ["out"], ("", "True"))
+        >>> key1 == key2, key1 == key3
+        (True, False)
+        >>> import finite_difference
+        >>> par.set_parval_from_str("finite_difference::FD_CENTDERIVS_ORDER", 6)
+        >>> key4 = outputC_cache_key([x + y], ["out"], ("", "True"))
+        >>> par.set_parval_from_str("finite_difference::FD_CENTDERIVS_ORDER", 4)
+        >>> key1 == key4
+        False
+    """
+    from suffixes import subtable  # NRPy+: gridfunction variable suffixes, applied within outputC()
+    import cse_helpers             # NRPy+: CSE helpers; CSE by SymEngine (if installed) may differ from CSE by SymPy
+    hasher = hashlib.sha256()
+    def update(string):
+        hasher.update(string.encode("utf-8"))
+        hasher.update(b"\0")
+    update(codegen_source_hash())
+    update(sp.__version__)
+    update(str(getattr(cse_helpers.se, "__version__", None)))
+    update(repr(sorted((param.module + "::" + param.parname, str(value))
+                       for param, value in zip(par.glb_params_list, par.glb_paramsvals_list)
+                       if param.module in _codegen_param_modules)))
+    update(repr(tuple(outCparams)))
+    update(prestring)
+    update(poststring)
+    free_symbols = set()
+    for expr, varname in zip(sympyexpr_list, output_varname_list):
+        update(str(varname))
+        update(sp.srepr(expr))
+        free_symbols |= {str(sym) for sym in sp.sympify(expr).free_symbols}
+    update(repr(gftypes))
+    update(repr(sorted((sym, subtable[sym]) for sym in free_symbols if sym in subtable)))
+    # Free symbols that are C parameters are loop invariant (see CSE_hoist_loop_invariants)
+    Cparam_names = {Cparam.parname for Cparam in par.glb_Cparams_list}
+    update(repr(sorted(sym for sym in free_symbols if sym in Cparam_names)))
+    return hasher.hexdigest()
+
+def _cache_filename(key):
+    return os.path.join(par.parval_from_str(thismodule + "::outputC_cache_dir"), key[0:2], key + ".c")
+
+def outputC_cache_load(key):
+    """ Return cached C code for key, or None on a cache miss.
+
+        >>> import tempfile
+        >>> par.set_parval_from_str("outputC_cache::outputC_cache_dir", tempfile.mkdtemp())
+        >>> reset_outputC_cache_stats()
+        >>> print(outputC_cache_load("0123abcd"))
+        None
+        >>> outputC_cache_store("0123abcd", "out = x + y;\\n")
+        >>> outputC_cache_load("0123abcd")
+        'out = x + y;\\n'
+        >>> outputC_cache_stats
+        {'hits': 1, 'misses': 1, 'stores': 1, 'evictions': 0}
+        >>> clear_outputC_cache()
+        >>> print(outputC_cache_load("0123abcd"))
+        None
+    """
+    filename = _cache_filename(key)
+    try:
+        with open(filename, "r") as file:
+            Ccode = file.read()
+    except (IOError, OSError):
+        outputC_cache_stats["misses"] += 1
+        return None
+    # Touch the file so that LRU eviction sees it as recently used.
+    try: os.utime(filename, None)
+    except OSError: pass
+    outputC_cache_stats["hits"] += 1
+    return Ccode
+
+def outputC_cache_store(key, Ccode):
+    """ Store C code under key, then evict least-recently used entries if the cache is too large. """
+    filename = _cache_filename(key)
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # Write to a temporary file, then rename: parallel codegen processes may share the cache.
+        tmpfilename = filename + ".tmp" + str(os.getpid())
+        with open(tmpfilename, "w") as file:
+            file.write(Ccode)
+        os.replace(tmpfilename, filename)
+    except (IOError, OSError) as err:
+        print("Warning: outputC_cache could not write to " + filename + ": " + str(err))
+        return
+    outputC_cache_stats["stores"] += 1
+    cachedir = par.parval_from_str(thismodule + "::outputC_cache_dir")
+    max_bytes = par.parval_from_str(thismodule + "::outputC_cache_max_MB") * 1024 * 1024
+    if cachedir not in _cache_bytes_estimate or _stores_since_rescan[cachedir] >= _rescan_interval:
+        evict_outputC_cache(max_bytes)
+    else:
+        _cache_bytes_estimate[cachedir] += len(Ccode)
+        _stores_since_rescan[cachedir] += 1
+        if _cache_bytes_estimate[cachedir] > max_bytes:
+            evict_outputC_cache(max_bytes)
+
+def evict_outputC_cache(max_bytes):
+    """ Delete least-recently used cache entries until the cache uses at most max_bytes.
+
+        >>> import tempfile
+        >>> par.set_parval_from_str("outputC_cache::outputC_cache_dir", tempfile.mkdtemp())
+        >>> for key in ["00aa", "01bb", "02cc"]:
+        ...     outputC_cache_store(key, 100 * "x")
+        >>> evict_outputC_cache(250)
+        >>> [outputC_cache_load(key) is None for key in ["00aa", "01bb", "02cc"]].count(True)
+        1
+        >>> clear_outputC_cache()
+    """
+    cachedir = par.parval_from_str(thismodule + "::outputC_cache_dir")
+    entries = []
+    total_bytes = 0
+    for dirpath, _dirnames, filenames in os.walk(cachedir):
+        for filename in filenames:
+            if filename.endswith(".c"):
+                path = os.path.join(dirpath, filename)
+                try: st = os.stat(path)
+                except OSError: continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total_bytes += st.st_size
+    if total_bytes > max_bytes:
+        for _mtime, size, path in sorted(entries):
+            try: os.remove(path)
+            except OSError: continue
+            outputC_cache_stats["evictions"] += 1
+            total_bytes -= size
+            if total_bytes <= max_bytes:
+                break
+    _cache_bytes_estimate[cachedir] = max(total_bytes, 0)
+    _stores_since_rescan[cachedir] = 0
+
+def clear_outputC_cache():
+    """ Remove all cached entries. """
+    evict_outputC_cache(-1)
+
+if __name__ == "__main__":
+    import doctest
+    sys.exit(doctest.testmod()[0])
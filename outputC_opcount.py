@@ -0,0 +1,235 @@
+""" Static Operation-Count and Memory-Traffic Estimator for Generated C Kernels
+
+    The following script implements a static analysis of C code generated
+    by outputC() and FD_outputC(), in both scalar and SIMD form. Given a
+    string of C code (or the name of a C function registered with
+    add_to_Cfunction_dict(), in which case only the loop body is analyzed),
+    it reports, per gridpoint:
+
+      adds, muls, fmas, divs    : floating-point arithmetic operations
+                                  (subtractions count as adds; each SIMD
+                                  intrinsic acts on one gridpoint per lane,
+                                  so SIMD counts are per gridpoint as well)
+      sqrts, pows, transcendentals : calls to sqrt(), pow(), exp(), sin(), ...
+      others                    : fabs(), fmin(), UPWIND_ALG(), etc.
+      calls                     : calls to any other function
+      flops                     : adds + muls + divs + 2*fmas
+      gf_loads, gf_stores       : number of distinct gridfunction array
+                                  elements read/written (e.g., stencil points)
+      gf_read_streams,
+      gf_write_streams          : number of distinct gridfunctions read/written
+      aux_loads                 : other array reads (e.g., rfmstruct->f0_of_xx0[i0])
+      bytes_per_point           : gridfunction memory traffic, assuming all
+                                  stencil points of a gridfunction are reused
+                                  from cache ((read + write streams) * sizeof(REAL))
+      bytes_per_point_no_reuse  : gridfunction memory traffic assuming no cache
+                                  reuse ((gf_loads + gf_stores) * sizeof(REAL))
+      arithmetic_intensity      : flops / bytes_per_point
+
+    Constant subexpressions involving only numeric literals (e.g., the
+    rational 1.0/3.0) are assumed to be folded by the compiler, and are
+    not counted. Unary minus is not counted.
+"""
+
+import NRPy_param_funcs as par  # NRPy+: parameter interface
+import json, re, sys            # Standard Python modules for JSON, regular expressions, and system
+
+op_count_keys = ["adds", "muls", "fmas", "divs", "sqrts", "pows", "transcendentals", "others", "calls", "flops",
+                 "gf_loads", "gf_stores", "gf_read_streams", "gf_write_streams", "aux_loads",
+                 "bytes_per_point", "bytes_per_point_no_reuse", "arithmetic_intensity"]
+
+# Map of function (or SIMD intrinsic) name to operation category. Functions
+#   mapping to None (e.g., memory reads/writes) are not operations.
+_func_category = {"AddSIMD": "adds", "SubSIMD": "adds", "MulSIMD": "muls", "DivSIMD": "divs",
+                  "FusedMulAddSIMD": "fmas", "FusedMulSubSIMD": "fmas",
+                  "NegFusedMulAddSIMD": "fmas", "NegFusedMulSubSIMD": "fmas", "fma": "fmas",
+                  "SqrtSIMD": "sqrts", "PowSIMD": "pows", "CbrtSIMD": "transcendentals",
+                  "ExpSIMD": "transcendentals", "LogSIMD": "transcendentals",
+                  "SinSIMD": "transcendentals", "CosSIMD": "transcendentals",
+                  "AbsSIMD": "others", "nrpyAbsSIMD": "others", "signSIMD": "others", "UPWIND_ALG": "others",
+                  "ReadSIMD": None, "WriteSIMD": None, "ConstSIMD": None, "IDX4S": None, "IDX4ptS": None,
+                  "IDX3S": None, "IDX4": None, "IDX4pt": None, "IDX3": None}
+_func_category["sqrt"] = "sqrts"
+_func_category["pow"]  = "pows"
+for _func in ["cbrt", "exp", "log", "sin", "cos", "tan", "sinh", "cosh", "tanh",
+              "asin", "acos", "atan", "atan2", "asinh", "acosh", "atanh", "erf", "log10", "exp2", "log2"]:
+    _func_category[_func] = "transcendentals"
+for _func in ["fabs", "fmin", "fmax", "fmod", "copysign", "floor", "ceil"]:
+    _func_category[_func] = "others"
+# C math library functions with float ("f") and long double ("l") suffixes, as output by ccode_postproc()
+for _func, _category in list(_func_category.items()):
+    if _category is not None and not _func.endswith("SIMD") and _func != "UPWIND_ALG":
+        _func_category[_func + "f"] = _category
+        _func_category[_func + "l"] = _category
+
+_sizeof_REAL = {"double": 8, "float": 4, "long double": 16, "CCTK_REAL": 8, "CCTK_REALVEC": 8}
+
+_number_re     = r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?[fFlL]?'
+_token_re      = re.compile(r'\s*(' + _number_re + r'|[A-Za-z_]\w*|->|[-+*/(),?:<>!=&|%.]|\S)')
+_array_re      = re.compile(r'([A-Za-z_]\w*(?:\s*->\s*\w+)*)((?:\s*\[[^\[\]]*\])+)')
+_for_header_re = re.compile(r'\bfor\s*\([^()]*\)')
+
+def _strip_comments_and_preprocessor(Ccode):
+    Ccode = re.sub(r'/\*.*?\*/', '', Ccode, flags=re.DOTALL)
+    Ccode = re.sub(r'//[^\n]*', '', Ccode)
+    return "\n".join(line for line in Ccode.splitlines() if not line.lstrip().startswith("#"))
+
+def _split_assignment(statement):
+    """ Split statement into (lhs, operator, rhs); lhs is None if statement is not an assignment. """
+    for match in re.finditer(r'([-+*/]?)=', statement):
+        start, end = match.span()
+        if statement[end:end + 1] == "=" or (start > 0 and statement[start - 1] in "=!<>"):
+            continue  # comparison operator
+        return statement[:start], match.group(1), statement[end:]
+    return None, "", statement
+
+def _gf_stream_name(array, subscript):
+    """ Return name of the gridfunction stream accessed, e.g., ('in_gfs', 'UUGF'), or None for non-gridfunction arrays. """
+    if not array.endswith("gfs"):
+        return None
+    match = re.search(r'IDX\w*\(\s*(\w+)', subscript)
+    return (array, match.group(1) if match else subscript)
+
+def count_ops_in_Ccode(Ccode, PRECISION=None):
+    """ Statically count operations and gridfunction memory accesses in a block of C code.
+
+        :arg:    string of C code, as output by outputC() or FD_outputC()
+        :arg:    PRECISION, used to compute bytes per REAL (default: NRPy+ parameter PRECISION)
+        :return: dict of per-gridpoint operation counts, keyed as in op_count_keys
+
+        >>> counts = count_ops_in_Ccode('''
+        ... const double tmp0 = in_gfs[IDX4S(UUGF, i0,i1,i2)];
+        ... const double tmp1 = (1.0/3.0)*in_gfs[IDX4S(UUGF, i0+1,i1,i2)] - tmp0;
+        ... rhs_gfs[IDX4S(VVGF, i0,i1,i2)] = -tmp1*tmp1/sqrt(tmp0) + pow(tmp0, 1.5);
+        ... ''', PRECISION="double")
+        >>> [counts[key] for key in ["adds", "muls", "divs", "sqrts", "pows", "flops"]]
+        [2, 2, 1, 1, 1, 5]
+        >>> [counts[key] for key in ["gf_loads", "gf_stores", "gf_read_streams", "gf_write_streams", "bytes_per_point"]]
+        [2, 1, 1, 1, 16]
+        >>> counts = count_ops_in_Ccode('''
+        ... const REAL_SIMD_ARRAY uu = ReadSIMD(&in_gfs[IDX4S(UUGF, i0,i1,i2)]);
+        ... const REAL_SIMD_ARRAY __RHS_exp_0 = FusedMulAddSIMD(uu, uu, MulSIMD(_Integer_2, uu));
+        ... WriteSIMD(&rhs_gfs[IDX4S(UUGF, i0,i1,i2)], __RHS_exp_0);
+        ... ''', PRECISION="double")
+        >>> [counts[key] for key in ["adds", "muls", "fmas", "flops", "gf_loads", "gf_stores"]]
+        [0, 1, 1, 3, 1, 1]
+    """
+    if PRECISION is None:
+        PRECISION = par.parval_from_str("PRECISION")
+    counts = dict((key, 0) for key in op_count_keys)
+    gf_loads, gf_stores, read_streams, write_streams, aux_loads = set(), set(), set(), set(), set()
+
+    def record_reads(expr):
+        # Replace each array access by a placeholder identifier, recording the access.
+        def replace(match):
+            array, subscript = re.sub(r'\s+', '', match.group(1)), re.sub(r'\s+', '', match.group(2))
+            stream = _gf_stream_name(array, subscript)
+            if stream is not None:
+                gf_loads.add(array + subscript)
+                read_streams.add(stream)
+            else:
+                aux_loads.add(array + subscript)
+            return " _array_access_ "
+        return _array_re.sub(replace, expr)
+
+    def count_tokens(expr):
+        tokens = [tok for tok in _token_re.findall(expr) if tok.strip()]
+        for i, tok in enumerate(tokens):
+            nexttok = tokens[i + 1] if i + 1 < len(tokens) else ""
+            if re.match(r'[A-Za-z_]', tok) and nexttok == "(":
+                category = _func_category.get(tok, "calls")
+                if category is not None:
+                    counts[category] += 1
+            elif tok in ("+", "-", "*", "/") and i > 0:
+                prevtok = tokens[i - 1]
+                is_operand = prevtok == ")" or re.match(r'[\w.]', prevtok) is not None
+                if not is_operand:
+                    continue  # unary plus or minus
+                # Operations on two numeric literals, e.g., (1.0/3.0), are folded by the compiler.
+                if re.match(_number_re + "$", prevtok) and re.match(_number_re + "$", nexttok):
+                    continue
+                counts[{"+": "adds", "-": "adds", "*": "muls", "/": "divs"}[tok]] += 1
+
+    Ccode = _for_header_re.sub("", _strip_comments_and_preprocessor(Ccode))
+    for statement in Ccode.replace("{", ";").replace("}", ";").split(";"):
+        if not statement.strip():
+            continue
+        lhs, compound_op, rhs = _split_assignment(statement)
+        match = re.match(r'\s*WriteSIMD\s*\(\s*&\s*(' + _array_re.pattern + r')\s*,(.*)\)\s*$', statement, flags=re.DOTALL)
+        if match:
+            lhs, rhs = match.group(1), match.group(4)
+        if lhs is not None:
+            lhs_match = _array_re.search(lhs)
+            if lhs_match:
+                array, subscript = re.sub(r'\s+', '', lhs_match.group(1)), re.sub(r'\s+', '', lhs_match.group(2))
+                stream = _gf_stream_name(array, subscript)
+                if stream is not None:
+                    gf_stores.add(array + subscript)
+                    write_streams.add(stream)
+                    if compound_op != "":
+                        gf_loads.add(array + subscript)
+                        read_streams.add(stream)
+            if compound_op != "":
+                counts[{"+": "adds", "-": "adds", "*": "muls", "/": "divs"}[compound_op]] += 1
+        count_tokens(record_reads(rhs).replace("&", " "))
+
+    counts["flops"]            = counts["adds"] + counts["muls"] + counts["divs"] + 2*counts["fmas"]
+    counts["gf_loads"]         = len(gf_loads)
+    counts["gf_stores"]        = len(gf_stores)
+    counts["gf_read_streams"]  = len(read_streams)
+    counts["gf_write_streams"] = len(write_streams)
+    counts["aux_loads"]        = len(aux_loads)
+    sizeof_REAL = _sizeof_REAL.get(PRECISION, 8)
+    counts["bytes_per_point"]          = (len(read_streams) + len(write_streams)) * sizeof_REAL
+    counts["bytes_per_point_no_reuse"] = (len(gf_loads) + len(gf_stores)) * sizeof_REAL
+    if counts["bytes_per_point"] > 0:
+        counts["arithmetic_intensity"] = float(counts["flops"]) / counts["bytes_per_point"]
+    else:
+        counts["arithmetic_intensity"] = float("inf") if counts["flops"] > 0 else 0.0
+    return counts
+
+def count_ops_in_Cfunction(name, PRECISION=None):
+    """ Count operations in the loop body of a C function registered with add_to_Cfunction_dict(). """
+    from outputC import outC_function_master_list  # NRPy+: Core C code output module
+    for element in reversed(outC_function_master_list):
+        if element.name == name:
+            return count_ops_in_Ccode(element.body, PRECISION)
+    print("count_ops_in_Cfunction() error: C function " + name + "() not found in outC_function_master_list.")
+    sys.exit(1)
+
+def op_counts_table(counts_dict):
+    """ Return a human-readable table of operation counts, one column per entry of counts_dict.
+
+        >>> print(op_counts_table({"a": count_ops_in_Ccode("x = y*z + 1.0;", "double")}).splitlines()[0:3])
+        ['                                    a', 'adds                                1', 'muls                                1']
+    """
+    names = list(counts_dict)
+    lines = ["%-28s" % "" + "".join("%9s" % name[-9:] for name in names)]
+    for key in op_count_keys:
+        row = "%-28s" % key
+        for name in names:
+            value = counts_dict[name][key]
+            row += "%9.3f" % value if isinstance(value, float) else "%9d" % value
+        lines.append(row)
+    return "\n".join(lines)
+
+def compare_op_counts(baseline, current):
+    """ Return dict of (baseline, current) pairs for all keys whose counts differ.
+
+        >>> compare_op_counts(count_ops_in_Ccode("x = y*z;", "double"), count_ops_in_Ccode("x = y*z*z;", "double"))
+        {'muls': (1, 2), 'flops': (1, 2)}
+    """
+    return dict((key, (baseline[key], current[key])) for key in op_count_keys if baseline[key] != current[key])
+
+def write_op_counts_json(filename, counts_dict):
+    """ Write operation counts (e.g., {"rhs_eval": counts, ...}) to filename as JSON, for later comparison. """
+    with open(filename, "w") as file:
+        file.write(json.dumps(counts_dict, indent=2, sort_keys=True) + "\n")
+
+def read_op_counts_json(filename):
+    with open(filename, "r") as file:
+        return json.load(file)
+
+if __name__ == "__main__":
+    import doctest
+    sys.exit(doctest.testmod()[0])
@@ -0,0 +1,233 @@
+""" Per-Phase Profiling of the outputC() / FD_outputC() Pipeline
+
+    The following script implements opt-in profiling instrumentation for
+    NRPy+ C code generation. When enabled, every call to outputC() and
+    FD_outputC() creates a profiling record, storing the wall time of each
+    phase of the call (e.g., cse_preprocess, cse, cse_postprocess, SIMD,
+    ccode, output), along with expression counts, expression tree sizes,
+    and the number of CSE temporaries. Calls to outputC() made from within
+    FD_outputC() are recorded as children of the FD_outputC() record.
+
+    Records are attributed to the C function being built: all records
+    created since the last call to Cfunction() are assigned to the name
+    passed to the next Cfunction() call (which is called by both
+    add_to_Cfunction_dict() and outCfunction()). Alternatively, the name
+    can be set explicitly with "with profile_Cfunction(name):".
+
+    The collected data are available as a structured report grouped by
+    C function name, either as a Python dict (outputC_profile_report()),
+    a JSON string or file (outputC_profile_report_json()), or a human-
+    readable table (outputC_profile_table()).
+
+    NRPy+ parameters (all within module "outputC_profiler"):
+        enable_outputC_profiling : bool, enable profiling (default: False)
+"""
+
+import NRPy_param_funcs as par   # NRPy+: parameter interface
+import json, sys, time           # Standard Python modules for JSON output, system, and timing
+from contextlib import contextmanager
+from functools import wraps
+
+thismodule = __name__
+par.initialize_param(par.glb_param("bool", thismodule, "enable_outputC_profiling", False))
+
+# All profiling records, in the order the profiled calls were made
+outputC_profile_records = []
+# Records that have not yet been attributed to a C function
+_unassigned_records = []
+# Stack of records of the currently executing profiled calls
+_active_records = []
+# Name of the C function set explicitly via profile_Cfunction(), or None
+_current_Cfunction = None
+
+UNASSIGNED = "(no Cfunction)"
+
+def outputC_profiling_is_enabled():
+    return par.parval_from_str(thismodule + "::enable_outputC_profiling")
+
+def reset_outputC_profile():
+    del outputC_profile_records[:]
+    del _unassigned_records[:]
+
+def expr_tree_size(sympyexpr_list):
+    """ Count the unique subexpressions (DAG nodes) in a list of SymPy expressions.
+
+        :arg:    list of SymPy expressions
+        :return: number of unique subexpressions
+
+        >>> from sympy.abc import x, y
+        >>> expr_tree_size([x + y, (x + y)**2])
+        5
+    """
+    seen = set()
+    stack = list(sympyexpr_list)
+    while stack:
+        expr = stack.pop()
+        if expr in seen:
+            continue
+        seen.add(expr)
+        stack.extend(getattr(expr, "args", ()))
+    return len(seen)
+
+class ProfileRecord:
+    """ Wall times and statistics of the phases of a single profiled call. """
+    def __init__(self, caller, parent):
+        self.caller    = caller
+        self.parent    = parent
+        self.Cfunction = _current_Cfunction
+        self.index     = len(outputC_profile_records)
+        self.total_time = 0.0
+        self.stats  = {}
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, {"time": 0.0, "calls": 0})
+            entry["time"] += time.perf_counter() - start
+            entry["calls"] += 1
+
+    def set_stat(self, name, value, phase=None):
+        if phase is None:
+            self.stats[name] = value
+        else:
+            self.phases.setdefault(phase, {"time": 0.0, "calls": 0})[name] = value
+
+    def as_dict(self):
+        return {"index": self.index, "caller": self.caller, "parent": self.parent,
+                "Cfunction": self.Cfunction if self.Cfunction is not None else UNASSIGNED,
+                "total_time": self.total_time, "stats": self.stats, "phases": self.phases}
+
+class _NullRecord:
+    """ Stand-in for ProfileRecord when profiling is disabled; all methods are no-ops. """
+    @contextmanager
+    def phase(self, _name):
+        yield
+
+    def set_stat(self, name, value, phase=None):
+        pass
+
+    # Tree sizes are expensive to compute; callers check "if prof:" before computing them.
+    def __bool__(self):
+        return False
+
+_null_record = _NullRecord()
+
+def current_record():
+    """ Return the record of the innermost profiled call, or a no-op record if profiling is disabled. """
+    if _active_records:
+        return _active_records[-1]
+    return _null_record
+
+def profiled(caller):
+    """ Decorator: create a profiling record for each call of the decorated function. """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not outputC_profiling_is_enabled():
+                return func(*args, **kwargs)
+            parent = _active_records[-1].index if _active_records else None
+            record = ProfileRecord(caller, parent)
+            outputC_profile_records.append(record)
+            if record.Cfunction is None:
+                _unassigned_records.append(record)
+            _active_records.append(record)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record.total_time = time.perf_counter() - start
+                _active_records.pop()
+        return wrapper
+    return decorator
+
+def assign_unassigned_records_to_Cfunction(name):
+    """ Attribute all records not yet assigned to a C function to C function name. Called by Cfunction(). """
+    for record in _unassigned_records:
+        record.Cfunction = name
+    del _unassigned_records[:]
+
+@contextmanager
+def profile_Cfunction(name):
+    """ Attribute all records created within this context to C function name. """
+    global _current_Cfunction
+    previous = _current_Cfunction
+    _current_Cfunction = name
+    try:
+        yield
+    finally:
+        _current_Cfunction = previous
+
+def outputC_profile_report():
+    """ Return profiling data grouped by C function name.
+
+        For each C function, "total_time" is the sum of wall times of top-level
+        calls only (i.e., outputC() calls made from within FD_outputC() are not
+        double-counted), and each phase is keyed as "caller.phase". Note that
+        FD_outputC.construct_Ccode includes the time spent in nested outputC()
+        calls, which are also listed separately as outputC.* phases.
+
+        >>> par.set_parval_from_str("outputC_profiler::enable_outputC_profiling", True)
+        >>> reset_outputC_profile()
+        >>> @profiled("demo")
+        ... def demo():
+        ...     with current_record().phase("work"):
+        ...         current_record().set_stat("num_exprs", 3, phase="work")
+        >>> demo()
+        >>> assign_unassigned_records_to_Cfunction("myfunc")
+        >>> with profile_Cfunction("otherfunc"):
+        ...     demo()
+        >>> report = outputC_profile_report()
+        >>> sorted(report["Cfunctions"])
+        ['myfunc', 'otherfunc']
+        >>> report["Cfunctions"]["myfunc"]["phases"]["demo.work"]["num_exprs"]
+        3
+        >>> par.set_parval_from_str("outputC_profiler::enable_outputC_profiling", False)
+        >>> reset_outputC_profile()
+    """
+    Cfunctions = {}
+    for record in outputC_profile_records:
+        name = record.Cfunction if record.Cfunction is not None else UNASSIGNED
+        group = Cfunctions.setdefault(name, {"calls": {}, "total_time": 0.0, "phases": {}})
+        group["calls"][record.caller] = group["calls"].get(record.caller, 0) + 1
+        if record.parent is None:
+            group["total_time"] += record.total_time
+        for phasename, entry in record.phases.items():
+            merged = group["phases"].setdefault(record.caller + "." + phasename, {})
+            for key, value in entry.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    merged[key] = merged.get(key, 0) + value
+    return {"Cfunctions": Cfunctions, "records": [record.as_dict() for record in outputC_profile_records]}
+
+def outputC_profile_report_json(filename=None):
+    """ Return the profiling report as a JSON string, or write it to filename if provided. """
+    report_json = json.dumps(outputC_profile_report(), indent=2, sort_keys=True)
+    if filename is None:
+        return report_json
+    with open(filename, "w") as file:
+        file.write(report_json + "\n")
+    print("Wrote outputC profiling report to file \"" + filename + "\"")
+    return None
+
+def outputC_profile_table():
+    """ Return the profiling report as a human-readable table, C functions sorted by total time. """
+    Cfunctions = outputC_profile_report()["Cfunctions"]
+    columns = ["num_exprs", "tree_size", "num_CSE_temps"]
+    lines = []
+    for name, group in sorted(Cfunctions.items(), key=lambda item: -item[1]["total_time"]):
+        calls = ", ".join(caller + " x" + str(num) for caller, num in sorted(group["calls"].items()))
+        lines.append("Cfunction %s: %.3f s (%s)" % (name, group["total_time"], calls))
+        lines.append("  %-36s %10s %6s %10s %10s %14s" % ("phase", "time [s]", "calls", "exprs", "tree size", "CSE temps"))
+        for phasename, entry in sorted(group["phases"].items(), key=lambda item: -item[1]["time"]):
+            extra = [str(entry[col]) if col in entry else "-" for col in columns]
+            lines.append("  %-36s %10.3f %6d %10s %10s %14s" % (phasename, entry["time"], entry["calls"],
+                                                                extra[0], extra[1], extra[2]))
+        lines.append("")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import doctest
+    sys.exit(doctest.testmod()[0])
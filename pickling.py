@@ -38,10 +38,14 @@ def pickle_NRPy_env():
         outstr.append(pickle.dumps(lst.parname))
         outstr.append(pickle.dumps(lst.defaultval))
 
-    outstr.append(pickle.dumps(len(outC.outC_function_dict)))
+    # C functions registered with outputC::stream_Cfunctions = True are assembled here, as closures cannot be pickled.
+    outstr.append(pickle.dumps(len(outC.outC_function_dict) + len(outC.outC_function_chunks_dict)))
     for Cfuncname, Cfunc in outC.outC_function_dict.items():
         outstr.append(pickle.dumps(Cfuncname))
         outstr.append(pickle.dumps(Cfunc))
+    for Cfuncname in outC.outC_function_chunks_dict:
+        outstr.append(pickle.dumps(Cfuncname))
+        outstr.append(pickle.dumps("".join(outC.outC_function_chunks(Cfuncname))))
 
     outstr.append(pickle.dumps(len(outC.outC_function_prototype_dict)))
     for Cfuncname, Cfuncprototype in outC.outC_function_prototype_dict.items():
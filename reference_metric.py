@@ -15,7 +15,9 @@
 #     5) Cart_to_xx[3]: Inverse of xx_to_Cart:
 #       xx0,xx1,xx2 as functions of (x,y,z).
 #       In the case that there exists no closed-form
-#       expression, then a root finder might be needed
+#       expression, leave Cart_to_xx[] unset; the
+#       generated C code then inverts xx_to_Cart with
+#       a Newton-Raphson root finder.
 #     6) UnitVectors[3][3]: Unit vectors of reference
 #       metric.
 
@@ -23,12 +25,13 @@
 #         zachetie **at** gmail **dot* com
 
 import sympy as sp                  # SymPy: The Python computer algebra package upon which NRPy+ depends
-from outputC import outputC, superfast_uniq, add_to_Cfunction_dict, indent_Ccode  # NRPy+: Core C code output module
+from outputC import outputC, superfast_uniq, add_to_Cfunction_dict, indent_Ccode, Cfunction  # NRPy+: Core C code output module
 from outputC import outC_NRPy_basic_defines_h_dict
 import NRPy_param_funcs as par      # NRPy+: Parameter interface
 import grid as gri                  # NRPy+: Functions having to do with numerical grids
 import indexedexp as ixp            # NRPy+: Symbolic indexed expression (e.g., tensors, vectors, etc.) support
-import os, sys                      # Standard Python modules for multiplatform OS-level functions
+import reference_metric_cache as rfmcache  # NRPy+: Persistent on-disk cache of hatted quantities
+import itertools, multiprocessing, os, sys  # Standard Python modules for iteration tools, process-based parallelism, and multiplatform OS-level functions
 
 # Step 0a: Initialize parameters
 thismodule = __name__
@@ -36,6 +39,12 @@ par.initialize_param(par.glb_param("char", thismodule, "CoordSystem", "Spherical
 par.initialize_param(par.glb_param("char", thismodule, "enable_rfm_precompute", "False"))
 par.initialize_param(par.glb_param("char", thismodule, "rfm_precompute_to_Cfunctions_and_NRPy_basic_defines", "False"))
 par.initialize_param(par.glb_param("char", thismodule, "rfm_precompute_Ccode_outdir", "Ccode"))
+# Maximum number of hatted quantity components, depending on exactly two of (xx0,xx1,xx2), to precompute and
+#   store in 2D arrays if rfm_precompute is enabled (0: none). This is a count of arrays, not a memory budget:
+#   each array holds Nxx_plus_2NGHOSTSa*Nxx_plus_2NGHOSTSb REALs, for grid sizes only known at run time.
+par.initialize_param(par.glb_param("int", thismodule, "rfm_precompute_max_num_2D_tables", 0))
+# Number of processes used to differentiate & simplify hatted quantities (1: serial; 0: all available cores)
+par.initialize_param(par.glb_param("int", thismodule, "rfm_hatted_quantities_nprocs", 1))
 
 # Step 0b: Declare global variables
 xx = gri.xx
@@ -92,6 +101,11 @@ def reference_metric(SymPySimplifyExpressions=True): #, enable_compute_hatted_qu
     global UnitVectors
     UnitVectors = ixp.zerorank2(DIM=3)
 
+    # Coordinate systems without a closed-form inverse leave Cart_to_xx[] unset; make sure
+    #   no expressions from a previously-chosen CoordSystem survive.
+    for i in range(len(Cart_to_xx)):
+        Cart_to_xx[i] = sp.sympify(0)
+
     # Set up hatted metric tensor, rescaling matrix, and rescaling vector
 
     #####################################################################
@@ -501,11 +515,39 @@ def reference_metric(SymPySimplifyExpressions=True): #, enable_compute_hatted_qu
 
     # Finally, call ref_metric__hatted_quantities()
     #  to construct hatted metric, derivs of hatted
-    #  metric, and Christoffel symbols
+    #  metric, and Christoffel symbols. If the
+    #  reference_metric cache is enabled, these are
+    #  instead restored from disk whenever possible.
+    if not rfmcache.reference_metric_cache_is_enabled():
+        ref_metric__hatted_quantities(SymPySimplifyExpressions)
+        return
+    cache_key = rfmcache.reference_metric_cache_key(scalefactor_orthog, scalefactor_orthog_funcform,
+                                                    SymPySimplifyExpressions)
+    cached_globals = rfmcache.reference_metric_cache_load(cache_key)
+    if cached_globals is not None:
+        for name, value in cached_globals.items():
+            if name in ("scalefactor_orthog", "scalefactor_orthog_funcform"):
+                globals()[name][:] = value  # Updated in place by ref_metric__hatted_quantities()
+            else:
+                globals()[name] = value
+        if "rfm_struct_Ccode" in cached_globals:
+            output_rfm_struct_Ccode()
+        return
     ref_metric__hatted_quantities(SymPySimplifyExpressions)
+    cached_globals = {name: globals()[name] for name in hatted_quantities_globals}
+    if par.parval_from_str(thismodule+"::enable_rfm_precompute") == "True":
+        cached_globals["rfm_struct_Ccode"] = rfm_struct_Ccode
+    rfmcache.reference_metric_cache_store(cache_key, cached_globals)
     # ref_metric__hatted_quantities(scalefactor_orthog_funcform,SymPySimplifyExpressions)
     # ref_metric__hatted_quantities(scalefactor_orthog,SymPySimplifyExpressions)
 
+# Globals set by ref_metric__hatted_quantities(); these are stored in the reference_metric cache,
+#   along with rfm_struct_Ccode if rfm_precompute is enabled.
+hatted_quantities_globals = ["scalefactor_orthog", "scalefactor_orthog_funcform",
+                             "ReU", "ReD", "ReDD", "ghatDD", "ghatUU", "detgammahat",
+                             "detgammahatdD", "detgammahatdDD", "ReUdD", "ReUdDD", "ReDdD", "ReDdDD",
+                             "ReDDdD", "ReDDdDD", "ghatDDdD", "ghatDDdDD", "GammahatUDD", "GammahatUDDdD"]
+
 def ref_metric__hatted_quantities(SymPySimplifyExpressions=True):
 
     enable_rfm_precompute = False
@@ -561,76 +603,12 @@ def ref_metric__hatted_quantities(SymPySimplifyExpressions=True):
                 print("Error: ghatUU["+ str(i) + "][" + str(j) + "] != ghatUU["+ str(j) + "][" + str(i) + ": " + str(ghatUU[i][j]) + "!=" + str(ghatUU[j][i]))
                 sys.exit(1)
 
-    # Step 2: Compute det(ghat) and its 1st & 2nd derivatives
-    global detgammahatdD, detgammahatdDD
-    detgammahatdD  = ixp.zerorank1(DIM)
-    detgammahatdDD = ixp.zerorank2(DIM)
-    for i in range(DIM):
-        detgammahatdD[i] = (sp.diff(detgammahat, xx[i]))
-        for j in range(DIM):
-            detgammahatdDD[i][j] = sp.diff(detgammahatdD[i], xx[j])
-
-    # Step 3a: Compute 1st & 2nd derivatives of rescaling vectors.
-    #          (E.g., needed in BSSN for betaUdDD computation)
-    global ReUdD, ReUdDD, ReDdD, ReDdDD
-    ReUdD  = ixp.zerorank2(DIM)
-    ReUdDD = ixp.zerorank3(DIM)
-    ReDdD  = ixp.zerorank2(DIM)
-    ReDdDD = ixp.zerorank3(DIM)
-    for i in range(DIM):
-        for j in range(DIM):
-            ReUdD[i][j] = sp.diff(ReU[i], xx[j])
-            ReDdD[i][j] = sp.diff(ReD[i], xx[j])
-            for k in range(DIM):
-                ReUdDD[i][j][k] = sp.diff(ReUdD[i][j], xx[k])
-                ReDdDD[i][j][k] = sp.diff(ReDdD[i][j], xx[k])
-
-    # Step 3b: Compute 1st & 2nd derivatives of rescaling matrix.
-    global ReDDdD, ReDDdDD
-    ReDDdD = ixp.zerorank3(DIM)
-    ReDDdDD = ixp.zerorank4(DIM)
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                ReDDdD[i][j][k] = (sp.diff(ReDD[i][j], xx[k]))
-                for l in range(DIM):
-                    # Simplifying this doesn't appear to help overall NRPy run time.
-                    ReDDdDD[i][j][k][l] = sp.diff(ReDDdD[i][j][k], xx[l])
-
-    # Step 3c: Compute 1st & 2nd derivatives of reference metric.
-    global ghatDDdD, ghatDDdDD
-    ghatDDdD = ixp.zerorank3(DIM)
-    ghatDDdDD = ixp.zerorank4(DIM)
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                if SymPySimplifyExpressions==True:
-#                    ghatDDdD[i][j][k] = sp.trigsimp(sp.diff(ghatDD[i][j], xx[k])) # FIXME: BAD: MUST BE SIMPLIFIED OR ANSWER IS INCORRECT! Must be some bug in sympy...
-                    ghatDDdD[i][j][k] = sp.simplify(sp.diff(ghatDD[i][j], xx[k])) # FIXME: BAD: MUST BE SIMPLIFIED OR ANSWER IS INCORRECT! Must be some bug in sympy...
-                else:
-                    ghatDDdD[i][j][k] = (sp.diff(ghatDD[i][j], xx[k])) # FIXME: BAD: MUST BE SIMPLIFIED OR ANSWER IS INCORRECT! Must be some bug in sympy...
-                for l in range(DIM):
-                    ghatDDdDD[i][j][k][l] = (sp.diff(ghatDDdD[i][j][k], xx[l]))
-
-    # Step 4a: Compute Christoffel symbols of reference metric.
-    global GammahatUDD
-    GammahatUDD = ixp.zerorank3(DIM)
-    for i in range(DIM):
-        for k in range(DIM):
-            for l in range(DIM):
-                for m in range(DIM):
-#                    GammahatUDD[i][k][l] += sp.trigsimp((sp.Rational(1,2))*ghatUU[i][m]*\
-                    GammahatUDD[i][k][l] += (sp.Rational(1, 2))*ghatUU[i][m]*\
-                                            (ghatDDdD[m][k][l] + ghatDDdD[m][l][k] - ghatDDdD[k][l][m])
-
-    # Step 4b: Compute derivs of Christoffel symbols of reference metric.
-    global GammahatUDDdD
-    GammahatUDDdD = ixp.zerorank4(DIM)
-    for i in range(DIM):
-        for j in range(DIM):
-            for k in range(DIM):
-                for l in range(DIM):
-                    GammahatUDDdD[i][j][k][l] = (sp.diff(GammahatUDD[i][j][k], xx[l]))
+    # Steps 2-4b: Compute 1st & 2nd derivatives of hatted quantities, and
+    #             Christoffel symbols of the reference metric and their derivatives.
+    nprocs = par.parval_from_str(thismodule+"::rfm_hatted_quantities_nprocs")
+    if nprocs == 0:
+        nprocs = multiprocessing.cpu_count()
+    ref_metric__hatted_quantities_derivs(SymPySimplifyExpressions, nprocs=nprocs)
 
     # Step 4c: If rfm_precompute is disabled, then we are finished with this function.
     #          Otherwise continue to Step 5.
@@ -832,6 +810,15 @@ def ref_metric__hatted_quantities(SymPySimplifyExpressions=True):
                         GammahatUDDdD[i][j][k][l] = GammahatUDDdD[i][j][k][l].subs(freevar,
                                                                                    freevars_uniq_xx_indep[varidx])
 
+    # Step 6.d: Optionally replace the most expensive hatted quantity components that depend on
+    #           exactly two of (xx0,xx1,xx2) by precomputed 2D arrays, trading memory for
+    #           fewer arithmetic operations per gridpoint.
+    max_num_2D_tables = par.parval_from_str(thismodule+"::rfm_precompute_max_num_2D_tables")
+    if max_num_2D_tables > 0:
+        for table_sym, table_val in tabulate_2D_hatted_quantities(freevars_uniq, freevars_uniq_vals, max_num_2D_tables):
+            freevars_uniq_xx_indep.append(table_sym)
+            freevars_uniq_vals.append(table_val)
+
     # Step 7: Construct needed C code for declaring rfmstruct, allocating storage for
     #         rfmstruct arrays, defining each element in each array, reading the
     #         rfmstruct data from memory (both with and without SIMD enabled), and
@@ -890,22 +877,28 @@ def ref_metric__hatted_quantities(SymPySimplifyExpressions=True):
                                                 " = ReadSIMD(&rfmstruct->" + str(freevars_uniq_xx_indep[which_freevar]) + "[i"+str(dirn)+"]);\n"
                     output_define_and_readvr = True
 
-            if (not output_define_and_readvr) and (gri.xx[0] in frees_uniq) and (gri.xx[1] in frees_uniq):
-                define_str += """
-for(int i1=0;i1<Nxx_plus_2NGHOSTS1;i1++) for(int i0=0;i0<Nxx_plus_2NGHOSTS0;i0++) {
-  const REAL xx0 = xx[0][i0];
-  const REAL xx1 = xx[1][i1];
-  rfmstruct.""" + str(freevars_uniq_xx_indep[which_freevar]) + """[i0 + Nxx_plus_2NGHOSTS0*i1] = """ + str(sp.ccode(freevars_uniq_vals[which_freevar])) + """;
+            # 2D arrays: expressions depending on exactly two of (xx0,xx1,xx2), stored with the
+            #   lower-index coordinate varying fastest, and read within the loop over that coordinate.
+            for (a, b) in ((0, 1), (0, 2), (1, 2)):
+                if (not output_define_and_readvr) and (gri.xx[a] in frees_uniq) and (gri.xx[b] in frees_uniq) \
+                        and not (gri.xx[3-a-b] in frees_uniq):
+                    a, b = str(a), str(b)
+                    idx2D = "[i"+a+" + Nxx_plus_2NGHOSTS"+a+"*i"+b+"]"
+                    define_str += """
+for(int i"""+b+"""=0;i"""+b+"""<Nxx_plus_2NGHOSTS"""+b+""";i"""+b+"""++) for(int i"""+a+"""=0;i"""+a+"""<Nxx_plus_2NGHOSTS"""+a+""";i"""+a+"""++) {
+  const REAL xx"""+a+""" = xx["""+a+"""][i"""+a+"""];
+  const REAL xx"""+b+""" = xx["""+b+"""][i"""+b+"""];
+  rfmstruct.""" + str(freevars_uniq_xx_indep[which_freevar]) + idx2D + """ = """ + str(sp.ccode(freevars_uniq_vals[which_freevar])) + """;
 }\n\n"""
-                readvr_str[0] += "const REAL " + str(freevars_uniq_xx_indep[which_freevar]) + " = rfmstruct->" + \
-                                 str(freevars_uniq_xx_indep[which_freevar]) + "[i0 + Nxx_plus_2NGHOSTS0*i1];\n"
-                readvr_SIMD_outer_str[0] += "const double NOSIMD" + str(freevars_uniq_xx_indep[which_freevar]) + \
-                                            " = rfmstruct->" + str(freevars_uniq_xx_indep[which_freevar]) + "[i0 + Nxx_plus_2NGHOSTS0*i1]; "
-                readvr_SIMD_outer_str[0] += "const REAL_SIMD_ARRAY " + str(freevars_uniq_xx_indep[which_freevar]) + \
-                                            " = ConstSIMD(NOSIMD" + str(freevars_uniq_xx_indep[which_freevar]) + ");\n"
-                readvr_SIMD_inner_str[0] += "const REAL_SIMD_ARRAY " + str(freevars_uniq_xx_indep[which_freevar]) + \
-                                            " = ReadSIMD(&rfmstruct->" + str(freevars_uniq_xx_indep[which_freevar]) + "[i0 + Nxx_plus_2NGHOSTS0*i1]);\n"
-                output_define_and_readvr = True
+                    readvr_str[int(a)] += "const REAL " + str(freevars_uniq_xx_indep[which_freevar]) + " = rfmstruct->" + \
+                                          str(freevars_uniq_xx_indep[which_freevar]) + idx2D + ";\n"
+                    readvr_SIMD_outer_str[int(a)] += "const double NOSIMD" + str(freevars_uniq_xx_indep[which_freevar]) + \
+                                                     " = rfmstruct->" + str(freevars_uniq_xx_indep[which_freevar]) + idx2D + "; "
+                    readvr_SIMD_outer_str[int(a)] += "const REAL_SIMD_ARRAY " + str(freevars_uniq_xx_indep[which_freevar]) + \
+                                                     " = ConstSIMD(NOSIMD" + str(freevars_uniq_xx_indep[which_freevar]) + ");\n"
+                    readvr_SIMD_inner_str[int(a)] += "const REAL_SIMD_ARRAY " + str(freevars_uniq_xx_indep[which_freevar]) + \
+                                                     " = ReadSIMD(&rfmstruct->" + str(freevars_uniq_xx_indep[which_freevar]) + idx2D + ");\n"
+                    output_define_and_readvr = True
 
             if not output_define_and_readvr:
                 print("ERROR: Could not figure out the (xx0,xx1,xx2) dependency within the expression for "+str(freevars_uniq_xx_indep[which_freevar])+":")
@@ -917,32 +910,201 @@ for(int i1=0;i1<Nxx_plus_2NGHOSTS1;i1++) for(int i0=0;i0<Nxx_plus_2NGHOSTS0;i0++
     struct_str += "} rfm_struct;\n"
 
     # Step 8: Output needed C code to files
+    global rfm_struct_Ccode
+    rfm_struct_Ccode = {"struct": struct_str, "malloc": malloc_str, "define": define_str, "freemem": freemm_str,
+                        "read": readvr_str, "SIMD_outer_read": readvr_SIMD_outer_str,
+                        "SIMD_inner_read": readvr_SIMD_inner_str}
+    output_rfm_struct_Ccode()
+
+def output_rfm_struct_Ccode():
+    """ Output the rfm_struct C code constructed by ref_metric__hatted_quantities() with rfm_precompute enabled. """
     outdir = par.parval_from_str(thismodule+"::rfm_precompute_Ccode_outdir")
     if par.parval_from_str(thismodule+"::rfm_precompute_to_Cfunctions_and_NRPy_basic_defines") == "False":
         with open(os.path.join(outdir, "rfm_struct__declare.h"), "w") as file:
-            file.write(struct_str)
+            file.write(rfm_struct_Ccode["struct"])
         with open(os.path.join(outdir, "rfm_struct__malloc.h"), "w") as file:
-            file.write(malloc_str)
+            file.write(rfm_struct_Ccode["malloc"])
         with open(os.path.join(outdir, "rfm_struct__define.h"), "w") as file:
-            file.write(define_str)
+            file.write(rfm_struct_Ccode["define"])
         with open(os.path.join(outdir, "rfm_struct__freemem.h"), "w") as file:
-            file.write(freemm_str)
+            file.write(rfm_struct_Ccode["freemem"])
     else:
         global NRPy_basic_defines_str
-        NRPy_basic_defines_str = struct_str
+        NRPy_basic_defines_str = rfm_struct_Ccode["struct"]
         global rfm_struct__malloc, rfm_struct__define, rfm_struct__freemem
-        rfm_struct__malloc = malloc_str
-        rfm_struct__define = define_str
-        rfm_struct__freemem = freemm_str
+        rfm_struct__malloc = rfm_struct_Ccode["malloc"]
+        rfm_struct__define = rfm_struct_Ccode["define"]
+        rfm_struct__freemem = rfm_struct_Ccode["freemem"]
 
     for i in range(3):
         with open(os.path.join(outdir, "rfm_struct__read" + str(i) + ".h"), "w") as file:
-            file.write(readvr_str[i])
+            file.write(rfm_struct_Ccode["read"][i])
         with open(os.path.join(outdir, "rfm_struct__SIMD_outer_read" + str(i) + ".h"), "w") as file:
-            file.write(readvr_SIMD_outer_str[i])
+            file.write(rfm_struct_Ccode["SIMD_outer_read"][i])
         with open(os.path.join(outdir, "rfm_struct__SIMD_inner_read" + str(i) + ".h"), "w") as file:
-            file.write(readvr_SIMD_inner_str[i])
+            file.write(rfm_struct_Ccode["SIMD_inner_read"][i])
+
+
+def hatted_quantity_derivs(expr, x, xx_list, simplify_first_deriv=False, second_derivs=True):
+    """ Return d(expr)/dx (simplified if requested) and, if second_derivs, its derivatives with respect to each xx.
+        Computes one component of the derivatives in ref_metric__hatted_quantities_derivs(), in a worker process
+        if nprocs > 1.
+    """
+    exprdD = sp.diff(expr, x)
+    if simplify_first_deriv:
+        # FIXME: BAD: MUST BE SIMPLIFIED OR ANSWER IS INCORRECT! Must be some bug in sympy...
+        exprdD = sp.simplify(exprdD)
+    exprdDD = [sp.diff(exprdD, xx_l) for xx_l in xx_list] if second_derivs else []
+    return exprdD, exprdDD
+
+def ref_metric__hatted_quantities_derivs(SymPySimplifyExpressions=True, nprocs=1):
+    """ Steps 2-4b of ref_metric__hatted_quantities(). If nprocs > 1, the component-wise differentiation
+        and simplification of hatted quantities in Steps 2-3c are distributed over a pool of nprocs processes.
+    """
+    DIM = par.parval_from_str("grid::DIM")
+    xx_list = [xx[k] for k in range(DIM)]
 
+    global detgammahatdD, detgammahatdDD
+    global ReUdD, ReUdDD, ReDdD, ReDdDD
+    global ReDDdD, ReDDdDD
+    global ghatDDdD, ghatDDdDD
+    global GammahatUDD
+    global GammahatUDDdD
+    detgammahatdD  = ixp.zerorank1(DIM)
+    detgammahatdDD = ixp.zerorank2(DIM)
+    ReUdD  = ixp.zerorank2(DIM)
+    ReUdDD = ixp.zerorank3(DIM)
+    ReDdD  = ixp.zerorank2(DIM)
+    ReDdDD = ixp.zerorank3(DIM)
+    ReDDdD = ixp.zerorank3(DIM)
+    ReDDdDD = ixp.zerorank4(DIM)
+    ghatDDdD = ixp.zerorank3(DIM)
+    ghatDDdDD = ixp.zerorank4(DIM)
+    GammahatUDD = ixp.zerorank3(DIM)
+    GammahatUDDdD = ixp.zerorank4(DIM)
+
+    # Each task evaluates the derivative of one component of a hatted quantity in one direction,
+    #   storing the result (and its derivatives) into (tensordD, tensordDD) at index idx.
+    #   Tasks involving sp.simplify() are by far the most expensive, so they are scheduled first.
+    def tasks_for(tensor, tensordD, tensordDD, rank, simplify_first_deriv=False):
+        tasks = []
+        for idx in (itertools.product(range(DIM), repeat=rank) if rank > 0 else [()]):
+            expr = tensor
+            for i in idx:
+                expr = expr[i]
+            for k in range(DIM):
+                tasks.append((tensordD, tensordDD, idx + (k,), (expr, xx_list[k], xx_list, simplify_first_deriv,
+                                                                 tensordDD is not None)))
+        return tasks
+    def run_tasks(pool, tasks):
+        if pool is not None:
+            results = pool.starmap(hatted_quantity_derivs, [task[3] for task in tasks], chunksize=1)
+        else:
+            results = [hatted_quantity_derivs(*task[3]) for task in tasks]
+        for (tensordD, tensordDD, idx, _args), (exprdD, exprdDD) in zip(tasks, results):
+            dD = tensordD
+            for i in idx[:-1]:
+                dD = dD[i]
+            dD[idx[-1]] = exprdD
+            if tensordDD is not None:
+                dDD = tensordDD
+                for i in idx:
+                    dDD = dDD[i]
+                dDD[:] = exprdDD
+
+    # Steps 2, 3a, 3b, 3c: 1st & 2nd derivatives of det(ghat), rescaling vectors & matrix, and reference metric.
+    tasks = tasks_for(ghatDD, ghatDDdD, ghatDDdDD, 2, simplify_first_deriv=(SymPySimplifyExpressions == True))
+    tasks += tasks_for(detgammahat, detgammahatdD, detgammahatdDD, 0)
+    tasks += tasks_for(ReU, ReUdD, ReUdDD, 1)
+    tasks += tasks_for(ReD, ReDdD, ReDdDD, 1)
+    tasks += tasks_for(ReDD, ReDDdD, ReDDdDD, 2)
+
+    pool = None
+    if nprocs > 1:
+        try:
+            pool = multiprocessing.Pool(min(nprocs, len(tasks)))
+        except (OSError, RuntimeError, AssertionError):
+            # Process pools are unavailable in some environments (e.g., within daemonic processes)
+            pool = None
+    try:
+        run_tasks(pool, tasks)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Step 4a: Compute Christoffel symbols of reference metric.
+    for i in range(DIM):
+        for k in range(DIM):
+            for l in range(DIM):
+                for m in range(DIM):
+                    GammahatUDD[i][k][l] += (sp.Rational(1, 2))*ghatUU[i][m]*\
+                                            (ghatDDdD[m][k][l] + ghatDDdD[m][l][k] - ghatDDdD[k][l][m])
+
+    # Step 4b: Compute derivs of Christoffel symbols of reference metric.
+    #          These are plain derivatives, cheaper to evaluate here than to pickle to and from a process pool.
+    run_tasks(None, tasks_for(GammahatUDD, GammahatUDDdD, None, 3))
+
+
+def tabulate_2D_hatted_quantities(freevars, freevars_vals, max_num_2D_tables):
+    """ Replace hatted quantity components that depend on exactly two of (xx0,xx1,xx2) by 2D rfm_struct arrays.
+
+        :arg:    list of precomputed reference metric symbols (e.g., f0_of_xx0__D0)
+        :arg:    list of their expressions in terms of xx0, xx1, and xx2
+        :arg:    maximum number of 2D arrays
+        :return: list of (symbol, expression in terms of xx0, xx1, and xx2) of each new 2D array
+
+        Candidates are components (after Step 6 of ref_metric__hatted_quantities()) that are
+        not already a single precomputed symbol. They are ranked by the operation count of
+        their outputC() C code, in order of (sqrts + pows + transcendentals, divs, flops), and the
+        max_num_2D_tables most expensive are chosen. Identical components (e.g., ghatDD[0][1] and
+        ghatDD[1][0]) share one array, named after the first, e.g., ghatDD00_of_xx0_xx1.
+    """
+    import outputC_opcount as outCopc  # NRPy+: Static operation count of generated C code
+    coords_of = {}
+    for var, val in zip(freevars, freevars_vals):
+        coords_of[var] = frozenset(i for i in range(3) if gri.xx[i] in val.free_symbols)
+
+    # Step 1: Find all candidate components, in order of appearance.
+    candidates = {}  # expression -> list of (global name, index tuple)
+    def find_candidates(name, tensor, idx):
+        if isinstance(tensor, list):
+            for i, component in enumerate(tensor):
+                find_candidates(name, component, idx + (i,))
+            return
+        expr = sp.sympify(tensor)
+        if expr.is_Symbol or expr.is_Number:
+            return
+        coords = frozenset().union(*[coords_of.get(sym, frozenset()) for sym in expr.free_symbols])
+        if len(coords) == 2:
+            candidates.setdefault(expr, []).append((name, idx))
+    for name in hatted_quantities_globals:
+        if not name.startswith("scalefactor_orthog"):
+            find_candidates(name, globals()[name], ())
+
+    # Step 2: Rank candidates by their per-gridpoint cost, and choose the most expensive.
+    def cost(expr):
+        counts = outCopc.count_ops_in_Ccode(outputC(expr, "tmp", filename="returnstring",
+                                                    params="includebraces=False,outCverbose=False"))
+        return (counts["sqrts"] + counts["pows"] + counts["transcendentals"], counts["divs"], counts["flops"])
+    ranked = sorted(candidates, key=lambda expr: tuple(-c for c in cost(expr)))
+
+    # Step 3: Replace chosen components by 2D array symbols.
+    tables = []
+    for expr in ranked[:max_num_2D_tables]:
+        name, idx = candidates[expr][0]
+        coords = sorted(frozenset().union(*[coords_of.get(sym, frozenset()) for sym in expr.free_symbols]))
+        table_sym = sp.Symbol(name + "".join(str(i) for i in idx) + "_of_" + "_".join("xx" + str(i) for i in coords))
+        for name, idx in candidates[expr]:
+            tensor = globals()[name]
+            if idx == ():
+                globals()[name] = table_sym
+                continue
+            for i in idx[:-1]:
+                tensor = tensor[i]
+            tensor[idx[-1]] = table_sym
+        tables.append((table_sym, expr.xreplace(dict(zip(freevars, freevars_vals)))))
+    return tables
 
 ####################################################
 # Core Jacobian (basis) transformation functions,
@@ -1264,6 +1426,151 @@ params.const_dz   = sinhv2_const_dr;\n"""
 #######################
 ## C FUNCTIONS RELATED TO REFERENCE METRIC
 
+# Returns True if Cart_to_xx[] has been set to a closed-form expression for
+#   each of xx0,xx1,xx2 by reference_metric(), for the chosen CoordSystem.
+def Cart_to_xx_has_closed_form():
+    return all(Cart_to_xx[i] != 0 for i in range(3))
+
+# Cart_to_xx__Newton(): C functions that invert xx_to_Cart numerically, for
+#   coordinate systems like SinhSphericalv2 & SinhCylindricalv2, in which
+#   no closed-form expression for Cart_to_xx exists. Each Newton-Raphson step
+#     xx^i -> xx^i - lambda (dx^i_rfm/dx^j_Cart) (xx_to_Cart^j(xx) - xCart^j)
+#   uses the analytic inverse Jacobian from
+#   compute_Jacobian_and_inverseJacobian_tofrom_Cartesian(); the step length
+#   lambda <= 1 is limited to half the width of the grid domain and then halved
+#   until |xx_to_Cart(xx) - xCart| decreases. If Newton-Raphson fails to converge
+#   to a point inside the grid domain from the initial guess, it is restarted
+#   from the points of a coarse 4x4x4 lattice spanning the domain, closest
+#   (in the Cartesian sense) to xCart first.
+def Cfunction__Cart_to_xx__Newton(rel_path_to_Cparams=os.path.join("./")):
+    PRECISION = par.parval_from_str("outputC::PRECISION")
+    # Relative tolerance on the Newton-Raphson step in each direction
+    tolerance = {"float": "1e-6", "long double": "1e-17"}.get(PRECISION, "1e-13")
+    max_iterations = 50
+    _Jac_dUCart_dDrfmUD, Jac_dUrfm_dDCartUD = compute_Jacobian_and_inverseJacobian_tofrom_Cartesian()
+    residual = [xx_to_Cart[j] - Cart[j] for j in range(3)]
+    Newton_step = ixp.zerorank1()
+    for i in range(3):
+        for j in range(3):
+            Newton_step[i] += Jac_dUrfm_dDCartUD[i][j]*residual[j]
+    xxmin_str = ",".join([str(xxmin[i]) for i in range(3)])
+    xxmax_str = ",".join([str(xxmax[i]) for i in range(3)])
+
+    _prototype, residual_func = Cfunction(
+        includes=[],
+        desc="Return |xx_to_Cart(xx0,xx1,xx2) - (Cartx,Carty,Cartz)|^2.",
+        c_type="static REAL",
+        name="Cart_to_xx__residual_sq",
+        params="const paramstruct *restrict params, const REAL Cartx, const REAL Carty, const REAL Cartz,\n"
+               "                                    const REAL xx0, const REAL xx1, const REAL xx2",
+        body="  REAL residual[3];\n" +
+             outputC(residual, ["residual[0]", "residual[1]", "residual[2]"], "returnstring",
+                     params="outCverbose=False,preindent=1") +
+             "  return residual[0]*residual[0] + residual[1]*residual[1] + residual[2]*residual[2];\n",
+        rel_path_to_Cparams=rel_path_to_Cparams)
+
+    _prototype, iterate_func = Cfunction(
+        includes=[],
+        desc="""Iterate Newton-Raphson from the initial guess xx[3] until xx_to_Cart(xx) = (Cartx,Carty,Cartz).
+Returns the number of iterations on convergence (overwriting xx[3] with the solution), -1 otherwise.""",
+        c_type="static int",
+        name="Cart_to_xx__Newton_iterate",
+        params="const paramstruct *restrict params, const REAL Cartx, const REAL Carty, const REAL Cartz, REAL xx[3]",
+        body="""  const REAL max_step[3] = { 0.5*(("""+str(xxmax[0])+""") - ("""+str(xxmin[0])+""")),
+                             0.5*(("""+str(xxmax[1])+""") - ("""+str(xxmin[1])+""")),
+                             0.5*(("""+str(xxmax[2])+""") - ("""+str(xxmin[2])+""")) };
+  REAL xx0 = xx[0], xx1 = xx[1], xx2 = xx[2];
+  REAL residual_sq = Cart_to_xx__residual_sq(params, Cartx, Carty, Cartz, xx0, xx1, xx2);
+  for(int iter=0; iter<"""+str(max_iterations)+"""; iter++) {
+    REAL dxx[3];
+""" + outputC(Newton_step[:3], ["dxx[0]", "dxx[1]", "dxx[2]"], "returnstring",
+              params="outCverbose=False,preindent=2") + """
+    REAL lambda = 1.0;
+    for(int i=0; i<3; i++) {
+      // Jacobian is singular or iteration diverged: give up.
+      if(!isfinite(dxx[i])) return -1;
+      if(lambda*fabs(dxx[i]) > max_step[i]) lambda = max_step[i] / fabs(dxx[i]);
+    }
+    if(lambda == 1.0 &&
+       fabs(dxx[0]) <= """+tolerance+"""*(1.0 + fabs(xx0)) &&
+       fabs(dxx[1]) <= """+tolerance+"""*(1.0 + fabs(xx1)) &&
+       fabs(dxx[2]) <= """+tolerance+"""*(1.0 + fabs(xx2))) {
+      xx[0] = xx0 - dxx[0];  xx[1] = xx1 - dxx[1];  xx[2] = xx2 - dxx[2];
+      return iter+1;
+    }
+    // Backtrack until the residual decreases.
+    REAL residual_sq_new = residual_sq;
+    for(int halvings=0; halvings<30; halvings++) {
+      residual_sq_new = Cart_to_xx__residual_sq(params, Cartx, Carty, Cartz,
+                                                xx0 - lambda*dxx[0], xx1 - lambda*dxx[1], xx2 - lambda*dxx[2]);
+      if(residual_sq_new < residual_sq) break;
+      lambda *= 0.5;
+    }
+    // Residual cannot be reduced further along the Newton direction (e.g., roundoff-limited near the root).
+    if(!(residual_sq_new < residual_sq)) return -1;
+    xx0 -= lambda*dxx[0];
+    xx1 -= lambda*dxx[1];
+    xx2 -= lambda*dxx[2];
+    residual_sq = residual_sq_new;
+  }
+  return -1;
+""",
+        rel_path_to_Cparams=rel_path_to_Cparams)
+
+    _prototype, driver_func = Cfunction(
+        includes=[],
+        desc="""Find (xx0,xx1,xx2) such that xx_to_Cart(xx) = (Cartx,Carty,Cartz), starting from the initial guess xx_guess[3].
+Returns 0 if Newton-Raphson converged to a point inside the grid domain,
+        1 if it only converged to a point outside the grid domain (e.g., xCart beyond the outer boundary), and
+       -1 if it did not converge (xx[3] is then set to xx_guess[3]).""",
+        c_type="static int",
+        name="Cart_to_xx__Newton",
+        params="const paramstruct *restrict params, const REAL Cartx, const REAL Carty, const REAL Cartz,\n                              const REAL xx_guess[3], REAL xx[3]",
+        body="""  const REAL xxmin[3] = { """+xxmin_str+""" };
+  const REAL xxmax[3] = { """+xxmax_str+""" };
+  int status = -1;
+  for(int i=0; i<3; i++) xx[i] = xx_guess[i];
+  // Candidate initial guesses: the provided xx_guess[3], then the cell centers of a 4x4x4 lattice spanning the grid domain,
+  //   tried in order of increasing |xx_to_Cart(xx) - xCart|. Lattice points already tried have infinite residual.
+  REAL lattice_residual_sq[64];
+  for(int attempt=-1; attempt<64; attempt++) {
+    REAL xx_try[3];
+    if(attempt < 0) {
+      for(int i=0; i<3; i++) xx_try[i] = xx_guess[i];
+    } else {
+      if(attempt == 0) {
+        for(int l=0; l<64; l++) {
+          const int lattice_idx[3] = { l % 4, (l / 4) % 4, l / 16 };
+          for(int i=0; i<3; i++) xx_try[i] = xxmin[i] + 0.25*((REAL)lattice_idx[i] + 0.5)*(xxmax[i] - xxmin[i]);
+          lattice_residual_sq[l] = Cart_to_xx__residual_sq(params, Cartx, Carty, Cartz, xx_try[0], xx_try[1], xx_try[2]);
+        }
+      }
+      int l_best = 0;
+      for(int l=1; l<64; l++) if(lattice_residual_sq[l] < lattice_residual_sq[l_best]) l_best = l;
+      lattice_residual_sq[l_best] = INFINITY;
+      const int lattice_idx[3] = { l_best % 4, (l_best / 4) % 4, l_best / 16 };
+      for(int i=0; i<3; i++) xx_try[i] = xxmin[i] + 0.25*((REAL)lattice_idx[i] + 0.5)*(xxmax[i] - xxmin[i]);
+    }
+    if(Cart_to_xx__Newton_iterate(params, Cartx, Carty, Cartz, xx_try) < 0) continue;
+    int inbounds = 1;
+    for(int i=0; i<3; i++) {
+      const REAL eps = """+tolerance+"""*(1.0 + fabs(xxmax[i] - xxmin[i]));
+      if(xx_try[i] < xxmin[i] - eps || xx_try[i] > xxmax[i] + eps) inbounds = 0;
+    }
+    if(inbounds) {
+      for(int i=0; i<3; i++) xx[i] = xx_try[i];
+      return 0;
+    }
+    if(status < 0) {
+      for(int i=0; i<3; i++) xx[i] = xx_try[i];
+      status = 1;
+    }
+  }
+  return status;
+""",
+        rel_path_to_Cparams=rel_path_to_Cparams)
+    return residual_func + iterate_func + driver_func
+
 # Construct Cart_to_xx_and_nearest_i0i1i2() C function for
 #   mapping from Cartesian->xx for the chosen CoordSystem.
 def add_to_Cfunc_dict__Cart_to_xx_and_nearest_i0i1i2(rel_path_to_Cparams=os.path.join("./"), relative_to="local_grid_center"):
@@ -1309,6 +1616,18 @@ def add_to_Cfunc_dict__Cart_to_xx_and_nearest_i0i1i2(rel_path_to_Cparams=os.path
         body = outputC([Cart_to_xx[0], Cart_to_xx[1], Cart_to_xx[2]],
                        ["xx[0]", "const REAL target_th", "xx[2]"], "returnstring", params="includebraces=False,preindent=1")
         body += "       xx[1] = NewtonRaphson_get_xx1_from_th(params, target_th);\n"
+    elif not Cart_to_xx_has_closed_form():
+        prefunc = Cfunction__Cart_to_xx__Newton(rel_path_to_Cparams=rel_path_to_Cparams)
+        body = """
+  // No closed-form expression for Cart_to_xx exists for this CoordSystem; invert xx_to_Cart
+  //   with Newton-Raphson, starting from the center of the grid domain.
+  const REAL xx_guess[3] = { """ + ", ".join(["0.5*((" + str(xxmin[i]) + ") + (" + str(xxmax[i]) + "))" for i in range(3)]) + """ };
+  if(Cart_to_xx__Newton(params, Cartx, Carty, Cartz, xx_guess, xx) < 0) {
+    fprintf(stderr, "Error: """ + name + """(): Newton-Raphson failed for (x,y,z) = (%e,%e,%e)\\n",
+            (double)xCart[0], (double)xCart[1], (double)xCart[2]);
+    exit(1);
+  }
+"""
     else:
         body = outputC([Cart_to_xx[0], Cart_to_xx[1], Cart_to_xx[2]],
                        ["xx[0]", "xx[1]", "xx[2]"], "returnstring", params="includebraces=False,preindent=1")
@@ -1334,6 +1653,91 @@ def add_to_Cfunc_dict__Cart_to_xx_and_nearest_i0i1i2(rel_path_to_Cparams=os.path
         rel_path_to_Cparams=rel_path_to_Cparams)
 
 
+# Construct Cart_to_xx_and_nearest_i0i1i2_batch() C function: batched version of
+#   Cart_to_xx_and_nearest_i0i1i2(), mapping num_points Cartesian points at once
+#   (e.g., all interpolation destinations). For coordinate systems without a
+#   closed-form Cart_to_xx, each point is inverted with Newton-Raphson, warm-started
+#   from the caller's nearest grid point i0i1i2_guess[] if provided, and otherwise
+#   from the solution at the previous point handled by the same OpenMP thread.
+def add_to_Cfunc_dict__Cart_to_xx_and_nearest_i0i1i2_batch(rel_path_to_Cparams=os.path.join("./"),
+                                                           relative_to="local_grid_center"):
+    prefunc = ""
+    desc = """Given num_points Cartesian points (x,y,z), stored as xCart[3*p+{0,1,2}], this function outputs the
+  corresponding (xx0,xx1,xx2) in xx[3*p+{0,1,2}] and the "closest" (i0,i1,i2) in Cart_to_i0i1i2[3*p+{0,1,2}].
+  i0i1i2_guess[3*p+{0,1,2}], if not NULL, is a grid point near point p, used as initial guess
+  when no closed-form Cart_to_xx exists. Returns the number of points for which no (xx0,xx1,xx2) was found."""
+    namesuffix = ""
+    if relative_to == "global_grid_center":
+        namesuffix = "_" + relative_to
+    name = "Cart_to_xx_and_nearest_i0i1i2_batch" + namesuffix
+    params = """const paramstruct *restrict params, const int num_points, const REAL *restrict xCart,
+                                         const int *restrict i0i1i2_guess, REAL *restrict xx, int *restrict Cart_to_i0i1i2"""
+
+    if relative_to == "local_grid_center":
+        Cart_origin = ["Cart_originx", "Cart_originy", "Cart_originz"]
+    elif relative_to == "global_grid_center":
+        Cart_origin = ["0", "0", "0"]
+    else:
+        print("Error: relative_to must be set to either local_grid_center or global_grid_center. " + relative_to + " was chosen.")
+        sys.exit(1)
+
+    body = """  int num_failures = 0;
+#pragma omp parallel reduction(+:num_failures)
+  {
+"""
+    if Cart_to_xx_has_closed_form():
+        body += """#pragma omp for
+    for(int p=0; p<num_points; p++) {
+      const REAL Cartx = xCart[3*p+0] - """ + Cart_origin[0] + """;
+      const REAL Carty = xCart[3*p+1] - """ + Cart_origin[1] + """;
+      const REAL Cartz = xCart[3*p+2] - """ + Cart_origin[2] + """;
+""" + outputC(Cart_to_xx[:3], ["xx[3*p+0]", "xx[3*p+1]", "xx[3*p+2]"], "returnstring",
+              params="outCverbose=False,preindent=3")
+    else:
+        prefunc = Cfunction__Cart_to_xx__Newton(rel_path_to_Cparams=rel_path_to_Cparams)
+        body += """    // Unless the caller provides the nearest grid point, each thread warm-starts Newton-Raphson
+    //   from its previous solution; consecutive points are usually close together.
+    REAL xx_prev[3] = { """ + ", ".join(["0.5*((" + str(xxmin[i]) + ") + (" + str(xxmax[i]) + "))" for i in range(3)]) + """ };
+#pragma omp for schedule(static)
+    for(int p=0; p<num_points; p++) {
+      const REAL Cartx = xCart[3*p+0] - """ + Cart_origin[0] + """;
+      const REAL Carty = xCart[3*p+1] - """ + Cart_origin[1] + """;
+      const REAL Cartz = xCart[3*p+2] - """ + Cart_origin[2] + """;
+      REAL xx_guess[3];
+      if(i0i1i2_guess != NULL) {
+        // xx[0][j] = xxmin[0] + ((REAL)(j-NGHOSTS) + (1.0/2.0))*params->dxx0; // Cell-centered grid.
+        xx_guess[0] = (""" + str(xxmin[0]) + """) + ((REAL)(i0i1i2_guess[3*p+0]-NGHOSTS) + (1.0/2.0))*params->dxx0;
+        xx_guess[1] = (""" + str(xxmin[1]) + """) + ((REAL)(i0i1i2_guess[3*p+1]-NGHOSTS) + (1.0/2.0))*params->dxx1;
+        xx_guess[2] = (""" + str(xxmin[2]) + """) + ((REAL)(i0i1i2_guess[3*p+2]-NGHOSTS) + (1.0/2.0))*params->dxx2;
+      } else {
+        for(int i=0; i<3; i++) xx_guess[i] = xx_prev[i];
+      }
+      if(Cart_to_xx__Newton(params, Cartx, Carty, Cartz, xx_guess, &xx[3*p]) < 0) {
+        num_failures++;
+      } else {
+        for(int i=0; i<3; i++) xx_prev[i] = xx[3*p+i];
+      }
+"""
+    body += """
+      // Then find the nearest index (i0,i1,i2) on underlying grid to (x,y,z); see Cart_to_xx_and_nearest_i0i1i2()
+      Cart_to_i0i1i2[3*p+0] = (int)( ( xx[3*p+0] - ("""+str(xxmin[0])+""") ) / params->dxx0 + (1.0/2.0) + NGHOSTS - 0.5 ); // Account for (int) typecast rounding down
+      Cart_to_i0i1i2[3*p+1] = (int)( ( xx[3*p+1] - ("""+str(xxmin[1])+""") ) / params->dxx1 + (1.0/2.0) + NGHOSTS - 0.5 ); // Account for (int) typecast rounding down
+      Cart_to_i0i1i2[3*p+2] = (int)( ( xx[3*p+2] - ("""+str(xxmin[2])+""") ) / params->dxx2 + (1.0/2.0) + NGHOSTS - 0.5 ); // Account for (int) typecast rounding down
+    } // END LOOP over points
+  } // END OpenMP parallel region
+  return num_failures;
+"""
+    add_to_Cfunction_dict(
+        includes=[os.path.join(rel_path_to_Cparams, "NRPy_basic_defines.h")],
+        prefunc=prefunc,
+        desc   =desc,
+        c_type ="int",
+        name   =name,
+        params =params,
+        body   =body,
+        rel_path_to_Cparams=rel_path_to_Cparams)
+
+
 def add_to_Cfunc_dict_set_Nxx_dxx_invdx_params__and__xx(rel_path_to_Cparams=os.path.join("./")):
     includes = [os.path.join(rel_path_to_Cparams, "NRPy_basic_defines.h")]
     desc = "Override default values for Nxx{0,1,2}, Nxx_plus_2NGHOSTS{0,1,2}, dxx{0,1,2}, and invdx{0,1,2}; and set xx[3][]"
@@ -0,0 +1,157 @@
+""" Persistent On-Disk Cache for reference_metric()
+
+    The following script implements a persistent cache for the hatted
+    quantities computed by reference_metric::ref_metric__hatted_quantities()
+    (ghatDD, ghatUU, GammahatUDD, their derivatives, ReU, ReDD, etc.,
+    as well as the rfm_struct C code when rfm_precompute is enabled).
+    Computing these quantities involves many sp.simplify() calls, which
+    for coordinate systems like SinhSymTP add seconds to the startup of
+    every NRPy+ process, including each worker in parallel codegen.
+
+    Each entry is keyed on CoordSystem, the rfm_precompute parameters,
+    the scale factors of the coordinate system, and the source code of
+    reference_metric.py (and the modules it depends on for the hatted
+    quantities). On a cache hit, reference_metric() restores the pickled
+    hatted quantities instead of recomputing them.
+
+    NRPy+ parameters (all within module "reference_metric_cache"):
+        enable_reference_metric_cache : bool, enable the cache (default: False)
+        reference_metric_cache_dir    : char, directory storing cached hatted quantities
+"""
+
+import NRPy_param_funcs as par  # NRPy+: parameter interface
+import grid as gri              # NRPy+: Functions having to do with numerical grids
+import sympy as sp              # SymPy: The Python computer algebra package upon which NRPy+ depends
+import hashlib, os, pickle, sys # Standard Python modules for hashing, serialization, and multiplatform OS-level functions
+
+thismodule = __name__
+par.initialize_param(par.glb_param("bool", thismodule, "enable_reference_metric_cache", False))
+par.initialize_param(par.glb_param("char", thismodule, "reference_metric_cache_dir",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "nrpy_reference_metric")))
+
+# Hit/miss counters, reset with reset_reference_metric_cache_stats()
+reference_metric_cache_stats = {"hits": 0, "misses": 0, "stores": 0}
+
+# Modules whose source code determines the hatted quantities; if any of
+#   these change, all previously cached entries become unreachable.
+_rfm_source_files = ["reference_metric.py", "indexedexp.py", "reference_metric_cache.py"]
+_rfm_source_hash = None
+
+def reference_metric_cache_is_enabled():
+    return par.parval_from_str(thismodule + "::enable_reference_metric_cache")
+
+def reset_reference_metric_cache_stats():
+    for key in reference_metric_cache_stats:
+        reference_metric_cache_stats[key] = 0
+
+def rfm_source_hash():
+    """ Return a hash of the source code of all modules that influence the hatted quantities. """
+    global _rfm_source_hash
+    if _rfm_source_hash is None:
+        hasher = hashlib.sha256()
+        rootdir = os.path.dirname(os.path.abspath(__file__))
+        for filename in _rfm_source_files:
+            path = os.path.join(rootdir, filename)
+            if os.path.isfile(path):
+                with open(path, "rb") as file:
+                    hasher.update(file.read())
+        _rfm_source_hash = hasher.hexdigest()
+    return _rfm_source_hash
+
+def reference_metric_cache_key(scalefactor_orthog, scalefactor_orthog_funcform, SymPySimplifyExpressions=True):
+    """ Compute stable key for the hatted quantities of the current coordinate system.
+
+        :arg:    scale factors of the coordinate system, as functions of xx[]
+        :arg:    scale factors of the coordinate system, as generic functions of xx[]
+        :arg:    SymPySimplifyExpressions argument of reference_metric()
+        :return: hexadecimal digest
+
+        >>> import reference_metric  # Registers the reference_metric parameters
+        >>> from sympy.abc import x, y
+        >>> key1 = reference_metric_cache_key([x, y, 1], [x, y, 1])
+        >>> key2 = reference_metric_cache_key([x, y, 1], [x, y, 1])
+        >>> key3 = reference_metric_cache_key([x, x*y, 1], [x, y, 1])
+        >>> key4 = reference_metric_cache_key([x, y, 1], [x, y, 1], SymPySimplifyExpressions=False)
+        >>> key1 == key2, key1 == key3, key1 == key4
+        (True, False, False)
+    """
+    hasher = hashlib.sha256()
+    def update(string):
+        hasher.update(string.encode("utf-8"))
+        hasher.update(b"\0")
+    update(rfm_source_hash())
+    update(sp.__version__)
+    update(sys.version.split()[0])
+    for parname in ["reference_metric::CoordSystem", "reference_metric::enable_rfm_precompute",
+                    "reference_metric::rfm_precompute_to_Cfunctions_and_NRPy_basic_defines",
+                    "reference_metric::rfm_precompute_max_num_2D_tables", "grid::DIM"]:
+        update(str(par.parval_from_str(parname)))
+    update(str(SymPySimplifyExpressions))
+    update(repr([sp.srepr(sp.sympify(expr)) for expr in scalefactor_orthog]))
+    update(repr([sp.srepr(sp.sympify(expr)) for expr in scalefactor_orthog_funcform]))
+    # rfm_struct arrays are allocated with sizes set by Nxx_plus_2NGHOSTS
+    update(repr([sp.srepr(sp.sympify(Nxx)) for Nxx in gri.Nxx_plus_2NGHOSTS]))
+    return hasher.hexdigest()
+
+def _cache_filename(key):
+    CoordSystem = par.parval_from_str("reference_metric::CoordSystem")
+    return os.path.join(par.parval_from_str(thismodule + "::reference_metric_cache_dir"),
+                        CoordSystem + "__" + key + ".pickle")
+
+def reference_metric_cache_load(key):
+    """ Return the cached dict of reference_metric globals for key, or None on a cache miss.
+
+        >>> import tempfile
+        >>> import reference_metric  # Registers the reference_metric parameters
+        >>> par.set_parval_from_str("reference_metric_cache::reference_metric_cache_dir", tempfile.mkdtemp())
+        >>> reset_reference_metric_cache_stats()
+        >>> print(reference_metric_cache_load("0123abcd"))
+        None
+        >>> from sympy.abc import x
+        >>> reference_metric_cache_store("0123abcd", {"ghatDD": [[x**2, 0], [0, 1]]})
+        >>> reference_metric_cache_load("0123abcd")
+        {'ghatDD': [[x**2, 0], [0, 1]]}
+        >>> reference_metric_cache_stats
+        {'hits': 1, 'misses': 1, 'stores': 1}
+        >>> clear_reference_metric_cache()
+        >>> print(reference_metric_cache_load("0123abcd"))
+        None
+    """
+    filename = _cache_filename(key)
+    try:
+        with open(filename, "rb") as file:
+            rfm_globals = pickle.load(file)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError):
+        reference_metric_cache_stats["misses"] += 1
+        return None
+    reference_metric_cache_stats["hits"] += 1
+    return rfm_globals
+
+def reference_metric_cache_store(key, rfm_globals):
+    """ Store dict of reference_metric globals under key. """
+    filename = _cache_filename(key)
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # Write to a temporary file, then rename: parallel codegen processes may share the cache.
+        tmpfilename = filename + ".tmp" + str(os.getpid())
+        with open(tmpfilename, "wb") as file:
+            pickle.dump(rfm_globals, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpfilename, filename)
+    except (IOError, OSError, pickle.PicklingError) as err:
+        print("Warning: reference_metric_cache could not write to " + filename + ": " + str(err))
+        return
+    reference_metric_cache_stats["stores"] += 1
+
+def clear_reference_metric_cache():
+    """ Remove all cached entries. """
+    cachedir = par.parval_from_str(thismodule + "::reference_metric_cache_dir")
+    if not os.path.isdir(cachedir):
+        return
+    for filename in os.listdir(cachedir):
+        if filename.endswith(".pickle"):
+            try: os.remove(os.path.join(cachedir, filename))
+            except OSError: pass
+
+if __name__ == "__main__":
+    import doctest
+    sys.exit(doctest.testmod()[0])
@@ -0,0 +1,144 @@
+""" Unit Testing for the fused Ricci + BSSN RHS kernels: rhs_eval(fuse_Ricci="registers" or "row_tiles")
+    must agree with Ricci_eval() followed by rhs_eval(fuse_Ricci="none"), in scalar and SIMD code, and
+    in Cartesian coordinates as well as in SinhSpherical coordinates with rfm_precompute """
+
+# pylint: disable = import-error
+import unittest, sys, os, shutil, subprocess, tempfile
+
+repodir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+fuse_Ricci_modes = ["none", "registers", "row_tiles"]
+
+main_Ccode = r"""#include "NRPy_basic_defines.h"
+#include "NRPy_function_prototypes.h"
+#include <math.h>
+
+int main(void) {
+  paramstruct params;
+  set_Cparameters_to_default(&params);
+#include "free_parameters.h"
+  const int Nxx[3] = { 12, 10, 8 };
+  REAL *xx[3];
+  set_Nxx_dxx_invdx_params__and__xx(0, Nxx, &params, xx);
+  const int Nxx_plus_2NGHOSTS0 = params.Nxx_plus_2NGHOSTS0;
+  const int Nxx_plus_2NGHOSTS1 = params.Nxx_plus_2NGHOSTS1;
+  const int Nxx_plus_2NGHOSTS2 = params.Nxx_plus_2NGHOSTS2;
+  const int Nxx_plus_2NGHOSTS[3] = { Nxx_plus_2NGHOSTS0, Nxx_plus_2NGHOSTS1, Nxx_plus_2NGHOSTS2 };
+%(rfmstruct_setup)s
+  const int Ntot = Nxx_plus_2NGHOSTS[0]*Nxx_plus_2NGHOSTS[1]*Nxx_plus_2NGHOSTS[2];
+  REAL *in_gfs = (REAL *)malloc(sizeof(REAL)*NUM_EVOL_GFS*Ntot);
+  REAL *auxevol_gfs = (REAL *)calloc(NUM_AUXEVOL_GFS*Ntot, sizeof(REAL));
+  REAL *rhs_gfs[%(num_modes)d];
+  for(int m=0;m<%(num_modes)d;m++) rhs_gfs[m] = (REAL *)calloc(NUM_EVOL_GFS*Ntot, sizeof(REAL));
+  // Smooth, small perturbations about flat space with unit lapse and conformal factor,
+  //   as functions of gridpoint indices so that they are smooth in any coordinate system.
+  for(int gf=0;gf<NUM_EVOL_GFS;gf++)
+    for(int i2=0;i2<Nxx_plus_2NGHOSTS[2];i2++) for(int i1=0;i1<Nxx_plus_2NGHOSTS[1];i1++) for(int i0=0;i0<Nxx_plus_2NGHOSTS[0];i0++) {
+      const REAL x = 0.1*i0, y = 0.11*i1, z = 0.12*i2;
+      in_gfs[IDX4S(gf,i0,i1,i2)] = ((gf == CFGF || gf == ALPHAGF) ? 1.0 : 0.0)
+        + 0.05*sin(1.3*x + 0.7*gf)*cos(0.9*y - 0.3*gf)*sin(1.1*z + 0.2*gf + 0.5);
+    }
+  Ricci_eval(&params, %(rfm_or_xx)s, in_gfs, auxevol_gfs);
+%(rhs_eval_calls)s
+  REAL max_rel_diff = 0.0;
+  for(int m=1;m<%(num_modes)d;m++)
+    for(int gf=0;gf<NUM_EVOL_GFS;gf++) LOOP_REGION(NGHOSTS,Nxx_plus_2NGHOSTS[0]-NGHOSTS,
+                                                  NGHOSTS,Nxx_plus_2NGHOSTS[1]-NGHOSTS,
+                                                  NGHOSTS,Nxx_plus_2NGHOSTS[2]-NGHOSTS) {
+      const REAL ref = rhs_gfs[0][IDX4S(gf,i0,i1,i2)], val = rhs_gfs[m][IDX4S(gf,i0,i1,i2)];
+      const REAL rel_diff = fabs(val - ref) / (fabs(ref) + 1e-12);
+      if(!(rel_diff <= max_rel_diff)) max_rel_diff = rel_diff;  // Also catches NaNs
+    }
+  printf("%%e\n", max_rel_diff);
+  return 0;
+}
+"""
+
+
+def generate_fuse_Ricci_Ccodes(dirname, CoordSystem, FD_order, enable_rfm_precompute, enable_SIMD):
+    # Output Ricci_eval() and rhs_eval_<mode>() for each fuse_Ricci mode, with the C functions and headers they need.
+    #   Each call must run in a fresh Python process, as NRPy+ gridfunction and C function registrations are global.
+    import NRPy_param_funcs as par
+    import outputC as outC
+    import grid as gri
+    import finite_difference as fin
+    import reference_metric as rfm
+    import BSSN.BSSN_Ccodegen_library as BCL
+
+    par.set_parval_from_str("reference_metric::CoordSystem", CoordSystem)
+    par.set_parval_from_str("finite_difference::FD_CENTDERIVS_ORDER", FD_order)
+    if enable_rfm_precompute:
+        os.mkdir(os.path.join(dirname, "rfm_files"))
+        par.set_parval_from_str("reference_metric::rfm_precompute_Ccode_outdir", os.path.join(dirname, "rfm_files"))
+        par.set_parval_from_str("reference_metric::enable_rfm_precompute", "True")
+        par.set_parval_from_str("reference_metric::rfm_precompute_to_Cfunctions_and_NRPy_basic_defines", "True")
+    rfm.reference_metric()
+
+    includes = ["NRPy_basic_defines.h"]
+    BCL.add_Ricci_eval_to_Cfunction_dict(includes=list(includes), enable_rfm_precompute=enable_rfm_precompute,
+                                         enable_SIMD=enable_SIMD)
+    for mode in fuse_Ricci_modes:
+        BCL.add_rhs_eval_to_Cfunction_dict(includes=list(includes), enable_rfm_precompute=enable_rfm_precompute,
+                                           enable_SIMD=enable_SIMD, func_name_suffix="_" + mode, fuse_Ricci=mode)
+    rfm.register_C_functions(enable_rfm_precompute=enable_rfm_precompute, use_unit_wavespeed_for_find_timestep=True)
+    rfm.register_NRPy_basic_defines(enable_rfm_precompute=enable_rfm_precompute)
+    outC.outputC_register_C_functions_and_NRPy_basic_defines()
+    outC.NRPy_param_funcs_register_C_functions_and_NRPy_basic_defines(dirname)
+    gri.register_C_functions_and_NRPy_basic_defines(enable_griddata_struct=False)
+    fin.register_C_functions_and_NRPy_basic_defines(NGHOSTS_account_for_onezone_upwind=True, enable_SIMD=enable_SIMD)
+    outC.construct_NRPy_basic_defines_h(dirname, enable_SIMD=enable_SIMD)
+    outC.construct_NRPy_function_prototypes_h(dirname)
+    for name, Cfunction in outC.outC_function_dict.items():
+        with open(os.path.join(dirname, name + ".c"), "w") as file:
+            file.write(Cfunction)
+    with open(os.path.join(dirname, "free_parameters.h"), "w") as file:
+        file.write(rfm.out_default_free_parameters_for_rfm("returnstring", 2.0, 0.4, 0.05, 1.0))
+
+    rfm_or_xx = "&rfmstruct" if enable_rfm_precompute else "xx"
+    rfmstruct_setup = ""
+    if enable_rfm_precompute:
+        rfmstruct_setup = """  rfm_struct rfmstruct;
+  rfm_precompute_rfmstruct_malloc(&params, &rfmstruct);
+  rfm_precompute_rfmstruct_define(&params, xx, &rfmstruct);"""
+    rhs_eval_calls = ""
+    for m, mode in enumerate(fuse_Ricci_modes):
+        rhs_eval_calls += "  rhs_eval_%s(&params, %s, auxevol_gfs, in_gfs, rhs_gfs[%d]);\n" % (mode, rfm_or_xx, m)
+    with open(os.path.join(dirname, "main.c"), "w") as file:
+        file.write(main_Ccode % {"num_modes": len(fuse_Ricci_modes), "rfm_or_xx": rfm_or_xx,
+                                 "rfmstruct_setup": rfmstruct_setup, "rhs_eval_calls": rhs_eval_calls})
+
+
+@unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+class TestBSSNFuseRicci(unittest.TestCase):
+
+    def max_rel_diff(self, CoordSystem, FD_order, enable_rfm_precompute, enable_SIMD):
+        # Largest difference between the RHSs of the fused and unfused kernels
+        dirname = tempfile.mkdtemp()
+        try:
+            subprocess.check_call([sys.executable, "-c", "import tests.test_BSSN_fuse_Ricci as t; "
+                                   "t.generate_fuse_Ricci_Ccodes(%r, %r, %d, %r, %r)" %
+                                   (dirname, CoordSystem, FD_order, enable_rfm_precompute, enable_SIMD)],
+                                  cwd=repodir, env=dict(os.environ, PYTHONPATH=repodir), stdout=subprocess.DEVNULL)
+            Cfiles = sorted(os.path.join(dirname, filename) for filename in os.listdir(dirname) if filename.endswith(".c"))
+            exefile = os.path.join(dirname, "fuse_Ricci")
+            subprocess.check_call(["gcc", "-O2", "-fopenmp", "-Wno-unknown-pragmas", "-I" + dirname, "-I" + repodir] +
+                                  (["-march=native"] if enable_SIMD else []) + Cfiles + ["-o", exefile, "-lm"])
+            return float(subprocess.check_output([exefile], env=dict(os.environ, OMP_NUM_THREADS="2")).decode())
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
+
+    def test_fused_and_unfused_rhs_eval_agree(self):
+        self.assertLess(self.max_rel_diff("Cartesian", 2, False, False), 1e-10)
+
+    def test_fused_and_unfused_rhs_eval_agree_rfm_precompute(self):
+        self.assertLess(self.max_rel_diff("SinhSpherical", 4, True, False), 1e-10)
+
+    def test_fused_and_unfused_rhs_eval_agree_SIMD(self):
+        # The production configuration. SIMD requires rfm_precompute, and with SIMD, row_tiles
+        #   computes RbarDD into row buffers with WriteSIMD() and reads them with ReadSIMD()
+        self.assertLess(self.max_rel_diff("SinhSpherical", 4, True, True), 1e-10)
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
@@ -0,0 +1,117 @@
+""" Unit Testing for the Cartesian -> xx inversion in Cart_to_xx_and_nearest_i0i1i2()
+    and Cart_to_xx_and_nearest_i0i1i2_batch(), in a coordinate system (SinhSphericalv2)
+    that has no closed-form Cart_to_xx, so that Newton-Raphson is used """
+
+# pylint: disable = import-error
+import unittest, sys, os, shutil, subprocess, tempfile
+
+import NRPy_param_funcs as par
+import outputC as outC
+import grid as gri
+import finite_difference as fin
+import reference_metric as rfm
+
+main_Ccode = r"""#include "NRPy_basic_defines.h"
+#include "NRPy_function_prototypes.h"
+#include <math.h>
+
+int main(void) {
+  paramstruct params;
+  set_Cparameters_to_default(&params);
+  const int Nxx[3] = { 32, 16, 8 };
+  REAL *xx[3];
+  set_Nxx_dxx_invdx_params__and__xx(0, Nxx, &params, xx);
+  const REAL dxx[3] = { params.dxx0, params.dxx1, params.dxx2 };
+
+  // Points offset from interior gridpoints (i0,i1,i2) by less than half a grid spacing,
+  //   so that (i0,i1,i2) is their nearest gridpoint.
+  const int num_points = Nxx[0]*Nxx[1]*Nxx[2];
+  REAL *xx_pts = (REAL *)malloc(sizeof(REAL)*3*num_points), *xCart = (REAL *)malloc(sizeof(REAL)*3*num_points);
+  int *i0i1i2 = (int *)malloc(sizeof(int)*3*num_points);
+  int p = 0;
+  for(int i2=NGHOSTS;i2<Nxx[2]+NGHOSTS;i2++) for(int i1=NGHOSTS;i1<Nxx[1]+NGHOSTS;i1++) for(int i0=NGHOSTS;i0<Nxx[0]+NGHOSTS;i0++) {
+    const int idx[3] = { i0, i1, i2 };
+    REAL xx_pt[3];
+    for(int d=0;d<3;d++) {
+      xx_pt[d] = xx[d][idx[d]] + (0.1 + 0.3*((p + 7*d) %% 3 - 1))*dxx[d];
+      xx_pts[3*p+d] = xx_pt[d];
+      i0i1i2[3*p+d] = idx[d];
+    }
+    REAL *xx_pt_ptr[3] = { &xx_pt[0], &xx_pt[1], &xx_pt[2] };
+    xx_to_Cart(&params, xx_pt_ptr, 0,0,0, &xCart[3*p]);
+    p++;
+  }
+
+  REAL max_err = 0.0;
+  int num_wrong_i0i1i2 = 0;
+  // Single point
+  for(p=0;p<num_points;p++) {
+    REAL xx_out[3];
+    int i0i1i2_out[3];
+    Cart_to_xx_and_nearest_i0i1i2(&params, &xCart[3*p], xx_out, i0i1i2_out);
+    for(int d=0;d<3;d++) {
+      if(!(fabs(xx_out[d] - xx_pts[3*p+d]) <= max_err)) max_err = fabs(xx_out[d] - xx_pts[3*p+d]);
+      if(i0i1i2_out[d] != i0i1i2[3*p+d]) num_wrong_i0i1i2++;
+    }
+  }
+  // Batch, warm-started from the previous solution and from the nearest gridpoint
+  REAL *xx_out = (REAL *)malloc(sizeof(REAL)*3*num_points);
+  int *i0i1i2_out = (int *)malloc(sizeof(int)*3*num_points);
+  int num_failures = 0;
+  for(int use_guess=0;use_guess<2;use_guess++) {
+    num_failures += Cart_to_xx_and_nearest_i0i1i2_batch(&params, num_points, xCart, use_guess ? i0i1i2 : NULL, xx_out, i0i1i2_out);
+    for(p=0;p<3*num_points;p++) {
+      if(!(fabs(xx_out[p] - xx_pts[p]) <= max_err)) max_err = fabs(xx_out[p] - xx_pts[p]);
+      if(i0i1i2_out[p] != i0i1i2[p]) num_wrong_i0i1i2++;
+    }
+  }
+  printf("%%e %%d %%d\n", max_err, num_wrong_i0i1i2, num_failures);
+  return 0;
+}
+"""
+
+
+@unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+class TestCartToxx(unittest.TestCase):
+
+    def test_SinhSphericalv2_round_trip(self):
+        par.set_parval_from_str("reference_metric::CoordSystem", "SinhSphericalv2")
+        rfm.reference_metric()
+        self.assertFalse(rfm.Cart_to_xx_has_closed_form())
+        dirname = tempfile.mkdtemp()
+        try:
+            rfm.add_to_Cfunc_dict_xx_to_Cart()
+            rfm.add_to_Cfunc_dict_set_Nxx_dxx_invdx_params__and__xx()
+            rfm.add_to_Cfunc_dict__Cart_to_xx_and_nearest_i0i1i2()
+            rfm.add_to_Cfunc_dict__Cart_to_xx_and_nearest_i0i1i2_batch()
+            rfm.register_NRPy_basic_defines()
+            outC.outputC_register_C_functions_and_NRPy_basic_defines()
+            outC.NRPy_param_funcs_register_C_functions_and_NRPy_basic_defines(dirname)
+            gri.register_C_functions_and_NRPy_basic_defines(enable_griddata_struct=False)
+            fin.register_C_functions_and_NRPy_basic_defines()
+            outC.construct_NRPy_basic_defines_h(dirname)
+            outC.construct_NRPy_function_prototypes_h(dirname)
+
+            Cfiles = []
+            for name in ["set_Cparameters_to_default", "xx_to_Cart", "set_Nxx_dxx_invdx_params__and__xx",
+                         "Cart_to_xx_and_nearest_i0i1i2", "Cart_to_xx_and_nearest_i0i1i2_batch"]:
+                Cfiles.append(os.path.join(dirname, name + ".c"))
+                with open(Cfiles[-1], "w") as file:
+                    file.write(outC.outC_function_dict[name])
+            Cfiles.append(os.path.join(dirname, "main.c"))
+            with open(Cfiles[-1], "w") as file:
+                file.write(main_Ccode % {})
+            exefile = os.path.join(dirname, "Cart_to_xx")
+            subprocess.check_call(["gcc", "-O2", "-fopenmp", "-I" + dirname] + Cfiles + ["-o", exefile, "-lm"])
+            max_err, num_wrong_i0i1i2, num_failures = \
+                subprocess.check_output([exefile], env=dict(os.environ, OMP_NUM_THREADS="3")).decode().split()
+            self.assertLess(float(max_err), 1e-12)
+            self.assertEqual(int(num_wrong_i0i1i2), 0)
+            self.assertEqual(int(num_failures), 0)
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
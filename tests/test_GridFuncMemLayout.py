@@ -0,0 +1,172 @@
+""" Unit Testing for grid::GridFuncMemLayout: a scalar wave evolution in curvilinear coordinates (RHSs,
+    curvilinear boundary conditions, and an MoL step, plus an AUX gridfunction diagnostic) must give
+    identical gridfunction values with the contiguous and interleaved memory layouts """
+
+# pylint: disable = import-error
+import unittest, sys, os, shutil, subprocess, tempfile
+
+repodir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def generate_ScalarWave_Ccodes(Ccodesrootdir, GridFuncMemLayout):
+    # Generate and compile ScalarWave_Playground, as in Tutorial-Start_to_Finish-ScalarWaveCurvilinear.ipynb.
+    #   Each call must run in a fresh Python process, as NRPy+ C function registrations are global.
+    import NRPy_param_funcs as par
+    import grid as gri
+    import indexedexp as ixp
+    import reference_metric as rfm
+    import finite_difference as fin
+    import outputC as outC
+    import cmdline_helper as cmd
+    import MoLtimestepping.MoL as MoL
+    import CurviBoundaryConditions.CurviBoundaryConditions as CBC
+    import ScalarWave.InitialData as swid
+    import ScalarWave.ScalarWaveCurvilinear_RHSs as swrhs
+    from outputC import lhrh
+
+    par.set_parval_from_str("grid::GridFuncMemLayout", GridFuncMemLayout)
+    par.set_parval_from_str("reference_metric::rfm_precompute_to_Cfunctions_and_NRPy_basic_defines", "True")
+    par.set_parval_from_str("reference_metric::CoordSystem", "SinhSpherical")
+    rfm.reference_metric()
+    swid.InitialData(CoordSystem="SinhSpherical", WaveType="SphericalGaussian")
+    par.set_parval_from_str("finite_difference::FD_CENTDERIVS_ORDER", 4)
+    par.set_parval_from_str("reference_metric::enable_rfm_precompute", "True")
+    par.set_parval_from_str("reference_metric::rfm_precompute_Ccode_outdir", os.path.join(Ccodesrootdir, "rfm_files"))
+    swrhs.ScalarWaveCurvilinear_RHSs()
+    par.set_parval_from_str("reference_metric::enable_rfm_precompute", "False")
+    rfm.ref_metric__hatted_quantities()
+    # An AUX gridfunction, stored in diagnostic_output_gfs, is accessed with IDX4SN(NUM_AUX_GFS, ...)
+    _uu_dxx = gri.register_gridfunctions("AUX", "uu_dxx")
+    uu_dD = ixp.declarerank1("uu_dD")
+
+    RHS_string = """rhs_eval(params, rfmstruct, RK_INPUT_GFS, RK_OUTPUT_GFS);
+if(params->outer_bc_type == RADIATION_OUTER_BCS)
+  apply_bcs_outerradiation_and_inner(params, bcstruct, griddata->xx,
+                                     gridfunctions_wavespeed,gridfunctions_f_infinity,
+                                     RK_INPUT_GFS, RK_OUTPUT_GFS);"""
+    post_RHS_string = """if(params->outer_bc_type == EXTRAPOLATION_OUTER_BCS)
+  apply_bcs_outerextrap_and_inner(params, bcstruct, RK_OUTPUT_GFS);"""
+    MoL.register_C_functions_and_NRPy_basic_defines("RK4", RHS_string=RHS_string, post_RHS_string=post_RHS_string,
+                                                    enable_rfm=True, enable_curviBCs=True, enable_SIMD=False)
+
+    includes = ["NRPy_basic_defines.h", "NRPy_function_prototypes.h"]
+    outC.add_to_Cfunction_dict(
+        includes=includes, desc="Exact solution at all points", name="exact_solution_all_points",
+        params="const paramstruct *restrict params, REAL *restrict xx[3], REAL *restrict in_gfs",
+        body=fin.FD_outputC("returnstring", [lhrh(lhs=gri.gfaccess("in_gfs", "uu"), rhs=swid.uu_ID),
+                                             lhrh(lhs=gri.gfaccess("in_gfs", "vv"), rhs=swid.vv_ID)],
+                            params="outCverbose=False"),
+        rel_path_to_Cparams=os.path.join("."), loopopts="AllPoints,Read_xxs")
+    outC.add_to_Cfunction_dict(
+        includes=includes, desc="Evaluate the scalar wave RHSs", name="rhs_eval",
+        params="const paramstruct *restrict params, const rfm_struct *restrict rfmstruct, "
+               "const REAL *restrict in_gfs, REAL *restrict rhs_gfs",
+        body=fin.FD_outputC("returnstring", [lhrh(lhs=gri.gfaccess("rhs_gfs", "uu"), rhs=swrhs.uu_rhs),
+                                             lhrh(lhs=gri.gfaccess("rhs_gfs", "vv"), rhs=swrhs.vv_rhs)],
+                            params="outCverbose=False"),
+        rel_path_to_Cparams=os.path.join("."), loopopts="InteriorPoints,enable_rfm_precompute")
+    outC.add_to_Cfunction_dict(
+        includes=includes, desc="Evaluate the AUX gridfunction uu_dxx", name="uu_dxx_eval",
+        params="const paramstruct *restrict params, const REAL *restrict in_gfs, REAL *restrict aux_gfs",
+        body=fin.FD_outputC("returnstring", lhrh(lhs=gri.gfaccess("aux_gfs", "uu_dxx"), rhs=uu_dD[0]),
+                            params="outCverbose=False"),
+        rel_path_to_Cparams=os.path.join("."), loopopts="InteriorPoints")
+
+    CBC.CurviBoundaryConditions_register_NRPy_basic_defines()
+    CBC.CurviBoundaryConditions_register_C_functions(radiation_BC_FD_order=2)
+    with open(os.path.join(Ccodesrootdir, "free_parameters.h"), "w") as file:
+        file.write(("params.wavespeed = 1.0;\n" +
+                    rfm.out_default_free_parameters_for_rfm("returnstring", 10.0, 0.4, 0.05, 1.0)).replace("params.", "griddata.params."))
+    rfm.register_C_functions(enable_rfm_precompute=True)
+    rfm.register_NRPy_basic_defines(enable_rfm_precompute=True)
+
+    # main(): evolve the initial data by one RK4 step, with the outer boundary conditions set by argv[1],
+    #   then print all evolved gridfunctions and uu_dxx, independently of the memory layout
+    body = r"""  griddata_struct griddata;
+  set_Cparameters_to_default(&griddata.params);
+  griddata.params.outer_bc_type = atoi(argv[1]);
+#include "free_parameters.h"
+  const int Nxx[3] = { 8, 4, 6 };
+  set_Nxx_dxx_invdx_params__and__xx(1, Nxx, &griddata.params, griddata.xx);
+  bcstruct_set_up(&griddata.params, griddata.xx, &griddata.bcstruct);
+  for(int i=0;i<3;i++) free(griddata.xx[i]);
+  set_Nxx_dxx_invdx_params__and__xx(0, Nxx, &griddata.params, griddata.xx);
+  griddata.params.dt = find_timestep(&griddata.params, griddata.xx, 0.5);
+  MoL_malloc_y_n_gfs(&griddata.params, &griddata.gridfuncs);
+  rfm_precompute_rfmstruct_malloc(&griddata.params, &griddata.rfmstruct);
+  rfm_precompute_rfmstruct_define(&griddata.params, griddata.xx, &griddata.rfmstruct);
+  griddata.params.time = 0.0;
+  exact_solution_all_points(&griddata.params, griddata.xx, griddata.gridfuncs.y_n_gfs);
+  MoL_malloc_non_y_n_gfs(&griddata.params, &griddata.gridfuncs);
+  MoL_step_forward_in_time(&griddata);
+  uu_dxx_eval(&griddata.params, griddata.gridfuncs.y_n_gfs, griddata.gridfuncs.diagnostic_output_gfs);
+
+  const int Nxx_plus_2NGHOSTS0 = griddata.params.Nxx_plus_2NGHOSTS0;
+  const int Nxx_plus_2NGHOSTS1 = griddata.params.Nxx_plus_2NGHOSTS1;
+  const int Nxx_plus_2NGHOSTS2 = griddata.params.Nxx_plus_2NGHOSTS2;
+  for(int which_gf=0;which_gf<NUM_EVOL_GFS;which_gf++)
+    LOOP_REGION(0,Nxx_plus_2NGHOSTS0, 0,Nxx_plus_2NGHOSTS1, 0,Nxx_plus_2NGHOSTS2)
+      printf("%d %d %d %d %.17e\n", which_gf, i0,i1,i2, griddata.gridfuncs.y_n_gfs[IDX4S(which_gf, i0,i1,i2)]);
+  LOOP_REGION(NGHOSTS,Nxx_plus_2NGHOSTS0-NGHOSTS, NGHOSTS,Nxx_plus_2NGHOSTS1-NGHOSTS, NGHOSTS,Nxx_plus_2NGHOSTS2-NGHOSTS)
+    printf("uu_dxx %d %d %d %.17e\n", i0,i1,i2, griddata.gridfuncs.diagnostic_output_gfs[IDX4SN(NUM_AUX_GFS, UU_DXXGF, i0,i1,i2)]);
+
+  rfm_precompute_rfmstruct_freemem(&griddata.params, &griddata.rfmstruct);
+  free(griddata.bcstruct.inner_bc_array);
+  for(int ng=0;ng<NGHOSTS*3;ng++) free(griddata.bcstruct.pure_outer_bc_array[ng]);
+  MoL_free_memory_y_n_gfs(&griddata.params, &griddata.gridfuncs);
+  MoL_free_memory_non_y_n_gfs(&griddata.params, &griddata.gridfuncs);
+  for(int i=0;i<3;i++) free(griddata.xx[i]);
+  return 0;
+"""
+    outC.add_to_Cfunction_dict(includes=includes, desc="main() function", c_type="int", name="main",
+                               params="int argc, const char *argv[]", body=body,
+                               rel_path_to_Cparams=os.path.join("."), enableCparameters=False)
+
+    outC.outputC_register_C_functions_and_NRPy_basic_defines()
+    outC.NRPy_param_funcs_register_C_functions_and_NRPy_basic_defines(os.path.join(Ccodesrootdir))
+    par.register_NRPy_basic_defines()
+    gri.register_C_functions_and_NRPy_basic_defines()
+    fin.register_C_functions_and_NRPy_basic_defines(NGHOSTS_account_for_onezone_upwind=False, enable_SIMD=False)
+    outC.construct_NRPy_basic_defines_h(Ccodesrootdir, enable_SIMD=False)
+    outC.construct_NRPy_function_prototypes_h(Ccodesrootdir)
+    cmd.new_C_compile(Ccodesrootdir, "ScalarWave_Playground", uses_free_parameters_h=True,
+                      compiler_opt_option="debug", addl_CFLAGS=["-ffp-contract=off"])
+
+
+class TestGridFuncMemLayout(unittest.TestCase):
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname, ignore_errors=True)
+
+    def evolve(self, GridFuncMemLayout, outer_bc_type):
+        Ccodesrootdir = os.path.join(self.dirname, GridFuncMemLayout)
+        exefile = os.path.join(Ccodesrootdir, "ScalarWave_Playground")
+        if not os.path.isfile(exefile):
+            os.makedirs(os.path.join(Ccodesrootdir, "rfm_files"))
+            subprocess.check_call([sys.executable, "-c", "import tests.test_GridFuncMemLayout as t; "
+                                   "t.generate_ScalarWave_Ccodes(" + repr(Ccodesrootdir) + ", " + repr(GridFuncMemLayout) + ")"],
+                                  cwd=repodir, env=dict(os.environ, PYTHONPATH=repodir), stdout=subprocess.DEVNULL)
+        return subprocess.check_output([exefile, str(outer_bc_type)]).decode().splitlines()
+
+    @unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+    def test_layouts_give_identical_evolution(self):
+        for outer_bc_type in [0, 1]:  # EXTRAPOLATION_OUTER_BCS, RADIATION_OUTER_BCS
+            contiguous = self.evolve("contiguous", outer_bc_type)
+            interleaved = self.evolve("interleaved", outer_bc_type)
+            # Both evolved gridfunctions at all gridpoints (NGHOSTS=2), and uu_dxx at all interior points
+            self.assertEqual(len(contiguous), 2*12*8*10 + 8*4*6)
+            self.assertEqual(interleaved, contiguous)
+        # The evolution is nontrivial, and the layouts are different
+        self.assertNotEqual(self.evolve("contiguous", 0), self.evolve("contiguous", 1))
+        for GridFuncMemLayout in ["contiguous", "interleaved"]:
+            with open(os.path.join(self.dirname, GridFuncMemLayout, "NRPy_basic_defines.h")) as file:
+                self.assertEqual("#define IDX4SN(num_gfs,g,i,j,k) ( (g) + (num_gfs) * IDX3S(i,j,k) )" in file.read(),
+                                 GridFuncMemLayout == "interleaved")
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
@@ -0,0 +1,53 @@
+""" Unit Testing for cse_collect(): the single-pass partial factorization in cse_preprocess()
+    must match repeated sp.collect() calls on BSSN RHS expressions """
+
+# pylint: disable = import-error
+import unittest, sys
+import sympy as sp
+
+import NRPy_param_funcs as par
+import reference_metric as rfm
+import BSSN.BSSN_RHSs as rhs
+import BSSN.BSSN_gauge_RHSs as gaugerhs
+from expr_tree import ExprTree
+from cse_helpers import cse_preprocess, cse_collect
+
+
+def sequential_collect(expr, syms):
+    # Reference: one sp.collect() call per symbol, on the expression and on the first argument of every function
+    tree = ExprTree(expr)
+    for subtree in tree.preorder():
+        if isinstance(subtree.expr, sp.Function):
+            arg = subtree.children[0]
+            for var in syms:
+                arg.expr = sp.collect(arg.expr, var)
+            tree.build(arg)
+    expr = tree.reconstruct()
+    for var in syms:
+        expr = sp.collect(expr, var)
+    return expr
+
+
+class TestCSECollect(unittest.TestCase):
+
+    def test_cse_collect_matches_sp_collect_on_BSSN_RHSs(self):
+        par.set_parval_from_str("reference_metric::CoordSystem", "Spherical")
+        rfm.reference_metric()
+        rhs.BSSN_RHSs()
+        gaugerhs.BSSN_gauge_RHSs()
+        # A sample of the BSSN RHSs, in Spherical coordinates so that functions (e.g., sin(xx1)) appear
+        expr_list = [rhs.cf_rhs, rhs.trK_rhs, gaugerhs.alpha_rhs, gaugerhs.vet_rhsU[0], gaugerhs.bet_rhsU[2]]
+        expr_list += [rhs.h_rhsDD[i][j] for i in range(3) for j in range(i, 3)]
+        expr_list, map_sym_to_rat = cse_preprocess(expr_list, factor=False)
+        syms = list(map_sym_to_rat)
+        memo = {}
+        for i, expr in enumerate(expr_list):
+            reference = sequential_collect(expr, syms)
+            self.assertEqual(cse_collect(expr, syms), reference, "expression " + str(i))
+            # Memoised results shared across expressions must not change the result
+            self.assertEqual(cse_collect(expr, syms, memo), reference, "expression " + str(i) + " (shared memo)")
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
@@ -0,0 +1,58 @@
+""" Unit Testing for cse_preprocess(shared=True): the output must be identical to that of
+    cse_preprocess(), while subexpressions shared by the expressions are preprocessed only once """
+
+# pylint: disable = import-error
+import unittest, sys
+from unittest import mock
+import sympy as sp
+
+import outputC as outC
+import cse_helpers
+
+R = sp.Rational
+
+
+def collect_work(expr_list, **kwargs):
+    # The output of cse_preprocess(), and the number of terms rewritten while partially factoring the expressions
+    with mock.patch.object(cse_helpers, "_expand_power_base", wraps=cse_helpers._expand_power_base) as expand_power_base:
+        output = cse_helpers.cse_preprocess(expr_list, **kwargs)
+    return output, expand_power_base.call_count
+
+
+class TestCSEPreprocessShared(unittest.TestCase):
+
+    def setUp(self):
+        a, b, c, d, x = sp.symbols("a b c d x", real=True)
+        S = R(1, 3)*a*b + R(2, 3)*a*c - R(1, 12)*b*d + R(5, 7)*d*sp.sin(R(1, 3)*a + R(1, 3)*c) + R(1, 12)*c*d
+        T = R(1, 3)*a*d - R(1, 12)*c + sp.cos(R(1, 12)*b + R(1, 12)*x)
+        self.exprs = [S**2*T + R(1, 3)*x*S, S*T - R(1, 12)*T**2, sp.exp(R(1, 3)*S*T + R(1, 3)*x), S + T + R(2, 3)*x*T]
+
+    def test_shared_subexpressions_are_preprocessed_once(self):
+        for kwargs in [{}, {"declare": True, "negative": True}]:
+            output, work = collect_work(self.exprs, **kwargs)
+            output_shared, work_shared = collect_work(self.exprs, shared=True, **kwargs)
+            self.assertEqual(output_shared, output)
+            self.assertLess(work_shared, work)
+            # Repeated expressions cost nothing extra in shared mode, but are preprocessed again otherwise
+            _output, work_first = collect_work(self.exprs[:1], **kwargs)
+            _output, work_repeated = collect_work(self.exprs[:1]*3, **kwargs)
+            _output, work_repeated_shared = collect_work(self.exprs[:1]*3, shared=True, **kwargs)
+            self.assertEqual((work_repeated, work_repeated_shared), (3*work_first, work_first))
+
+    def test_outputC_CSE_preprocess_shared(self):
+        output_varnames = ["out" + str(i) for i in range(len(self.exprs))]
+        for enable_SIMD in ["False", "True"]:
+            params = "outCverbose=False,CSE_preprocess=True,enable_SIMD=" + enable_SIMD
+            with mock.patch.object(cse_helpers, "_expand_power_base", wraps=cse_helpers._expand_power_base) as expand_power_base:
+                Ccode = outC.outputC(self.exprs, output_varnames, "returnstring", params=params)
+                work = expand_power_base.call_count
+                expand_power_base.reset_mock()
+                Ccode_shared = outC.outputC(self.exprs, output_varnames, "returnstring", params=params + ",CSE_preprocess_shared=True")
+                work_shared = expand_power_base.call_count
+            self.assertEqual(Ccode_shared, Ccode)
+            self.assertLess(work_shared, work)
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
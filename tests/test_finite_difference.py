@@ -0,0 +1,252 @@
+""" Unit Testing for finite difference coefficients computed by Fornberg's algorithm """
+
+# pylint: disable = import-error
+import unittest, sys, os, re, shutil, subprocess, tempfile
+import sympy as sp
+
+import NRPy_param_funcs as par
+import grid as gri
+import indexedexp as ixp
+import finite_difference as fin
+import loop as lp
+import outputC_opcount as outCopc
+from outputC import lhrh
+
+R = sp.Rational
+
+
+def compile_and_run(Ccode, dirname, CFLAGS=None):
+    Cfile = os.path.join(dirname, "FD_kernels.c")
+    exefile = os.path.join(dirname, "FD_kernels")
+    with open(Cfile, "w") as file:
+        file.write(Ccode)
+    subprocess.check_call(["gcc", "-O2", "-ffp-contract=off", "-Wall", "-Werror", "-Wno-unknown-pragmas", "-Wno-unused-variable",
+                           "-I" + os.path.dirname(os.path.dirname(os.path.abspath(__file__)))] + (CFLAGS or []) +
+                          [Cfile, "-o", exefile, "-lm"])
+    return subprocess.check_output([exefile]).decode()
+
+
+def upwind_branches(Ccode):
+    # The C code of each branch of each if (UpwindControlVectorU...) or if (UpWindLanes...) statement
+    branches, indent = [], None
+    for line in Ccode.splitlines():
+        stripped = line.strip()
+        if indent is None and stripped.startswith("if (Up"):
+            indent = line[:len(line) - len(line.lstrip())]
+            branches.append([""])
+        elif indent is not None and line.startswith(indent + "}"):
+            if stripped == "}":
+                indent = None
+            else:
+                branches[-1].append("")
+        elif indent is not None:
+            branches[-1][-1] += line + "\n"
+    return branches
+
+
+class TestFiniteDifference(unittest.TestCase):
+
+    def setUp(self):
+        self.FD_CENTDERIVS_ORDER = par.parval_from_str("finite_difference::FD_CENTDERIVS_ORDER")
+        self.glb_gridfcs_list = list(gri.glb_gridfcs_list)
+        par.set_parval_from_str("finite_difference::FD_CENTDERIVS_ORDER", 4)
+
+    def tearDown(self):
+        par.set_parval_from_str("finite_difference::FD_CENTDERIVS_ORDER", self.FD_CENTDERIVS_ORDER)
+        gri.glb_gridfcs_list = self.glb_gridfcs_list
+
+    def test_centered_coefficients_match_known_tables(self):
+        # Centered coefficients from the standard tables [B. Fornberg, Math. Comp. 51, 699 (1988)]
+        known = {(3, 1): [R(-1, 2), 0, R(1, 2)],
+                 (5, 1): [R(1, 12), R(-2, 3), 0, R(2, 3), R(-1, 12)],
+                 (7, 1): [R(-1, 60), R(3, 20), R(-3, 4), 0, R(3, 4), R(-3, 20), R(1, 60)],
+                 (3, 2): [1, -2, 1],
+                 (5, 2): [R(-1, 12), R(4, 3), R(-5, 2), R(4, 3), R(-1, 12)],
+                 (7, 2): [R(1, 90), R(-3, 20), R(3, 2), R(-49, 18), R(3, 2), R(-3, 20), R(1, 90)],
+                 (5, 3): [R(-1, 2), 1, 0, -1, R(1, 2)],
+                 (7, 3): [R(1, 8), -1, R(13, 8), 0, R(-13, 8), 1, R(-1, 8)],
+                 (5, 4): [1, -4, 6, -4, 1]}
+        for (STENCILWIDTH, deriv_order), weights in known.items():
+            self.assertEqual(list(fin.fdcoeffs_1D(STENCILWIDTH, 0, deriv_order)), weights)
+
+    def test_offset_coefficients_match_known_tables(self):
+        # One-point upwinded and fully one-sided 4th-order first derivatives
+        self.assertEqual(list(fin.fdcoeffs_1D(5, 1, 1)), [R(-1, 4), R(-5, 6), R(3, 2), R(-1, 2), R(1, 12)])
+        self.assertEqual(list(fin.fdcoeffs_1D(5, 2, 1)), [R(-25, 12), 4, -3, R(4, 3), R(-1, 4)])
+        self.assertEqual(list(fin.fdcoeffs_1D(5, -2, 1)), [R(1, 4), R(-4, 3), 3, -4, R(25, 12)])
+
+    def test_compute_fdcoeffs_fdstencl(self):
+        fdcoeffs, fdstencl = fin.compute_fdcoeffs_fdstencl("dD0")
+        self.assertEqual(fdcoeffs, [R(1, 12), R(-2, 3), R(2, 3), R(-1, 12)])
+        self.assertEqual(fdstencl, [[-2, 0, 0, 0], [-1, 0, 0, 0], [1, 0, 0, 0], [2, 0, 0, 0]])
+        # 4th-order unmixed third derivative: 7-point stencil
+        fdcoeffs, fdstencl = fin.compute_fdcoeffs_fdstencl("dDDD111")
+        self.assertEqual(fdcoeffs, [R(1, 8), -1, R(13, 8), R(-13, 8), 1, R(-1, 8)])
+        self.assertEqual([idx4[1] for idx4 in fdstencl], [-3, -2, -1, 1, 2, 3])
+
+    def test_third_derivative_requires_wide_ghost_zones(self):
+        # NGHOSTS = FD_CENTDERIVS_ORDER/2 + 1 suffices for the 7-point 4th-order stencil, but NGHOSTS = FD_CENTDERIVS_ORDER/2 does not
+        fin.compute_fdcoeffs_fdstencl("dDDD000", NGHOSTS=3)
+        with self.assertRaises(ValueError):
+            fin.compute_fdcoeffs_fdstencl("dDDD000", NGHOSTS=2)
+        # Other operators and unchecked calls are unaffected, also after a failed check
+        fin.compute_fdcoeffs_fdstencl("dDD00", NGHOSTS=2)
+        fin.compute_fdcoeffs_fdstencl("dDDD000")
+
+    def test_FD_outputC_checks_NGHOSTS(self):
+        uu, vv = gri.register_gridfunctions("EVOL", ["uu", "vv"])
+        uu_dDDD = ixp.declarerank3("uu_dDDD", "sym012")
+        exprs = [lhrh(lhs=gri.gfaccess("rhs_gfs", "uu"), rhs=vv), lhrh(lhs=gri.gfaccess("rhs_gfs", "vv"), rhs=uu_dDDD[1][1][1])]
+        params = "outCverbose=False,FD_NGHOSTS="
+        self.assertIn("in_gfs[IDX4S(UUGF, i0,i1+3,i2)]", fin.FD_outputC("returnstring", exprs, params=params + "3"))
+        with self.assertRaises(ValueError):
+            fin.FD_outputC("returnstring", exprs, params=params + "2")
+        # The check applies only to the FD_outputC() call it is requested for
+        self.assertIn("in_gfs[IDX4S(UUGF, i0,i1+3,i2)]", fin.FD_outputC("returnstring", exprs, params="outCverbose=False"))
+
+    @unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+    def test_FD_unroll_i0_gives_identical_results(self):
+        # Nxx0 = 11 is not a multiple of any unroll factor tested, so the remainder loop is always exercised
+        uu, vv = gri.register_gridfunctions("EVOL", ["uu", "vv"])
+        uu_dD = ixp.declarerank1("uu_dD")
+        uu_dDD = ixp.declarerank2("uu_dDD", "sym01")
+        xx0 = sp.Symbol("xx0", real=True)
+        exprs = [lhrh(lhs=gri.gfaccess("rhs_gfs", "uu"), rhs=vv),
+                 lhrh(lhs=gri.gfaccess("rhs_gfs", "vv"), rhs=uu_dDD[0][0] + uu_dDD[1][1] + uu_dDD[2][2] + uu_dD[0]*vv*xx0)]
+        unroll_factors = [1, 2, 3, 4]
+        Ccode = """#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+#define REAL double
+#define NGHOSTS 2
+#define UUGF 0
+#define VVGF 1
+#define IDX4S(g,i,j,k) ( (i) + Nxx_plus_2NGHOSTS0*( (j) + Nxx_plus_2NGHOSTS1*( (k) + Nxx_plus_2NGHOSTS2*(g) ) ) )
+const int Nxx0 = 11, Nxx1 = 5, Nxx2 = 4;
+const int Nxx_plus_2NGHOSTS0 = 11 + 2*NGHOSTS, Nxx_plus_2NGHOSTS1 = 5 + 2*NGHOSTS, Nxx_plus_2NGHOSTS2 = 4 + 2*NGHOSTS;
+const REAL invdx0 = 1.1, invdx1 = 0.9, invdx2 = 1.3;
+"""
+        for unroll_factor in unroll_factors:
+            body = fin.FD_outputC("returnstring", exprs, params="outCverbose=False,FD_unroll_i0=" + str(unroll_factor))
+            self.assertEqual("i0_unrolled_end" in lp.simple_loop("InteriorPoints,Read_xxs", body), unroll_factor > 1)
+            Ccode += "void rhs_%d(REAL *xx[3], const REAL *restrict in_gfs, REAL *restrict rhs_gfs) {\n%s}\n" % \
+                (unroll_factor, lp.simple_loop("InteriorPoints,Read_xxs", body))
+        Ccode += """int main(void) {
+  const int N = 2*Nxx_plus_2NGHOSTS0*Nxx_plus_2NGHOSTS1*Nxx_plus_2NGHOSTS2;
+  const int Nxx_plus_2NGHOSTS[3] = { Nxx_plus_2NGHOSTS0, Nxx_plus_2NGHOSTS1, Nxx_plus_2NGHOSTS2 };
+  REAL *xx[3];
+  for(int d=0;d<3;d++) {
+    xx[d] = (REAL *)malloc(sizeof(REAL)*Nxx_plus_2NGHOSTS[d]);
+    for(int j=0;j<Nxx_plus_2NGHOSTS[d];j++) xx[d][j] = 0.1*j - 0.3*d;
+  }
+  REAL *in_gfs = (REAL *)malloc(sizeof(REAL)*N), *ref = (REAL *)calloc(N, sizeof(REAL)), *out = (REAL *)calloc(N, sizeof(REAL));
+  for(int i=0;i<N;i++) in_gfs[i] = sin(0.37*i);
+  rhs_1(xx, in_gfs, ref);
+"""
+        for unroll_factor in unroll_factors[1:]:
+            Ccode += """  for(int i=0;i<N;i++) out[i] = 0.0;
+  rhs_%d(xx, in_gfs, out);
+  for(int i=0;i<N;i++) if(out[i] != ref[i]) { printf("MISMATCH %d\\n"); return 1; }
+""" % (unroll_factor, unroll_factor)
+        Ccode += "  printf(\"OK\\n\");\n  return 0;\n}\n"
+        dirname = tempfile.mkdtemp()
+        try:
+            self.assertEqual(compile_and_run(Ccode, dirname).strip(), "OK")
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
+
+    def upwinded_exprs(self):
+        uu, vv = gri.register_gridfunctions("EVOL", ["uu", "vv"])
+        betaU = ixp.register_gridfunctions_for_single_rank1("AUXEVOL", "betaU")
+        uu_dupD = ixp.declarerank1("uu_dupD")
+        vv_dupD = ixp.declarerank1("vv_dupD")
+        uu_dDD = ixp.declarerank2("uu_dDD", "sym01")
+        return betaU, [lhrh(lhs=gri.gfaccess("rhs_gfs", "uu"), rhs=vv + sum(betaU[i]*uu_dupD[i] for i in range(3))),
+                       lhrh(lhs=gri.gfaccess("rhs_gfs", "vv"), rhs=uu_dDD[0][0] + sum(betaU[i]*vv_dupD[i] for i in range(2)))]
+
+    @unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+    def test_FD_upwind_branch_gives_identical_results(self):
+        # Branching on the sign of betaU must select the same one-sided stencils as blending them,
+        #   for control vectors that are positive, negative, zero, or (with SIMD) of mixed sign across the lanes.
+        betaU, exprs = self.upwinded_exprs()
+        for enable_SIMD in ["False", "True"]:
+            Ccode = """#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+#ifdef ENABLE_SIMD
+#include "SIMD/SIMD_intrinsics.h"
+#else
+#define UPWIND_ALG(UpwindVecU) UpwindVecU > 0.0 ? 1.0 : 0.0
+#endif
+#define NGHOSTS 3
+#define UUGF 0
+#define VVGF 1
+#define BETAU0GF 0
+#define BETAU1GF 1
+#define BETAU2GF 2
+#define IDX4S(g,i,j,k) ( (i) + Nxx_plus_2NGHOSTS0*( (j) + Nxx_plus_2NGHOSTS1*( (k) + Nxx_plus_2NGHOSTS2*(g) ) ) )
+const int Nxx0 = 16, Nxx1 = 6, Nxx2 = 5;
+const int Nxx_plus_2NGHOSTS0 = 16 + 2*NGHOSTS, Nxx_plus_2NGHOSTS1 = 6 + 2*NGHOSTS, Nxx_plus_2NGHOSTS2 = 5 + 2*NGHOSTS;
+"""
+            invdx = [("invdx0", "1.1"), ("invdx1", "0.9"), ("invdx2", "1.3")]
+            preloop = "".join("  const REAL_SIMD_ARRAY %s = ConstSIMD(%s);\n" % inv if enable_SIMD == "True"
+                              else "  const double %s = %s;\n" % inv for inv in invdx)
+            for upwind_branch in ["False", "True"]:
+                body = fin.FD_outputC("returnstring", exprs, upwindcontrolvec=betaU,
+                                      params="outCverbose=False,enable_SIMD=" + enable_SIMD + ",FD_upwind_branch=" + upwind_branch)
+                self.assertEqual("if (Up" in body, upwind_branch == "True")
+                loopopts = "InteriorPoints" + (",enable_SIMD" if enable_SIMD == "True" else "")
+                Ccode += "void rhs_branch%s(const double *restrict auxevol_gfs, const double *restrict in_gfs, double *restrict rhs_gfs) {\n%s%s}\n" % \
+                    (upwind_branch, preloop, lp.simple_loop(loopopts, body))
+            Ccode += """int main(void) {
+  const int N = Nxx_plus_2NGHOSTS0*Nxx_plus_2NGHOSTS1*Nxx_plus_2NGHOSTS2;
+  double *auxevol_gfs = (double *)malloc(sizeof(double)*3*N), *in_gfs = (double *)malloc(sizeof(double)*2*N);
+  double *ref = (double *)calloc(2*N, sizeof(double)), *out = (double *)calloc(2*N, sizeof(double));
+  for(int i=0;i<2*N;i++) in_gfs[i] = sin(0.37*i);
+  for(int d=0;d<3;d++) for(int i2=0;i2<Nxx_plus_2NGHOSTS2;i2++) for(int i1=0;i1<Nxx_plus_2NGHOSTS1;i1++) for(int i0=0;i0<Nxx_plus_2NGHOSTS0;i0++) {
+    const int pattern = (i1 + 2*i2 + d) % 3;
+    auxevol_gfs[IDX4S(d, i0,i1,i2)] = pattern == 0 ? 0.5 + 0.01*i0 : (pattern == 1 ? -0.5 - 0.01*i0 : (i0 % 3 == 0 ? 0.0 : sin(1.3*i0 + i1 + d)));
+  }
+  rhs_branchFalse(auxevol_gfs, in_gfs, ref);
+  rhs_branchTrue(auxevol_gfs, in_gfs, out);
+  for(int i=0;i<2*N;i++) if(fabs(out[i] - ref[i]) > 1e-13*(1.0 + fabs(ref[i]))) { printf("MISMATCH\\n"); return 1; }
+  printf("OK\\n");
+  return 0;
+}
+"""
+            dirname = tempfile.mkdtemp()
+            try:
+                self.assertEqual(compile_and_run(Ccode, dirname, ["-march=native", "-DENABLE_SIMD"] if enable_SIMD == "True" else []).strip(),
+                                 "OK")
+            finally:
+                shutil.rmtree(dirname, ignore_errors=True)
+
+    def test_FD_upwind_branch_flop_savings(self):
+        # The flops reported in the generated code comment must be those of the generated branches:
+        #   the more expensive one-sided branch, vs. the branch evaluating & blending both stencils (SIMD only).
+        betaU, exprs = self.upwinded_exprs()
+        for enable_SIMD in [False, True]:
+            Ccode = fin.FD_outputC("returnstring", exprs, upwindcontrolvec=betaU,
+                                   params="outCverbose=False,FD_upwind_branch=True,enable_SIMD=" + str(enable_SIMD))
+            flops_branch, flops_blend = [int(flops) for flops in
+                                         re.search(r"\(([0-9]+) flops per point, vs\. ([0-9]+) evaluating", Ccode).groups()]
+            self.assertLess(flops_branch, flops_blend)
+            branches = upwind_branches(Ccode)
+            self.assertEqual([len(direction) for direction in branches], [3 if enable_SIMD else 2]*3)
+            flops = [[outCopc.count_ops_in_Ccode(branch, "double")["flops"] for branch in direction] for direction in branches]
+            self.assertEqual(flops_branch, sum(max(direction[:2]) for direction in flops))
+            if enable_SIMD:
+                self.assertEqual(flops_blend, sum(direction[2] for direction in flops))
+
+    def test_coeffs_table_requires_a_file(self):
+        par.set_parval_from_str("finite_difference::enable_FD_coeffs_table", True)
+        try:
+            with self.assertRaises(SystemExit):
+                fin.fdcoeffs_1D(9, 0, 1)
+        finally:
+            par.set_parval_from_str("finite_difference::enable_FD_coeffs_table", False)
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
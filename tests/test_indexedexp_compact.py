@@ -0,0 +1,92 @@
+""" Unit Testing for indexedexp.CompactIndexedExp: for each symmetry and dimension, the compact indexed
+    expression must be equivalent to the nested-list indexed expression of declare_indexedexp() """
+
+# pylint: disable = import-error
+import unittest, sys, itertools
+import sympy as sp
+
+import NRPy_param_funcs as par
+import indexedexp as ixp
+
+# (rank, symmetry, dimension, number of independent components)
+cases = [(1, None, 4, 4),
+         (2, "nosym", 2, 4), (2, "sym01", 3, 6), (2, "sym01", 4, 10), (2, "anti01", 2, 1), (2, "anti01", 4, 6),
+         (3, "sym12", 2, 6), (3, "sym12", 3, 18), (3, "sym01", 4, 40), (3, "anti12", 3, 9), (3, "anti12", 4, 24),
+         (4, "sym01_sym23", 2, 9), (4, "anti01_anti23", 3, 9), (4, "anti01_anti23", 4, 36)]
+
+
+def component(indexedexp, index):
+    for i in index:
+        indexedexp = indexedexp[i]
+    return indexedexp
+
+
+class TestCompactIndexedExp(unittest.TestCase):
+
+    def test_equivalent_to_declare_indexedexp(self):
+        for rank, symmetry, dimension, num_independent in cases:
+            msg = str((rank, symmetry, dimension))
+            T = ixp.CompactIndexedExp(rank, "T", symmetry, dimension)
+            reference = ixp.declare_indexedexp(rank, "T", symmetry, dimension)
+            self.assertEqual(T.tolist(), reference, msg)
+            self.assertEqual(len(T), dimension, msg)
+            independent = T.independent_indices()
+            self.assertEqual(len(independent), num_independent, msg)
+            self.assertEqual(independent, sorted(independent), msg)
+            # Each independent component is stored under its own name, and the orbits of the
+            #   independent components partition the nonzero components, with the signs of the symmetry
+            covered = []
+            for index in independent:
+                symbol = sp.Symbol("T" + "".join(str(i) for i in index))
+                self.assertEqual(component(T, index), symbol, msg)
+                orbit = T.orbit(index)
+                self.assertIn((1, index), orbit, msg)
+                self.assertEqual(T.multiplicity(index), len(orbit), msg)
+                for sign, orbit_index in orbit:
+                    self.assertEqual(component(reference, orbit_index), sign*symbol, msg)
+                covered += [orbit_index for _sign, orbit_index in orbit]
+            self.assertEqual(len(covered), len(set(covered)), msg)
+            for index in itertools.product(range(dimension), repeat=rank):
+                self.assertEqual(index in covered, component(reference, index) != 0, msg)
+
+    def test_assignment_sets_related_components(self):
+        x = sp.Symbol("x")
+        for rank, symmetry, dimension, _num_independent in cases:
+            msg = str((rank, symmetry, dimension))
+            for index in ixp.CompactIndexedExp(rank, "T", symmetry, dimension).independent_indices():
+                T = ixp.CompactIndexedExp(rank, "T", symmetry, dimension)
+                orbit = T.orbit(index)
+                # Assign to the last index of the orbit, through the partially-indexed views
+                sign, last = orbit[-1]
+                view = T
+                for i in last[:-1]:
+                    view = view[i]
+                view[last[-1]] = sign*x
+                for orbit_sign, orbit_index in orbit:
+                    self.assertEqual(component(T, orbit_index), orbit_sign*x, msg)
+                self.assertEqual(sum(1 for value in T.components.values() if value == x), 1, msg)
+        A = ixp.CompactIndexedExp(3, "A", "anti12", 3)
+        with self.assertRaises(ValueError):
+            A[0][1][1] = x
+        A[0][1][1] = 0
+        with self.assertRaises(TypeError):
+            A[0] = x
+        with self.assertRaises(TypeError):
+            A[0][1] = x
+
+    def test_default_dimension(self):
+        DIM = par.parval_from_str("grid::DIM")
+        par.set_parval_from_str("grid::DIM", 4)
+        try:
+            T = ixp.CompactIndexedExp(2, "T", "sym01")
+        finally:
+            par.set_parval_from_str("grid::DIM", DIM)
+        self.assertEqual(T.dimension, 4)
+        self.assertEqual(T.tolist(), ixp.declarerank2("T", "sym01", DIM=4))
+        with self.assertRaises(ValueError):
+            ixp.CompactIndexedExp(2, "T", "sym01", 2.5)
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
@@ -0,0 +1,130 @@
+""" Unit Testing for cache-blocked (tiled) loops generated by loop.simple_loop() """
+
+# pylint: disable = import-error
+import unittest, sys, os, shutil, subprocess, tempfile
+
+import NRPy_param_funcs as par
+import loop as lp
+import outputC as outC
+import loop_tiling_autotune as lptune
+
+repodir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def compile_and_run(Ccode, dirname):
+    Cfile = os.path.join(dirname, "tiled_loops.c")
+    exefile = os.path.join(dirname, "tiled_loops")
+    with open(Cfile, "w") as file:
+        file.write(Ccode)
+    subprocess.check_call(["gcc", "-O2", "-fopenmp", "-Wall", "-Werror", "-Wno-unknown-pragmas", Cfile, "-o", exefile])
+    return subprocess.check_output([exefile], env=dict(os.environ, OMP_NUM_THREADS="3")).decode()
+
+
+@unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+class TestLoopTiling(unittest.TestCase):
+
+    def test_tiled_loops_visit_each_point_once(self):
+        # Each tiled loop must update exactly the points updated by the untiled loop, once each,
+        #   including tiles that do not evenly divide the grid.
+        body = "out[IDX3(i0,i1,i2)] += 1 + i0 + 100*i1 + 10000*i2;\n"
+        tile_sizes = [[0, 0, 0], [0, 8, 0], [4, 4, 0], [3, 5, 0], [2, 3, 7], [16, 16, 16]]
+        Ccode = """#include <stdio.h>
+#include <stdlib.h>
+#define MIN(A, B) ( ((A) < (B)) ? (A) : (B) )
+#define NGHOSTS 2
+#define IDX3(i,j,k) ( (i) + Nxx_plus_2NGHOSTS0*( (j) + Nxx_plus_2NGHOSTS1*(k) ) )
+const int Nxx0 = 13, Nxx1 = 11, Nxx2 = 9;
+const int Nxx_plus_2NGHOSTS0 = 13 + 2*NGHOSTS, Nxx_plus_2NGHOSTS1 = 11 + 2*NGHOSTS, Nxx_plus_2NGHOSTS2 = 9 + 2*NGHOSTS;
+"""
+        for n, tile_size in enumerate(tile_sizes):
+            for points in ["AllPoints", "InteriorPoints"]:
+                loopopts = points + ("," + lp.tile_size_loopopt(tile_size) if any(tile_size) else "")
+                Ccode += "void loop_%s_%d(double *restrict out) {\n%s}\n" % (points, n, lp.simple_loop(loopopts, body))
+        Ccode += """int main(void) {
+  const int N = Nxx_plus_2NGHOSTS0*Nxx_plus_2NGHOSTS1*Nxx_plus_2NGHOSTS2;
+  double *ref = calloc(N, sizeof(double)), *out = calloc(N, sizeof(double));
+"""
+        for points in ["AllPoints", "InteriorPoints"]:
+            Ccode += "  for(int i=0;i<N;i++) ref[i] = 0.0;\n  loop_%s_0(ref);\n" % points
+            for n in range(1, len(tile_sizes)):
+                Ccode += """  for(int i=0;i<N;i++) out[i] = 0.0;
+  loop_%s_%d(out);
+  for(int i=0;i<N;i++) if(out[i] != ref[i]) { printf("MISMATCH %s %d\\n"); return 1; }
+""" % (points, n, points, n)
+        Ccode += "  printf(\"OK\\n\");\n  free(ref); free(out);\n  return 0;\n}\n"
+        dirname = tempfile.mkdtemp()
+        try:
+            self.assertEqual(compile_and_run(Ccode, dirname).strip(), "OK")
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
+
+    def test_SIMD_tile_size_must_be_multiple_of_SIMD_width(self):
+        # SIMD_width, if given, is checked when generating the loop
+        with self.assertRaises(ValueError):
+            lp.simple_loop("InteriorPoints,enable_SIMD,tile_size=(0,8,4),SIMD_width=8", "// <INTERIOR>")
+        self.assertIn("i0B", lp.simple_loop("InteriorPoints,enable_SIMD,tile_size=(0,8,4),SIMD_width=4", "// <INTERIOR>"))
+        self.assertIn("i0B", lp.simple_loop("InteriorPoints,enable_SIMD,tile_size=(0,8,16),SIMD_width=8", "// <INTERIOR>"))
+        # Otherwise, it is checked when compiling, for the SIMD_width of the SIMD intrinsics in use
+        Ccode = """#include "SIMD/SIMD_intrinsics.h"
+#define MIN(A, B) ( ((A) < (B)) ? (A) : (B) )
+#define NGHOSTS 2
+void loop(const int Nxx0, const int Nxx1, const int Nxx2, double *restrict out) {
+%s}
+""" % lp.simple_loop("InteriorPoints,enable_SIMD,tile_size=(0,8,4)",
+                     "WriteSIMD(&out[i0 + (NGHOSTS+Nxx0)*(i1 + (NGHOSTS+Nxx1)*i2)], ConstSIMD(1.0));")
+        dirname = tempfile.mkdtemp()
+        try:
+            Cfile = os.path.join(dirname, "SIMD_tiled_loop.c")
+            with open(Cfile, "w") as file:
+                file.write(Ccode)
+            def compiles(CFLAGS):
+                return subprocess.call(["gcc", "-fsyntax-only", "-Wno-unknown-pragmas", "-I" + repodir] + CFLAGS + [Cfile],
+                                       stderr=subprocess.DEVNULL) == 0
+            self.assertTrue(compiles(["-mno-avx"]))                           # SSE: SIMD_width = 2
+            self.assertTrue(compiles(["-mavx", "-mfma", "-mno-avx512f"]))      # AVX: SIMD_width = 4
+            self.assertFalse(compiles(["-mavx512f", "-mfma"]))                # AVX-512: SIMD_width = 8
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
+
+
+
+class TestTunedTileSizes(unittest.TestCase):
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.parvals = [par.parval_from_str("loop_tiling_autotune::" + parname)
+                        for parname in ["tile_size_database", "tuned_tile_sizes_Nxx"]]
+        par.set_parval_from_str("loop_tiling_autotune::tile_size_database", os.path.join(self.dirname, "tile_sizes.json"))
+        self.names = ["tiled_rhs_eval", "untiled_rhs_eval"]
+
+    def tearDown(self):
+        for parname, parval in zip(["tile_size_database", "tuned_tile_sizes_Nxx"], self.parvals):
+            par.set_parval_from_str("loop_tiling_autotune::" + parname, parval)
+        outC.outC_function_master_list[:] = [item for item in outC.outC_function_master_list if item.name not in self.names]
+        for Cdict in [outC.outC_function_dict, outC.outC_function_prototype_dict, outC.outC_function_outdir_dict]:
+            for name in self.names:
+                Cdict.pop(name, None)
+        shutil.rmtree(self.dirname, ignore_errors=True)
+
+    def register(self, name, loopopts):
+        outC.add_to_Cfunction_dict(desc="Test function", name=name, params="double *restrict out",
+                                   body="out[IDX3(i0,i1,i2)] = 1.0;", loopopts=loopopts, enableCparameters=False)
+        return outC.outC_function_dict.pop(name)
+
+    def test_tuned_tile_sizes_are_opt_in(self):
+        for name in self.names:
+            lptune.record_tile_size(name, [64, 32, 16], [0, 8, 0], 1e-3, {})
+        untuned = [self.register(name, "InteriorPoints") for name in self.names]
+        par.set_parval_from_str("loop_tiling_autotune::tuned_tile_sizes_Nxx", "64,32,16")
+        # Only C functions registered with the tuned_tile_size loop option get their recorded tile sizes
+        self.assertEqual(self.register("untiled_rhs_eval", "InteriorPoints"), untuned[1])
+        tiled = self.register("tiled_rhs_eval", "InteriorPoints,tuned_tile_size")
+        self.assertNotEqual(tiled, untuned[0])
+        body = "out[IDX3(i0,i1,i2)] = 1.0;"
+        self.assertEqual(tiled, untuned[0].replace(lp.simple_loop("InteriorPoints", body),
+                                                   lp.simple_loop("InteriorPoints,tile_size=(0,8,0)", body)))
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
@@ -0,0 +1,299 @@
+""" Unit Testing for outputC code generation options """
+
+# pylint: disable = import-error
+import unittest, sys, os, shutil, subprocess, tempfile
+from unittest import mock
+import sympy as sp
+
+import NRPy_param_funcs as par
+import outputC as outC
+import loop as lp
+import cse_helpers
+
+eval_main_Ccode = r"""#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+#define REAL double
+#ifdef ENABLE_SIMD
+#include "SIMD/SIMD_intrinsics.h"
+#else
+#define REAL_SIMD_ARRAY REAL
+#define SIMD_width 1
+#define ReadSIMD(a) *(a)
+#define WriteSIMD(a,b) *(a)=(b)
+#endif
+#define NUM_POINTS 16
+
+int main(void) {
+  static REAL inputs[%(num_inputs)d][NUM_POINTS], outputs[%(num_outputs)d][NUM_POINTS];
+  for(int i=0;i<%(num_inputs)d;i++) for(int p=0;p<NUM_POINTS;p++) inputs[i][p] = 0.5 + 0.37*i + 0.11*p;
+  for(int p=0;p<NUM_POINTS;p+=SIMD_width) {
+%(read_inputs)s    REAL_SIMD_ARRAY %(output_varnames)s;
+%(Ccode)s
+%(write_outputs)s  }
+  for(int i=0;i<%(num_outputs)d;i++) for(int p=0;p<NUM_POINTS;p++) printf("%%.17e\n", outputs[i][p]);
+  return 0;
+}
+"""
+
+
+def eval_outputC(exprs, params, enable_SIMD=False):
+    """ Compile and run the C code output by outputC() for exprs, at 16 points.
+
+        :arg:    list of SymPy expressions, in positive input symbols
+        :arg:    outputC() parameters (enable_SIMD excluded)
+        :arg:    whether to generate and compile SIMD code
+        :return: (C code, list of output values: all points of the first expression, then the second, ...)
+    """
+    inputs = sorted(set().union(*[expr.free_symbols for expr in exprs]), key=str)
+    output_varnames = ["out" + str(i) for i in range(len(exprs))]
+    Ccode = outC.outputC(exprs, output_varnames, "returnstring",
+                         params="outCverbose=False,enable_SIMD=" + str(enable_SIMD) + ("," + params if params else ""))
+    dirname = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(dirname, "main.c"), "w") as file:
+            file.write(eval_main_Ccode % {
+                "num_inputs": len(inputs), "num_outputs": len(exprs), "Ccode": Ccode,
+                "read_inputs": "".join("    const REAL_SIMD_ARRAY %s = ReadSIMD(&inputs[%d][p]);\n" % (sym, i)
+                                       for i, sym in enumerate(inputs)),
+                "output_varnames": ", ".join(output_varnames),
+                "write_outputs": "".join("    WriteSIMD(&outputs[%d][p], %s);\n" % (i, varname)
+                                         for i, varname in enumerate(output_varnames))})
+        # -ffp-contract=off: no FMAs other than those output by NRPy+, so that results are reproducible
+        subprocess.check_call(["gcc", "-O2", "-march=native", "-ffp-contract=off", "-std=gnu99",
+                               "-I" + os.path.dirname(os.path.abspath(outC.__file__))] +
+                              (["-DENABLE_SIMD"] if enable_SIMD else []) +
+                              [os.path.join(dirname, "main.c"), "-o", os.path.join(dirname, "main"), "-lm"])
+        values = [float(value) for value in subprocess.check_output([os.path.join(dirname, "main")]).split()]
+    finally:
+        shutil.rmtree(dirname, ignore_errors=True)
+    return Ccode, values
+
+
+class TestOutputC(unittest.TestCase):
+
+    def assertValuesAlmostEqual(self, values, reference, rel_tol=1e-13):
+        self.assertEqual(len(values), len(reference))
+        for value, ref in zip(values, reference):
+            self.assertLessEqual(abs(value - ref), rel_tol * abs(ref), str(value) + " != " + str(ref))
+
+    def test_CSE_schedule_output_read_by_later_output(self):
+        # Bar reads Foo, so Foo must be assigned first, whether or not CSE_schedule is enabled.
+        x, y, Foo = sp.symbols("x y Foo")
+        for schedule in ["False", "True"]:
+            Ccode = outC.outputC([sp.sin(x) + x*sp.cos(y), Foo*sp.sin(x) + y], ["Foo", "Bar"], "returnstring",
+                                 params="outCverbose=False,CSE_schedule=" + schedule)
+            self.assertLess(Ccode.index("Foo = "), Ccode.index("Bar = "))
+
+    def test_CSE_schedule_output_overwrites_input(self):
+        # Bar reads the old value of Foo, so Foo must be assigned last.
+        x, y, Foo = sp.symbols("x y Foo")
+        for schedule in ["False", "True"]:
+            Ccode = outC.outputC([Foo*sp.sin(x) + y, sp.sin(x) + x*sp.cos(y)], ["Bar", "Foo"], "returnstring",
+                                 params="outCverbose=False,CSE_schedule=" + schedule)
+            self.assertLess(Ccode.index("Bar = "), Ccode.index("Foo = "))
+
+    def test_CSE_schedule_temporary_reads_overwritten_input(self):
+        # tmp0 = sin(Foo) must be evaluated before Foo is overwritten.
+        x, Foo = sp.symbols("x Foo")
+        Ccode = outC.outputC([x*sp.cos(x), sp.sin(Foo)*x + sp.sin(Foo)**2, sp.sin(x)], ["Foo", "Bar", "Baz"], "returnstring",
+                             params="outCverbose=False,CSE_schedule=True")
+        self.assertLess(Ccode.index("sin(Foo)"), Ccode.index("Foo = "))
+
+    @unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+    def test_CSE_schedule_gives_identical_results(self):
+        x, y, z = sp.symbols("x y z", positive=True)
+        exprs = []
+        for k in range(1, 5):
+            # Each CSE temporary z + sqrt(x + k*y) is read by two outputs, next to which it is scheduled
+            s = sp.sqrt(x + k*y) + z
+            exprs += [s*x + s/y, s*y - s*z*x]
+        for enable_SIMD in [False, True]:
+            Ccode_unscheduled, reference = eval_outputC(exprs, "", enable_SIMD=enable_SIMD)
+            Ccode, values = eval_outputC(exprs, "CSE_schedule=True", enable_SIMD=enable_SIMD)
+            self.assertNotEqual(Ccode, Ccode_unscheduled)
+            # Only the order of the statements changes, so results agree to the last bit
+            self.assertEqual(values, reference)
+
+    @unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+    def test_CSE_hoist_reciprocals(self):
+        x, y, z = sp.symbols("x y z", positive=True)
+        exprs = [x/(y + z) + y/(y + z)**2 + z/(x*(y + z)**3), (x + y)/(y + z) - z/(x*(y + z)) + sp.sqrt(y + z)/x]
+        _Ccode, reference = eval_outputC(exprs, "")
+        _Ccode, values = eval_outputC(exprs, "CSE_hoist_reciprocals=True")
+        self.assertValuesAlmostEqual(values, reference)
+        # SIMD: each of the two denominators is divided by only once
+        Ccode_unhoisted, values_unhoisted = eval_outputC(exprs, "", enable_SIMD=True)
+        Ccode, values = eval_outputC(exprs, "CSE_hoist_reciprocals=True", enable_SIMD=True)
+        self.assertEqual((Ccode_unhoisted.count("DivSIMD("), Ccode.count("DivSIMD(")), (4, 2))
+        self.assertValuesAlmostEqual(values_unhoisted, reference)
+        self.assertValuesAlmostEqual(values, reference)
+
+    @unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+    def test_CSE_reduce_powers(self):
+        x, y, z = sp.symbols("x y z", positive=True)
+        exprs = [x**5 + y**sp.Rational(7, 2) + z**(-3), sp.sqrt(x)*y**sp.Rational(-3, 2) + x**3*z**2]
+        Ccode, reference = eval_outputC(exprs, "")
+        self.assertEqual(Ccode.count("pow("), 2)
+        # Without CSE_reduce_powers, SIMD code would call PowSIMD(), which is not defined in SIMD_intrinsics.h
+        self.assertIn("PowSIMD(", outC.outputC(exprs, ["out0", "out1"], "returnstring", params="outCverbose=False,enable_SIMD=True"))
+        for enable_SIMD in [False, True]:
+            Ccode, values = eval_outputC(exprs, "CSE_reduce_powers=True", enable_SIMD=enable_SIMD)
+            self.assertNotIn("pow(", Ccode.replace("PowSIMD(", "pow("))
+            self.assertValuesAlmostEqual(values, reference)
+
+    @unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+    def test_CSE_partitions(self):
+        x, y, z = sp.symbols("x y z", positive=True)
+        exprs = []
+        for k in range(1, 7):
+            s = sp.sqrt(x + k*y) + z/(x + y)
+            exprs += [s*x + s**2/y, s*y - s*z*x + (x + y)**k]
+        # CSE_partitions=4 splits the 12 expressions into 4 groups, CSE'd separately (plus one CSE of the shared subexpressions)
+        partitions = cse_helpers.partition_expr_list(exprs, 4)
+        self.assertEqual(len(partitions), 4)
+        self.assertEqual(sorted(sum(partitions, [])), list(range(len(exprs))))
+        with mock.patch.object(cse_helpers, "_cse_worker", wraps=cse_helpers._cse_worker) as cse_worker:
+            cse_helpers.cse_partitioned(exprs, sp.numbered_symbols("tmp"), num_partitions=4, nprocs=1)
+            self.assertEqual(cse_worker.call_count, 1 + 4)
+            self.assertEqual(sorted(len(call[0][0]) for call in cse_worker.call_args_list[1:]),
+                             sorted(len(partition) for partition in partitions))
+        for enable_SIMD in [False, True]:
+            _Ccode, reference = eval_outputC(exprs, "", enable_SIMD=enable_SIMD)
+            Ccode, values = eval_outputC(exprs, "CSE_partitions=4", enable_SIMD=enable_SIMD)
+            self.assertEqual(Ccode.count("sqrt(" if not enable_SIMD else "SqrtSIMD("), 6)
+            self.assertValuesAlmostEqual(values, reference)
+
+    @unittest.skipIf(cse_helpers.se is None or shutil.which("gcc") is None, "requires SymEngine and gcc")
+    def test_CSE_backend_symengine(self):
+        x, y, z = sp.symbols("x y z", positive=True)
+        exprs = [(x + y)**2*sp.sqrt(x*z + y) + z/(x + y), sp.sqrt(x*z + y)/(x + y) - x*y*z, (x*y*z + 1)**3 + x/(x*z + y)]
+        replaced, reduced = cse_helpers.cse_symengine(exprs, sp.numbered_symbols("tmp"))
+        self.assertGreater(len(replaced), 0)
+        self.assertTrue(cse_helpers.cse_outputs_agree((replaced, reduced), sp.cse(exprs, sp.numbered_symbols("tmp"))))
+        for enable_SIMD in [False, True]:
+            _Ccode, reference = eval_outputC(exprs, "", enable_SIMD=enable_SIMD)
+            _Ccode, values = eval_outputC(exprs, "CSE_backend=symengine,CSE_backend_validate=True", enable_SIMD=enable_SIMD)
+            self.assertValuesAlmostEqual(values, reference)
+
+    def test_CSE_backend_symengine_fallback(self):
+        # Without SymEngine, CSE_backend=symengine falls back to SymPy's CSE
+        x, y, z = sp.symbols("x y z", positive=True)
+        exprs = [(x + y)**2*sp.sin(x*z) + z/(x + y), sp.sin(x*z)/(x + y)]
+        params = "outCverbose=False,CSE_backend="
+        with mock.patch.object(cse_helpers, "se", None):
+            self.assertIsNone(cse_helpers.cse_symengine(exprs, sp.numbered_symbols("tmp")))
+            self.assertEqual(outC.outputC(exprs, ["out0", "out1"], "returnstring", params=params + "symengine"),
+                             outC.outputC(exprs, ["out0", "out1"], "returnstring", params=params + "sympy"))
+
+    def test_CSE_backend_validate_catches_mismatch(self):
+        x, y, z = sp.symbols("x y z", positive=True)
+        exprs = [(x + y)**2*sp.sin(x*z) + z/(x + y), sp.sin(x*z)/(x + y)]
+
+        def wrong_cse(expr_list, symbols, order="canonical"):
+            replaced, reduced = sp.cse(expr_list, symbols, order=order)
+            return replaced, [reduced[0] + sp.Rational(1, 10**8)*x] + reduced[1:]
+        params = "outCverbose=False,CSE_backend=symengine,CSE_backend_validate="
+        with mock.patch.object(outC, "cse_symengine", wrong_cse):
+            self.assertIn("1.0/100000000.0", outC.outputC(exprs, ["out0", "out1"], "returnstring", params=params + "False"))
+            with self.assertRaises(SystemExit):
+                outC.outputC(exprs, ["out0", "out1"], "returnstring", params=params + "True")
+
+    @unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+    def test_CSE_hoist_loop_invariants(self):
+        # amp is a C parameter, so expressions of amp alone may be hoisted out of all loops
+        self.addCleanup(setattr, par, "glb_Cparams_list", list(par.glb_Cparams_list))
+        amp = par.Cparameters("REAL", "test_outputC", ["amp"], 0.7)
+        xx0, xx1, xx2, uu = sp.symbols("xx0 xx1 xx2 uu", real=True)
+        expr = uu*sp.sin(xx1)*sp.cos(xx2) + xx2**2*sp.exp(amp*xx2) + xx0*sp.sqrt(amp**2 + 1) + uu**2/(2 + sp.cos(xx1)*sp.sin(xx2))
+        Ccode = """#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+#define REAL double
+#define IDX3(i,j,k) ( (i) + Nxx_plus_2NGHOSTS0*( (j) + Nxx_plus_2NGHOSTS1*(k) ) )
+const int Nxx_plus_2NGHOSTS0 = 7, Nxx_plus_2NGHOSTS1 = 6, Nxx_plus_2NGHOSTS2 = 5;
+const REAL amp = 0.7;
+"""
+        loops = []
+        for hoist in ["False", "True"]:
+            body = "const REAL uu = in_gfs[IDX3(i0,i1,i2)];\n" + \
+                outC.outputC(expr, "out_gfs[IDX3(i0,i1,i2)]", "returnstring",
+                             params="outCverbose=False,CSE_hoist_loop_invariants=" + hoist)
+            loops.append(lp.simple_loop("AllPoints,Read_xxs,DisableOpenMP", body))
+            Ccode += "void kernel_%s(REAL *xx[3], const REAL *restrict in_gfs, REAL *restrict out_gfs) {\n%s}\n" % (hoist, loops[-1])
+        # With hoisting, all function calls (of xx1, xx2, and amp only) are made outside the i0 loop
+        for loop_Ccode, hoisted in zip(loops, [False, True]):
+            i0_loop_Ccode = loop_Ccode[loop_Ccode.index("for (int i0"):]
+            for func in ["sin(", "cos(", "exp(", "sqrt("]:
+                self.assertEqual(func in i0_loop_Ccode, not hoisted, func)
+        self.assertIn("const REAL xx2 = xx[2][i2];\n    const double tmpinv_", loops[1])
+        Ccode += r"""int main(void) {
+  const int N = Nxx_plus_2NGHOSTS0*Nxx_plus_2NGHOSTS1*Nxx_plus_2NGHOSTS2;
+  const int Nxx_plus_2NGHOSTS[3] = { Nxx_plus_2NGHOSTS0, Nxx_plus_2NGHOSTS1, Nxx_plus_2NGHOSTS2 };
+  REAL *xx[3];
+  for(int d=0;d<3;d++) {
+    xx[d] = (REAL *)malloc(sizeof(REAL)*Nxx_plus_2NGHOSTS[d]);
+    for(int j=0;j<Nxx_plus_2NGHOSTS[d];j++) xx[d][j] = 0.1 + 0.23*j - 0.4*d;
+  }
+  REAL *in_gfs = (REAL *)malloc(sizeof(REAL)*N), *out_gfs[2] = { (REAL *)malloc(sizeof(REAL)*N), (REAL *)malloc(sizeof(REAL)*N) };
+  for(int i=0;i<N;i++) in_gfs[i] = sin(0.37*i);
+  kernel_False(xx, in_gfs, out_gfs[0]);
+  kernel_True(xx, in_gfs, out_gfs[1]);
+  for(int i=0;i<N;i++) printf("%.17e %.17e\n", out_gfs[0][i], out_gfs[1][i]);
+  return 0;
+}
+"""
+        dirname = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(dirname, "main.c"), "w") as file:
+                file.write(Ccode)
+            subprocess.check_call(["gcc", "-O2", "-ffp-contract=off", "-Wall", "-Werror", "-std=gnu99",
+                                   os.path.join(dirname, "main.c"), "-o", os.path.join(dirname, "main"), "-lm"])
+            values = [float(value) for value in subprocess.check_output([os.path.join(dirname, "main")]).split()]
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
+        self.assertValuesAlmostEqual(values[1::2], values[0::2])
+
+    def test_stream_Cfunctions_writes_identical_files(self):
+        Cdicts = [outC.outC_function_dict, outC.outC_function_chunks_dict,
+                  outC.outC_function_prototype_dict, outC.outC_function_outdir_dict]
+        saved = [list(outC.outC_function_master_list)] + [dict(Cdict) for Cdict in Cdicts]
+        x = sp.Symbol("x")
+        body = outC.outputC(sp.sin(x)**2, "out_gfs[IDX3S(i0,i1,i2)]", "returnstring", params="outCverbose=False")
+        dirnames = []
+        try:
+            for stream in [False, True]:
+                del outC.outC_function_master_list[:]
+                for Cdict in Cdicts:
+                    Cdict.clear()
+                par.set_parval_from_str("outputC::stream_Cfunctions", stream)
+                outC.add_to_Cfunction_dict(includes=["NRPy_basic_defines.h"], desc="Test function", name="func",
+                                           params="const paramstruct *restrict params, REAL *restrict out_gfs",
+                                           body=body, loopopts="AllPoints")
+                outC.add_to_Cfunction_dict(name="func2", params="void", body="  return;\n", enableCparameters=False,
+                                           path_from_rootsrcdir_to_this_Cfunc="subdir")
+                # Streamed functions are not held in outC_function_dict, but have the same prototypes
+                self.assertEqual(sorted(outC.outC_function_dict), [] if stream else ["func", "func2"])
+                self.assertEqual(sorted(outC.outC_function_chunks_dict), ["func", "func2"] if stream else [])
+                self.assertEqual(outC.outC_function_prototype_dict["func2"], "void func2(void);")
+                dirnames.append(tempfile.mkdtemp())
+                os.mkdir(os.path.join(dirnames[-1], "subdir"))
+                outC.construct_Makefile_from_outC_function_dict(dirnames[-1], "test", create_lib=True)
+            for Cfile in ["func.c", os.path.join("subdir", "func2.c")]:
+                with open(os.path.join(dirnames[0], Cfile)) as file0, open(os.path.join(dirnames[1], Cfile)) as file1:
+                    Ccode = file0.read()
+                    self.assertIn("for (int i0 = 0; i0 < Nxx_plus_2NGHOSTS0; i0++)" if Cfile == "func.c" else "return;", Ccode)
+                    self.assertEqual(Ccode, file1.read())
+        finally:
+            par.set_parval_from_str("outputC::stream_Cfunctions", False)
+            outC.outC_function_master_list[:] = saved[0]
+            for Cdict, saved_Cdict in zip(Cdicts, saved[1:]):
+                Cdict.clear()
+                Cdict.update(saved_Cdict)
+            for dirname in dirnames:
+                shutil.rmtree(dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
@@ -0,0 +1,72 @@
+""" Unit Testing for outputC_opcount: pin the operation and memory-traffic counts of scalar,
+    SIMD and finite-difference kernels as actually generated by outputC() and FD_outputC(),
+    so that any change in the formatting of generated C code that breaks the counts is caught """
+
+# pylint: disable = import-error
+import unittest, sys, re
+import sympy as sp
+
+import NRPy_param_funcs as par
+import grid as gri
+import indexedexp as ixp
+import finite_difference as fin
+from outputC import outputC, lhrh
+import outputC_opcount as outCopc
+
+op_keys  = ["adds", "muls", "fmas", "divs", "sqrts", "pows", "transcendentals", "others", "calls", "flops"]
+mem_keys = ["gf_loads", "gf_stores", "gf_read_streams", "gf_write_streams", "aux_loads",
+            "bytes_per_point", "bytes_per_point_no_reuse"]
+
+
+def nonzero_counts(Ccode, keys):
+    counts = outCopc.count_ops_in_Ccode(Ccode, "double")
+    # Counts must not depend on whitespace or line breaks in the generated code
+    counts_reformatted = outCopc.count_ops_in_Ccode(re.sub(r'\s+', ' ', Ccode).replace(" = ", "="), "double")
+    assert counts == counts_reformatted, outCopc.compare_op_counts(counts, counts_reformatted)
+    return dict((key, counts[key]) for key in keys if counts[key] != 0)
+
+
+class TestOutputCOpcount(unittest.TestCase):
+
+    def setUp(self):
+        par.set_parval_from_str("finite_difference::FD_CENTDERIVS_ORDER", 4)
+        x, y = sp.symbols("x y", real=True)
+        self.exprs = [sp.sqrt(x)*y + sp.sin(x)/y, x**3 + sp.Rational(1, 3)*y]
+
+    def scalar_kernel(self, enable_SIMD):
+        return outputC(self.exprs, ["out0", "out1"], filename="returnstring",
+                       params="enable_SIMD=" + str(enable_SIMD) + ",outCverbose=False,includebraces=False")
+
+    def FD_kernel(self, enable_SIMD):
+        gri.glb_gridfcs_list = []
+        uu, vv = gri.register_gridfunctions("EVOL", ["uu", "vv"])
+        uu_dDD = ixp.declarerank2("uu_dDD", "sym01")
+        return fin.FD_outputC("returnstring",
+                              [lhrh(lhs=gri.gfaccess("rhs_gfs", "uu"), rhs=vv),
+                               lhrh(lhs=gri.gfaccess("rhs_gfs", "vv"), rhs=uu_dDD[0][0] + uu_dDD[1][1] + uu_dDD[2][2])],
+                              params="enable_SIMD=" + str(enable_SIMD) + ",outCverbose=False")
+
+    def test_scalar_kernel(self):
+        # out0 = sqrt(x)*y + sin(x)/y; out1 = ((x)*(x)*(x)) + (1.0/3.0)*y;
+        self.assertEqual(nonzero_counts(self.scalar_kernel(False), op_keys),
+                         {"adds": 2, "muls": 4, "divs": 1, "sqrts": 1, "transcendentals": 1, "flops": 7})
+        self.assertEqual(nonzero_counts(self.scalar_kernel(False), mem_keys), {})
+
+    def test_SIMD_kernel(self):
+        # Two FusedMulAddSIMD()s replace two adds and two muls; flops are unchanged
+        self.assertEqual(nonzero_counts(self.scalar_kernel(True), op_keys),
+                         {"muls": 2, "fmas": 2, "divs": 1, "sqrts": 1, "transcendentals": 1, "flops": 7})
+
+    def test_FD_kernels(self):
+        # 4th-order Laplacian: 13 points of uu and one of vv read; rhs_gfs of uu and vv written
+        mem_counts = {"gf_loads": 14, "gf_stores": 2, "gf_read_streams": 2, "gf_write_streams": 2,
+                      "bytes_per_point": 32, "bytes_per_point_no_reuse": 128}
+        self.assertEqual(nonzero_counts(self.FD_kernel(False), op_keys), {"adds": 14, "muls": 13, "flops": 27})
+        self.assertEqual(nonzero_counts(self.FD_kernel(False), mem_keys), mem_counts)
+        self.assertEqual(nonzero_counts(self.FD_kernel(True), op_keys), {"adds": 8, "muls": 7, "fmas": 6, "flops": 27})
+        self.assertEqual(nonzero_counts(self.FD_kernel(True), mem_keys), mem_counts)
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
@@ -190,6 +190,26 @@ par.set_parval_from_str("reference_metric::CoordSystem", "Cartesian")
     create_test(module, module_name, function_and_global_dict, initialization_string_dict=initialization_string_dict)
 
 
+def test_SymTP_parallel():
+
+    module = 'reference_metric'
+
+    # Same trusted values as test_SymTP(): parallel derivation of hatted quantities must not change them.
+    module_name = 'rfm_SymTP'
+
+    function_and_global_dict = {'reference_metric(True)': ['xxmin', 'xxmax', 'UnitVectors', 'ReU', 'ReDD', 'ghatDD', 'ghatUU', 'detgammahat',
+                       'detgammahatdD', 'detgammahatdDD', 'ReUdD', 'ReUdDD', 'ReDDdD', 'ReDDdDD', 'ghatDDdD',
+                       'ghatDDdDD', 'GammahatUDD', 'GammahatUDDdD', 'Cart_to_xx','xx_to_Cart','xxSph','scalefactor_orthog']}
+
+    initialization_string_dict = {'reference_metric(True)': '''
+import NRPy_param_funcs as par
+par.set_parval_from_str("reference_metric::CoordSystem", "SymTP")
+par.set_parval_from_str("reference_metric::rfm_hatted_quantities_nprocs", 2)
+'''}
+
+    create_test(module, module_name, function_and_global_dict, initialization_string_dict=initialization_string_dict)
+
+
 if __name__ == '__main__':
     import sys
 
@@ -0,0 +1,99 @@
+""" Unit Testing for reference_metric_cache: a cache hit must restore exactly the reference_metric globals
+    that reference_metric() computes, and any change to the cache key must force a recomputation """
+
+# pylint: disable = import-error
+import unittest, sys, os, shutil, tempfile
+from unittest import mock
+import sympy as sp
+
+import NRPy_param_funcs as par
+import grid as gri
+import reference_metric as rfm
+import reference_metric_cache as rfmcache
+
+params = ["reference_metric::CoordSystem", "reference_metric::enable_rfm_precompute",
+          "reference_metric::rfm_precompute_Ccode_outdir", "reference_metric::rfm_precompute_max_num_2D_tables",
+          "reference_metric_cache::enable_reference_metric_cache", "reference_metric_cache::reference_metric_cache_dir"]
+
+
+def rfm_globals():
+    # The reference_metric globals restored on a cache hit, as strings
+    enable_rfm_precompute = par.parval_from_str("reference_metric::enable_rfm_precompute") == "True"
+    names = rfm.hatted_quantities_globals + (["rfm_struct_Ccode"] if enable_rfm_precompute else [])
+    return dict((name, str(getattr(rfm, name))) for name in names)
+
+
+class TestReferenceMetricCache(unittest.TestCase):
+
+    def setUp(self):
+        self.parvals = [par.parval_from_str(parname) for parname in params]
+        self.Nxx_plus_2NGHOSTS = gri.Nxx_plus_2NGHOSTS
+        self.rfm_globals = dict((name, getattr(rfm, name)) for name in rfm.hatted_quantities_globals + ["rfm_struct_Ccode"]
+                                if hasattr(rfm, name))
+        self.dirname = tempfile.mkdtemp()
+        par.set_parval_from_str("reference_metric_cache::reference_metric_cache_dir", os.path.join(self.dirname, "cache"))
+        par.set_parval_from_str("reference_metric::rfm_precompute_Ccode_outdir", self.dirname)
+        rfmcache.reset_reference_metric_cache_stats()
+
+    def tearDown(self):
+        for parname, parval in zip(params, self.parvals):
+            par.set_parval_from_str(parname, parval)
+        gri.Nxx_plus_2NGHOSTS = self.Nxx_plus_2NGHOSTS
+        for name, value in self.rfm_globals.items():
+            setattr(rfm, name, value)
+        shutil.rmtree(self.dirname, ignore_errors=True)
+
+    def reference_metric(self, enable_cache):
+        # Call reference_metric(), returning its globals and whether the hatted quantities were computed
+        par.set_parval_from_str("reference_metric_cache::enable_reference_metric_cache", enable_cache)
+        with mock.patch.object(rfm, "ref_metric__hatted_quantities", wraps=rfm.ref_metric__hatted_quantities) as hatted_quantities:
+            rfm.reference_metric()
+        return rfm_globals(), hatted_quantities.called
+
+    def test_cache_hit_reproduces_rfm_globals(self):
+        for CoordSystem, enable_rfm_precompute in [("Spherical", "False"), ("SinhSpherical", "True")]:
+            par.set_parval_from_str("reference_metric::CoordSystem", CoordSystem)
+            par.set_parval_from_str("reference_metric::enable_rfm_precompute", enable_rfm_precompute)
+            uncached, _computed = self.reference_metric(False)
+            header_files = sorted(filename for filename in os.listdir(self.dirname) if filename.endswith(".h"))
+            self.assertEqual(len(header_files) > 0, enable_rfm_precompute == "True")
+            headers = [open(os.path.join(self.dirname, filename)).read() for filename in header_files]
+            for filename in header_files:
+                os.remove(os.path.join(self.dirname, filename))
+            stats = dict(rfmcache.reference_metric_cache_stats)
+            self.assertEqual(self.reference_metric(True), (uncached, True))
+            self.assertEqual(rfmcache.reference_metric_cache_stats,
+                             dict(stats, misses=stats["misses"] + 1, stores=stats["stores"] + 1))
+            self.assertEqual(self.reference_metric(True), (uncached, False))
+            self.assertEqual(rfmcache.reference_metric_cache_stats,
+                             dict(stats, hits=stats["hits"] + 1, misses=stats["misses"] + 1, stores=stats["stores"] + 1))
+            # With rfm_precompute, a cache hit also outputs the rfm_struct C code
+            self.assertEqual([open(os.path.join(self.dirname, filename)).read() for filename in header_files], headers)
+
+    def test_key_change_forces_recomputation(self):
+        par.set_parval_from_str("reference_metric::CoordSystem", "Spherical")
+        Spherical, computed = self.reference_metric(True)
+        self.assertTrue(computed)
+        self.assertEqual(self.reference_metric(True), (Spherical, False))
+        changes = [("reference_metric::CoordSystem", "Cylindrical"),
+                   ("reference_metric::enable_rfm_precompute", "True"),
+                   ("reference_metric::rfm_precompute_max_num_2D_tables", 2)]
+        for parname, parval in changes:
+            saved_parval = par.parval_from_str(parname)
+            par.set_parval_from_str(parname, parval)
+            _globals, computed = self.reference_metric(True)
+            self.assertTrue(computed, parname)
+            par.set_parval_from_str(parname, saved_parval)
+        # rfm_struct arrays are allocated with sizes set by gri.Nxx_plus_2NGHOSTS
+        gri.Nxx_plus_2NGHOSTS = sp.symbols("Nxx_plus_2NGHOSTS_local0:3", integer=True)
+        _globals, computed = self.reference_metric(True)
+        self.assertTrue(computed)
+        gri.Nxx_plus_2NGHOSTS = self.Nxx_plus_2NGHOSTS
+        # Changing the key back finds the original entry
+        self.assertEqual(self.reference_metric(True), (Spherical, False))
+        self.assertEqual(rfmcache.reference_metric_cache_stats, {"hits": 2, "misses": 5, "stores": 5})
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())
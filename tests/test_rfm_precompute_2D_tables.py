@@ -0,0 +1,127 @@
+""" Unit Testing for rfm_precompute 2D tables (reference_metric::rfm_precompute_max_num_2D_tables): the most
+    expensive hatted quantity components depending on two coordinates are tabulated, and reading the
+    tables at [i<a> + Nxx_plus_2NGHOSTS<a>*i<b>] gives the values of the components they replace """
+
+# pylint: disable = import-error
+import unittest, sys, os, shutil, subprocess, tempfile
+import sympy as sp
+
+import NRPy_param_funcs as par
+import reference_metric as rfm
+
+params = ["reference_metric::CoordSystem", "reference_metric::enable_rfm_precompute",
+          "reference_metric::rfm_precompute_Ccode_outdir", "reference_metric::rfm_precompute_max_num_2D_tables"]
+
+# The components of the SinhSymTP hatted quantities that are the most expensive to evaluate at each gridpoint
+SinhSymTP_tables = ["GammahatUDDdD0000_of_xx0_xx1", "GammahatUDDdD0110_of_xx0_xx1",
+                    "GammahatUDDdD0220_of_xx0_xx1", "ReUdDD000_of_xx0_xx1"]
+
+
+def component(table):
+    # The component of the global replaced by table, e.g., GammahatUDDdD[0][1][1][0] for GammahatUDDdD0110_of_xx0_xx1
+    name = max((name for name in rfm.hatted_quantities_globals if table.startswith(name)), key=len)
+    tensor = getattr(rfm, name)
+    for i in table[len(name):table.index("_of_")]:
+        tensor = tensor[int(i)]
+    return tensor
+
+
+class TestRfmPrecompute2DTables(unittest.TestCase):
+
+    def setUp(self):
+        self.parvals = [par.parval_from_str(parname) for parname in params]
+        self.rfm_globals = dict((name, getattr(rfm, name)) for name in rfm.hatted_quantities_globals + ["rfm_struct_Ccode"]
+                                if hasattr(rfm, name))
+        self.dirname = tempfile.mkdtemp()
+        par.set_parval_from_str("reference_metric::CoordSystem", "SinhSymTP")
+        par.set_parval_from_str("reference_metric::rfm_precompute_Ccode_outdir", self.dirname)
+
+    def tearDown(self):
+        for parname, parval in zip(params, self.parvals):
+            par.set_parval_from_str(parname, parval)
+        for name, value in self.rfm_globals.items():
+            setattr(rfm, name, value)
+        shutil.rmtree(self.dirname, ignore_errors=True)
+
+    def tables(self, max_num_2D_tables):
+        # The 2D tables in rfm_struct, with rfm_precompute_max_num_2D_tables = max_num_2D_tables
+        par.set_parval_from_str("reference_metric::enable_rfm_precompute", "True")
+        par.set_parval_from_str("reference_metric::rfm_precompute_max_num_2D_tables", max_num_2D_tables)
+        rfm.reference_metric()
+        return [line.split()[-1].rstrip(";") for line in rfm.rfm_struct_Ccode["struct"].splitlines()
+                if any(line.split()[-1].startswith(name) for name in rfm.hatted_quantities_globals)]
+
+    def test_most_expensive_components_are_tabulated(self):
+        self.assertEqual(self.tables(0), [])
+        tables = self.tables(2)
+        self.assertEqual(len(tables), 2)
+        self.assertTrue(set(tables) < set(SinhSymTP_tables))
+        self.assertEqual(self.tables(4), SinhSymTP_tables)
+        for table in SinhSymTP_tables:
+            # Each table replaces its component, is read within the i0 loop, and is allocated as a 2D array
+            self.assertEqual(component(table), sp.Symbol(table))
+            self.assertIn("const REAL " + table + " = rfmstruct->" + table + "[i0 + Nxx_plus_2NGHOSTS0*i1];\n",
+                          rfm.rfm_struct_Ccode["read"][0])
+            self.assertIn("rfmstruct." + table + " = (REAL *)malloc(sizeof(REAL)*Nxx_plus_2NGHOSTS0*Nxx_plus_2NGHOSTS1);\n",
+                          rfm.rfm_struct_Ccode["malloc"])
+        # Tabulated components no longer appear in any other form
+        self.assertNotIn("ReUdDD000", str(rfm.ReUdDD).replace("ReUdDD000_of_xx0_xx1", ""))
+
+    @unittest.skipIf(shutil.which("gcc") is None, "requires gcc")
+    def test_table_reads_match_symbolic_values(self):
+        # The symbolic components, in terms of xx0 and xx1, without rfm_precompute
+        par.set_parval_from_str("reference_metric::enable_rfm_precompute", "False")
+        rfm.reference_metric()
+        exprs = dict((table, component(table)) for table in SinhSymTP_tables)
+        self.assertEqual(self.tables(4), SinhSymTP_tables)
+        rfm_struct_Ccode = rfm.rfm_struct_Ccode
+        Ccode = """#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+#define REAL double
+const int Nxx_plus_2NGHOSTS0 = 7, Nxx_plus_2NGHOSTS1 = 6, Nxx_plus_2NGHOSTS2 = 5;
+const REAL AMAX = 10.0, bScale = 0.5, SINHWAA = 0.2;
+""" + rfm_struct_Ccode["struct"] + """
+REAL check(const rfm_struct *restrict rfmstruct, REAL *xx[3]) {
+  REAL max_rel_diff = 0.0;
+  for(int i2=0;i2<Nxx_plus_2NGHOSTS2;i2++) {
+""" + rfm_struct_Ccode["read"][2] + """
+    for(int i1=0;i1<Nxx_plus_2NGHOSTS1;i1++) {
+""" + rfm_struct_Ccode["read"][1] + """
+      const REAL xx1 = xx[1][i1];
+      for(int i0=0;i0<Nxx_plus_2NGHOSTS0;i0++) {
+""" + rfm_struct_Ccode["read"][0] + """
+        const REAL xx0 = xx[0][i0];
+"""
+        for table in SinhSymTP_tables:
+            Ccode += "        {\n          const REAL exact = " + sp.ccode(exprs[table]) + ";\n" + \
+                     "          max_rel_diff = fmax(max_rel_diff, fabs(" + table + " - exact)/(1.0 + fabs(exact)));\n        }\n"
+        Ccode += """      }
+    }
+  }
+  return max_rel_diff;
+}
+int main(void) {
+  const int Nxx_plus_2NGHOSTS[3] = { Nxx_plus_2NGHOSTS0, Nxx_plus_2NGHOSTS1, Nxx_plus_2NGHOSTS2 };
+  REAL *xx[3];
+  for(int d=0;d<3;d++) {
+    xx[d] = (REAL *)malloc(sizeof(REAL)*Nxx_plus_2NGHOSTS[d]);
+    for(int j=0;j<Nxx_plus_2NGHOSTS[d];j++) xx[d][j] = 0.15 + 0.11*j + 0.07*d;
+  }
+""" + rfm_struct_Ccode["malloc"] + rfm_struct_Ccode["define"] + """
+  printf("%.3e\\n", check(&rfmstruct, xx));
+""" + rfm_struct_Ccode["freemem"] + """
+  return 0;
+}
+"""
+        Cfile = os.path.join(self.dirname, "rfm_2D_tables.c")
+        exefile = os.path.join(self.dirname, "rfm_2D_tables")
+        with open(Cfile, "w") as file:
+            file.write(Ccode)
+        subprocess.check_call(["gcc", "-O2", "-Wall", "-Werror", "-Wno-unused-variable", Cfile, "-o", exefile, "-lm"])
+        self.assertLess(float(subprocess.check_output([exefile])), 1e-12)
+
+
+if __name__ == '__main__':
+    result = unittest.main(argv=[sys.argv[0]], exit=False).result
+    sys.exit(not result.wasSuccessful())